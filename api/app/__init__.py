@@ -6,7 +6,6 @@ from app.extensions import (
     db,
     migrate,
     jwt,
-    jwt_blacklist,
     socketio,
     ma,
     init_milvus_client, 
@@ -14,23 +13,43 @@ from app.extensions import (
 )
 from app.auth.models import User
 from app.common.hipaa_middleware import HIPAAMiddleware
+from app.common.instrumentation import PrometheusMiddleware
+from app.common.sql_profiler import init_sql_profiler
 from app.common.error_handlers import register_error_handlers
+from app.common.audit_writer import init_audit_writer, get_audit_writer
+from app.auth.revocation import init_revocation_store, get_revocation_store
+from app.dashboard.rollups import init_rollup_compactor, get_rollup_compactor
+from app.dashboard.recorder import init_metrics_recorder, get_metrics_recorder
+from app.common.health_prober import init_health_prober, get_health_prober
 
-def create_app():
+def create_app(config_overrides: dict = None):
     app = Flask(__name__)
     app.config.from_object("config.Config")
-    CORS(app, supports_credentials=True, origins=["http://localhost:3000"])
+    # Applied before anything below reads the config, e.g. run_jobs.py's BACKGROUND_SERVICES=False
+    app.config.update(config_overrides or {})
+    background_services = app.config.get("BACKGROUND_SERVICES", True)
+    # The web client reads the pagination headers, which browsers hide unless exposed
+    CORS(app, supports_credentials=True, origins=app.config["CORS_ORIGINS"],
+         expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "X-Total-Count"])
 
 
     # --- Initialize Flask extensions ---
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
-    socketio.init_app(app)
+    # Import handlers before init_app so they are kept on socketio and re-bound for every app instance
+    from app.chat import socket as chat_socket  # noqa: F401
+    socketio.init_app(app, cors_allowed_origins=app.config["CORS_ORIGINS"])
     ma.init_app(app)
     
     # Initialize HIPAA compliance middleware
     HIPAAMiddleware(app)
+
+    # Prometheus request/DB metrics, scraped from /metrics
+    PrometheusMiddleware(app)
+
+    # Sampled per-request SQL profiling with N+1 detection (report at /api/dashboard/metrics/sql-profile)
+    init_sql_profiler(app)
     
     # Initialize rate limiting for HIPAA compliance
     limiter = Limiter(
@@ -53,6 +72,7 @@ def create_app():
     from app.dashboard.routes import dashboard_bp
     from app.llm.routes import llm_bp
     from app.common.health import health_bp
+    from app.jobs.routes import jobs_bp
 
     app.register_blueprint(health_bp)
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -63,18 +83,40 @@ def create_app():
     app.register_blueprint(billing_bp, url_prefix="/api/billing")
     app.register_blueprint(dashboard_bp, url_prefix="/api/dashboard")
     app.register_blueprint(llm_bp, url_prefix="/api/llm")
+    app.register_blueprint(jobs_bp, url_prefix="/api/jobs")
+
+    # --- JWT Token Revocation (shared store, see REVOCATION_STORE_URL) ---
+    init_revocation_store(app)
 
-    # --- JWT Token Revocation (Blacklist) ---
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
         jti = jwt_payload["jti"]
-        return jti in jwt_blacklist
+        return get_revocation_store().is_revoked(jti)
 
     # --- Application Context Initializations (DB, Milvus, Models) ---
     with app.app_context():
         # Initialize Database Tables (for dev/first run; use Flask-Migrate in prod)
         db.create_all()
 
+        # Batched HIPAA audit writer (replays any spill files left by a crash)
+        init_audit_writer(app)
+
+        if background_services:
+            # Dashboard metric rollups, folded in from the raw event tables in the background
+            init_rollup_compactor(app)
+
+            # Buffered counters/gauges/histograms, including per-request API call and latency metrics
+            init_metrics_recorder(app)
+
+            # Pre-generated LLM summaries for upcoming appointments (PATIENT_SUMMARY_PREGENERATE_INTERVAL).
+            # Imported here: Patient's relationships need every blueprint's models registered first.
+            from app.patients.services import init_summary_pregenerator
+            init_summary_pregenerator(app)
+
+            # Background LLM jobs: completion events, plus in-process workers if JOBS_IN_PROCESS_THREADS is set
+            from app.jobs.services import init_jobs
+            init_jobs(app)
+
         # Ensure 'bot' user exists for AI/RAG interactions
         bot = User.query.filter_by(username="bot").first()
         if not bot:
@@ -122,8 +164,33 @@ def create_app():
         except Exception as e:
             app.logger.error(f"Failed to initialize embedding model: {e}", exc_info=True)
 
-        # Llama Model - using lazy loading to prevent segfault
-        app.logger.info("Llama model will be loaded on first use (lazy loading).")
+        # Chat agent routing: embeds each agent's exemplars once (keyword routing if the model is missing)
+        from app.agents.intent_router import init_intent_router
+        init_intent_router(app)
+
+        # Llama Model - served by isolated worker processes (LLM_WORKERS) so a llama.cpp
+        # crash cannot take down the API; started lazily on the first LLM request.
+        app.logger.info(f"Llama model will be loaded on first use by {app.config.get('LLM_WORKERS', 0)} worker process(es).")
+
+    # Component health is probed in the background; health endpoints serve the cached snapshot
+    if background_services:
+        init_health_prober(app)
 
     return app
 
+
+def stop_background_services():
+    """
+    Stop the process-wide background threads create_app() started, writing what they buffered.
+    They are shared by every app in the process and the next create_app() restarts them, so
+    tests stop them before dropping an app's tables.
+    """
+    from app.patients.services import get_summary_pregenerator
+    from app.jobs.services import get_job_notifier
+    for get_service in (get_health_prober, get_job_notifier, get_summary_pregenerator, get_rollup_compactor,
+                        get_metrics_recorder, get_audit_writer):
+        try:
+            service = get_service()
+        except RuntimeError:
+            continue  # never started in this process (BACKGROUND_SERVICES off)
+        service.stop()
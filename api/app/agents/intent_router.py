@@ -0,0 +1,217 @@
+from typing import Callable, Optional, Sequence
+from app.extensions import embed_texts
+from app.rag.embedding_cache import embed_query
+import numpy as np
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_INTENT = "fallback"
+
+# Labelled example queries per agent; a query is routed to the agent whose closest exemplar
+# is most similar. Add phrasings here when a kind of question keeps being misrouted.
+INTENT_EXEMPLARS = {
+    "symptom": [
+        "I have a headache and a fever",
+        "My stomach hurts after eating",
+        "I've been coughing for a week",
+        "I feel dizzy when I stand up",
+        "There is a rash on my arm that itches",
+        "My child has a high temperature",
+        "I'm not feeling well today",
+        "My back pain is getting worse",
+        "Is shortness of breath a sign of something serious?",
+        "I have a sore throat and swollen glands",
+    ],
+    "medication": [
+        "What are the side effects of ibuprofen?",
+        "Can I take paracetamol with alcohol?",
+        "What dose of amoxicillin should an adult take?",
+        "Does metformin interact with other drugs?",
+        "Is it safe to take this medication while pregnant?",
+        "How long does it take for antibiotics to work?",
+        "What should I do if I miss a dose?",
+        "Which painkiller is gentler on the stomach?",
+    ],
+    "billing": [
+        "I have a question about my bill",
+        "Why is my invoice higher than expected?",
+        "How do I pay my outstanding balance?",
+        "Does my insurance cover this visit?",
+        "I was charged twice for the same appointment",
+        "Can I set up a payment plan?",
+        "What is this charge on my billing statement?",
+        "How much will the procedure cost?",
+        "I need a receipt for my payment",
+    ],
+    "prescription": [
+        "I need a refill of my prescription",
+        "Can my doctor renew my blood pressure prescription?",
+        "My pharmacy hasn't received my prescription",
+        "How many refills do I have left?",
+        "Can you send my prescription to a different pharmacy?",
+        "My prescription ran out yesterday",
+        "How do I get a new script for my inhaler?",
+    ],
+    FALLBACK_INTENT: [
+        "Hello",
+        "What are your opening hours?",
+        "How do I book an appointment?",
+        "Can I change my contact details?",
+        "Thank you for your help",
+        "How do I reset my password?",
+    ],
+}
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class IntentRouter:
+    """
+    Routes queries to agents by embedding similarity.
+
+    Every exemplar is embedded once (build()) into a unit-normalized float32 matrix grouped by
+    intent. A query is scored with one matrix-vector product; each intent's score is its best
+    exemplar's cosine similarity, and the query goes to the top intent unless that score is
+    below `threshold`, in which case it goes to the fallback agent. classify_batch() scores many
+    queries with one matrix product.
+    """
+
+    def __init__(self, exemplars: dict = None, threshold: float = 0.4,
+                 embed: Callable[[list], np.ndarray] = None):
+        self.exemplars = exemplars or INTENT_EXEMPLARS
+        self.threshold = threshold
+        self._embed = embed or embed_texts
+        # (matrix, intents, starts): unit exemplar rows grouped by intent, and each intent's first row
+        self._index = None
+        self._lock = threading.Lock()
+        self._counters = {"routed": 0, "low_confidence": 0}
+        self._route_seconds = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def build(self):
+        """Embed all exemplars in one batched pass; call again after changing the exemplars."""
+        intents, texts, starts = [], [], []
+        for intent, examples in self.exemplars.items():
+            if not examples:
+                continue
+            intents.append(intent)
+            starts.append(len(texts))
+            texts.extend(examples)
+        matrix = _unit_rows(np.asarray(self._embed(texts), dtype=np.float32))
+        self._index = (matrix, tuple(intents), np.asarray(starts))
+        logger.info(f"Intent router built from {len(texts)} exemplars across {len(intents)} intents")
+
+    # --- Classification ---
+
+    def _scores(self, vectors):
+        index = self._index
+        if index is None:
+            raise RuntimeError("Intent router has not been built; call build() first.")
+        matrix, intents, starts = index
+        vectors = _unit_rows(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        return np.maximum.reduceat(vectors @ matrix.T, starts, axis=1), intents
+
+    def scores(self, vectors) -> dict:
+        """{intent: best-exemplar cosine similarity} for one query vector."""
+        scores, intents = self._scores(vectors)
+        return dict(zip(intents, scores[0].tolist()))
+
+    def classify(self, vector) -> tuple:
+        """(intent, confidence) for one query embedding."""
+        return self.classify_batch([vector])[0]
+
+    def classify_batch(self, vectors) -> list:
+        """[(intent, confidence), ...] for a batch of query embeddings."""
+        started = time.perf_counter()
+        scores, intents = self._scores(vectors)
+        best = scores.argmax(axis=1)
+        results = []
+        low_confidence = 0
+        for row, index in enumerate(best):
+            confidence = float(scores[row, index])
+            if confidence < self.threshold:
+                results.append((FALLBACK_INTENT, confidence))
+                low_confidence += 1
+            else:
+                results.append((intents[index], confidence))
+        with self._lock:
+            self._counters["routed"] += len(results)
+            self._counters["low_confidence"] += low_confidence
+            self._route_seconds += time.perf_counter() - started
+        return results
+
+    def route(self, text: str, vector: Optional[np.ndarray] = None) -> tuple:
+        """
+        (intent, confidence) for a query. Without `vector` the query embedding comes from the
+        query embedding cache, so a query the chat path has already embedded for RAG costs
+        no model call.
+        """
+        return self.classify(embed_query(text) if vector is None else vector)
+
+    def route_batch(self, texts: Sequence[str]) -> list:
+        return self.classify_batch(self._embed(list(texts)))
+
+    def stats(self) -> dict:
+        index = self._index
+        with self._lock:
+            routed = self._counters["routed"]
+            return {
+                "ready": index is not None,
+                "intents": list(index[1]) if index else [],
+                "exemplars": len(index[0]) if index else 0,
+                "threshold": self.threshold,
+                **self._counters,
+                "avg_route_microseconds": self._route_seconds / routed * 1e6 if routed else 0.0,
+            }
+
+
+def classify_keywords(user_query: str) -> str:
+    """Keyword routing, used only while the embedding model is unavailable."""
+    lower = user_query.lower()
+    if any(word in lower for word in ["bill", "payment", "invoice", "insurance", "cost"]):
+        return "billing"
+    elif any(word in lower for word in ["prescription", "refill", "script"]):
+        return "prescription"
+    elif any(word in lower for word in ["medication", "medicine", "drug", "dose", "side effect"]):
+        return "medication"
+    elif any(word in lower for word in ["pain", "symptom", "fever", "ache", "not feeling"]):
+        return "symptom"
+    return FALLBACK_INTENT
+
+
+_intent_router = None
+_intent_router_lock = threading.Lock()
+
+
+def init_intent_router(app) -> IntentRouter:
+    """
+    Create the process-wide router from INTENT_ROUTER_* settings and embed its exemplars.
+    Needs the embedding model; if it is unavailable the router stays unbuilt and routing
+    falls back to keywords.
+    """
+    global _intent_router
+    with _intent_router_lock:
+        if _intent_router is None:
+            _intent_router = IntentRouter(threshold=app.config.get("INTENT_ROUTER_THRESHOLD", 0.4))
+        if not _intent_router.ready:
+            try:
+                _intent_router.build()
+            except Exception as e:
+                logger.error(f"Intent router build failed, routing by keywords: {e}")
+    return _intent_router
+
+
+def get_intent_router() -> IntentRouter:
+    if _intent_router is None:
+        raise RuntimeError("Intent router not initialized; call init_intent_router(app) in create_app.")
+    return _intent_router
@@ -1,4 +1,6 @@
-from app.llm.model import generate_response
+from app.llm.clients import generate_response
+from app.llm.scheduler import SchedulerBusyError
+from app.llm.prefix_cache import register_static_prefix
 from typing import Optional
 from flask import current_app
 
@@ -8,6 +10,8 @@ class BaseAgent:
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.top_p = top_p
+        # Every prompt from this agent starts with the same system message; cache its KV state
+        register_static_prefix([{"role": "system", "content": self.system_prompt}])
 
     def build_messages(self, user_query: str, context: Optional[str] = None) -> list:
         prompt_parts = []
@@ -37,10 +41,30 @@ class BaseAgent:
                 top_p=self.top_p,
             )
             return response
+        except SchedulerBusyError:
+            raise
         except Exception as e:
             current_app.logger.error(f"LLM generation error in {self.__class__.__name__}: {e}", exc_info=True)
             return "Sorry, I couldn't process your request at the moment."
 
+    def answer_stream(
+        self,
+        user_query: str,
+        context: Optional[str] = None,
+    ):
+        """
+        Stream the answer as text pieces as the model produces them.
+        The request is queued immediately, so SchedulerBusyError is raised here rather than mid-stream.
+        """
+        messages = self.build_messages(user_query, context)
+        return generate_response(
+            messages=messages,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            top_p=self.top_p,
+            stream=True,
+        )
+
 
 class SymptomCheckerAgent(BaseAgent):
     def __init__(self, max_tokens=512):
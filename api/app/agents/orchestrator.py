@@ -1,23 +1,30 @@
 from flask import current_app
 from app.agents.multi_agents import AGENTS
+from app.agents.intent_router import classify_keywords, get_intent_router
+from app.common.instrumentation import AGENT_ROUTES
 
 
 def classify_intent(user_query: str) -> str:
-    lower = user_query.lower()
-    if any(word in lower for word in ["pain", "symptom", "fever", "ache", "not feeling", "i have"]):
-        return "symptom"
-    elif any(word in lower for word in ["medication", "drug", "dose", "side effect"]):
-        return "medication"
-    elif any(word in lower for word in ["bill", "payment", "invoice", "insurance", "cost"]):
-        return "billing"
-    elif any(word in lower for word in ["prescription", "refill", "medicine", "script"]):
-        return "prescription"
-    else:
-        return "fallback"
+    """Agent for a query from the embedding intent router, or from keywords while it is unavailable."""
+    try:
+        router = get_intent_router()
+        if router.ready:
+            intent, confidence = router.route(user_query)
+            current_app.logger.info(f"Classified intent: {intent} ({confidence:.2f})")
+            AGENT_ROUTES.labels(intent=intent, method="embedding").inc()
+            return intent
+    except Exception as e:
+        current_app.logger.warning(f"Intent router unavailable, routing by keywords: {e}")
+    intent = classify_keywords(user_query)
+    current_app.logger.info(f"Classified intent by keywords: {intent}")
+    AGENT_ROUTES.labels(intent=intent, method="keywords").inc()
+    return intent
 
 
-def supervisor_agent(user_query: str, context: str) -> str:
+def supervisor_agent(user_query: str, context: str, stream: bool = False):
+    """Route the query to an agent. Returns the reply text, or an iterator of text pieces when stream=True."""
     intent = classify_intent(user_query)
-    current_app.logger.info(f"Classified intent: {intent}")
     agent = AGENTS.get(intent, AGENTS["fallback"])
+    if stream:
+        return agent.answer_stream(user_query, context)
     return agent.answer(user_query, context)
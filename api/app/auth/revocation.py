@@ -0,0 +1,330 @@
+from typing import Iterable, List, Tuple
+import threading
+import hashlib
+import bisect
+import logging
+import sqlite3
+import math
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no deletes; rebuild to drop entries)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+# --- Backends ---
+# Each backend stores (jti, expires_at) pairs and exposes an append-only change feed
+# (changes_since) so every worker can keep its Bloom filter current incrementally.
+
+
+class MemoryRevocationBackend:
+    """Single-process backend, for development and tests."""
+
+    def __init__(self):
+        self._entries = {}  # jti -> expires_at
+        self._feed = []  # (seq, jti, expires_at), ascending seq; expired entries are purged
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def add(self, jti: str, expires_at: float):
+        with self._lock:
+            self._entries[jti] = expires_at
+            self._seq += 1
+            self._feed.append((self._seq, jti, expires_at))
+
+    def contains(self, jti: str) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def changes_since(self, cursor: int) -> Tuple[List[Tuple[str, float]], int]:
+        # Cursors are seqs, not list positions, so they stay valid when purging trims the feed
+        with self._lock:
+            changes = self._feed[bisect.bisect_right(self._feed, cursor, key=lambda entry: entry[0]):]
+        return [(jti, exp) for _, jti, exp in changes], changes[-1][0] if changes else cursor
+
+    def active(self) -> List[Tuple[str, float]]:
+        now = time.time()
+        with self._lock:
+            return [(jti, exp) for jti, exp in self._entries.items() if exp > now]
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [jti for jti, exp in self._entries.items() if exp <= now]
+            for jti in expired:
+                del self._entries[jti]
+            self._feed = [entry for entry in self._feed if entry[2] > now]
+        return len(expired)
+
+
+class SQLiteRevocationBackend:
+    """SQLite file shared by every worker process on the host."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS revoked_tokens ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT, jti TEXT NOT NULL UNIQUE, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires ON revoked_tokens (expires_at)")
+            self._conn.commit()
+
+    def add(self, jti: str, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)", (jti, expires_at)
+            )
+            self._conn.commit()
+
+    def contains(self, jti: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM revoked_tokens WHERE jti = ? AND expires_at > ?", (jti, time.time())
+            ).fetchone()
+        return row is not None
+
+    def changes_since(self, cursor: int) -> Tuple[List[Tuple[str, float]], int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, jti, expires_at FROM revoked_tokens WHERE seq > ? ORDER BY seq", (cursor,)
+            ).fetchall()
+        return [(jti, exp) for _, jti, exp in rows], rows[-1][0] if rows else cursor
+
+    def active(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT jti, expires_at FROM revoked_tokens WHERE expires_at > ?", (time.time(),)
+            ).fetchall()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+        return cursor.rowcount
+
+
+class RedisRevocationBackend:
+    """Redis backend for deployments spanning several hosts. Keys expire with the token."""
+
+    # Allocating the feed seq and writing the entry in one script keeps the feed gap-free for
+    # readers: with a separate INCR, seq N+1 could be visible before N and a cursor would skip N.
+    _ADD_SCRIPT = """
+    local seq = redis.call('INCR', KEYS[1])
+    redis.call('SET', KEYS[2], 1, 'EX', ARGV[1])
+    redis.call('ZADD', KEYS[3], seq, ARGV[2])
+    return seq
+    """
+
+    def __init__(self, url: str, prefix: str = "revoked"):
+        import redis  # optional dependency, only needed for this backend
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._add = self._redis.register_script(self._ADD_SCRIPT)
+
+    def add(self, jti: str, expires_at: float):
+        ttl = max(1, int(math.ceil(expires_at - time.time())))
+        self._add(
+            keys=[f"{self._prefix}:seq", f"{self._prefix}:jti:{jti}", f"{self._prefix}:feed"],
+            args=[ttl, f"{expires_at}|{jti}"],
+        )
+
+    def contains(self, jti: str) -> bool:
+        return bool(self._redis.exists(f"{self._prefix}:jti:{jti}"))
+
+    def changes_since(self, cursor: int) -> Tuple[List[Tuple[str, float]], int]:
+        rows = self._redis.zrangebyscore(f"{self._prefix}:feed", f"({cursor}", "+inf", withscores=True)
+        changes = []
+        for member, seq in rows:
+            expires_at, jti = member.decode("utf-8").split("|", 1)
+            changes.append((jti, float(expires_at)))
+            cursor = int(seq)
+        return changes, cursor
+
+    def active(self) -> List[Tuple[str, float]]:
+        now = time.time()
+        return [(jti, exp) for jti, exp in self.changes_since(0)[0] if exp > now]
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        expired = [
+            member for member in self._redis.zrange(f"{self._prefix}:feed", 0, -1)
+            if float(member.decode("utf-8").split("|", 1)[0]) <= now
+        ]
+        if expired:
+            self._redis.zrem(f"{self._prefix}:feed", *expired)
+        return len(expired)
+
+
+# --- Store ---
+
+
+class RevocationStore:
+    """
+    JWT revocation checks with an optional per-process Bloom filter in front of a shared backend.
+
+    The filter is kept current from the backend's change feed at most every `sync_interval`
+    seconds, so a token that was never revoked is answered from memory; only filter hits
+    (revoked tokens and rare false positives) reach the backend. Revocations made in another
+    worker take effect here within `sync_interval`. Expired entries are purged and the filter
+    rebuilt every `purge_interval` seconds, which keeps its size bounded by live revocations.
+    """
+
+    def __init__(self, backend, bloom_capacity: int = 100000, bloom_error_rate: float = 0.001,
+                 sync_interval: float = 2.0, purge_interval: float = 300.0, use_bloom: bool = True):
+        self.backend = backend
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.sync_interval = sync_interval
+        self.purge_interval = purge_interval
+        self.use_bloom = use_bloom
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._cursor = 0
+        self._last_sync = self._last_purge = time.monotonic()
+        self._counters = {"checks": 0, "bloom_negatives": 0, "backend_checks": 0, "revoked_hits": 0}
+        if use_bloom:
+            self._rebuild()
+
+    def revoke(self, jti: str, expires_at: float):
+        """Revoke a token until its `exp` (seconds since the epoch)."""
+        self.backend.add(jti, float(expires_at))
+        if self._bloom is not None:
+            with self._lock:
+                self._bloom.add(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        self._counters["checks"] += 1
+        if self._bloom is not None:
+            self._maybe_sync()
+            if jti not in self._bloom:
+                self._counters["bloom_negatives"] += 1
+                return False
+        self._counters["backend_checks"] += 1
+        revoked = self.backend.contains(jti)
+        if revoked:
+            self._counters["revoked_hits"] += 1
+        return revoked
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "bloom_entries": self._bloom.count if self._bloom is not None else None,
+            "bloom_capacity": self._bloom.capacity if self._bloom is not None else None,
+            **self._counters,
+        }
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_interval:
+            return
+        with self._lock:
+            if now - self._last_sync < self.sync_interval:
+                return
+            self._last_sync = now
+            try:
+                if isinstance(self._bloom, _AlwaysMaybe) or now - self._last_purge >= self.purge_interval:
+                    self._last_purge = now
+                    self.backend.purge_expired()
+                    self._rebuild_locked()
+                    return
+                changes, self._cursor = self.backend.changes_since(self._cursor)
+                self._add_all(changes)
+            except Exception as e:
+                # Fail closed for this check window: route every lookup to the backend
+                logger.error(f"Revocation sync failed, checking the backend directly: {e}")
+                self._bloom = _AlwaysMaybe()
+
+    def _rebuild(self):
+        with self._lock:
+            self._rebuild_locked()
+
+    def _rebuild_locked(self):
+        _, cursor = self.backend.changes_since(self._cursor)
+        active = self.backend.active()
+        self._bloom = BloomFilter(max(self.bloom_capacity, 2 * len(active)), self.bloom_error_rate)
+        for jti, _ in active:
+            self._bloom.add(jti)
+        self._cursor = cursor
+
+    def _add_all(self, changes: Iterable[Tuple[str, float]]):
+        for jti, _ in changes:
+            self._bloom.add(jti)
+        if self._bloom.count > self._bloom.capacity:
+            self._rebuild_locked()  # grow rather than let the false-positive rate climb
+
+
+class _AlwaysMaybe:
+    """Stand-in filter after a failed sync; the next sync rebuilds the real one."""
+
+    count = 0
+    capacity = 0
+
+    def __contains__(self, item):
+        return True
+
+    def add(self, item):
+        pass
+
+
+def create_backend(url: str, instance_path: str):
+    """memory:// | sqlite:///path/to/file.db | redis://host:port/db (default: SQLite file in the instance folder)."""
+    if not url:
+        return SQLiteRevocationBackend(os.path.join(instance_path, "revoked_tokens.db"))
+    if url.startswith("memory://"):
+        return MemoryRevocationBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteRevocationBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRevocationBackend(url)
+    raise ValueError(f"Unsupported REVOCATION_STORE_URL: {url}")
+
+
+_revocation_store = None
+
+
+def init_revocation_store(app) -> RevocationStore:
+    global _revocation_store
+    _revocation_store = RevocationStore(
+        create_backend(app.config.get("REVOCATION_STORE_URL", ""), app.instance_path),
+        bloom_capacity=app.config.get("REVOCATION_BLOOM_CAPACITY", 100000),
+        bloom_error_rate=app.config.get("REVOCATION_BLOOM_ERROR_RATE", 0.001),
+        sync_interval=app.config.get("REVOCATION_SYNC_INTERVAL", 2.0),
+        use_bloom=app.config.get("REVOCATION_USE_BLOOM", True),
+    )
+    return _revocation_store
+
+
+def get_revocation_store() -> RevocationStore:
+    if _revocation_store is None:
+        raise RuntimeError("Revocation store not initialized; call init_revocation_store(app) in create_app.")
+    return _revocation_store
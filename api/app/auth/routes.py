@@ -163,10 +163,10 @@ def change_password():
 @jwt_required()
 def logout():
     from flask_jwt_extended import get_jwt
-    from app.extensions import jwt_blacklist
-    
-    jti = get_jwt()["jti"]
-    jwt_blacklist.add(jti)
+    from app.auth.revocation import get_revocation_store
+
+    claims = get_jwt()
+    get_revocation_store().revoke(claims["jti"], claims["exp"])
     
     response = jsonify({"message": "Logged out successfully"})
     unset_jwt_cookies(response)
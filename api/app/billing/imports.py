@@ -0,0 +1,184 @@
+from collections import defaultdict
+from marshmallow import EXCLUDE, ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from app.billing.models import Invoice, Payment, settled_status
+from app.billing.schemas import PaymentSchema
+from app.extensions import db, _iter_batches
+from app.llm.response_cache import invalidate_cached_responses
+import logging
+import json
+import csv
+import io
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "ndjson")
+
+
+class UnreadableFileError(ValueError):
+    """The upload stopped being readable (bad UTF-8, malformed CSV); nothing after it is imported."""
+
+# Remittance files carry extra columns (claim numbers, payer ids...); only the payment fields are kept
+_payment_schema = PaymentSchema(unknown=EXCLUDE)
+
+
+def detect_format(content_type: str = None, filename: str = None, requested: str = None) -> str:
+    """'csv' or 'ndjson' from an explicit ?format=, the file extension or the content type."""
+    if requested:
+        return requested.lower()
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if name.endswith(".csv"):
+        return "csv"
+    content_type = (content_type or "").lower()
+    if "ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type:
+        return "ndjson"
+    return "csv"
+
+
+def read_rows(stream, fmt: str):
+    """
+    Yield (row number, record or None, parse error or None) from a binary stream, one line at
+    a time, so a large upload is never held in memory. Row numbers count data rows from 1.
+    If the file itself cannot be read further, the last item carries an UnreadableFileError
+    as its error, numbered after the last row read.
+    """
+    number = 0
+    try:
+        for number, record, error in _parse_rows(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""), fmt):
+            yield number, record, error
+    except (UnicodeDecodeError, csv.Error) as e:
+        yield number + 1, None, UnreadableFileError(
+            f"File could not be read past row {number}: {e}. Rows from here on were not imported."
+        )
+
+
+def _parse_rows(text, fmt: str):
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(text), start=1):
+            # Blank cells mean "not given", not an empty string
+            yield number, {k: v for k, v in record.items() if k and v not in (None, "")}, None
+        return
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(record, dict):
+            yield number, record, None
+        else:
+            yield number, None, "Each line must be a JSON object"
+
+
+def _validate(record: dict):
+    """(payment values, None) or (None, errors) for one row."""
+    try:
+        payment = _payment_schema.load(record)
+    except ValidationError as e:
+        return None, e.messages
+    errors = {}
+    for field in ("invoice_id", "amount"):
+        if payment.get(field) is None:
+            errors[field] = ["Missing data for required field."]
+    if not errors and payment["amount"] <= 0:
+        errors["amount"] = ["Must be greater than 0."]
+    if errors:
+        return None, errors
+    return {"invoice_id": payment["invoice_id"], "amount": payment["amount"], "method": payment.get("method")}, None
+
+
+def import_payments(rows, batch_size: int = 1000) -> dict:
+    """
+    Insert payments from `rows` (as yielded by read_rows) in batches of `batch_size`.
+
+    Each batch is one transaction: a single executemany INSERT, then one UPDATE per affected
+    invoice adding that batch's payments to paid_total and settling its status. Rows that fail
+    validation or reference a missing invoice are reported and skipped; if a batch's transaction
+    fails, its rows are reported as failed and the import continues with the next batch. When
+    the file becomes unreadable part way, the batches read so far are kept and the report says
+    so in `file_error`, with every row's outcome up to that point.
+    """
+    payments, invoices = Payment.__table__, Invoice.__table__
+    add_to_invoice = (
+        update(invoices)
+        .where(invoices.c.id == bindparam("invoice_key"))
+        .values(
+            paid_total=invoices.c.paid_total + bindparam("delta"),
+            status=settled_status(invoices.c.paid_total + bindparam("delta")),
+        )
+    )
+    results = []
+    touched = set()
+    summary = {"rows": 0, "created": 0, "failed": 0, "file_error": None}
+
+    for batch in _iter_batches(rows, batch_size):
+        summary["rows"] += len(batch)
+        valid = []
+        for number, record, error in batch:
+            if isinstance(error, UnreadableFileError):
+                summary["rows"] -= 1  # not a data row
+                summary["file_error"] = str(error)
+                continue
+            if error:
+                results.append({"row": number, "status": "error", "errors": {"_row": [error]}})
+                continue
+            values, errors = _validate(record)
+            if errors:
+                results.append({"row": number, "status": "error", "errors": errors})
+            else:
+                valid.append((number, values))
+
+        invoice_ids = {values["invoice_id"] for _, values in valid}
+        known = set(
+            db.session.execute(select(invoices.c.id).where(invoices.c.id.in_(invoice_ids))).scalars()
+        ) if invoice_ids else set()
+        accepted = []
+        for number, values in valid:
+            if values["invoice_id"] in known:
+                accepted.append((number, values))
+            else:
+                results.append({"row": number, "status": "error",
+                                "errors": {"invoice_id": [f"Invoice {values['invoice_id']} not found."]}})
+        if not accepted:
+            db.session.rollback()
+            continue
+
+        deltas = defaultdict(float)
+        for _, values in accepted:
+            deltas[values["invoice_id"]] += values["amount"]
+        try:
+            db.session.execute(insert(payments), [values for _, values in accepted])
+            db.session.execute(
+                add_to_invoice,
+                [{"invoice_key": invoice_id, "delta": delta} for invoice_id, delta in deltas.items()],
+            )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Payment import batch of {len(accepted)} rows failed: {e}")
+            results.extend(
+                {"row": number, "status": "error", "errors": {"_row": ["Database error; batch not saved."]}}
+                for number, _ in accepted
+            )
+            continue
+        touched.update(deltas)
+        results.extend(
+            {"row": number, "status": "created", "invoice_id": values["invoice_id"]} for number, values in accepted
+        )
+
+    # The bulk statements bypass the Payment listeners that invalidate cached invoice explanations
+    for invoice_id in touched:
+        invalidate_cached_responses(f"invoice:{invoice_id}")
+
+    results.sort(key=lambda r: r["row"])
+    summary["created"] = sum(1 for r in results if r["status"] == "created")
+    summary["failed"] = len(results) - summary["created"]
+    summary["invoices_updated"] = len(touched)
+    return {**summary, "results": results}
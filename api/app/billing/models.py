@@ -1,5 +1,8 @@
 from enum import Enum
 from app.extensions import db
+from app.llm.response_cache import invalidate_cached_responses
+from sqlalchemy import case, event, inspect
+from sqlalchemy.orm import object_session
 from sqlalchemy.sql import func
 
 class InvoiceStatus(Enum):
@@ -16,17 +19,90 @@ class Invoice(db.Model):
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     due_date = db.Column(db.DateTime, nullable=True)
     updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Maintained in SQL by the Payment listeners below so balances never need the payment rows
+    paid_total = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
     payments = db.relationship('Payment', back_populates='invoice', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_invoice_status_id', 'status', 'id'),
+        db.Index('ix_invoice_patient_id_id', 'patient_id', 'id'),
+    )
+
     @property
     def paid_amount(self):
-        return sum(p.amount for p in self.payments)
+        return self.paid_total or 0.0
+
+    @property
+    def balance(self):
+        return max(0.0, self.amount - self.paid_amount)
 
 class Payment(db.Model):
     __tablename__ = 'payment'
     id = db.Column(db.Integer, primary_key=True)
-    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    # active_history: the update listener needs the previous values even when they were not loaded
+    invoice_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('invoice.id'), nullable=False, index=True), active_history=True
+    )
+    amount = db.column_property(db.Column(db.Float, nullable=False), active_history=True)
     payment_date = db.Column(db.DateTime(timezone=True), server_default=func.now())
     method = db.Column(db.String(50), nullable=True)
     invoice = db.relationship('Invoice', back_populates='payments')
+
+
+# Cached LLM explanations of an invoice are stale once it or its payments change
+@event.listens_for(Invoice, 'after_update')
+@event.listens_for(Invoice, 'after_delete')
+def _invalidate_invoice_responses(mapper, connection, target):
+    invalidate_cached_responses(f"invoice:{target.id}")
+
+@event.listens_for(Payment, 'after_insert')
+@event.listens_for(Payment, 'after_update')
+@event.listens_for(Payment, 'after_delete')
+def _invalidate_payment_invoice_responses(mapper, connection, target):
+    invalidate_cached_responses(f"invoice:{target.invoice_id}")
+
+
+def settled_status(paid_total):
+    """SQL expression for an invoice's status once its paid total becomes `paid_total`."""
+    invoices = Invoice.__table__
+    return case(
+        (paid_total >= invoices.c.amount, InvoiceStatus.PAID.value),
+        (invoices.c.status == InvoiceStatus.PAID.value, InvoiceStatus.PENDING.value),
+        else_=invoices.c.status,
+    )
+
+def _apply_payment_delta(connection, target, invoice_id, delta):
+    """Add `delta` to the invoice's paid_total and settle its status in the same statement."""
+    if invoice_id is None or not delta:
+        return
+    invoices = Invoice.__table__
+    new_total = invoices.c.paid_total + delta
+    connection.execute(
+        invoices.update()
+        .where(invoices.c.id == invoice_id)
+        .values(paid_total=new_total, status=settled_status(new_total))
+    )
+    # The UPDATE bypassed the ORM; make a loaded Invoice re-read the new values
+    session = object_session(target)
+    invoice = session.identity_map.get(session.identity_key(Invoice, invoice_id)) if session else None
+    if invoice is not None:
+        session.expire(invoice, ['paid_total', 'status'])
+
+@event.listens_for(Payment, 'after_insert')
+def _add_payment_to_invoice(mapper, connection, target):
+    _apply_payment_delta(connection, target, target.invoice_id, target.amount)
+
+@event.listens_for(Payment, 'after_delete')
+def _remove_payment_from_invoice(mapper, connection, target):
+    _apply_payment_delta(connection, target, target.invoice_id, -target.amount)
+
+@event.listens_for(Payment, 'after_update')
+def _move_payment_between_invoices(mapper, connection, target):
+    state = inspect(target)
+    amount, invoice_id = state.attrs.amount.history, state.attrs.invoice_id.history
+    if not amount.has_changes() and not invoice_id.has_changes():
+        return
+    old_amount = amount.deleted[0] if amount.deleted else target.amount
+    old_invoice_id = invoice_id.deleted[0] if invoice_id.deleted else target.invoice_id
+    _apply_payment_delta(connection, target, old_invoice_id, -old_amount)
+    _apply_payment_delta(connection, target, target.invoice_id, target.amount)
@@ -1,9 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, abort, current_app, request, jsonify
 from flask_jwt_extended import jwt_required
 from app.billing.models import Invoice, Payment
 from app.billing.schemas import InvoiceSchema, PaymentSchema
+from app.billing.services import invoice_balances, invoice_explanation, recompute_paid_totals
+from app.billing.imports import FORMATS, detect_format, import_payments, read_rows
+from app.common.decorators import jwt_required_with_roles
+from app.common.pagination import list_page, page_limit, with_next_cursor
+from sqlalchemy import case
 from app.extensions import db
-from app.llm.clients import generate_response
+from app.jobs.services import job_accepted, wants_async
 
 
 billing_bp = Blueprint('billing', __name__)
@@ -13,6 +18,17 @@ invoices_schema = InvoiceSchema(many=True)
 payment_schema = PaymentSchema()
 payments_schema = PaymentSchema(many=True)
 
+# List endpoint: output name -> column or expression, the default ?fields= set, and ?<name>= filters
+INVOICE_COLUMNS = {
+    **{c.key: getattr(Invoice, c.key) for c in Invoice.__table__.columns},
+    'balance': case((Invoice.paid_total >= Invoice.amount, 0.0), else_=Invoice.amount - Invoice.paid_total),
+}
+INVOICE_DEFAULT_FIELDS = ('id', 'patient_id', 'amount', 'status', 'paid_total', 'balance', 'created_at', 'due_date')
+INVOICE_FILTERS = {'patient_id': Invoice.patient_id, 'status': Invoice.status}
+
+PAYMENT_COLUMNS = {c.key: getattr(Payment, c.key) for c in Payment.__table__.columns}
+PAYMENT_DEFAULT_FIELDS = tuple(PAYMENT_COLUMNS)
+
 # Create Invoice
 @billing_bp.route('/invoices', methods=['POST'])
 @jwt_required()
@@ -37,23 +53,38 @@ def get_invoice(invoice_id):
 @billing_bp.route('/invoices', methods=['GET'])
 @jwt_required()
 def list_invoices():
+    """Filter with ?patient_id=, ?status=, ?from=/?to= (due_date); ?fields=, ?limit=, ?cursor=."""
+    return list_page(INVOICE_COLUMNS, INVOICE_DEFAULT_FIELDS, INVOICE_FILTERS, Invoice.due_date)
+
+# Invoice Balances (bulk, e.g. month-end reconciliation)
+@billing_bp.route('/invoices/balances', methods=['GET'])
+@jwt_required()
+def get_invoice_balances():
+    """
+    Balances for many invoices in one query per page, without loading payments.
+    ?ids=1,2,3 selects invoices, ?status= filters, ?open=true keeps only unpaid balances;
+    paginated with ?limit= and ?cursor= (next cursor in X-Next-Cursor).
+    """
+    ids = request.args.get('ids')
     try:
-        patient_id = request.args.get('patient_id', type=int)
-        query = Invoice.query
-        if patient_id:
-            query = query.filter_by(patient_id=patient_id)
-        invoices = query.all()
-        result = [{
-            'id': inv.id,
-            'patient_id': inv.patient_id,
-            'amount': float(inv.amount),
-            'status': inv.status,
-            'created_at': inv.created_at.isoformat() if inv.created_at else None,
-            'due_date': inv.due_date.isoformat() if inv.due_date else None
-        } for inv in invoices]
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        invoice_ids = [int(i) for i in ids.split(',') if i.strip()] if ids else None
+    except ValueError:
+        return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
+    balances, next_cursor = invoice_balances(
+        page_limit(),
+        request.args.get('cursor'),
+        invoice_ids=invoice_ids,
+        status=request.args.get('status'),
+        open_only=request.args.get('open', 'false').lower() == 'true',
+    )
+    return with_next_cursor(jsonify(balances), next_cursor)
+
+# Rebuild paid totals from payments
+@billing_bp.route('/invoices/balances/recompute', methods=['POST'])
+@jwt_required_with_roles(roles=['admin'])
+def recompute_invoice_balances():
+    """Reconcile every invoice's paid_total and status against its payment rows."""
+    return jsonify({"invoices_updated": recompute_paid_totals()})
 
 # Update Invoice
 @billing_bp.route('/invoices/<int:invoice_id>', methods=['PUT'])
@@ -91,44 +122,45 @@ def create_payment():
     db.session.commit()
     return jsonify(payment_schema.dump(payment)), 201
 
+# Bulk Payment Import (clearinghouse remittance files)
+@billing_bp.route('/payments/import', methods=['POST'])
+@jwt_required_with_roles(roles=['admin'])
+def import_payments_file():
+    """
+    Import payments from a CSV (header row: invoice_id,amount,method) or NDJSON upload, sent
+    as the request body or as a multipart `file`. The upload is read as a stream and written in
+    batched transactions; the response reports every row's outcome, plus `file_error` when the
+    upload could not be read to the end (the rows before it are saved and listed).
+    """
+    upload = request.files.get('file')
+    fmt = detect_format(
+        upload.mimetype if upload else request.content_type,
+        upload.filename if upload else None,
+        request.args.get('format'),
+    )
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(FORMATS)}"}), 400
+    stream = upload.stream if upload else request.stream
+    batch_size = current_app.config.get('PAYMENT_IMPORT_BATCH_SIZE', 1000)
+    report = import_payments(read_rows(stream, fmt), batch_size=batch_size)
+    return jsonify(report)
+
 # List Payments for Invoice
 @billing_bp.route('/invoices/<int:invoice_id>/payments', methods=['GET'])
 @jwt_required()
 def get_payments(invoice_id):
-    payments = Payment.query.filter_by(invoice_id=invoice_id).all()
-    return jsonify(payments_schema.dump(payments))
+    """?fields=, ?limit=, ?cursor=; ?from=/?to= on payment_date."""
+    return list_page(PAYMENT_COLUMNS, PAYMENT_DEFAULT_FIELDS, date_column=Payment.payment_date,
+                     where=[Payment.invoice_id == invoice_id])
 
 @billing_bp.route('/invoices/<int:invoice_id>/explain', methods=['GET'])
 @jwt_required()
 def explain_invoice(invoice_id):
-    invoice = Invoice.query.get_or_404(invoice_id)
-    
-    try:
-        # Get invoice details
-        bill_info = (
-            f"Invoice ID: {invoice.id}\n"
-            f"Amount: ${invoice.amount:.2f}\n"
-            f"Status: {invoice.status}\n"
-            f"Description: {getattr(invoice, 'description', 'Medical services')}\n"
-        )
-        
-        prompt = [
-            {"role": "system", "content": "Explain this medical invoice in clear, friendly language for a patient."},
-            {"role": "user", "content": bill_info}
-        ]
-
-        explanation_gen = generate_response(prompt)
-        explanation_text = ''.join(explanation_gen) if explanation_gen else ""
-        
-        if not explanation_text.strip():
-            explanation_text = f"This is invoice #{invoice.id} for ${invoice.amount:.2f} with status: {invoice.status}. Please contact billing for more details."
-
-        return jsonify({
-            "invoice_id": invoice.id,
-            "explanation": explanation_text
-        })
-    except Exception as e:
-        return jsonify({
-            "invoice_id": invoice.id,
-            "explanation": f"This is invoice #{invoice.id} for ${invoice.amount:.2f}. Please contact billing for assistance."
-        })
+    """?async=true queues the explanation and answers 202 with a job id (see /api/jobs)."""
+    if wants_async():
+        Invoice.query.get_or_404(invoice_id)
+        return job_accepted('invoice_explanation', {'invoice_id': invoice_id})
+    result = invoice_explanation(invoice_id)
+    if result is None:
+        abort(404)
+    return jsonify(result)
@@ -12,6 +12,8 @@ class InvoiceSchema(Schema):
     patient_id = fields.Int()
     amount = fields.Float()
     status = fields.Str()
+    paid_total = fields.Float(dump_only=True)
+    balance = fields.Float(dump_only=True)
     created_at = fields.DateTime(dump_only=True)
     due_date = fields.DateTime(allow_none=True)
     updated_at = fields.DateTime(dump_only=True)
@@ -1,8 +1,15 @@
-from app.billing.models import Invoice
+from app.billing.models import Invoice, settled_status
 from app.agents.multi_agents import BillingAgent
 from app.extensions import db
 from app.billing.models import Payment
 from flask import current_app
+from sqlalchemy import func, select
+from app.common.pagination import keyset_page
+from app.llm.clients import generate_response
+from app.llm.scheduler import SchedulerBusyError
+
+# Payment lines included in an invoice summary; older ones are only counted
+SUMMARY_PAYMENT_LINES = 20
 
 class BillingService:
     def __init__(self):
@@ -16,9 +23,17 @@ class BillingService:
         if not invoice:
             return ""
 
-        payments = invoice.payments
-        total_paid = sum(p.amount for p in payments)
+        payment_count = db.session.query(func.count(Payment.id)).filter(Payment.invoice_id == invoice_id).scalar()
+        payments = (
+            Payment.query.filter_by(invoice_id=invoice_id)
+            .order_by(Payment.payment_date.desc(), Payment.id.desc())
+            .limit(SUMMARY_PAYMENT_LINES)
+            .all()
+        )
+        total_paid = invoice.paid_amount
         payment_details = "\n".join(f"Payment on {p.payment_date.date()}: ${p.amount} via {p.method or 'unknown'}" for p in payments) or "No payments made yet."
+        if payment_count > len(payments):
+            payment_details += f"\n...and {payment_count - len(payments)} earlier payments"
 
         context = (
             f"Invoice ID: {invoice.id}\n"
@@ -58,11 +73,81 @@ class BillingService:
         if not invoice:
             raise ValueError("Invoice not found")
 
+        # paid_total and status are updated in SQL by the Payment insert listener
         payment = Payment(invoice_id=invoice_id, amount=amount, method=method)
         db.session.add(payment)
-
-        total_paid = sum(p.amount for p in invoice.payments) + amount
-        invoice.status = 'paid' if total_paid >= invoice.amount else 'pending'
-
         db.session.commit()
         return payment
+
+
+def invoice_balances(limit: int, cursor: str = None, invoice_ids=None, status: str = None, open_only: bool = False):
+    """
+    One page of invoice balances, read from the maintained paid_total column without touching
+    payment rows; ordered by id. Returns (rows, next_cursor or None).
+    """
+    query = db.session.query(
+        Invoice.id, Invoice.patient_id, Invoice.amount, Invoice.paid_total, Invoice.status, Invoice.due_date
+    )
+    if invoice_ids is not None:
+        query = query.filter(Invoice.id.in_(invoice_ids))
+    if status:
+        query = query.filter(Invoice.status == status)
+    if open_only:
+        query = query.filter(Invoice.paid_total < Invoice.amount)
+    rows, next_cursor = keyset_page(query, [Invoice.id], lambda r: (r.id,), limit, cursor, descending=False)
+    return [
+        {
+            "invoice_id": row.id,
+            "patient_id": row.patient_id,
+            "amount": row.amount,
+            "paid_total": row.paid_total,
+            "balance": max(0.0, row.amount - row.paid_total),
+            "status": row.status,
+            "due_date": row.due_date.isoformat() if row.due_date else None,
+        }
+        for row in rows
+    ], next_cursor
+
+
+def recompute_paid_totals() -> int:
+    """Rebuild every invoice's paid_total and status from its payments in one aggregate UPDATE (backfill/reconciliation)."""
+    invoices = Invoice.__table__
+    payments = Payment.__table__
+    paid = (
+        select(func.coalesce(func.sum(payments.c.amount), 0.0))
+        .where(payments.c.invoice_id == invoices.c.id)
+        .scalar_subquery()
+    )
+    result = db.session.execute(invoices.update().values(paid_total=paid, status=settled_status(paid)))
+    db.session.commit()
+    return result.rowcount
+
+
+def invoice_explanation(invoice_id: int):
+    """
+    Patient-friendly explanation of an invoice, or None if it does not exist. Falls back to a
+    plain description when the LLM fails; raises SchedulerBusyError when its queue is saturated.
+    """
+    invoice = db.session.get(Invoice, invoice_id)
+    if invoice is None:
+        return None
+    bill_info = (
+        f"Invoice ID: {invoice.id}\n"
+        f"Amount: ${invoice.amount:.2f}\n"
+        f"Status: {invoice.status}\n"
+        f"Description: {getattr(invoice, 'description', 'Medical services')}\n"
+    )
+    prompt = [
+        {"role": "system", "content": "Explain this medical invoice in clear, friendly language for a patient."},
+        {"role": "user", "content": bill_info}
+    ]
+    try:
+        explanation_text = generate_response(prompt, cache=True, cache_tags=(f"invoice:{invoice.id}",))
+    except SchedulerBusyError:
+        raise
+    except Exception as e:
+        current_app.logger.error(f"Invoice explanation failed for invoice {invoice.id}: {e}")
+        explanation_text = f"This is invoice #{invoice.id} for ${invoice.amount:.2f}. Please contact billing for assistance."
+    if not explanation_text.strip():
+        explanation_text = f"This is invoice #{invoice.id} for ${invoice.amount:.2f} with status: {invoice.status}. Please contact billing for more details."
+    return {"invoice_id": invoice.id, "explanation": explanation_text}
@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import event, or_
 from app.extensions import db
 
 class ChatRoom(db.Model):
@@ -6,11 +7,16 @@ class ChatRoom(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False, unique=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Denormalized from chat_messages on insert so room listings need no per-room lookup
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_activity_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     messages = db.relationship('ChatMessage', backref='room', lazy='dynamic')
     participants = db.relationship('ChatParticipant', backref='room', lazy='dynamic')
     telemed_sessions = db.relationship('TelemedSession', backref='room', lazy='dynamic')
 
+    __table_args__ = (db.Index('ix_chat_rooms_activity', 'last_activity_at', 'id'),)
+
 class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
     id = db.Column(db.Integer, primary_key=True)
@@ -25,6 +31,8 @@ class ChatMessage(db.Model):
     message_type = db.Column(db.String(50), default='text')  # text, image, system, etc.
     status = db.Column(db.String(50), default='sent')       # sent, delivered, read, etc.
 
+    __table_args__ = (db.Index('ix_chat_messages_room_timestamp', 'room_id', 'timestamp'),)
+
 class ChatParticipant(db.Model):
     __tablename__ = 'chat_participants'
     id = db.Column(db.Integer, primary_key=True)
@@ -42,3 +50,14 @@ class TelemedSession(db.Model):
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
     end_time = db.Column(db.DateTime, nullable=True)
     status = db.Column(db.String(50), default='pending')  # e.g., 'pending', 'active', 'completed'
+
+
+@event.listens_for(ChatMessage, 'after_insert')
+def _update_room_activity(mapper, connection, target):
+    rooms = ChatRoom.__table__
+    connection.execute(
+        rooms.update()
+        .where(rooms.c.id == target.room_id)
+        .where(or_(rooms.c.last_message_id.is_(None), rooms.c.last_activity_at <= target.timestamp))
+        .values(last_message_id=target.id, last_activity_at=target.timestamp)
+    )
@@ -4,12 +4,17 @@ from app.chat.models import ChatRoom, ChatMessage, ChatParticipant, TelemedSessi
 from app.chat.schemas import (
     ChatRoomSchema, ChatMessageSchema, TelemedSessionSchema
 )
-from app.extensions import db
-from datetime import datetime
+from app.extensions import db, socketio
+from app.common.pagination import keyset_filter, keyset_page, page_limit, with_next_cursor
+from app.common.utils import parse_iso8601
+from datetime import datetime, timezone
 from app.auth.models import User
 import logging
-from app.extensions import init_embed_model, search_vectors
+import uuid
+from app.extensions import search_vectors
+from app.rag.embedding_cache import embed_query
 from app.agents.orchestrator import supervisor_agent
+from app.llm.scheduler import SchedulerBusyError
 
 logger = logging.getLogger(__name__)
 
@@ -69,15 +74,27 @@ def create_room():
 @chat_bp.route('/rooms', methods=['GET'])
 @jwt_required()
 def list_rooms():
-    rooms = ChatRoom.query.all()
+    """
+    Rooms by most recent activity, each with its last message, one query per page.
+    Pass ?limit= and the X-Next-Cursor header value as ?cursor= for the next page.
+    """
+    query = db.session.query(ChatRoom, ChatMessage).outerjoin(
+        ChatMessage, ChatMessage.id == ChatRoom.last_message_id
+    )
+    rows, next_cursor = keyset_page(
+        query,
+        [ChatRoom.last_activity_at, ChatRoom.id],
+        lambda row: (row[0].last_activity_at, row[0].id),
+        limit=page_limit(),
+        cursor=request.args.get('cursor'),
+    )
     rooms_data = []
-    for room in rooms:
-        last_message = ChatMessage.query.filter_by(room_id=room.id).order_by(ChatMessage.timestamp.desc()).first()
+    for room, last_message in rows:
         room_data = chat_room_schema.dump(room)
         room_data['last_message'] = chat_message_schema.dump(last_message) if last_message else None
         rooms_data.append(room_data)
 
-    return jsonify(rooms_data)
+    return with_next_cursor(jsonify(rooms_data), next_cursor)
 
 @chat_bp.route('/rooms/<int:room_id>/participants', methods=['POST'])
 @jwt_required()
@@ -125,9 +142,50 @@ def send_message(room_id):
 @chat_bp.route('/rooms/<int:room_id>/messages', methods=['GET'])
 @jwt_required()
 def get_room_messages(room_id):
-    messages = ChatMessage.query.filter_by(room_id=room_id).order_by(ChatMessage.timestamp.asc()).all()
-    messages_data = chat_messages_schema.dump(messages)
-    return jsonify(messages_data)
+    """
+    A page of the room's history in chronological order (the latest messages by default).
+
+    ?before=<message id>   older messages, for scrolling back; X-Prev-Cursor has the next ?before= value
+    ?after=<message id>    newer messages; X-Next-Cursor has the next ?after= value while more remain
+    ?since=<ISO 8601>      messages created after a timestamp, for incremental sync (pages like ?after=)
+    ?limit=                page size, capped at MAX_PAGE_SIZE
+    """
+    limit = page_limit()
+    before = request.args.get('before', type=int)
+    after = request.args.get('after', type=int)
+    since = request.args.get('since')
+    order = [ChatMessage.timestamp, ChatMessage.id]
+    query = ChatMessage.query.filter_by(room_id=room_id)
+
+    if since:
+        since_dt = parse_iso8601(since)
+        if since_dt is None:
+            return jsonify({'error': 'since must be an ISO 8601 timestamp'}), 400
+        if since_dt.tzinfo is not None:
+            since_dt = since_dt.astimezone(timezone.utc).replace(tzinfo=None)  # timestamps are naive UTC
+        query = query.filter(ChatMessage.timestamp > since_dt)
+
+    anchor_id = after if after is not None else before
+    if anchor_id is not None:
+        anchor = ChatMessage.query.filter_by(id=anchor_id, room_id=room_id).first()
+        if not anchor:
+            return jsonify({'error': 'Cursor message not found in this room'}), 400
+        query = query.filter(keyset_filter(order, [anchor.timestamp, anchor.id], descending=after is None))
+
+    headers = {}
+    if after is not None or since:
+        messages = query.order_by(*[c.asc() for c in order]).limit(limit + 1).all()
+        if len(messages) > limit:
+            messages = messages[:limit]
+            headers['X-Next-Cursor'] = str(messages[-1].id)
+    else:
+        messages = query.order_by(*[c.desc() for c in order]).limit(limit + 1).all()
+        if len(messages) > limit:
+            messages = messages[:limit]
+            headers['X-Prev-Cursor'] = str(messages[-1].id)
+        messages.reverse()
+
+    return jsonify(chat_messages_schema.dump(messages)), 200, headers
 
 # --- Telemedicine Session Endpoints ---
 
@@ -214,8 +272,7 @@ def post_message_and_get_bot_reply(room_id):
 
     # Retrieve RAG context
     try:
-        embedding_model = init_embed_model()
-        embedding_vector = embedding_model.encode(content).tolist()
+        embedding_vector = embed_query(content).tolist()
         docs = search_vectors(embedding_vector, top_k=5)
         rag_context = "\n".join(r['text'] for r in docs[0]) if docs and docs[0] else "No additional context available."
     except Exception as e:
@@ -224,23 +281,42 @@ def post_message_and_get_bot_reply(room_id):
 
     combined_context = f"{context_text}\n\nRelevant Documents:\n{rag_context}"
 
+    if data.get("stream"):
+        # Queue admission happens here, so a saturated scheduler still answers 429/503 synchronously
+        pieces = supervisor_agent(content, combined_context, stream=True)
+        stream_id = uuid.uuid4().hex
+        socketio.start_background_task(
+            stream_bot_reply, current_app._get_current_object(), room_id, stream_id, pieces
+        )
+        return jsonify({
+            "stream_id": stream_id,
+            "room_id": room_id,
+            "user_message": chat_message_schema.dump(user_msg),
+        }), 202
+
     try:
-        llm_response = supervisor_agent(content, combined_context)
-
-        chunks = []
-        for chunk in llm_response:
-            if chunk:
-                current_app.logger.debug(f"Streaming token: {chunk}")
-                chunks.append(chunk)
-        bot_reply_text = ''.join(chunks).strip()
+        bot_reply_text = supervisor_agent(content, combined_context).strip()
+    except SchedulerBusyError:
+        raise
     except Exception as e:
         current_app.logger.error(f"LLM generation failed: {e}", exc_info=True)
         bot_reply_text = "Sorry, I couldn't process your request at the moment."
 
+    bot_msg = save_bot_reply(room_id, bot_reply_text)
+
+    current_app.logger.info(f"Sending bot reply to client: {repr(bot_reply_text)}")
+
+    # Only the messages this call created; clients append them or sync with ?after=
+    return jsonify({
+        "bot_reply": bot_reply_text,
+        "messages": chat_messages_schema.dump([m for m in (user_msg, bot_msg) if m is not None]),
+    })
+
+
+def save_bot_reply(room_id: int, bot_reply_text: str):
+    """Persist the bot's reply; returns the saved message or None if the write failed."""
     if not bot_reply_text:
         bot_reply_text = "I'm here to help you with your healthcare questions."
-
-    # Save bot reply
     try:
         bot_user = get_or_create_bot_user()
         bot_msg = ChatMessage(
@@ -252,16 +328,46 @@ def post_message_and_get_bot_reply(room_id):
         )
         db.session.add(bot_msg)
         db.session.commit()
+        return bot_msg
     except Exception as e:
         current_app.logger.error(f"Failed to save bot message: {e}", exc_info=True)
         db.session.rollback()
-
-    messages = ChatMessage.query.filter_by(room_id=room_id).order_by(ChatMessage.timestamp.asc()).all()
-    conversation = chat_messages_schema.dump(messages)
-
-    current_app.logger.info(f"Sending bot reply to client: {repr(bot_reply_text)}")
-
-    return jsonify({
-        "bot_reply": bot_reply_text,
-        "conversation": conversation,
-    })
+        return None
+
+
+def stream_bot_reply(app, room_id: int, stream_id: str, pieces):
+    """
+    Background task: push reply tokens to the room as they are generated, then persist the
+    full reply once and announce it. Clients receive them after emitting `join` with {"room": room_id}.
+
+    Socket.IO events (all carry stream_id):
+        bot_token     {token}          one per generated piece
+        bot_complete  {message}        the persisted ChatMessage
+        bot_error     {error}          generation failed; the partial reply is still saved
+    """
+    with app.app_context():
+        parts = []
+        try:
+            for piece in pieces:
+                parts.append(piece)
+                socketio.emit("bot_token", {"stream_id": stream_id, "room_id": room_id, "token": piece}, to=room_id)
+        except Exception as e:
+            app.logger.error(f"LLM streaming failed: {e}", exc_info=True)
+            socketio.emit("bot_error", {
+                "stream_id": stream_id,
+                "room_id": room_id,
+                "error": "Sorry, I couldn't process your request at the moment.",
+            }, to=room_id)
+            if not parts:
+                parts.append("Sorry, I couldn't process your request at the moment.")
+        finally:
+            if hasattr(pieces, "close"):
+                pieces.close()  # frees the LLM worker if the loop stopped early
+
+        bot_msg = save_bot_reply(room_id, "".join(parts).strip())
+        socketio.emit("bot_complete", {
+            "stream_id": stream_id,
+            "room_id": room_id,
+            "message": chat_message_schema.dump(bot_msg) if bot_msg else None,
+        }, to=room_id)
+        db.session.remove()
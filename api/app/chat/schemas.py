@@ -4,6 +4,7 @@ class ChatRoomSchema(Schema):
     id = fields.Int(dump_only=True)
     name = fields.Str(required=True)
     created_at = fields.DateTime(dump_only=True)
+    last_activity_at = fields.DateTime(dump_only=True)
 
 class ChatMessageSchema(Schema):
     id = fields.Int(dump_only=True)
@@ -1,29 +1,88 @@
-from flask_socketio import emit, join_room, leave_room
+from flask import request
+from flask_jwt_extended import decode_token
+from flask_socketio import ConnectionRefusedError, emit, join_room, leave_room
+from app.auth.revocation import get_revocation_store
+from app.common.authz_cache import get_authz_cache, parse_user_id
 from app.extensions import db, socketio
-from .models import ChatMessage
+from app.jobs.models import Job
+from app.jobs.services import get_job_notifier
+from .models import ChatMessage, ChatParticipant
+
+# Socket id -> user id of the access token the connection was opened with
+_socket_users = {}
+
+
+def _socket_token(auth):
+    """Access token from the connect payload ({"token": ...}), or the ?token= query string."""
+    if isinstance(auth, dict) and auth.get('token'):
+        return auth['token']
+    return request.args.get('token')
+
+
+def _current_user_id():
+    return _socket_users.get(request.sid)
+
+
+def _is_participant(user_id, room_id) -> bool:
+    return ChatParticipant.query.filter_by(room_id=room_id, user_id=user_id).first() is not None
+
+
+def _room_id(data):
+    try:
+        return int((data or {}).get('room'))
+    except (TypeError, ValueError):
+        return None
+
+
+@socketio.on('connect')
+def on_connect(auth=None):
+    token = _socket_token(auth)
+    if not token:
+        raise ConnectionRefusedError('Missing access token.')
+    try:
+        claims = decode_token(token)
+    except Exception:
+        raise ConnectionRefusedError('Invalid access token.')
+    user_id = parse_user_id(claims.get('sub'))
+    if claims.get('type') != 'access' or user_id is None or get_revocation_store().is_revoked(claims['jti']):
+        raise ConnectionRefusedError('Invalid access token.')
+    _socket_users[request.sid] = user_id
+
+
+@socketio.on('disconnect')
+def on_disconnect():
+    _socket_users.pop(request.sid, None)
+
 
 @socketio.on('join')
 def on_join(data):
-    username = data.get('username')
-    room = data.get('room')
+    # Bot replies are streamed to the room, so only its participants may listen
+    user_id, room = _current_user_id(), _room_id(data)
+    if room is None or not _is_participant(user_id, room):
+        emit('error', {'message': 'Not a participant of this room.'})
+        return
     join_room(room)
-    emit('status', {'msg': f'{username} has joined room {room}.'}, room=room)
+    emit('status', {'msg': f'User {user_id} has joined room {room}.'}, room=room)
 
 @socketio.on('leave')
 def on_leave(data):
-    username = data.get('username')
-    room = data.get('room')
+    room = _room_id(data)
+    if room is None:
+        return
     leave_room(room)
-    emit('status', {'msg': f'{username} has left room {room}.'}, room=room)
+    emit('status', {'msg': f'User {_current_user_id()} has left room {room}.'}, room=room)
 
 @socketio.on('send_message')
 def handle_message(data):
-    room = data.get('room')
-    sender_id = data.get('sender_id')
-    content = data.get('content')
-    if not (room and sender_id and content):
+    room = _room_id(data)
+    sender_id = _current_user_id()
+    content = (data or {}).get('content')
+    if not (room and content):
         emit('error', {'message': 'Missing data for message!'})
         return
+    if not _is_participant(sender_id, room):
+        emit('error', {'message': 'Not a participant of this room.'})
+        return
     msg = ChatMessage(room_id=room, sender_id=sender_id, content=content)
     db.session.add(msg)
     db.session.commit()
@@ -33,3 +92,19 @@ def handle_message(data):
         'content': content,
         'timestamp': msg.timestamp.isoformat()
     }, room=room)
+
+@socketio.on('watch_job')
+def on_watch_job(data):
+    # Background job completion events ("job_finished") are sent to room job:<id>; like the
+    # /api/jobs routes, only the job's submitter or an admin may watch it
+    job_id = (data or {}).get('job_id')
+    if not job_id:
+        emit('error', {'message': 'Missing job_id!'})
+        return
+    user_id = _current_user_id()
+    job = db.session.get(Job, str(job_id))
+    if job is None or (job.user_id != user_id and get_authz_cache().user_role(user_id) != 'admin'):
+        emit('error', {'message': f'Job {job_id} not found.'})
+        return
+    join_room(f"job:{job.id}")
+    get_job_notifier().watch(job.id)
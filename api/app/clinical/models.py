@@ -20,6 +20,14 @@ class Observation(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Back the list endpoint's keyset pages and filters
+    __table_args__ = (
+        db.Index('ix_observations_patient_id_id', 'patient_id', 'id'),
+        db.Index('ix_observations_patient_effective', 'patient_id', 'effective_datetime'),
+        db.Index('ix_observations_code', 'code'),
+        db.Index('ix_observations_status_id', 'status', 'id'),
+    )
+
 class Encounter(db.Model):
     __tablename__ = 'encounters'
     id = db.Column(db.Integer, primary_key=True)
@@ -37,6 +45,13 @@ class Encounter(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_encounters_patient_id_id', 'patient_id', 'id'),
+        db.Index('ix_encounters_patient_period_start', 'patient_id', 'period_start'),
+        db.Index('ix_encounters_status_id', 'status', 'id'),
+        db.Index('ix_encounters_class_id', 'encounter_class', 'id'),
+    )
+
 class Appointment(db.Model):
     __tablename__ = 'appointments'
     id = db.Column(db.Integer, primary_key=True)
@@ -50,3 +65,11 @@ class Appointment(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_appointments_patient_id_id', 'patient_id', 'id'),
+        db.Index('ix_appointments_patient_datetime', 'patient_id', 'appointment_datetime'),
+        db.Index('ix_appointments_status_datetime', 'status', 'appointment_datetime'),
+        db.Index('ix_appointments_status_id', 'status', 'id'),
+        db.Index('ix_appointments_practitioner_id', 'practitioner', 'id'),
+    )
@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required
 from app.clinical.models import Observation, Encounter, Appointment
 from app.clinical.schemas import ObservationSchema, EncounterSchema, AppointmentSchema
 from app.extensions import db
+from app.common.pagination import list_page
 from datetime import datetime
 
 clinical_bp = Blueprint('clinical', __name__)
@@ -14,6 +15,23 @@ encounters_schema = EncounterSchema(many=True)
 appointment_schema = AppointmentSchema()
 appointments_schema = AppointmentSchema(many=True)
 
+# List endpoints: output name -> column, the default ?fields= set, and ?<name>= filters
+OBSERVATION_COLUMNS = {c.key: getattr(Observation, c.key) for c in Observation.__table__.columns}
+OBSERVATION_DEFAULT_FIELDS = ('id', 'patient_id', 'code', 'value', 'unit', 'effective_datetime', 'status', 'created_at')
+OBSERVATION_FILTERS = {'patient_id': Observation.patient_id, 'status': Observation.status, 'code': Observation.code}
+
+ENCOUNTER_COLUMNS = {c.key: getattr(Encounter, c.key) for c in Encounter.__table__.columns}
+ENCOUNTER_DEFAULT_FIELDS = tuple(ENCOUNTER_COLUMNS)
+ENCOUNTER_FILTERS = {
+    'patient_id': Encounter.patient_id, 'status': Encounter.status, 'encounter_class': Encounter.encounter_class,
+}
+
+APPOINTMENT_COLUMNS = {c.key: getattr(Appointment, c.key) for c in Appointment.__table__.columns}
+APPOINTMENT_DEFAULT_FIELDS = ('id', 'patient_id', 'appointment_datetime', 'status', 'practitioner', 'reason')
+APPOINTMENT_FILTERS = {
+    'patient_id': Appointment.patient_id, 'status': Appointment.status, 'practitioner': Appointment.practitioner,
+}
+
 @clinical_bp.route('/observations', methods=['POST'])
 @jwt_required()
 def create_observation():
@@ -40,12 +58,10 @@ def create_observation():
 @clinical_bp.route('/observations', methods=['GET'])
 @jwt_required()
 def list_observations():
-    patient_id = request.args.get('patient_id', type=int)
-    query = Observation.query
-    if patient_id:
-        query = query.filter_by(patient_id=patient_id)
-    obs_list = query.all()
-    return jsonify(observations_schema.dump(obs_list))
+    """Filter with ?patient_id=, ?status=, ?code=, ?from=/?to= (effective_datetime); ?fields=, ?limit=, ?cursor=."""
+    return list_page(
+        OBSERVATION_COLUMNS, OBSERVATION_DEFAULT_FIELDS, OBSERVATION_FILTERS, Observation.effective_datetime
+    )
 
 @clinical_bp.route('/observations/<int:id>', methods=['GET'])
 @jwt_required()
@@ -154,12 +170,8 @@ def delete_encounter(id):
 @clinical_bp.route('/encounters', methods=['GET'])
 @jwt_required()
 def list_encounters():
-    patient_id = request.args.get('patient_id', type=int)
-    query = Encounter.query
-    if patient_id:
-        query = query.filter_by(patient_id=patient_id)
-    encounters = query.all()
-    return jsonify(encounters_schema.dump(encounters))
+    """Filter with ?patient_id=, ?status=, ?encounter_class=, ?from=/?to= (period_start); ?fields=, ?limit=, ?cursor=."""
+    return list_page(ENCOUNTER_COLUMNS, ENCOUNTER_DEFAULT_FIELDS, ENCOUNTER_FILTERS, Encounter.period_start)
 
 @clinical_bp.route('/encounters', methods=['POST'])
 @jwt_required()
@@ -217,23 +229,10 @@ def delete_appointment(id):
 @clinical_bp.route('/appointments', methods=['GET'])
 @jwt_required()
 def list_appointments():
-    try:
-        patient_id = request.args.get('patient_id', type=int)
-        query = Appointment.query
-        if patient_id:
-            query = query.filter_by(patient_id=patient_id)
-        appointments = query.all()
-        result = [{
-            'id': a.id,
-            'patient_id': a.patient_id,
-            'appointment_datetime': a.appointment_datetime.isoformat() if a.appointment_datetime else None,
-            'status': a.status,
-            'practitioner': a.practitioner,
-            'reason': a.reason
-        } for a in appointments]
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({"error": "Failed to fetch appointments", "details": str(e)}), 422
+    """Filter with ?patient_id=, ?status=, ?practitioner=, ?from=/?to= (appointment_datetime); ?fields=, ?limit=, ?cursor=."""
+    return list_page(
+        APPOINTMENT_COLUMNS, APPOINTMENT_DEFAULT_FIELDS, APPOINTMENT_FILTERS, Appointment.appointment_datetime
+    )
 
 @clinical_bp.route('/appointments', methods=['POST'])
 @jwt_required()
@@ -0,0 +1,306 @@
+from datetime import datetime
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+import threading
+import logging
+import atexit
+import glob
+import json
+import time
+import uuid
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(event: dict) -> str:
+    return json.dumps({k: v.isoformat() if isinstance(v, datetime) else v for k, v in event.items()})
+
+
+def _decode(line: str) -> dict:
+    event = json.loads(line)
+    if event.get("timestamp"):
+        event["timestamp"] = datetime.fromisoformat(event["timestamp"])
+    return event
+
+
+class AuditWriter:
+    """
+    Batched, write-behind writer for HIPAA audit rows.
+
+    enqueue() appends the event to a local JSONL spill file (the write-ahead log) and to an
+    in-memory queue, and returns without touching the database. A background thread bulk-inserts
+    queued events whenever `batch_size` are waiting or `flush_interval` seconds have passed,
+    using its own connection so audit failures never affect a request's session.
+
+    Each writer spills to `<spill_path>.<pid>-<run id>` and every flush rotates that file into a
+    segment that is deleted only after its rows are committed. On start, files left by processes
+    that are no longer running, or by an earlier run that had this process's PID (common after a
+    container restart), are replayed. Delivery is at-least-once:
+    a crash between commit and delete can duplicate a batch, but no event is lost. Rows the
+    database rejects individually are moved to `<spill_path>.rejected` instead of blocking.
+    """
+
+    def __init__(self, spill_path: str, batch_size: int = 200, flush_interval: float = 1.0, fsync: bool = False):
+        self.spill_path = spill_path
+        # The run id keeps a reused PID from appending to, or rotating over, an earlier run's files
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._process_path = f"{spill_path}.{self._owner}"
+        _open_writers.add(self._owner)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._queue = []  # events written to the current spill file, not yet in a segment
+        self._pending = []  # (segment path, events) rotated out and awaiting commit
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._segment_seq = 0
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._closed = False
+        self._metrics = {
+            "enqueued": 0,
+            "written": 0,
+            "rejected": 0,
+            "replayed": 0,
+            "flushes": 0,
+            "flush_failures": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(spill_path)), exist_ok=True)
+        self._recover()
+        self._spill = open(self._process_path, "a", encoding="utf-8")
+
+    # --- Public API ---
+
+    def start(self, app):
+        """Replay segments left by processes that exited since, and start the background flusher."""
+        self._app = app
+        self._recover()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def stop(self, timeout: float = 5):
+        """
+        Stop the background flusher and write what is queued, e.g. before the app's database goes
+        away; unlike close() the spill file stays open and start() resumes the flusher.
+        """
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            with self._cond:
+                self._stop.set()
+                self._cond.notify_all()
+            thread.join(timeout)
+            atexit.unregister(self.close)
+        if self._app is not None:
+            self.flush()
+
+    def enqueue(self, event: dict):
+        line = _encode(event) + "\n"
+        with self._cond:
+            self._spill.write(line)
+            self._spill.flush()
+            if self.fsync:
+                os.fsync(self._spill.fileno())
+            self._queue.append(event)
+            self._metrics["enqueued"] += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self):
+        """Write everything queued so far; safe to call from any thread."""
+        with self._flush_lock:
+            with self._cond:
+                self._rotate()
+                pending = list(self._pending)
+            for segment, events in pending:
+                if not self._write_segment(segment, events):
+                    return False
+        return True
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        with self._cond:
+            self._cond.notify_all()
+        if self._app is not None:
+            self.flush()
+        with self._cond:
+            self._spill.close()
+        _open_writers.discard(self._owner)
+
+    def stats(self) -> dict:
+        with self._cond:
+            flushes = self._metrics["flushes"]
+            return {
+                "queue_depth": len(self._queue) + sum(len(events) for _, events in self._pending),
+                "pending_segments": len(self._pending),
+                **self._metrics,
+                "avg_flush_ms": self._metrics["total_flush_ms"] / flushes if flushes else 0.0,
+            }
+
+    # --- Internals ---
+
+    def _run(self):
+        while not (self._closed or self._stop.is_set()):
+            with self._cond:
+                if len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+            try:
+                flushed = self.flush()
+            except Exception as e:
+                # e.g. an OSError rotating the spill file; the events are still on disk and queued
+                with self._cond:
+                    self._metrics["flush_failures"] += 1
+                logger.error(f"Audit flush failed, will retry: {e}", exc_info=True)
+                flushed = False
+            if not flushed:
+                self._stop.wait(min(30, self.flush_interval * 5))  # database unavailable; keep the segments
+
+    def _rotate(self):
+        """Move the current spill file aside as a segment; callers hold self._cond."""
+        if not self._queue:
+            return
+        self._segment_seq += 1
+        segment = f"{self._process_path}.{self._segment_seq}"
+        self._spill.close()
+        try:
+            os.replace(self._process_path, segment)
+        finally:
+            # On failure the spill file and queue are untouched and the next flush retries
+            self._spill = open(self._process_path, "a", encoding="utf-8")
+        self._pending.append((segment, self._queue))
+        self._queue = []
+
+    def _write_segment(self, segment: str, events: list) -> bool:
+        from app.common.hipaa import HIPAAAuditLog
+
+        table = HIPAAAuditLog.__table__
+        started = time.monotonic()
+        rejected = 0
+        try:
+            with self._app.app_context():
+                from app.extensions import db
+                try:
+                    with db.engine.begin() as connection:
+                        for i in range(0, len(events), self.batch_size):
+                            connection.execute(table.insert(), events[i:i + self.batch_size])
+                except SQLAlchemyError:
+                    # Find and set aside the offending rows so one bad event cannot block the log
+                    rejected = self._write_rows_individually(db.engine, table, events)
+        except SQLAlchemyError as e:
+            with self._cond:
+                self._metrics["flush_failures"] += 1
+            logger.error(f"Audit flush failed, {len(events)} events kept in {segment}: {e}")
+            return False
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        try:
+            os.remove(segment)
+        except OSError as e:
+            # Committed already; a leftover segment is only replayed (duplicated) by a later run
+            logger.error(f"Could not remove flushed audit segment {segment}: {e}")
+        with self._cond:
+            self._pending = [p for p in self._pending if p[0] != segment]
+            self._metrics["written"] += len(events) - rejected
+            self._metrics["flushes"] += 1
+            self._metrics["last_flush_ms"] = elapsed_ms
+            self._metrics["max_flush_ms"] = max(self._metrics["max_flush_ms"], elapsed_ms)
+            self._metrics["total_flush_ms"] += elapsed_ms
+        return True
+
+    def _write_rows_individually(self, engine, table, events: list) -> int:
+        rejected = []
+        with engine.connect() as connection:
+            for event in events:
+                try:
+                    with connection.begin():
+                        connection.execute(table.insert(), [event])
+                except SQLAlchemyError as e:
+                    if not self._is_row_error(e):
+                        raise
+                    rejected.append({**event, "error": str(e.orig if hasattr(e, "orig") else e)})
+        if rejected:
+            with open(f"{self.spill_path}.rejected", "a", encoding="utf-8") as dead_letter:
+                for event in rejected:
+                    dead_letter.write(_encode(event) + "\n")
+            with self._cond:
+                self._metrics["rejected"] += len(rejected)
+            logger.error(f"{len(rejected)} audit events rejected by the database, saved to {self.spill_path}.rejected")
+        return len(rejected)
+
+    @staticmethod
+    def _is_row_error(error) -> bool:
+        return isinstance(error, (IntegrityError, DataError))
+
+    def _recover(self):
+        """Queue events from spill files and segments no running writer owns."""
+        prefix = f"{self.spill_path}."
+        with self._cond:
+            queued = {path for path, _ in self._pending}
+        leftovers = []
+        for path in sorted(glob.glob(f"{glob.escape(self.spill_path)}.*")):
+            owner = path[len(prefix):].split(".")[0]
+            pid = owner.split("-")[0]
+            if path.endswith(".rejected") or not pid.isdigit() or owner in _open_writers or path in queued:
+                continue
+            # A file with our PID but another run id was left by an earlier process that had this PID
+            if int(pid) != os.getpid() and _process_alive(int(pid)):
+                continue
+            leftovers.append(path)
+
+        recovered = []
+        for path in leftovers:
+            with open(path, encoding="utf-8") as handle:
+                recovered.append((path, [_decode(line) for line in handle if line.strip()]))
+        with self._cond:
+            self._pending[:0] = recovered
+            self._metrics["replayed"] += sum(len(events) for _, events in recovered)
+        if leftovers:
+            logger.warning(f"Replaying {len(leftovers)} audit spill files from a previous run")
+
+
+# Run ids of the writers open in this process, whose files are never treated as leftovers
+_open_writers = set()
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_audit_writer = None
+_audit_writer_lock = threading.Lock()
+
+
+def init_audit_writer(app) -> AuditWriter:
+    """Create and start the process-wide audit writer from AUDIT_* settings."""
+    global _audit_writer
+    with _audit_writer_lock:
+        if _audit_writer is None:
+            spill_path = app.config.get("AUDIT_SPILL_PATH") or os.path.join(app.instance_path, "audit_spill.jsonl")
+            _audit_writer = AuditWriter(
+                spill_path,
+                batch_size=app.config.get("AUDIT_BATCH_SIZE", 200),
+                flush_interval=app.config.get("AUDIT_FLUSH_INTERVAL", 1.0),
+                fsync=app.config.get("AUDIT_FSYNC", False),
+            )
+        _audit_writer.start(app)
+    return _audit_writer
+
+
+def get_audit_writer() -> AuditWriter:
+    if _audit_writer is None:
+        raise RuntimeError("Audit writer not initialized; call init_audit_writer(app) in create_app.")
+    return _audit_writer
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from app.extensions import db, _config_value
+from app.auth.models import User
+from app.patients.models import Patient
+import threading
+import time
+
+_MISSING = object()
+
+
+def parse_user_id(identity):
+    """The integer user id in a JWT identity, or None if the identity is not one."""
+    try:
+        return int(identity)
+    except (TypeError, ValueError):
+        return None
+
+
+class AuthorizationCache:
+    """
+    TTL cache of the two lookups every protected request needs: a user's role and, for
+    patient users, which patient records they own. Entries are dropped early by the
+    model listeners below when a user or patient row changes in this process; other
+    processes pick up changes within `ttl_seconds`.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (kind, user_id) -> (value, stored_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def user_role(self, user_id):
+        """The user's role, or None if the user does not exist (or `user_id` is not an id)."""
+        user_id = parse_user_id(user_id)
+        if user_id is None:
+            return None
+        return self._get_or_load(("role", user_id), lambda uid: db.session.query(User.role).filter_by(id=uid).scalar())
+
+    def owned_patient_ids(self, user_id) -> frozenset:
+        """Ids of the patient records linked to this user account."""
+        user_id = parse_user_id(user_id)
+        if user_id is None:
+            return frozenset()
+        return self._get_or_load(
+            ("patients", user_id),
+            lambda uid: frozenset(pid for (pid,) in db.session.query(Patient.id).filter_by(user_id=uid)),
+        )
+
+    def invalidate_user(self, user_id):
+        user_id = parse_user_id(user_id)
+        if user_id is None:
+            return
+        with self._lock:
+            self._entries.pop(("role", user_id), None)
+            self._entries.pop(("patients", user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _get_or_load(self, key, load):
+        now = time.monotonic()
+        with self._lock:
+            value, stored_at = self._entries.get(key, (_MISSING, 0.0))
+            if value is not _MISSING and now - stored_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = load(key[1])
+        with self._lock:
+            self._entries[key] = (value, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+_authz_cache = None
+_authz_cache_lock = threading.Lock()
+
+
+def get_authz_cache() -> AuthorizationCache:
+    """Return the process-wide authorization cache, configured from AUTHZ_CACHE_* settings."""
+    global _authz_cache
+    if _authz_cache is None:
+        with _authz_cache_lock:
+            if _authz_cache is None:
+                _authz_cache = AuthorizationCache(
+                    ttl_seconds=_config_value("AUTHZ_CACHE_TTL", 60),
+                    max_entries=_config_value("AUTHZ_CACHE_MAX_ENTRIES", 10000),
+                )
+    return _authz_cache
+
+
+def _invalidate(user_id):
+    if _authz_cache is not None:
+        _authz_cache.invalidate_user(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user(mapper, connection, target):
+    _invalidate(target.id)
+
+
+@event.listens_for(Patient, 'after_insert')
+@event.listens_for(Patient, 'after_update')
+@event.listens_for(Patient, 'after_delete')
+def _invalidate_patient_owner(mapper, connection, target):
+    # A reassigned record changes ownership for both the old and the new user
+    history = inspect(target).attrs.user_id.history
+    for user_id in {target.user_id, *history.deleted}:
+        _invalidate(user_id)
@@ -1,6 +1,7 @@
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
+from app.common.authz_cache import get_authz_cache, parse_user_id
 
 import logging
 
@@ -12,14 +13,22 @@ def jwt_required_with_roles(roles=None):
         @wraps(fn)
         def decorator(*args, **kwargs):
             verify_jwt_in_request()
-            claims = get_jwt()
-            user_roles = claims.get("roles") or claims.get("role")
-            logging.debug(f"User roles from JWT claims: {user_roles}")
-
-            if isinstance(user_roles, str):
-                user_roles = [user_roles]
-            elif user_roles is None:
-                user_roles = []
+            if parse_user_id(get_jwt_identity()) is None:
+                logging.warning(f"Access denied: malformed token identity {get_jwt_identity()!r}")
+                return jsonify({"msg": "Missing or insufficient role"}), 403
+            # The stored role is authoritative (refreshed tokens carry no roles, and roles can
+            # change mid-token); it comes from the authorization cache, not a query per request.
+            role = get_authz_cache().user_role(get_jwt_identity())
+            if role is not None:
+                user_roles = [role]
+            else:
+                claims = get_jwt()
+                user_roles = claims.get("roles") or claims.get("role")
+                if isinstance(user_roles, str):
+                    user_roles = [user_roles]
+                elif user_roles is None:
+                    user_roles = []
+            logging.debug(f"User roles: {user_roles}")
 
             if any(role in user_roles for role in roles):
                 return fn(*args, **kwargs)
@@ -2,6 +2,8 @@ from flask import jsonify, current_app
 from werkzeug.exceptions import HTTPException
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from marshmallow import ValidationError
+from app.llm.scheduler import SchedulerBusyError
+from app.common.pagination import InvalidCursorError, InvalidQueryError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,6 +34,31 @@ def register_error_handlers(app):
             "message": "An error occurred while processing your request"
         }), 500
 
+    @app.errorhandler(SchedulerBusyError)
+    def handle_scheduler_busy(e):
+        logger.warning(f"LLM scheduler backpressure ({e.status_code}): {e}")
+        response = jsonify({
+            "error": "LLM service busy",
+            "message": str(e),
+            "retry_after": e.retry_after
+        })
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, e.status_code
+
+    @app.errorhandler(InvalidCursorError)
+    def handle_invalid_cursor(e):
+        return jsonify({
+            "error": "Invalid cursor",
+            "message": str(e)
+        }), 400
+
+    @app.errorhandler(InvalidQueryError)
+    def handle_invalid_query(e):
+        return jsonify({
+            "error": "Invalid query",
+            "message": str(e)
+        }), 400
+
     @app.errorhandler(HTTPException)
     def handle_http_error(e):
         return jsonify({
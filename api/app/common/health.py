@@ -1,8 +1,7 @@
-from flask import Blueprint, jsonify, current_app
-from app.extensions import db, get_milvus_client
+from flask import Blueprint, Response, jsonify, current_app
+from app.common.health_prober import get_health_prober
+from app.common.instrumentation import render_metrics
 from datetime import datetime
-import psutil
-import os
 
 health_bp = Blueprint('health', __name__)
 
@@ -17,71 +16,11 @@ def health_check():
 
 @health_bp.route('/health/detailed', methods=['GET'])
 def detailed_health_check():
-    """Detailed health check with component status"""
-    health_status = {
-        'status': 'healthy',
-        'timestamp': datetime.utcnow().isoformat(),
-        'components': {}
-    }
-    
-    # Database health
-    try:
-        db.session.execute('SELECT 1')
-        health_status['components']['database'] = {'status': 'healthy'}
-    except Exception as e:
-        health_status['components']['database'] = {
-            'status': 'unhealthy',
-            'error': str(e)
-        }
-        health_status['status'] = 'unhealthy'
-    
-    # Milvus health
-    try:
-        client = get_milvus_client()
-        health_status['components']['milvus'] = {'status': 'healthy'}
-    except Exception as e:
-        health_status['components']['milvus'] = {
-            'status': 'unhealthy',
-            'error': str(e)
-        }
-        health_status['status'] = 'degraded'
-    
-    # System resources
-    try:
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-        health_status['components']['system'] = {
-            'status': 'healthy',
-            'memory_percent': memory.percent,
-            'disk_percent': disk.percent,
-            'cpu_percent': psutil.cpu_percent(interval=1)
-        }
-    except Exception as e:
-        health_status['components']['system'] = {
-            'status': 'unknown',
-            'error': str(e)
-        }
-    
-    return jsonify(health_status)
+    """Detailed health check with component status, served from the background prober's latest snapshot"""
+    return jsonify(get_health_prober().snapshot())
 
 @health_bp.route('/metrics', methods=['GET'])
 def metrics():
-    """Basic metrics endpoint"""
-    try:
-        # Database metrics
-        from app.auth.models import User
-        from app.patients.models import Patient
-        
-        user_count = User.query.count()
-        patient_count = Patient.query.count()
-        
-        return jsonify({
-            'users_total': user_count,
-            'patients_total': patient_count,
-            'timestamp': datetime.utcnow().isoformat()
-        })
-    except Exception as e:
-        return jsonify({
-            'error': 'Failed to collect metrics',
-            'message': str(e)
-        }), 500
\ No newline at end of file
+    """Prometheus scrape endpoint (request, DB, RAG and LLM metrics)"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
\ No newline at end of file
@@ -0,0 +1,221 @@
+from datetime import datetime
+from sqlalchemy import text
+import threading
+import logging
+import atexit
+import psutil
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# A failing component marks the whole service with this status
+_FAILURE_STATUS = {"database": "unhealthy", "milvus": "degraded", "llm": "degraded", "embedding": "degraded"}
+_SEVERITY = {"healthy": 0, "degraded": 1, "unhealthy": 2}
+
+
+def _probe_database():
+    from app.extensions import db
+    db.session.execute(text("SELECT 1"))
+    db.session.rollback()
+    return {"status": "healthy"}
+
+
+def _probe_milvus():
+    from app import extensions
+    if extensions._milvus_client is None:
+        return {"status": "unhealthy", "error": "Milvus client not initialized"}
+    # One nearest-neighbour lookup with a fixed unit vector exercises the index without embedding anything;
+    # it targets the collection init_milvus_client() opened, the one retrieval searches
+    probe_vector = [1.0] + [0.0] * (extensions.embedding_dim - 1)
+    extensions._milvus_client.search(
+        collection_name=extensions._milvus_collection, data=[probe_vector], limit=1, output_fields=[]
+    )
+    return {"status": "healthy"}
+
+
+def _probe_embedding():
+    from app import extensions
+    loaded = extensions.embed_model is not None
+    return {"status": "healthy" if loaded else "unhealthy", "model_loaded": loaded}
+
+
+def _probe_llm(app):
+    """Model and worker state only; never runs inference or starts workers."""
+    from app.llm import clients
+    model_path = app.config.get("LLAMA_MODEL_PATH")
+    if not model_path:
+        return {"status": "unhealthy", "llm_available": False, "error": "LLAMA_MODEL_PATH not configured"}
+    if not os.path.exists(model_path):
+        return {"status": "unhealthy", "llm_available": False, "error": f"Model file not found: {model_path}"}
+
+    scheduler = clients._scheduler
+    if scheduler is None:
+        # Created on the first completion; the model file is present so it can be loaded then
+        return {"status": "healthy", "llm_available": True, "model_loaded": False}
+    backend = scheduler.backend
+    ready = backend.is_ready()
+    queue = scheduler.stats()
+    result = {
+        "status": "healthy" if ready else "unhealthy",
+        "llm_available": ready,
+        "model_loaded": ready,
+        "backend": type(backend).__name__,
+        "queue_depth": queue.get("queue_depth"),
+        "in_flight": queue.get("in_flight"),
+    }
+    if hasattr(backend, "stats"):
+        workers = backend.stats()
+        result["workers"] = {
+            state: sum(1 for w in workers if w.get("state") == state)
+            for state in ("starting", "idle", "busy", "dead")
+        }
+    return result
+
+
+def _probe_audit_writer():
+    from app.common.audit_writer import get_audit_writer
+    audit = get_audit_writer().stats()
+    return {"status": "healthy" if audit["pending_segments"] <= 1 else "degraded", **audit}
+
+
+def _probe_system():
+    memory = psutil.virtual_memory()
+    disk = psutil.disk_usage('/')
+    return {
+        "status": "healthy",
+        "memory_percent": memory.percent,
+        "disk_percent": disk.percent,
+        # Non-blocking: utilisation since the previous probe
+        "cpu_percent": psutil.cpu_percent(interval=None),
+    }
+
+
+class HealthProber:
+    """
+    Probes component health in a background thread every `interval` seconds and keeps the
+    latest snapshot, so health endpoints answer from memory without touching the database,
+    Milvus or the LLM. A snapshot older than `stale_after` seconds (the prober is stuck or
+    dead) is reported as degraded.
+    """
+
+    def __init__(self, interval: float = 15, stale_after: float = None):
+        self.interval = interval
+        self.stale_after = stale_after or 3 * interval
+        self._snapshot = None
+        self._snapshot_at = None
+        self._lock = threading.Lock()
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self, app):
+        self._app = app
+        if self.interval and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+            self._thread.start()
+            atexit.register(self._stop.set)
+
+    def stop(self, timeout: float = 5):
+        """Stop the background thread, e.g. before its app's database goes away; start() runs it again."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+            atexit.unregister(self._stop.set)
+
+    def probe_now(self) -> dict:
+        """Run every probe once and store the result as the current snapshot."""
+        app = self._app
+        probes = {
+            "database": _probe_database,
+            "milvus": _probe_milvus,
+            "embedding": _probe_embedding,
+            "llm": lambda: _probe_llm(app),
+            "audit_writer": _probe_audit_writer,
+            "system": _probe_system,
+        }
+        components = {}
+        with app.app_context():
+            try:
+                for name, probe in probes.items():
+                    started = time.perf_counter()
+                    try:
+                        result = probe()
+                    except Exception as e:
+                        status = "unhealthy" if name in _FAILURE_STATUS else "unknown"
+                        result = {"status": status, "error": str(e)}
+                    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                    components[name] = result
+            finally:
+                from app.extensions import db
+                db.session.remove()
+
+        checked_at = datetime.utcnow()
+        with self._lock:
+            self._snapshot = components
+            self._snapshot_at = checked_at
+        return self.snapshot()
+
+    def snapshot(self) -> dict:
+        """Latest probe results with an overall status; never blocks on a component."""
+        with self._lock:
+            components, checked_at = self._snapshot, self._snapshot_at
+        if components is None:
+            return {"status": "unknown", "timestamp": datetime.utcnow().isoformat(), "components": {},
+                    "message": "First health probe has not completed yet"}
+
+        status = "healthy"
+        for name, component in components.items():
+            if component["status"] == "unhealthy":
+                impact = _FAILURE_STATUS.get(name, "healthy")
+            elif component["status"] == "degraded":
+                impact = "degraded"
+            else:
+                continue
+            if _SEVERITY[impact] > _SEVERITY[status]:
+                status = impact
+        age = (datetime.utcnow() - checked_at).total_seconds()
+        if age > self.stale_after and status == "healthy":
+            status = "degraded"
+        return {
+            "status": status,
+            "timestamp": datetime.utcnow().isoformat(),
+            "checked_at": checked_at.isoformat(),
+            "snapshot_age_seconds": round(age, 3),
+            "stale": age > self.stale_after,
+            "components": components,
+        }
+
+    def _run(self):
+        while True:
+            try:
+                self.probe_now()
+            except Exception as e:
+                logger.error(f"Health probe failed: {e}", exc_info=True)
+            if self._stop.wait(self.interval):
+                return
+
+
+_health_prober = None
+_health_prober_lock = threading.Lock()
+
+
+def init_health_prober(app) -> HealthProber:
+    """Create and start the process-wide health prober from HEALTH_PROBE_* settings."""
+    global _health_prober
+    with _health_prober_lock:
+        if _health_prober is None:
+            _health_prober = HealthProber(
+                interval=app.config.get("HEALTH_PROBE_INTERVAL", 15),
+                stale_after=app.config.get("HEALTH_PROBE_STALE_AFTER") or None,
+            )
+        _health_prober.start(app)
+    return _health_prober
+
+
+def get_health_prober() -> HealthProber:
+    if _health_prober is None:
+        raise RuntimeError("Health prober not initialized; call init_health_prober(app) in create_app.")
+    return _health_prober
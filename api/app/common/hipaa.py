@@ -4,6 +4,8 @@ from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
 from datetime import datetime
 import logging
 from app.extensions import db
+from app.common.audit_writer import get_audit_writer
+from app.common.authz_cache import get_authz_cache, parse_user_id
 
 # HIPAA Audit Log Model
 class HIPAAAuditLog(db.Model):
@@ -22,25 +24,27 @@ class HIPAAAuditLog(db.Model):
     reason = db.Column(db.String(255), nullable=True)  # For failed attempts
 
 def log_hipaa_access(action, resource, resource_id=None, patient_id=None, success=True, reason=None):
-    """Log HIPAA-compliant access to PHI"""
+    """
+    Log HIPAA-compliant access to PHI.
+    The event is captured from the request now and written in a batch by the audit writer,
+    so the request's session and latency are unaffected.
+    """
     try:
         user_id = get_jwt_identity() if verify_jwt_in_request(optional=True) else None
-        
-        audit_log = HIPAAAuditLog(
-            user_id=user_id,
-            patient_id=patient_id,
-            action=action,
-            resource=resource,
-            resource_id=str(resource_id) if resource_id else None,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent'),
-            success=success,
-            reason=reason
-        )
-        
-        db.session.add(audit_log)
-        db.session.commit()
-        
+
+        get_audit_writer().enqueue({
+            "user_id": user_id,
+            "patient_id": patient_id,
+            "action": action,
+            "resource": resource,
+            "resource_id": str(resource_id) if resource_id else None,
+            "ip_address": request.remote_addr,
+            "user_agent": request.headers.get('User-Agent'),
+            "timestamp": datetime.utcnow(),
+            "success": success,
+            "reason": reason,
+        })
+
         current_app.logger.info(
             f"HIPAA Audit: User {user_id} {action} {resource} {resource_id} - Success: {success}"
         )
@@ -73,18 +77,20 @@ def require_patient_access(patient_id_param='patient_id'):
             verify_jwt_in_request()
             user_id = get_jwt_identity()
             patient_id = kwargs.get(patient_id_param)
+            if parse_user_id(user_id) is None:
+                return {'error': 'Access denied'}, 403
             
+            # Role and ownership come from the authorization cache rather than two queries per request
+            authz = get_authz_cache()
+            role = authz.user_role(user_id)
+
             # Admin and clinician roles can access all patients
-            from app.auth.models import User
-            user = User.query.get(user_id)
-            if user and user.role in ['admin', 'clinician']:
+            if role in ['admin', 'clinician']:
                 return f(*args, **kwargs)
             
             # Patient users can only access their own data
-            if user and user.role == 'patient':
-                from app.patients.models import Patient
-                patient = Patient.query.filter_by(user_id=user_id, id=patient_id).first()
-                if not patient:
+            if role == 'patient':
+                if patient_id not in authz.owned_patient_ids(user_id):
                     log_hipaa_access('READ', 'patient', patient_id, patient_id, success=False, reason='Unauthorized access attempt')
                     return {'error': 'Access denied'}, 403
             
@@ -0,0 +1,176 @@
+from flask import g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import time
+import os
+
+# --- HTTP ---
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ["method", "route", "status"]
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests currently being served.", ["method", "route"],
+    multiprocess_mode="livesum",
+)
+
+# --- Database ---
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Duration of individual SQL statements.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250),
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request.", ["route"]
+)
+
+# --- RAG ---
+
+EMBEDDING_SECONDS = Histogram(
+    "embedding_duration_seconds", "Embedding model forward passes.", ["kind"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+VECTOR_SEARCH_SECONDS = Histogram(
+    "milvus_search_duration_seconds", "Milvus vector search latency.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+# --- LLM ---
+
+_LLM_SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "llm_queue_wait_seconds", "Time a completion waited in the inference queue.", buckets=_LLM_SECONDS_BUCKETS
+)
+LLM_GENERATION_SECONDS = Histogram(
+    "llm_generation_duration_seconds", "Time spent generating a completion.", ["stream"],
+    buckets=_LLM_SECONDS_BUCKETS,
+)
+LLM_PROMPT_TOKENS = Counter("llm_prompt_tokens", "Prompt tokens processed.")
+LLM_COMPLETION_TOKENS = Counter("llm_completion_tokens", "Completion tokens generated.")
+LLM_TOKENS_PER_SECOND = Histogram(
+    "llm_tokens_per_second", "Completion tokens per second of generation time.",
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200),
+)
+LLM_FAILURES = Counter("llm_failures", "Completions that ended with a backend error.")
+AGENT_ROUTES = Counter("agent_routes", "Chat queries routed to each agent, by routing method.", ["intent", "method"])
+LLM_COALESCED_REQUESTS = Counter(
+    "llm_coalesced_requests", "Requests served by an identical in-flight generation instead of their own.", ["stream"]
+)
+
+
+def record_llm_completion(elapsed: float, completion_tokens: int, prompt_tokens: int = None, stream: bool = False):
+    LLM_GENERATION_SECONDS.labels(stream=str(stream).lower()).observe(elapsed)
+    if prompt_tokens:
+        LLM_PROMPT_TOKENS.inc(prompt_tokens)
+    if completion_tokens:
+        LLM_COMPLETION_TOKENS.inc(completion_tokens)
+        if elapsed > 0:
+            LLM_TOKENS_PER_SECOND.observe(completion_tokens / elapsed)
+
+
+def completion_usage(response: dict):
+    """(prompt_tokens, completion_tokens) from an OpenAI-style chat completion, if reported."""
+    usage = (response or {}).get("usage") or {}
+    return usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+
+def chunk_has_content(chunk: dict) -> bool:
+    """llama.cpp streams one token per chunk; count those carrying text."""
+    choices = (chunk or {}).get("choices") or [{}]
+    return bool((choices[0].get("delta") or {}).get("content"))
+
+
+# --- Request / SQLAlchemy hooks ---
+
+
+def _route() -> str:
+    # Route templates ("/api/patients/<int:patient_id>") keep label cardinality bounded
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+# The one timing hook for SQL statements: it feeds the Prometheus histograms and, for requests the
+# SQL profiler sampled, the request's g.sql_profile. The start time lives on the statement's
+# execution context, so a statement that fails (no after_cursor_execute) leaves nothing behind.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started_at", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    DB_QUERY_SECONDS.observe(elapsed)
+    if has_request_context():
+        if "db_queries" in g:
+            g.db_queries += 1
+            g.db_seconds += elapsed
+        profile = g.get("sql_profile")
+        if profile is not None:
+            profile.append((statement, elapsed))
+
+
+class PrometheusMiddleware:
+    """Per-request latency, in-flight and SQL metrics for every route."""
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def before_request(self):
+        g.prometheus_started = time.perf_counter()
+        g.prometheus_route = _route()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+        HTTP_REQUESTS_IN_PROGRESS.labels(request.method, g.prometheus_route).inc()
+
+    def after_request(self, response):
+        started = g.get("prometheus_started")
+        if started is not None:
+            route = g.prometheus_route
+            HTTP_REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(
+                time.perf_counter() - started
+            )
+            DB_QUERIES_PER_REQUEST.labels(route).observe(g.db_queries)
+            DB_SECONDS_PER_REQUEST.labels(route).observe(g.db_seconds)
+        return response
+
+    def teardown_request(self, exception):
+        # Runs even when the view raised, so the gauge cannot drift upwards
+        route = g.pop("prometheus_route", None)
+        if route is not None:
+            HTTP_REQUESTS_IN_PROGRESS.labels(request.method, route).dec()
+
+
+def render_metrics():
+    """(body, content type) in Prometheus text format; aggregates all workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
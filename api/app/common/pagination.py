@@ -0,0 +1,151 @@
+from datetime import date, datetime, timezone
+from flask import current_app, jsonify, request
+from sqlalchemy import and_, or_
+from app.extensions import db
+import base64
+import json
+
+
+class InvalidCursorError(ValueError):
+    """Raised for a malformed or tampered pagination cursor; rendered as 400."""
+
+
+class InvalidQueryError(ValueError):
+    """Raised for an unknown ?fields= name or an unparseable filter value; rendered as 400."""
+
+
+def encode_cursor(*values) -> str:
+    """Opaque, URL-safe cursor holding the sort key of the last row on a page."""
+    payload = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursorError("Invalid pagination cursor.")
+    if not isinstance(payload, list) or len(values) != size:
+        raise InvalidCursorError("Invalid pagination cursor.")
+    return values
+
+
+def page_limit(default: int = None) -> int:
+    """Page size from ?limit=, clamped to 1..MAX_PAGE_SIZE."""
+    maximum = current_app.config.get("MAX_PAGE_SIZE", 200)
+    if default is None:
+        default = current_app.config.get("DEFAULT_PAGE_SIZE", 50)
+    limit = request.args.get("limit", default, type=int)
+    return max(1, min(limit, maximum))
+
+
+def keyset_filter(columns: list, values: list, descending: bool = True):
+    """Rows strictly after `values` in (columns...) order, e.g. (a < x) OR (a = x AND b < y)."""
+    clauses = []
+    for i, column in enumerate(columns):
+        after = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], after))
+    return or_(*clauses)
+
+
+def keyset_page(query, columns: list, cursor_of, limit: int, cursor: str = None, descending: bool = True):
+    """
+    Fetch one page of `query` ordered by `columns` (the last column must be unique, e.g. the id).
+    `cursor_of(row)` returns the row's values for `columns`. Returns (rows, next_cursor or None).
+    """
+    if cursor:
+        query = query.filter(keyset_filter(columns, decode_cursor(cursor, len(columns)), descending))
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    rows = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(*cursor_of(rows[limit - 1])) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def with_next_cursor(response, next_cursor: str = None):
+    """List endpoints keep returning a bare JSON array; the cursor for the next page travels in a header."""
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+# --- Projected list endpoints ---
+
+
+def requested_fields(columns: dict, default_fields) -> list:
+    """Field names from ?fields=a,b (each must be a key of `columns`), else `default_fields`; id always included."""
+    raw = request.args.get("fields")
+    if not raw:
+        names = list(default_fields)
+    else:
+        names = [name.strip() for name in raw.split(",") if name.strip()]
+        unknown = [name for name in names if name not in columns]
+        if unknown:
+            raise InvalidQueryError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(columns)}")
+    return names if "id" in names else ["id", *names]
+
+
+def _parse_value(column, raw: str, arg: str):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return raw
+    try:
+        if python_type is bool:
+            if raw.lower() not in ("true", "false", "1", "0"):
+                raise ValueError(raw)
+            return raw.lower() in ("true", "1")
+        if python_type is datetime:
+            value = datetime.fromisoformat(raw)
+            # Stored timestamps are naive UTC
+            return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+        if python_type is date:
+            return date.fromisoformat(raw[:10])
+        return python_type(raw)
+    except ValueError:
+        raise InvalidQueryError(f"Invalid value for {arg}: {raw!r}")
+
+
+def apply_filters(query, filters: dict = None, date_column=None):
+    """
+    Equality filters from ?<name>=value for each `filters` entry (name -> column), converted to
+    the column's type, plus an inclusive ?from= / ?to= ISO 8601 range on `date_column`.
+    """
+    for arg, column in (filters or {}).items():
+        raw = request.args.get(arg)
+        if raw not in (None, ""):
+            query = query.filter(column == _parse_value(column, raw, arg))
+    if date_column is not None:
+        start, end = request.args.get("from"), request.args.get("to")
+        if start:
+            query = query.filter(date_column >= _parse_value(date_column, start, "from"))
+        if end:
+            query = query.filter(date_column <= _parse_value(date_column, end, "to"))
+    return query
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def list_page(columns: dict, default_fields, filters: dict = None, date_column=None, where=(),
+              descending: bool = False):
+    """
+    A complete list endpoint response: selects only the requested columns (`columns` maps output
+    name -> column or SQL expression and must include the unique "id"), applies the fixed `where`
+    criteria and request filters, and returns one keyset page ordered by id as a JSON array with
+    X-Next-Cursor. With ?count=true the number of rows matching the filters (across all pages)
+    is sent in X-Total-Count, so totals never need every page.
+    """
+    names = requested_fields(columns, default_fields)
+    query = db.session.query(*[columns[name].label(name) for name in names]).filter(*where)
+    query = apply_filters(query, filters, date_column)
+    total = query.count() if request.args.get("count", "").lower() in ("true", "1") else None
+    rows, next_cursor = keyset_page(
+        query, [columns["id"]], lambda row: (row.id,), page_limit(), request.args.get("cursor"), descending
+    )
+    items = [{name: _json_value(getattr(row, name)) for name in names} for row in rows]
+    response = with_next_cursor(jsonify(items), next_cursor)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return response
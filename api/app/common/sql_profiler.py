@@ -0,0 +1,175 @@
+from flask import g, request
+from app.common import instrumentation  # noqa: F401  (its statement timing hook fills g.sql_profile)
+import threading
+import logging
+import random
+import re
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_NAMED_PARAM = re.compile(r"%\(\w+\)s|:\w+\b")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text with literals and parameters folded, so repeated lookups compare equal."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NAMED_PARAM.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PARAM_LIST.sub("(?, ...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class _EndpointReport:
+    __slots__ = ("requests", "queries", "max_queries", "sql_ms", "n_plus_one_requests", "shapes")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.sql_ms = 0.0
+        self.n_plus_one_requests = 0
+        self.shapes = {}  # shape -> [executions, total ms, requests flagged as N+1]
+
+
+class SQLProfiler:
+    """
+    Records every SQL statement issued while serving a sampled request.
+
+    Sampling is decided per request (`sample_rate`, 1.0 in debug mode). A sampled request gets a
+    `g.sql_profile` list that the statement timing hook in app.common.instrumentation fills with
+    (statement, seconds) pairs. The statements are grouped by shape; a SELECT shape executed
+    `n_plus_one_threshold` or more times is flagged as a likely N+1 and logged. Results
+    accumulate into a per-endpoint report (request count, queries per request, SQL time, top
+    statement shapes) kept in memory, with at most `max_shapes` shapes per endpoint.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, n_plus_one_threshold: int = 5, max_shapes: int = 50):
+        self.sample_rate = sample_rate
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.max_shapes = max_shapes
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+
+    # --- Request hooks ---
+
+    def before_request(self):
+        if self.sample_rate >= 1 or (self.sample_rate > 0 and random.random() < self.sample_rate):
+            g.sql_profile = []
+
+    def after_request(self, response):
+        statements = g.pop("sql_profile", None)
+        if statements is None:
+            return response
+        endpoint = f"{request.method} {request.url_rule.rule if request.url_rule is not None else 'unmatched'}"
+        profile = self.summarize(statements)
+        self._record(endpoint, profile)
+        response.headers["X-SQL-Queries"] = str(profile["queries"])
+        response.headers["X-SQL-Time-Ms"] = f"{profile['sql_ms']:.2f}"
+        if profile["n_plus_one"]:
+            shapes = "; ".join(f"{s['count']}x {s['shape'][:120]}" for s in profile["n_plus_one"])
+            logger.warning(f"Possible N+1 in {endpoint}: {shapes}")
+        return response
+
+    # --- Reports ---
+
+    def summarize(self, statements: list) -> dict:
+        """Group one request's (statement, seconds) pairs by shape."""
+        shapes = {}
+        for statement, seconds in statements:
+            entry = shapes.setdefault(statement_shape(statement), [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds * 1000
+        ranked = sorted(
+            ({"shape": shape, "count": count, "ms": ms} for shape, (count, ms) in shapes.items()),
+            key=lambda s: s["ms"], reverse=True,
+        )
+        return {
+            "queries": len(statements),
+            "sql_ms": sum(s["ms"] for s in ranked),
+            "shapes": ranked,
+            "n_plus_one": [
+                s for s in ranked
+                if s["count"] >= self.n_plus_one_threshold and s["shape"].upper().startswith("SELECT")
+            ],
+        }
+
+    def report(self, top: int = 10) -> list:
+        """Per-endpoint totals, slowest total SQL time first."""
+        with self._lock:
+            endpoints = [
+                {
+                    "endpoint": endpoint,
+                    "sampled_requests": r.requests,
+                    "avg_queries": r.queries / r.requests,
+                    "max_queries": r.max_queries,
+                    "avg_sql_ms": r.sql_ms / r.requests,
+                    "total_sql_ms": r.sql_ms,
+                    "n_plus_one_requests": r.n_plus_one_requests,
+                    "top_shapes": [
+                        {"shape": shape, "executions": count, "total_ms": ms, "n_plus_one_requests": flagged}
+                        for shape, (count, ms, flagged) in sorted(
+                            r.shapes.items(), key=lambda item: item[1][1], reverse=True
+                        )[:top]
+                    ],
+                }
+                for endpoint, r in self._endpoints.items()
+            ]
+        return sorted(endpoints, key=lambda e: e["total_sql_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def _record(self, endpoint: str, profile: dict):
+        flagged = {s["shape"] for s in profile["n_plus_one"]}
+        with self._lock:
+            report = self._endpoints.get(endpoint)
+            if report is None:
+                report = self._endpoints[endpoint] = _EndpointReport()
+            report.requests += 1
+            report.queries += profile["queries"]
+            report.max_queries = max(report.max_queries, profile["queries"])
+            report.sql_ms += profile["sql_ms"]
+            report.n_plus_one_requests += bool(flagged)
+            for shape in profile["shapes"]:
+                entry = report.shapes.setdefault(shape["shape"], [0, 0.0, 0])
+                entry[0] += shape["count"]
+                entry[1] += shape["ms"]
+                entry[2] += shape["shape"] in flagged
+            if len(report.shapes) > self.max_shapes:
+                # Keep the shapes that cost the most time
+                keep = sorted(report.shapes.items(), key=lambda item: item[1][1], reverse=True)[:self.max_shapes]
+                report.shapes = dict(keep)
+
+
+_sql_profiler = None
+_sql_profiler_lock = threading.Lock()
+
+
+def init_sql_profiler(app) -> SQLProfiler:
+    """Create the process-wide profiler from SQL_PROFILER_* settings and hook it into `app`."""
+    global _sql_profiler
+    with _sql_profiler_lock:
+        if _sql_profiler is None:
+            sample_rate = app.config.get("SQL_PROFILER_SAMPLE_RATE", 0.0)
+            _sql_profiler = SQLProfiler(
+                sample_rate=1.0 if app.debug else sample_rate,
+                n_plus_one_threshold=app.config.get("SQL_PROFILER_N_PLUS_ONE_THRESHOLD", 5),
+                max_shapes=app.config.get("SQL_PROFILER_MAX_SHAPES", 50),
+            )
+    _sql_profiler.init_app(app)
+    return _sql_profiler
+
+
+def get_sql_profiler() -> SQLProfiler:
+    if _sql_profiler is None:
+        raise RuntimeError("SQL profiler not initialized; call init_sql_profiler(app) in create_app.")
+    return _sql_profiler
@@ -10,6 +10,11 @@ class AppMetric(db.Model):
     # Optional: dimensions for filtering, e.g., 'endpoint', 'user_id'
     dimension_key = db.Column(db.String(100))
     dimension_value = db.Column(db.String(255))
+    # Rows written by the buffered recorder summarize many samples: value is their sum
+    sample_count = db.Column(db.Integer, nullable=False, default=1)
+    min_value = db.Column(db.Float)
+    max_value = db.Column(db.Float)
+    buckets = db.Column(db.Text)  # histograms only: JSON {upper_bound: count}
 
     def __repr__(self):
         return f'<AppMetric {self.metric_name} {self.value} at {self.timestamp}>'
@@ -22,3 +27,42 @@ class UserActivity(db.Model):
     activity_type = db.Column(db.String(100), nullable=False) # e.g., 'login', 'patient_view', 'chat_message_sent'
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     details = db.Column(db.Text) # JSON string or free text for additional context
+
+
+# --- Pre-aggregated rollups (maintained by app.dashboard.rollups.RollupCompactor) ---
+
+class MetricRollup(db.Model):
+    """Count and sum of one metric/dimension per minute, hour or day bucket."""
+    __tablename__ = 'metric_rollups'
+    id = db.Column(db.Integer, primary_key=True)
+    metric = db.Column(db.String(100), nullable=False)  # e.g., 'api_call', 'llm_query', 'active_users'
+    granularity = db.Column(db.String(10), nullable=False)  # 'minute', 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    dimension = db.Column(db.String(255), nullable=False, default='')  # e.g., endpoint or model name
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.UniqueConstraint('metric', 'granularity', 'bucket_start', 'dimension', name='_metric_rollup_uc'),
+        db.Index('ix_metric_rollups_lookup', 'metric', 'granularity', 'bucket_start'),
+    )
+
+class DailyActiveUser(db.Model):
+    """One row per user per day with activity; distinct counts are not additive across buckets."""
+    __tablename__ = 'daily_active_users'
+    day = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+
+class RollupWatermark(db.Model):
+    """Highest raw row id already folded into the rollups, per source table."""
+    __tablename__ = 'rollup_watermarks'
+    source = db.Column(db.String(100), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RollupGap(db.Model):
+    """A raw id below the watermark that was missing when passed: possibly a transaction still in flight."""
+    __tablename__ = 'rollup_gaps'
+    source = db.Column(db.String(100), primary_key=True)
+    raw_id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,289 @@
+from datetime import datetime
+from flask import request
+from sqlalchemy.exc import SQLAlchemyError
+import threading
+import bisect
+import logging
+import atexit
+import json
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds for histogram buckets (milliseconds suit request and query latencies)
+DEFAULT_HISTOGRAM_BOUNDS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class _Aggregate:
+    __slots__ = ("kind", "count", "total", "last", "min", "max", "buckets")
+
+    def __init__(self, kind: str, bucket_count: int = 0):
+        self.kind = kind
+        self.count = 0
+        self.total = 0.0
+        self.last = None
+        self.min = None
+        self.max = None
+        self.buckets = [0] * bucket_count if bucket_count else None
+
+    def add(self, value: float, bucket: int = None):
+        self.count += 1
+        self.total += value
+        self.last = value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if bucket is not None:
+            self.buckets[bucket] += 1
+
+
+class _ThreadBuffer:
+    """One thread's pending samples; its lock is only contended while the flusher swaps it out."""
+
+    __slots__ = ("thread", "lock", "aggregates", "activities")
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.lock = threading.Lock()
+        self.aggregates = {}  # (kind, name, dimension_key, dimension_value) -> _Aggregate
+        self.activities = []
+
+    def drain(self):
+        with self.lock:
+            aggregates, self.aggregates = self.aggregates, {}
+            activities, self.activities = self.activities, []
+        return aggregates, activities
+
+
+class MetricsRecorder:
+    """
+    In-process counters, gauges and histograms flushed to `app_metrics` in bulk.
+
+    Each thread records into its own buffer, so recording is a dict update with no database
+    access and no shared lock. Every `flush_interval` seconds a background thread merges all
+    buffers and writes one summarized row per (metric, dimension) with the interval's sample
+    count, sum, min and max (the last value for gauges, bucket counts for histograms), plus the
+    buffered `user_activity` rows, in a single transaction. If a flush fails the rows are kept for
+    the next attempt, up to `max_pending_rows`; beyond that the oldest are dropped. Samples still
+    in memory are lost if the process is killed.
+    """
+
+    def __init__(self, flush_interval: float = 10.0, max_pending_rows: int = 100000,
+                 histogram_bounds=DEFAULT_HISTOGRAM_BOUNDS):
+        self.flush_interval = flush_interval
+        self.max_pending_rows = max_pending_rows
+        self.histogram_bounds = tuple(histogram_bounds)
+        self._local = threading.local()
+        self._buffers = []
+        self._buffers_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending_metrics = []
+        self._pending_activities = []
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._counters = {"flushes": 0, "flush_failures": 0, "rows_written": 0, "rows_dropped": 0}
+
+    # --- Recording ---
+
+    def increment(self, name: str, value: float = 1, dimension_key: str = None, dimension_value: str = None):
+        self._record("counter", name, value, dimension_key, dimension_value)
+
+    def gauge(self, name: str, value: float, dimension_key: str = None, dimension_value: str = None):
+        self._record("gauge", name, value, dimension_key, dimension_value)
+
+    def observe(self, name: str, value: float, dimension_key: str = None, dimension_value: str = None):
+        """Add a sample to a histogram (e.g. a latency in ms)."""
+        self._record("histogram", name, value, dimension_key, dimension_value)
+
+    def activity(self, user_id, activity_type: str, details: str = None):
+        buffer = self._buffer()
+        with buffer.lock:
+            buffer.activities.append({
+                "user_id": user_id,
+                "activity_type": activity_type,
+                "details": details,
+                "timestamp": datetime.utcnow(),
+            })
+
+    # --- Lifecycle ---
+
+    def start(self, app):
+        self._app = app
+        if self.flush_interval and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-recorder", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def stop(self, timeout: float = 5):
+        """
+        Stop the flusher thread and write what is buffered, e.g. before the app's database goes
+        away; start() runs it again, with whichever app it is given.
+        """
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+            atexit.unregister(self.close)
+        if self._app is not None:
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        if self._app is not None:
+            self.flush()
+
+    def flush(self) -> bool:
+        """Write everything recorded so far; safe to call from any thread."""
+        from app.dashboard.models import AppMetric, UserActivity
+        from app.extensions import db
+
+        with self._flush_lock:
+            metrics, activities = self._collect()
+            self._pending_metrics.extend(metrics)
+            self._pending_activities.extend(activities)
+            if not self._pending_metrics and not self._pending_activities:
+                return True
+            try:
+                with self._app.app_context():
+                    with db.engine.begin() as connection:
+                        if self._pending_metrics:
+                            connection.execute(AppMetric.__table__.insert(), self._pending_metrics)
+                        if self._pending_activities:
+                            connection.execute(UserActivity.__table__.insert(), self._pending_activities)
+            except SQLAlchemyError as e:
+                self._counters["flush_failures"] += 1
+                self._trim_pending()
+                logger.error(f"Metrics flush failed, keeping {len(self._pending_metrics)} metric rows for retry: {e}")
+                return False
+            self._counters["flushes"] += 1
+            self._counters["rows_written"] += len(self._pending_metrics) + len(self._pending_activities)
+            self._pending_metrics, self._pending_activities = [], []
+            return True
+
+    def stats(self) -> dict:
+        with self._buffers_lock:
+            buffers = len(self._buffers)
+        return {
+            "thread_buffers": buffers,
+            "pending_rows": len(self._pending_metrics) + len(self._pending_activities),
+            **self._counters,
+        }
+
+    # --- Internals ---
+
+    def _buffer(self) -> _ThreadBuffer:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = _ThreadBuffer()
+            with self._buffers_lock:
+                self._buffers.append(buffer)
+        return buffer
+
+    def _record(self, kind, name, value, dimension_key, dimension_value):
+        buffer = self._buffer()
+        key = (kind, name, dimension_key, dimension_value)
+        bucket = bisect.bisect_left(self.histogram_bounds, value) if kind == "histogram" else None
+        with buffer.lock:
+            aggregate = buffer.aggregates.get(key)
+            if aggregate is None:
+                aggregate = buffer.aggregates[key] = _Aggregate(
+                    kind, len(self.histogram_bounds) + 1 if kind == "histogram" else 0
+                )
+            aggregate.add(value, bucket)
+
+    def _collect(self):
+        """Drain every thread buffer and merge same-key aggregates into summarized rows."""
+        with self._buffers_lock:
+            buffers = list(self._buffers)
+            # Buffers of finished threads are dropped once drained below
+            self._buffers = [b for b in self._buffers if b.thread.is_alive()]
+        merged, activities = {}, []
+        for buffer in buffers:
+            aggregates, buffered_activities = buffer.drain()
+            activities.extend(buffered_activities)
+            for key, aggregate in aggregates.items():
+                into = merged.get(key)
+                if into is None:
+                    merged[key] = aggregate
+                    continue
+                into.count += aggregate.count
+                into.total += aggregate.total
+                into.last = aggregate.last
+                into.min = min(into.min, aggregate.min)
+                into.max = max(into.max, aggregate.max)
+                if into.buckets is not None:
+                    into.buckets = [a + b for a, b in zip(into.buckets, aggregate.buckets)]
+
+        now = datetime.utcnow()
+        rows = []
+        for (kind, name, dimension_key, dimension_value), aggregate in merged.items():
+            row = {
+                "metric_name": name,
+                "dimension_key": dimension_key,
+                "dimension_value": dimension_value,
+                "timestamp": now,
+                "min_value": aggregate.min,
+                "max_value": aggregate.max,
+                "buckets": None,
+            }
+            if kind == "gauge":
+                row.update(value=aggregate.last, sample_count=1)
+            else:
+                row.update(value=aggregate.total, sample_count=aggregate.count)
+            if kind == "histogram":
+                bounds = [str(b) for b in self.histogram_bounds] + ["+Inf"]
+                row["buckets"] = json.dumps(dict(zip(bounds, aggregate.buckets)))
+            rows.append(row)
+        return rows, activities
+
+    def _trim_pending(self):
+        overflow = len(self._pending_metrics) + len(self._pending_activities) - self.max_pending_rows
+        if overflow <= 0:
+            return
+        dropped_metrics = min(overflow, len(self._pending_metrics))
+        del self._pending_metrics[:dropped_metrics]
+        del self._pending_activities[:overflow - dropped_metrics]
+        self._counters["rows_dropped"] += overflow
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # Pending rows stay queued; the next interval retries them
+                self._counters["flush_failures"] += 1
+                logger.error(f"Metrics flush failed: {e}", exc_info=True)
+
+
+_metrics_recorder = None
+_metrics_recorder_lock = threading.Lock()
+
+
+def init_metrics_recorder(app) -> MetricsRecorder:
+    """Create and start the process-wide metrics recorder and, if enabled, per-request instrumentation."""
+    global _metrics_recorder
+    with _metrics_recorder_lock:
+        if _metrics_recorder is None:
+            _metrics_recorder = MetricsRecorder(
+                flush_interval=app.config.get("METRICS_FLUSH_INTERVAL", 10.0),
+                max_pending_rows=app.config.get("METRICS_MAX_PENDING_ROWS", 100000),
+            )
+        _metrics_recorder.start(app)
+    if app.config.get("METRICS_INSTRUMENT_REQUESTS", True):
+        app.after_request(_record_request)
+    return _metrics_recorder
+
+
+def get_metrics_recorder() -> MetricsRecorder:
+    if _metrics_recorder is None:
+        raise RuntimeError("Metrics recorder not initialized; call init_metrics_recorder(app) in create_app.")
+    return _metrics_recorder
+
+
+def _record_request(response):
+    # Only the per-endpoint call count the dashboard rolls up; latency and status are exported by
+    # the Prometheus middleware, which already times every request.
+    # Route templates ("/api/patients/<int:patient_id>") keep the dimension's cardinality bounded
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    get_metrics_recorder().increment("api_call", 1, "endpoint", endpoint)
+    return response
@@ -0,0 +1,384 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import islice
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.extensions import db, _config_value
+from app.dashboard.models import AppMetric, UserActivity, MetricRollup, DailyActiveUser, RollupWatermark, RollupGap
+from app.llm.models import LLMQueryLog
+import threading
+import logging
+import atexit
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("minute", "hour", "day")
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# Each raw table maps its rows to (metric, dimension, value, sample count) events
+def _app_metric_events(row):
+    # Rows from the buffered recorder summarize sample_count samples whose sum is value
+    yield row.metric_name, row.dimension_value or "", row.value or 0.0, row.sample_count or 1
+
+
+def _user_activity_events(row):
+    yield "activity", row.activity_type or "", 1.0, 1
+
+
+def _llm_query_events(row):
+    yield "llm_query", row.model_name or "", 1.0, 1
+
+
+SOURCES = {
+    "app_metrics": (
+        AppMetric, AppMetric.timestamp,
+        (AppMetric.metric_name, AppMetric.dimension_value, AppMetric.value, AppMetric.sample_count),
+        _app_metric_events,
+    ),
+    "user_activity": (
+        UserActivity, UserActivity.timestamp,
+        (UserActivity.user_id, UserActivity.activity_type), _user_activity_events,
+    ),
+    "llm_query_logs": (
+        LLMQueryLog, LLMQueryLog.created_at,
+        (LLMQueryLog.model_name,), _llm_query_events,
+    ),
+}
+
+
+class RollupCompactor:
+    """
+    Folds new rows from the raw event tables into `metric_rollups` (per-minute, hour and day
+    count/sum per metric and dimension) and `daily_active_users`.
+
+    Progress is tracked per source as the highest raw id already folded in (`rollup_watermarks`),
+    so each pass reads only rows added since the last one. The watermark is advanced with a
+    compare-and-set in the same transaction as the rollup increments: a row is counted exactly
+    once even when several workers run the compactor. Ids the watermark passes over that do not
+    exist yet (a transaction still in flight) are kept in `rollup_gaps` and folded when their row
+    commits; gaps still empty after `gap_timeout` seconds are taken as rolled back and dropped.
+    Rows are bucketed by their own timestamp, and rows without one are passed over uncounted.
+    Minute and hour buckets are pruned after their retention; day buckets are kept.
+    """
+
+    def __init__(self, interval: float = 60, batch_size: int = 5000, gap_timeout: float = 300,
+                 minute_retention_hours: int = 48, hour_retention_days: int = 90):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.gap_timeout = gap_timeout
+        self.minute_retention_hours = minute_retention_hours
+        self.hour_retention_days = hour_retention_days
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    # --- Public API ---
+
+    def start(self, app):
+        """Run compact() every `interval` seconds in a background thread (interval 0 disables it)."""
+        self._app = app
+        if self.interval and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rollup-compactor", daemon=True)
+            self._thread.start()
+            atexit.register(self._stop.set)
+
+    def stop(self, timeout: float = 5):
+        """Stop the background thread, e.g. before its app's database goes away; start() runs it again."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+            atexit.unregister(self._stop.set)
+
+    def compact(self) -> dict:
+        """Fold every new and late-committed row into the rollups; returns rows folded per source."""
+        folded = {}
+        for source in SOURCES:
+            folded[source] = self.compact_gaps(source)
+            while True:
+                count = self.compact_source(source)
+                folded[source] += count
+                if count < self.batch_size:
+                    break
+        self.prune()
+        return folded
+
+    def compact_source(self, source: str) -> int:
+        """Fold at most one batch of new `source` rows; returns how many rows were folded."""
+        try:
+            last_id = self._watermark(source)
+            rows = self._raw_rows(source).filter(SOURCES[source][0].id > last_id).limit(self.batch_size).all()
+            if not rows:
+                db.session.rollback()
+                return 0
+
+            watermarks = RollupWatermark.__table__
+            claimed = db.session.execute(
+                update(watermarks)
+                .where(watermarks.c.source == source, watermarks.c.last_id == last_id)
+                .values(last_id=rows[-1].id, updated_at=datetime.utcnow())
+            ).rowcount
+            if not claimed:
+                db.session.rollback()  # another worker folded this batch first
+                return 0
+
+            # The first pass has no earlier ids to wait for (lower ones may have been purged)
+            if last_id:
+                self._record_gaps(source, last_id, rows)
+            self._fold(source, rows)
+            db.session.commit()
+            return len(rows)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Rollup compaction of {source} failed: {e}")
+            return 0
+
+    def compact_gaps(self, source: str) -> int:
+        """Fold `source` rows that committed after the watermark had passed their id."""
+        folded, after = 0, 0
+        while after is not None:
+            count, after = self._compact_gap_page(source, after)
+            folded += count
+        return folded
+
+    def prune(self):
+        rollups = MetricRollup.__table__
+        gaps = RollupGap.__table__
+        now = datetime.utcnow()
+        try:
+            db.session.execute(gaps.delete().where(gaps.c.created_at < now - timedelta(seconds=self.gap_timeout)))
+            for granularity, cutoff in (
+                ("minute", now - timedelta(hours=self.minute_retention_hours)),
+                ("hour", now - timedelta(days=self.hour_retention_days)),
+            ):
+                db.session.execute(
+                    rollups.delete().where(rollups.c.granularity == granularity, rollups.c.bucket_start < cutoff)
+                )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Rollup pruning failed: {e}")
+
+    def watermarks(self) -> dict:
+        return {w.source: w.last_id for w in RollupWatermark.query.all()}
+
+    # --- Internals ---
+
+    def _raw_rows(self, source: str):
+        model, timestamp_column, columns, _ = SOURCES[source]
+        return db.session.query(model.id, timestamp_column.label("ts"), *columns).order_by(model.id)
+
+    def _compact_gap_page(self, source: str, after: int) -> tuple:
+        """Fold the rows now present for one page of gaps; returns (rows folded, next page's `after`)."""
+        gaps = RollupGap.__table__
+        try:
+            gap_ids = db.session.execute(
+                select(gaps.c.raw_id)
+                .where(gaps.c.source == source, gaps.c.raw_id > after)
+                .order_by(gaps.c.raw_id)
+                .limit(self.batch_size)
+            ).scalars().all()
+            next_after = gap_ids[-1] if len(gap_ids) == self.batch_size else None
+            rows = self._raw_rows(source).filter(SOURCES[source][0].id.in_(gap_ids)).all() if gap_ids else []
+            if not rows:
+                db.session.rollback()
+                return 0, next_after
+
+            # Deleting the gaps is the compare-and-set: a worker that finds any already gone lost the race
+            claimed = db.session.execute(
+                delete(gaps).where(gaps.c.source == source, gaps.c.raw_id.in_([row.id for row in rows]))
+            ).rowcount
+            if claimed != len(rows):
+                db.session.rollback()
+                return 0, next_after
+            self._fold(source, rows)
+            db.session.commit()
+            return len(rows), next_after
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Rollup compaction of late {source} rows failed: {e}")
+            return 0, None
+
+    def _record_gaps(self, source: str, last_id: int, rows):
+        missing = list(islice(_missing_ids(last_id, rows), self.batch_size + 1))
+        if len(missing) > self.batch_size:
+            # A jump this large is a rolled-back bulk insert, not transactions still in flight
+            logger.warning(f"{source} skipped more than {self.batch_size} ids after {last_id}; not waiting for the rest")
+            missing = missing[-self.batch_size:]
+        if missing:
+            now = datetime.utcnow()
+            db.session.execute(
+                insert(RollupGap.__table__),
+                [{"source": source, "raw_id": raw_id, "created_at": now} for raw_id in missing],
+            )
+
+    def _fold(self, source: str, rows):
+        to_events = SOURCES[source][3]
+        rows = [row for row in rows if row.ts is not None]  # cannot be bucketed
+        increments = defaultdict(lambda: [0, 0.0])
+        for row in rows:
+            for metric, dimension, value, count in to_events(row):
+                for granularity in GRANULARITIES:
+                    key = (metric, granularity, bucket_start(row.ts, granularity), dimension)
+                    increments[key][0] += count
+                    increments[key][1] += value
+        if source == "user_activity":
+            self._fold_active_users(rows, increments)
+        if increments:
+            self._apply(increments)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._app.app_context():
+                try:
+                    self.compact()
+                finally:
+                    db.session.remove()
+
+    def _watermark(self, source: str) -> int:
+        last_id = db.session.execute(
+            select(RollupWatermark.last_id).where(RollupWatermark.source == source)
+        ).scalar()
+        if last_id is not None:
+            return last_id
+        try:
+            db.session.execute(insert(RollupWatermark.__table__).values(source=source, last_id=0))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # created concurrently
+        return 0
+
+    @staticmethod
+    def _fold_active_users(rows, increments):
+        pairs = {(row.ts.date(), row.user_id) for row in rows if row.user_id is not None}
+        if not pairs:
+            return
+        existing = set(
+            db.session.query(DailyActiveUser.day, DailyActiveUser.user_id)
+            .filter(DailyActiveUser.day.in_({day for day, _ in pairs}))
+            .filter(DailyActiveUser.user_id.in_({user_id for _, user_id in pairs}))
+        )
+        new_pairs = pairs - existing
+        if not new_pairs:
+            return
+        db.session.execute(
+            insert(DailyActiveUser.__table__),
+            [{"day": day, "user_id": user_id} for day, user_id in new_pairs],
+        )
+        for day, _ in new_pairs:
+            key = ("active_users", "day", datetime.combine(day, datetime.min.time()), "")
+            increments[key][0] += 1
+            increments[key][1] += 1.0
+
+    @staticmethod
+    def _apply(increments: dict):
+        rollups = MetricRollup.__table__
+        buckets = [key[2] for key in increments]
+        existing = {
+            (row.metric, row.granularity, row.bucket_start, row.dimension): row.id
+            for row in db.session.execute(
+                select(rollups.c.id, rollups.c.metric, rollups.c.granularity, rollups.c.bucket_start, rollups.c.dimension)
+                .where(rollups.c.metric.in_({key[0] for key in increments}))
+                .where(rollups.c.bucket_start.between(min(buckets), max(buckets)))
+            )
+        }
+        updates, inserts = [], []
+        for key, (count, total) in increments.items():
+            if key in existing:
+                updates.append({"rollup_id": existing[key], "add_count": count, "add_total": total})
+            else:
+                metric, granularity, start, dimension = key
+                inserts.append({"metric": metric, "granularity": granularity, "bucket_start": start,
+                                "dimension": dimension, "count": count, "total": total})
+        if updates:
+            db.session.execute(
+                update(rollups)
+                .where(rollups.c.id == bindparam("rollup_id"))
+                .values(count=rollups.c.count + bindparam("add_count"), total=rollups.c.total + bindparam("add_total")),
+                updates,
+            )
+        if inserts:
+            db.session.execute(insert(rollups), inserts)
+
+
+def _missing_ids(last_id: int, rows):
+    """Ids between `last_id` and the last of the id-ordered `rows` that have no row."""
+    previous = last_id
+    for row in rows:
+        yield from range(previous + 1, row.id)
+        previous = row.id
+
+
+# --- Queries ---
+
+
+def _granularity_for(start: datetime) -> str:
+    """Finest granularity whose buckets are still retained for a window starting at `start`."""
+    now = datetime.utcnow()
+    if start >= now - timedelta(hours=_config_value("ROLLUP_MINUTE_RETENTION_HOURS", 48)):
+        return "minute"
+    if start >= now - timedelta(days=_config_value("ROLLUP_HOUR_RETENTION_DAYS", 90)):
+        return "hour"
+    return "day"
+
+
+def rollup_totals(metric: str, start: datetime) -> list:
+    """(dimension, count, total) for `metric` since `start`, largest count first."""
+    granularity = _granularity_for(start)
+    return (
+        db.session.query(MetricRollup.dimension, func.sum(MetricRollup.count), func.sum(MetricRollup.total))
+        .filter(MetricRollup.metric == metric)
+        .filter(MetricRollup.granularity == granularity)
+        .filter(MetricRollup.bucket_start >= bucket_start(start, granularity))
+        .group_by(MetricRollup.dimension)
+        .order_by(func.sum(MetricRollup.count).desc())
+        .all()
+    )
+
+
+def rollup_series(metric: str, granularity: str, start: datetime) -> list:
+    """(bucket_start, count) for `metric` since `start`, summed over dimensions, oldest first."""
+    return (
+        db.session.query(MetricRollup.bucket_start, func.sum(MetricRollup.count))
+        .filter(MetricRollup.metric == metric)
+        .filter(MetricRollup.granularity == granularity)
+        .filter(MetricRollup.bucket_start >= bucket_start(start, granularity))
+        .group_by(MetricRollup.bucket_start)
+        .order_by(MetricRollup.bucket_start)
+        .all()
+    )
+
+
+_rollup_compactor = None
+_rollup_compactor_lock = threading.Lock()
+
+
+def init_rollup_compactor(app) -> RollupCompactor:
+    """Create and start the process-wide rollup compactor from ROLLUP_* settings."""
+    global _rollup_compactor
+    with _rollup_compactor_lock:
+        if _rollup_compactor is None:
+            _rollup_compactor = RollupCompactor(
+                interval=app.config.get("ROLLUP_INTERVAL", 60),
+                batch_size=app.config.get("ROLLUP_BATCH_SIZE", 5000),
+                gap_timeout=app.config.get("ROLLUP_GAP_TIMEOUT", 300),
+                minute_retention_hours=app.config.get("ROLLUP_MINUTE_RETENTION_HOURS", 48),
+                hour_retention_days=app.config.get("ROLLUP_HOUR_RETENTION_DAYS", 90),
+            )
+        _rollup_compactor.start(app)
+    return _rollup_compactor
+
+
+def get_rollup_compactor() -> RollupCompactor:
+    if _rollup_compactor is None:
+        raise RuntimeError("Rollup compactor not initialized; call init_rollup_compactor(app) in create_app.")
+    return _rollup_compactor
@@ -1,11 +1,14 @@
 from flask import Blueprint, jsonify, request
 from app.dashboard.services import (
     get_total_users, get_daily_active_users, get_api_call_counts_per_endpoint,
-    get_llm_query_counts, get_llm_queries_by_model, get_metric_data
+    get_llm_query_counts, get_llm_queries_by_model, answer_dashboard_question
 )
+from app.dashboard.rollups import get_rollup_compactor
+from app.common.sql_profiler import get_sql_profiler
 from app.dashboard.schemas import AggregatedDataSchema
 from app.common.decorators import jwt_required_with_roles
-from app.llm.clients import generate_response
+from app.jobs.services import job_accepted, wants_async
+from app.llm.scheduler import SchedulerBusyError
 from flask_jwt_extended import jwt_required
 
 
@@ -59,6 +62,27 @@ def metrics_summary():
         "llm_queries_by_model": get_llm_queries_by_model(hours)
     })
 
+@dashboard_bp.route('/metrics/rollups/compact', methods=['POST'])
+@jwt_required_with_roles(roles=['admin'])
+def compact_rollups():
+    """Fold pending raw events into the rollups now instead of waiting for the next pass."""
+    compactor = get_rollup_compactor()
+    return jsonify({"folded": compactor.compact(), "watermarks": compactor.watermarks()})
+
+@dashboard_bp.route('/metrics/sql-profile', methods=['GET'])
+@jwt_required_with_roles(roles=['admin'])
+def sql_profile_report():
+    """Per-endpoint SQL counts, timings and likely N+1 statement shapes from sampled requests."""
+    top = request.args.get('top', 10, type=int)
+    profiler = get_sql_profiler()
+    return jsonify({"sample_rate": profiler.sample_rate, "endpoints": profiler.report(top)})
+
+@dashboard_bp.route('/metrics/sql-profile', methods=['DELETE'])
+@jwt_required_with_roles(roles=['admin'])
+def sql_profile_reset():
+    get_sql_profiler().reset()
+    return jsonify({"cleared": True})
+
 # Example: A simple dashboard HTML view (if you plan on a server-rendered dashboard)
 # Requires 'templates' folder inside 'dashboard' and 'static' for assets
 @dashboard_bp.route('/')
@@ -77,22 +101,11 @@ def dashboard_ask_llm():
     if not question:
         return jsonify({"error": "No question provided"}), 400
 
+    if wants_async():
+        return job_accepted('dashboard_question', {'question': question})
     try:
-        raw_metrics = get_metric_data()
-        context = f"Current metrics:\n{raw_metrics}"
-
-        messages = [
-            {"role": "system", "content": "You are a medical admin dashboard assistant. Interpret metrics and answer dashboard queries clearly."},
-            {"role": "user", "content": f"{context}\n\nQ: {question}"}
-        ]
-
-        answer = generate_response(messages)
-        
-        # Handle both string and generator responses
-        if hasattr(answer, '__iter__') and not isinstance(answer, str):
-            answer = ''.join(answer)
-        
-        return jsonify({"answer": answer or "No response generated"})
-        
+        return jsonify(answer_dashboard_question(question))
+    except SchedulerBusyError:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1,105 +1,53 @@
-from app.extensions import db
-from app.dashboard.models import AppMetric, UserActivity
 from app.auth.models import User # Assuming User model from auth blueprint
+from app.dashboard.recorder import get_metrics_recorder
+from app.dashboard.rollups import rollup_series, rollup_totals
+from app.llm.clients import generate_response
 from datetime import datetime, timedelta
-from sqlalchemy import func, extract
-
-def record_metric(metric_name, value, dimension_key=None, dimension_value=None):
-    """Records a single application metric."""
-    metric = AppMetric(
-        metric_name=metric_name,
-        value=value,
-        dimension_key=dimension_key,
-        dimension_value=dimension_value
-    )
-    db.session.add(metric)
-    db.session.commit()
+
+def record_metric(metric_name, value, dimension_key=None, dimension_value=None, kind="counter"):
+    """Records an application metric ("counter", "gauge" or "histogram"); buffered and written in bulk."""
+    recorder = get_metrics_recorder()
+    record = {"counter": recorder.increment, "gauge": recorder.gauge, "histogram": recorder.observe}[kind]
+    record(metric_name, value, dimension_key, dimension_value)
 
 def record_user_activity(user_id, activity_type, details=None):
-    """Records user specific activity."""
-    activity = UserActivity(
-        user_id=user_id,
-        activity_type=activity_type,
-        details=details
-    )
-    db.session.add(activity)
-    db.session.commit()
+    """Records user specific activity; buffered and written in bulk."""
+    get_metrics_recorder().activity(user_id, activity_type, details)
 
 def get_total_users():
     """Returns the total number of registered users."""
     return User.query.count()
 
 def get_daily_active_users(days_ago=7):
-    """Calculates daily active users for the last N days."""
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days_ago)
-
-    active_users = (
-        UserActivity.query
-        .filter(UserActivity.timestamp >= start_date)
-        .filter(UserActivity.timestamp <= end_date)
-        .group_by(func.date(UserActivity.timestamp))
-        .group_by(UserActivity.user_id) # Ensure unique user per day
-        .with_entities(func.date(UserActivity.timestamp).label('date'), func.count(func.distinct(UserActivity.user_id)).label('count'))
-        .order_by('date')
-        .all()
-    )
-    return [{"date": str(row.date), "count": row.count} for row in active_users]
+    """Daily active users for the last N days, from the pre-aggregated rollups."""
+    start_date = datetime.utcnow() - timedelta(days=days_ago)
+    return [
+        {"date": str(day.date()), "count": int(count)}
+        for day, count in rollup_series("active_users", "day", start_date)
+    ]
 
 
 def get_api_call_counts_per_endpoint(period_hours=24):
-    """Aggregates API call counts per endpoint from logs or custom metrics."""
-    # This is a placeholder. In a real system, you'd integrate with:
-    # 1. Access logs (Nginx, Gunicorn)
-    # 2. Application logging (structured logs)
-    # 3. Dedicated APM tools (e.g., Prometheus/Grafana, Datadog)
-    
-    # For this example, we'll use our AppMetric model if you record 'api_calls'
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(hours=period_hours)
-
-    api_calls = (
-        AppMetric.query
-        .filter(AppMetric.metric_name == 'api_call')
-        .filter(AppMetric.timestamp >= start_time)
-        .group_by(AppMetric.dimension_value) # Assuming dimension_value is endpoint path
-        .with_entities(AppMetric.dimension_value.label('endpoint'), func.count().label('count'))
-        .order_by(func.count().desc())
-        .all()
-    )
-    return [{"endpoint": row.endpoint, "count": row.count} for row in api_calls]
+    """API call counts per endpoint, from rollups of the 'api_call' metric (dimension = endpoint path)."""
+    start_time = datetime.utcnow() - timedelta(hours=period_hours)
+    return [
+        {"endpoint": endpoint or None, "count": int(count)}
+        for endpoint, count, _ in rollup_totals("api_call", start_time)
+    ]
 
 
 def get_llm_query_counts(period_hours=24):
     """Counts LLM queries."""
-    from app.llm.models import LLMQueryLog  # Import from llm blueprint
-    from datetime import datetime, timedelta
-
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(hours=period_hours)
-    
-    total_queries = (
-        LLMQueryLog.query
-        .filter(LLMQueryLog.created_at >= start_time)  # Use created_at instead of timestamp
-        .count()
-    )
-    return total_queries
+    return sum(entry["count"] for entry in get_llm_queries_by_model(period_hours))
 
 
 def get_llm_queries_by_model(period_hours=24):
     """Counts LLM queries by model."""
-    from app.llm.models import LLMQueryLog
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(hours=period_hours)
-
-    queries_by_model = (
-        LLMQueryLog.query
-        .filter(LLMQueryLog.created_at >= start_time)
-        .group_by(LLMQueryLog.model_name)
-        .with_entities(LLMQueryLog.model_name.label('model'), func.count().label('count'))
-        .all()
-    )
-    return [{"model": row.model, "count": row.count} for row in queries_by_model]
+    start_time = datetime.utcnow() - timedelta(hours=period_hours)
+    return [
+        {"model": model or None, "count": int(count)}
+        for model, count, _ in rollup_totals("llm_query", start_time)
+    ]
 
 def get_metric_data():
     """
@@ -131,3 +79,16 @@ def get_metric_data():
     )
 
     return summary
+
+def answer_dashboard_question(question):
+    """LLM answer to an admin question about the current metrics; raises if generation fails."""
+    context = f"Current metrics:\n{get_metric_data()}"
+    messages = [
+        {"role": "system", "content": "You are a medical admin dashboard assistant. Interpret metrics and answer dashboard queries clearly."},
+        {"role": "user", "content": f"{context}\n\nQ: {question}"}
+    ]
+    answer = generate_response(messages)
+    # Handle both string and generator responses
+    if hasattr(answer, '__iter__') and not isinstance(answer, str):
+        answer = ''.join(answer)
+    return {"answer": answer or "No response generated"}
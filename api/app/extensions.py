@@ -1,19 +1,23 @@
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_socketio import SocketIO
 from flask_marshmallow import Marshmallow
-from llama_cpp import Llama
 from pymilvus import MilvusClient
 from sentence_transformers import SentenceTransformer
+from app.llm.prefix_cache import PrefixCachingLlama, registered_prefixes
+from app.common.instrumentation import EMBEDDING_SECONDS, VECTOR_SEARCH_SECONDS
+import numpy as np
+import itertools
 import pathlib
 import logging
+import time
 
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
-jwt_blacklist = set() # In-memory blacklist for JTI (for single-instance dev/testing)
-socketio = SocketIO(cors_allowed_origins="*") # Consider specifying async_mode="eventlet" if using eventlet
+socketio = SocketIO()  # allowed origins come from CORS_ORIGINS in create_app
 ma = Marshmallow()
 
 # Global instances for Llama, Embedding Model, and Milvus Client
@@ -24,21 +28,38 @@ _milvus_client = None
 db_path = "./milvus_rag.db"
 collection_name = "sure_health_collection"
 embedding_dim = 384
+_milvus_collection = collection_name  # Collection passed to init_milvus_client()
 
-def init_llama_model(model_path: str, n_ctx: int = 4096, n_gpu_layers: int = 0, n_threads: int = 4, use_mlock: bool = False, verbose: bool = False):
+# Ingestion defaults, overridable via EMBED_BATCH_SIZE / MILVUS_INSERT_BATCH_SIZE in config.py
+DEFAULT_EMBED_BATCH_SIZE = 64
+DEFAULT_INSERT_BATCH_SIZE = 512
+
+def _config_value(key: str, default=None):
+    """
+    Read a value from the active Flask app config, falling back to `default`
+    when called outside an application context (scripts, workers, tests).
+    """
+    if has_app_context():
+        return current_app.config.get(key, default)
+    return default
+
+def init_llama_model(model_path: str, n_ctx: int = 4096, n_gpu_layers: int = 0, n_threads: int = 4, use_mlock: bool = False, verbose: bool = False, prefix_cache_size: int = 16):
     """
     Initializes the global Llama model instance.
+    Static prompt prefixes registered so far are evaluated once and their KV state cached.
     Raises RuntimeError if initialization fails.
     """
     global llama_model
     if llama_model is None:
         try:
-            llama_model = Llama(
+            llama_model = PrefixCachingLlama(
                 model_path=model_path,
                 n_ctx=n_ctx,
                 n_gpu_layers=n_gpu_layers,
                 verbose=verbose,
+                prefix_cache_size=prefix_cache_size,
             )
+            llama_model.warm_prefixes(registered_prefixes())
             logging.info(f"Llama model loaded from {model_path} with context {n_ctx}")
         except Exception as e:
             logging.error(f"Failed to load Llama model from {model_path}: {e}")
@@ -65,7 +86,7 @@ def init_milvus_client(db_path=db_path, collection=collection_name, dim=embeddin
     Initialize and return the global MilvusClient singleton.
     Only creates the collection if it does not exist.
     """
-    global _milvus_client
+    global _milvus_client, _milvus_collection
     if _milvus_client is None:
         # Ensure directory exists
         pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
@@ -82,6 +103,8 @@ def init_milvus_client(db_path=db_path, collection=collection_name, dim=embeddin
             if "already exists" not in str(e).lower():
                 raise e
 
+        _milvus_collection = collection
+
     return _milvus_client
 
 def get_milvus_client():
@@ -97,38 +120,98 @@ def get_milvus_client():
         )
     return _milvus_client
 
-def insert_documents(docs: list, collection_name: str = None):
+def _iter_batches(iterable, batch_size: int):
+    """
+    Yield lists of at most `batch_size` items from any iterable.
+    Only one batch is held in memory at a time, so generators over very large corpora are safe.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def embed_texts(texts: list, batch_size: int = None) -> np.ndarray:
     """
-    Insert documents into Milvus collection.
-    docs: List of dict where each dict should have keys: 'id' (optional), 'text', 'subject' (optional).
-          Vectors will be generated from 'text' using embed_model.
+    Encode a list of texts with the global embedding model in batched forward passes.
+    Returns a float32 NumPy array of shape (len(texts), dim).
+    """
+    if embed_model is None:
+        raise ValueError("Embedding model not initialized. Call init_embed_model() first.")
+
+    batch_size = batch_size or _config_value("EMBED_BATCH_SIZE", DEFAULT_EMBED_BATCH_SIZE)
+    with EMBEDDING_SECONDS.labels(kind="batch").time():
+        vectors = embed_model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+    return np.asarray(vectors, dtype=np.float32)
+
+def insert_documents(docs, collection_name: str = None, batch_size: int = None, embed_batch_size: int = None):
+    """
+    Insert documents into Milvus collection in bulk.
+    docs: Iterable of dict where each dict should have keys: 'id' (optional), 'text', 'subject' (optional).
+          May be a generator; documents are consumed in chunks of `batch_size`, each chunk is
+          embedded as one NumPy batch and written with a single Milvus insert.
+    Returns a dict with 'insert_count', 'ids', 'elapsed_seconds' and 'docs_per_sec'.
     """
     client = get_milvus_client()
-    current_collection = collection_name if collection_name else client.collection_name # Use passed name or default
+    current_collection = collection_name if collection_name else _milvus_collection
 
     if embed_model is None:
         raise ValueError("Embedding model not initialized. Call init_embed_model() first.")
 
-    data_to_insert = []
-    for doc in docs:
-        if 'text' not in doc:
-            raise ValueError("Document must contain 'text' field for embedding.")
-        
-        doc_vector = embed_model.encode(doc['text']).tolist() # Convert numpy array to list
-        
-        new_doc = {
-            "text": doc['text'],
-            "subject": doc.get('subject', 'general'), # Default subject if not provided
-            "vector": doc_vector
-        }
-        # Only add 'id' if it's explicitly provided and not None, otherwise Milvus auto-generates
-        if 'id' in doc and doc['id'] is not None:
-            new_doc["id"] = doc['id']
-            
-        data_to_insert.append(new_doc)
-
-    logging.info(f"Inserting {len(data_to_insert)} documents into Milvus collection '{current_collection}'.")
-    return client.insert(collection_name=current_collection, data=data_to_insert)
+    batch_size = batch_size or _config_value("MILVUS_INSERT_BATCH_SIZE", DEFAULT_INSERT_BATCH_SIZE)
+
+    total_inserted = 0
+    inserted_ids = []
+    started = time.perf_counter()
+
+    for batch in _iter_batches(docs, batch_size):
+        for doc in batch:
+            if 'text' not in doc:
+                raise ValueError("Document must contain 'text' field for embedding.")
+
+        vectors = embed_texts([doc['text'] for doc in batch], batch_size=embed_batch_size)
+
+        data_to_insert = []
+        for doc, doc_vector in zip(batch, vectors.tolist()):
+            new_doc = {
+                "text": doc['text'],
+                "subject": doc.get('subject', 'general'), # Default subject if not provided
+                "vector": doc_vector
+            }
+            # Only add 'id' if it's explicitly provided and not None, otherwise Milvus auto-generates
+            if 'id' in doc and doc['id'] is not None:
+                new_doc["id"] = doc['id']
+
+            data_to_insert.append(new_doc)
+
+        result = client.insert(collection_name=current_collection, data=data_to_insert)
+        # Older pymilvus returns the primary keys directly, newer versions a {'insert_count', 'ids'} dict
+        inserted_ids.extend(result.get("ids", []) if isinstance(result, dict) else list(result or []))
+        total_inserted += len(data_to_insert)
+
+        elapsed = time.perf_counter() - started
+        logging.info(
+            f"Inserted {total_inserted} documents into Milvus collection '{current_collection}' "
+            f"({total_inserted / elapsed if elapsed > 0 else 0:.1f} docs/sec)."
+        )
+
+    elapsed = time.perf_counter() - started
+    docs_per_sec = total_inserted / elapsed if elapsed > 0 else 0.0
+    logging.info(
+        f"Ingestion finished: {total_inserted} documents in {elapsed:.2f}s ({docs_per_sec:.1f} docs/sec)."
+    )
+    return {
+        "insert_count": total_inserted,
+        "ids": inserted_ids,
+        "elapsed_seconds": elapsed,
+        "docs_per_sec": docs_per_sec,
+    }
 
 def search_vectors(query_embedding: list, top_k=5, filter_expr=None):
     """
@@ -140,13 +223,14 @@ def search_vectors(query_embedding: list, top_k=5, filter_expr=None):
     if _milvus_client is None:
         raise ValueError("Milvus client not initialized")
 
-    return _milvus_client.search(
-        collection_name=collection_name,
-        data=[query_embedding], # MilvusClient.search expects a list of query vectors
-        filter=filter_expr,
-        limit=top_k,
-        output_fields=["text", "subject"]
-    )
+    with VECTOR_SEARCH_SECONDS.time():
+        return _milvus_client.search(
+            collection_name=_milvus_collection,
+            data=[query_embedding], # MilvusClient.search expects a list of query vectors
+            filter=filter_expr,
+            limit=top_k,
+            output_fields=["text", "subject"]
+        )
 
 def query_documents(filter_expr: str = None, collection_name: str = None):
     """
@@ -193,7 +277,8 @@ def get_rag_context(query: str, top_k: int = 5) -> str:
         logging.error(f"Milvus client not initialized for RAG context: {e}")
         raise
 
-    embedding = embed_model.encode(query).tolist()
+    from app.rag.embedding_cache import embed_query
+    embedding = embed_query(query).tolist()
     results = search_vectors(embedding, top_k=top_k)
 
     if not results or len(results) == 0 or not results[0]:
@@ -0,0 +1,64 @@
+from datetime import datetime
+from app.extensions import db
+import json
+
+
+class JobStatus:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    ACTIVE = (QUEUED, RUNNING)
+
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    type = db.Column(db.String(64), nullable=False)
+    params = db.Column(db.Text, nullable=False, default='{}')
+    # Identical in-flight submissions (same user, type and params) share one job
+    dedup_key = db.Column(db.String(64), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    status = db.Column(db.String(16), nullable=False, default=JobStatus.QUEUED)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    timeout_seconds = db.Column(db.Float, nullable=False, default=300)
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    worker_id = db.Column(db.String(64), nullable=True)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+        db.Index('ix_jobs_type_status', 'type', 'status'),
+        db.Index('ix_jobs_finished_at', 'finished_at'),
+    )
+
+    def to_dict(self, include_result=True):
+        data = {
+            'id': self.id,
+            'type': self.type,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if include_result:
+            data['result'] = json.loads(self.result) if self.result is not None else None
+        return data
+
+
+class JobTypeLock(db.Model):
+    """One row per job type, locked while a worker claims a job of that type."""
+    __tablename__ = 'job_type_locks'
+
+    type = db.Column(db.String(64), primary_key=True)
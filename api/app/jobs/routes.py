@@ -0,0 +1,53 @@
+from flask import Blueprint, abort, jsonify, request, url_for
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from app.common.authz_cache import get_authz_cache
+from app.extensions import db
+from app.jobs.models import Job, JobStatus
+from app.jobs.services import submit_job, task_types
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def _visible_job(job_id):
+    """The job if it exists and the caller submitted it (or is an admin); 404 otherwise."""
+    job = db.session.get(Job, job_id)
+    identity = get_jwt_identity()
+    if job is None or (str(job.user_id) != str(identity) and get_authz_cache().user_role(identity) != 'admin'):
+        abort(404, description=f"Job {job_id} not found.")
+    return job
+
+
+@jobs_bp.route('', methods=['POST'])
+@jwt_required()
+def create_job():
+    """Body: {"type": <job type>, "params": {...}}. Identical in-flight jobs are shared."""
+    data = request.get_json(silent=True) or {}
+    job_type = data.get('type')
+    if not job_type:
+        return jsonify({"error": "No job type provided", "types": task_types()}), 400
+    try:
+        job, created = submit_job(job_type, data.get('params') or {}, user_id=int(get_jwt_identity()))
+    except ValueError as e:
+        return jsonify({"error": str(e), "types": task_types()}), 400
+    response = jsonify({**job.to_dict(include_result=False), "deduplicated": not created})
+    response.status_code = 202
+    response.headers["Location"] = url_for('jobs.get_job', job_id=job.id)
+    return response
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    return jsonify(_visible_job(job_id).to_dict(include_result=False))
+
+
+@jobs_bp.route('/<job_id>/result', methods=['GET'])
+@jwt_required()
+def get_job_result(job_id):
+    """200 with the result once succeeded, 202 while queued or running, 500 if the job failed."""
+    job = _visible_job(job_id)
+    if job.status == JobStatus.SUCCEEDED:
+        return jsonify(job.to_dict())
+    if job.status == JobStatus.FAILED:
+        return jsonify({"job_id": job.id, "status": job.status, "error": job.error}), 500
+    return jsonify({"job_id": job.id, "status": job.status, "attempts": job.attempts}), 202
@@ -0,0 +1,444 @@
+from datetime import datetime, timedelta
+from flask import jsonify, request, url_for
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.extensions import db, socketio
+from app.jobs.models import Job, JobStatus, JobTypeLock
+from app.llm.scheduler import cancel_on
+import threading
+import hashlib
+import inspect
+import logging
+import atexit
+import json
+import uuid
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class JobError(Exception):
+    """Raised by a task for a failure that retrying cannot fix (bad params, missing record)."""
+
+
+class UnknownJobTypeError(ValueError):
+    pass
+
+
+class InvalidJobParamsError(ValueError):
+    pass
+
+
+class _TaskSpec:
+    __slots__ = ("name", "fn", "concurrency", "timeout", "max_attempts")
+
+    def __init__(self, name, fn, concurrency, timeout, max_attempts):
+        self.name = name
+        self.fn = fn
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+
+
+_TASKS = {}
+
+
+def task(name: str, concurrency: int = 1, timeout: float = 300, max_attempts: int = 3):
+    """
+    Register `fn(**params)` as the handler for jobs of type `name`. Its return value must be
+    JSON-serializable and becomes the job result. At most `concurrency` jobs of the type run at
+    once across all workers; an attempt still running after `timeout` seconds is cancelled.
+    """
+    def register(fn):
+        _TASKS[name] = _TaskSpec(name, fn, concurrency, timeout, max_attempts)
+        return fn
+    return register
+
+
+def task_types() -> list:
+    return sorted(_TASKS)
+
+
+def _dedup_key(job_type: str, params: dict, user_id) -> str:
+    payload = json.dumps([job_type, params, user_id], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def submit_job(job_type: str, params: dict = None, user_id=None):
+    """
+    Queue a job and return (job, created). An identical job from the same user that is still
+    queued or running is returned instead of queueing a duplicate.
+    """
+    spec = _TASKS.get(job_type)
+    if spec is None:
+        raise UnknownJobTypeError(f"Unknown job type: {job_type}")
+    params = params or {}
+    try:
+        inspect.signature(spec.fn).bind(**params)
+    except TypeError as e:
+        raise InvalidJobParamsError(f"Invalid params for {job_type}: {e}")
+    dedup_key = _dedup_key(job_type, params, user_id)
+    existing = Job.query.filter(Job.dedup_key == dedup_key, Job.status.in_(JobStatus.ACTIVE)).first()
+    if existing is not None:
+        return existing, False
+    job = Job(
+        id=uuid.uuid4().hex,
+        type=job_type,
+        params=json.dumps(params, sort_keys=True, default=str),
+        dedup_key=dedup_key,
+        user_id=user_id,
+        max_attempts=spec.max_attempts,
+        timeout_seconds=spec.timeout,
+        run_after=datetime.utcnow(),
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job, True
+
+
+def wants_async() -> bool:
+    return request.args.get('async', 'false').lower() == 'true'
+
+
+def job_accepted(job_type: str, params: dict):
+    """Queue `job_type` for the current user and answer 202 with the job id (the ?async=true form of an endpoint)."""
+    identity = get_jwt_identity()
+    job, created = submit_job(job_type, params, user_id=int(identity) if identity is not None else None)
+    status_url = url_for('jobs.get_job', job_id=job.id)
+    response = jsonify({"job_id": job.id, "status": job.status, "status_url": status_url, "deduplicated": not created})
+    response.status_code = 202
+    response.headers["Location"] = status_url
+    return response
+
+
+class JobWorker:
+    """
+    Runs queued jobs in `threads` worker threads, outside the request path.
+
+    A job is claimed with a compare-and-set UPDATE that also checks the type's running count.
+    Claims of one type hold a lock on the type's `job_type_locks` row, so they take turns and
+    several worker processes can share the `jobs` table without running a job twice or exceeding
+    a type's concurrency limit.
+
+    Each attempt runs in its own thread, with its LLM requests tied to a cancel event
+    (app.llm.scheduler.cancel_on). Once its timeout passes the event is set and the job stays
+    running, holding its slot, until the thread stops (at most `cancel_grace` seconds). Only
+    then is it retried; an attempt that does not stop fails the job without a retry and keeps
+    counting against the type's limit in this worker for as long as its thread runs. Failed
+    attempts are retried with exponential backoff up to `max_attempts`. Jobs left running by a
+    dead worker are requeued once their lease expires.
+    """
+
+    def __init__(self, threads: int = 2, poll_interval: float = 0.5, retry_backoff: float = 5.0,
+                 cancel_grace: float = 30.0, worker_id: str = None):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.cancel_grace = cancel_grace
+        self.worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._app = None
+        self._threads = []
+        self._stuck = []  # (job type, thread) of attempts that outlived their timeout and cancellation
+        self._stuck_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # --- Lifecycle ---
+
+    def start(self, app):
+        self._app = app
+        if self._threads:
+            return
+        for i in range(self.threads):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self._threads:
+            atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+
+    def wait(self):
+        """Block until stop() is called (for the standalone worker process)."""
+        while not self._stop.wait(1.0):
+            pass
+
+    # --- One step (also used directly by tests) ---
+
+    def run_once(self) -> bool:
+        """Reap expired leases, then claim and run one job; returns False if nothing was runnable."""
+        self.reap_expired()
+        job = self.claim()
+        if job is None:
+            return False
+        self.execute(job)
+        return True
+
+    def claim(self):
+        now = datetime.utcnow()
+        candidates = db.session.execute(
+            select(Job.id, Job.type, Job.attempts)
+            .where(Job.status == JobStatus.QUEUED, Job.run_after <= now)
+            .order_by(Job.run_after)
+            .limit(20)
+        ).all()
+        jobs = Job.__table__
+        for candidate in candidates:
+            spec = _TASKS.get(candidate.type)
+            if spec is None:
+                continue  # registered in another worker's code version
+            slots = spec.concurrency - self._stuck_count(candidate.type)
+            if slots <= 0:
+                continue
+            # Held until the commit below: no other claim of this type can change the running count meanwhile
+            self._lock_type(candidate.type)
+            running = (
+                select(func.count()).select_from(jobs)
+                .where(jobs.c.type == candidate.type, jobs.c.status == JobStatus.RUNNING)
+                .scalar_subquery()
+            )
+            claimed = db.session.execute(
+                update(jobs)
+                .where(jobs.c.id == candidate.id, jobs.c.status == JobStatus.QUEUED,
+                       jobs.c.attempts == candidate.attempts, running < slots)
+                .values(status=JobStatus.RUNNING, attempts=jobs.c.attempts + 1, started_at=now,
+                        worker_id=self.worker_id,
+                        lease_expires_at=now + timedelta(seconds=spec.timeout + self.poll_interval * 4))
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return db.session.get(Job, candidate.id, populate_existing=True)
+        return None
+
+    def execute(self, job: Job):
+        spec = _TASKS[job.type]
+        job_id, attempt, max_attempts = job.id, job.attempts, job.max_attempts
+        params = json.loads(job.params or "{}")
+        outcome = {}
+        cancel = threading.Event()
+        app = self._app
+
+        def target():
+            with app.app_context(), cancel_on(cancel):
+                try:
+                    outcome["result"] = spec.fn(**params)
+                except Exception as e:
+                    outcome["error"] = e
+                finally:
+                    db.session.remove()
+
+        runner = threading.Thread(target=target, name=f"job-{job_id[:8]}", daemon=True)
+        runner.start()
+        runner.join(spec.timeout)
+
+        timed_out = runner.is_alive()
+        if timed_out:
+            # Stop the attempt's LLM requests; the job stays running (and counted) until the thread exits
+            cancel.set()
+            self._extend_lease(job_id, attempt, self.cancel_grace)
+            runner.join(self.cancel_grace)
+
+        if runner.is_alive():
+            with self._stuck_lock:
+                self._stuck.append((spec.name, runner))
+            error, retry = f"Timed out after {spec.timeout:g}s and did not stop when cancelled", False
+            logger.error(f"Job {job_id} ({spec.name}) attempt {attempt} is still running after cancellation")
+        elif timed_out:
+            error, retry = f"Timed out after {spec.timeout:g}s", attempt < max_attempts
+        elif "error" in outcome:
+            e = outcome["error"]
+            error, retry = f"{type(e).__name__}: {e}", attempt < max_attempts and not isinstance(e, JobError)
+            logger.warning(f"Job {job_id} ({job.type}) attempt {attempt} failed: {error}")
+        else:
+            self._finish(job_id, attempt, JobStatus.SUCCEEDED, result=outcome.get("result"))
+            return
+        if retry:
+            self._retry(job_id, attempt, error)
+        else:
+            self._finish(job_id, attempt, JobStatus.FAILED, error=error)
+
+    def reap_expired(self) -> int:
+        """Requeue (or fail, when out of attempts) jobs whose worker stopped renewing their lease."""
+        jobs = Job.__table__
+        now = datetime.utcnow()
+        expired = db.session.execute(
+            select(jobs.c.id, jobs.c.attempts, jobs.c.max_attempts)
+            .where(jobs.c.status == JobStatus.RUNNING, jobs.c.lease_expires_at < now)
+        ).all()
+        for job in expired:
+            if job.attempts < job.max_attempts:
+                self._retry(job.id, job.attempts, "Worker lost before the job finished")
+            else:
+                self._finish(job.id, job.attempts, JobStatus.FAILED, error="Worker lost before the job finished")
+        return len(expired)
+
+    # --- Internals ---
+
+    def _lock_type(self, job_type: str):
+        """Lock the type's job_type_locks row (creating it on first use) until the next commit."""
+        locks = JobTypeLock.__table__
+        lock = select(locks.c.type).where(locks.c.type == job_type).with_for_update()
+        if db.session.execute(lock).first() is not None:
+            return
+        try:
+            db.session.execute(locks.insert().values(type=job_type))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # another worker created it first
+        db.session.execute(lock)
+
+    def _stuck_count(self, job_type: str) -> int:
+        with self._stuck_lock:
+            self._stuck = [(t, thread) for t, thread in self._stuck if thread.is_alive()]
+            return sum(1 for t, _ in self._stuck if t == job_type)
+
+    def _extend_lease(self, job_id, attempt, seconds: float):
+        jobs = Job.__table__
+        db.session.execute(
+            update(jobs)
+            .where(jobs.c.id == job_id, jobs.c.attempts == attempt, jobs.c.status == JobStatus.RUNNING)
+            .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=seconds + self.poll_interval * 4))
+        )
+        db.session.commit()
+
+    def _finish(self, job_id, attempt, status, result=None, error=None):
+        jobs = Job.__table__
+        # Guarded by the attempt number: a late result from an abandoned attempt is discarded
+        db.session.execute(
+            update(jobs)
+            .where(jobs.c.id == job_id, jobs.c.attempts == attempt, jobs.c.status == JobStatus.RUNNING)
+            .values(status=status, finished_at=datetime.utcnow(), lease_expires_at=None, error=error,
+                    result=json.dumps(result, default=str) if status == JobStatus.SUCCEEDED else None)
+        )
+        db.session.commit()
+
+    def _retry(self, job_id, attempt, error):
+        jobs = Job.__table__
+        delay = self.retry_backoff * 2 ** (attempt - 1)
+        db.session.execute(
+            update(jobs)
+            .where(jobs.c.id == job_id, jobs.c.attempts == attempt, jobs.c.status == JobStatus.RUNNING)
+            .values(status=JobStatus.QUEUED, error=error, lease_expires_at=None,
+                    run_after=datetime.utcnow() + timedelta(seconds=delay))
+        )
+        db.session.commit()
+
+    def _run(self):
+        while not self._stop.is_set():
+            ran = False
+            with self._app.app_context():
+                try:
+                    ran = self.run_once()
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    logger.error(f"Job worker database error: {e}")
+                except Exception as e:
+                    logger.error(f"Job worker error: {e}", exc_info=True)
+                finally:
+                    db.session.remove()
+            if not ran:
+                self._stop.wait(self.poll_interval)
+
+
+class JobNotifier:
+    """
+    Emits a Socket.IO `job_finished` event to room "job:<id>" once a watched job has finished,
+    whichever process ran it. Clients join the room with `watch_job`, which also registers the
+    job here, then fetch the result over HTTP; the event carries no result data. Only watched
+    jobs are polled for, so an idle process issues no queries.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._watched = set()
+        self._lock = threading.Lock()
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self, app):
+        self._app = app
+        if self.interval and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="job-notifier", daemon=True)
+            self._thread.start()
+            atexit.register(self._stop.set)
+
+    def stop(self, timeout: float = 5):
+        """Stop the background thread, e.g. before its app's database goes away; start() runs it again."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+            atexit.unregister(self._stop.set)
+
+    def watch(self, job_id: str):
+        with self._lock:
+            self._watched.add(job_id)
+
+    def poll(self) -> int:
+        with self._lock:
+            watched = list(self._watched)
+        if not watched:
+            return 0
+        jobs = db.session.execute(select(Job.id, Job.type, Job.status).where(Job.id.in_(watched))).all()
+        finished = [job for job in jobs if job.status not in JobStatus.ACTIVE]
+        for job in finished:
+            socketio.emit("job_finished", {"job_id": job.id, "type": job.type, "status": job.status},
+                          to=f"job:{job.id}")
+        # Finished jobs have been announced; ids that match no job are never going to finish
+        settled = set(watched) - {job.id for job in jobs if job.status in JobStatus.ACTIVE}
+        with self._lock:
+            self._watched -= settled
+        return len(finished)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._app.app_context():
+                try:
+                    self.poll()
+                except Exception as e:
+                    logger.error(f"Job notifier failed: {e}")
+                finally:
+                    db.session.remove()
+
+
+_job_worker = None
+_job_notifier = None
+_jobs_lock = threading.Lock()
+
+
+def init_jobs(app, worker_threads: int = None):
+    """
+    Start the completion notifier and, when JOBS_IN_PROCESS_THREADS (or `worker_threads`) is set,
+    job worker threads in this process. Production runs workers separately with run_jobs.py.
+    """
+    global _job_worker, _job_notifier
+    from app.jobs import tasks  # noqa: F401  (registers the built-in task types)
+    threads = app.config.get("JOBS_IN_PROCESS_THREADS", 0) if worker_threads is None else worker_threads
+    with _jobs_lock:
+        if _job_notifier is None:
+            _job_notifier = JobNotifier(interval=app.config.get("JOBS_NOTIFY_INTERVAL", 1.0))
+        _job_notifier.start(app)
+        if _job_worker is None:
+            _job_worker = JobWorker(
+                threads=threads,
+                poll_interval=app.config.get("JOBS_POLL_INTERVAL", 0.5),
+                retry_backoff=app.config.get("JOBS_RETRY_BACKOFF", 5.0),
+                cancel_grace=app.config.get("JOBS_CANCEL_GRACE", 30.0),
+            )
+        _job_worker.start(app)
+    return _job_worker
+
+
+def get_job_notifier() -> JobNotifier:
+    if _job_notifier is None:
+        raise RuntimeError("Job notifier not initialized; call init_jobs(app) in create_app.")
+    return _job_notifier
+
+
+def get_job_worker() -> JobWorker:
+    if _job_worker is None:
+        raise RuntimeError("Job worker not initialized; call init_jobs(app) in create_app.")
+    return _job_worker
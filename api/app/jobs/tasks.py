@@ -0,0 +1,32 @@
+# Built-in job types: the LLM-backed endpoints that accept ?async=true
+from app.jobs.services import JobError, task
+from app.patients.services import summarize_patient
+from app.billing.services import invoice_explanation as explain_invoice
+from app.dashboard.services import answer_dashboard_question
+from app.medications.services import counsel_medication
+
+
+@task("patient_summary", concurrency=2, timeout=180)
+def patient_summary(patient_id: int, refresh: bool = False):
+    result = summarize_patient(patient_id, refresh=refresh)
+    if result is None:
+        raise JobError(f"Patient with id {patient_id} not found.")
+    return result
+
+
+@task("invoice_explanation", concurrency=2, timeout=120)
+def invoice_explanation(invoice_id: int):
+    result = explain_invoice(invoice_id)
+    if result is None:
+        raise JobError(f"Invoice with id {invoice_id} not found.")
+    return result
+
+
+@task("dashboard_question", concurrency=1, timeout=180)
+def dashboard_question(question: str):
+    return answer_dashboard_question(question)
+
+
+@task("medication_counseling", concurrency=2, timeout=120)
+def medication_counseling(medication: str):
+    return counsel_medication(medication)
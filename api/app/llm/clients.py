@@ -1,10 +1,17 @@
-from flask import current_app
+from flask import current_app, has_request_context
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
 from app.extensions import init_llama_model
+from app.llm.scheduler import InferenceScheduler, LocalLlamaBackend, current_cancel_event, resolve_priority
+from app.llm.worker_pool import LLMWorkerPool
+from app.llm.response_cache import get_response_cache
+from app.llm.coalescing import get_request_coalescer
 import threading
 import logging
 
 _llm_instance = None
 _llm_lock = threading.Lock()
+_scheduler = None
+_scheduler_lock = threading.Lock()
 
 def get_llm():
     global _llm_instance
@@ -14,41 +21,128 @@ def get_llm():
                 model_path = current_app.config.get("LLAMA_MODEL_PATH")
                 if not model_path:
                     raise RuntimeError("LLAMA_MODEL_PATH not configured in Flask config.")
-                _llm_instance = init_llama_model(model_path)
+                _llm_instance = init_llama_model(
+                    model_path, prefix_cache_size=current_app.config.get("LLM_PREFIX_CACHE_SIZE", 16)
+                )
     return _llm_instance
 
 
+def get_scheduler() -> InferenceScheduler:
+    """Return the process-wide inference scheduler, created from app config on first use."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                model_path = current_app.config.get("LLAMA_MODEL_PATH")
+                if not model_path:
+                    raise RuntimeError("LLAMA_MODEL_PATH not configured in Flask config.")
+                config = current_app.config
+                num_workers = config.get("LLM_WORKERS", 0)
+                if num_workers > 0:
+                    backend = LLMWorkerPool(
+                        model_path,
+                        num_workers=num_workers,
+                        n_ctx=config.get("LLAMA_N_CTX", 4096),
+                        n_threads=config.get("LLM_WORKER_THREADS") or None,
+                        n_gpu_layers=config.get("LLAMA_N_GPU_LAYERS", 0),
+                        start_timeout=config.get("LLM_WORKER_START_TIMEOUT", 180),
+                        request_timeout=config.get("LLM_WORKER_REQUEST_TIMEOUT", 600),
+                        health_interval=config.get("LLM_WORKER_HEALTH_INTERVAL", 15),
+                        prefix_cache_size=config.get("LLM_PREFIX_CACHE_SIZE", 16),
+                    )
+                else:
+                    backend = LocalLlamaBackend(model_path, prefix_cache_size=config.get("LLM_PREFIX_CACHE_SIZE", 16))
+                _scheduler = InferenceScheduler(
+                    backend,
+                    max_queue_size=config.get("LLM_QUEUE_MAX_SIZE", 32),
+                    max_wait_seconds=config.get("LLM_QUEUE_MAX_WAIT", 30),
+                )
+    return _scheduler
+
+
+def request_priority(background: bool = False) -> int:
+    """
+    Scheduler priority for the current call: clinicians/admins ahead of patients,
+    and anything outside a request (jobs, pre-generation) treated as background.
+    """
+    if not has_request_context():
+        return resolve_priority(background=True)
+    roles = []
+    try:
+        verify_jwt_in_request(optional=True)
+        claims = get_jwt() or {}
+        roles = claims.get("roles") or claims.get("role") or []
+    except Exception:
+        pass
+    return resolve_priority(roles, background=background)
+
+
+def completion_params(messages: list, max_tokens=512, temperature=0.7, top_p=0.9, stop_tokens=None) -> dict:
+    return {
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "top_p": top_p,
+        "stop": stop_tokens or [],
+    }
+
+
+def _stream_content(chunks):
+    for token in chunks:
+        content_piece = token.get('choices', [{}])[0].get('delta', {}).get('content', '')
+        logging.debug(f"Streaming token: {content_piece}")
+        if content_piece:
+            yield content_piece
+
+
 def generate_response(
     messages: list,
     max_tokens=512,
     temperature=0.7,
     top_p=0.9,
     stop_tokens=None,
-    stream=False
+    stream=False,
+    priority=None,
+    cache=False,
+    semantic_cache=False,
+    cache_tags=(),
 ):
-    model = get_llm()
-    stop_tokens = stop_tokens or []
+    """
+    Run a chat completion through the inference scheduler.
+    Returns the reply text, or an iterator of text pieces when stream=True.
+    With cache=True, identical requests are answered from the response cache; semantic_cache=True
+    also reuses replies to near-identical final user messages. cache_tags name the records the
+    reply depends on so model events can invalidate it (see app.llm.response_cache).
+    Identical requests already being generated are joined rather than repeated (app.llm.coalescing),
+    except inside scheduler.cancel_on, whose cancellation must not reach callers sharing the generation.
+    Raises SchedulerBusyError when the queue is saturated.
+    """
+    params = completion_params(messages, max_tokens, temperature, top_p, stop_tokens)
+    if priority is None:
+        priority = request_priority()
+
+    coalescer = get_request_coalescer() if current_cancel_event() is None else None
+    if stream:
+        logging.info(f"Calling LLM with messages: {messages}")
+        if coalescer is not None:
+            return _stream_content(coalescer.stream(get_scheduler(), params, priority))
+        return _stream_content(get_scheduler().stream(params, priority))
+
+    if cache or semantic_cache:
+        cached = get_response_cache().get(params, semantic=semantic_cache)
+        if cached is not None:
+            logging.info("LLM response served from cache")
+            return cached
 
     logging.info(f"Calling LLM with messages: {messages}")
 
-    response = model.create_chat_completion(
-        messages=messages,
-        max_tokens=max_tokens,
-        temperature=temperature,
-        top_p=top_p,
-        stop=stop_tokens,
-        stream=stream,
-    )
+    if coalescer is not None:
+        response = coalescer.complete(get_scheduler(), params, priority)
+    else:
+        response = get_scheduler().complete(params, priority)
 
     logging.info(f"Raw LLM response: {response}")
 
-    if stream:
-        for token in response:
-            content_piece = token.get('choices', [{}])[0].get('delta', {}).get('content', '')
-            logging.debug(f"Streaming token: {content_piece}")
-            yield content_piece
-        return
-
     choices = response.get("choices", [])
     if not choices:
         logging.error("LLM returned no choices")
@@ -60,4 +154,6 @@ def generate_response(
         return "Sorry, I couldn't generate a response at this time."
 
     logging.info(f"LLM full content: {content.strip()}")
+    if cache or semantic_cache:
+        get_response_cache().put(params, content.strip(), tags=cache_tags, semantic=semantic_cache)
     return content.strip()
@@ -0,0 +1,220 @@
+from app.extensions import _config_value
+from app.common import instrumentation
+import threading
+import hashlib
+import json
+
+
+def _normalize_message(message: dict) -> dict:
+    content = message.get("content")
+    return {**message, "content": content.strip()} if isinstance(content, str) else message
+
+
+class _Flight:
+    """One in-flight generation and everything it has produced so far."""
+
+    def __init__(self):
+        self.source = None  # scheduler chunk iterator (streams only)
+        self.items = []  # raw chunks, or the single completion response
+        self.done = False
+        self.error = None
+        self.readers = 0
+        self.pulling = False
+        self.cond = threading.Condition()
+
+    def finish(self, item=None, error=None):
+        with self.cond:
+            if item is not None:
+                self.items.append(item)
+            self.error = error
+            self.done = True
+            self.cond.notify_all()
+
+    def result(self):
+        with self.cond:
+            while not self.done:
+                self.cond.wait()
+            if self.error is not None:
+                raise self.error
+            return self.items[0]
+
+
+class RequestCoalescer:
+    """
+    Single-flight for identical concurrent LLM requests.
+
+    Requests with the same messages (content whitespace-trimmed) and sampling params that arrive
+    while one is already being generated attach to it instead of queueing a generation of their
+    own: completions share the one response, streams share its chunks. A stream that joins late
+    first replays the chunks already produced, and the generation is cancelled only when every
+    attached stream has been closed. Streams and completions are coalesced separately; the
+    shared generation runs at the priority of the request that started it, and its errors
+    (including SchedulerBusyError) are raised to every attached caller.
+    """
+
+    def __init__(self):
+        self._flights = {}  # (kind, key) -> _Flight
+        self._lock = threading.Lock()
+        self._counters = {
+            "generations": 0,
+            "coalesced": 0,
+            "coalesced_streams": 0,
+        }
+
+    @staticmethod
+    def make_key(params: dict) -> str:
+        payload = {k: params.get(k) for k in ("max_tokens", "temperature", "top_p", "stop")}
+        payload["messages"] = [_normalize_message(m) for m in params.get("messages") or []]
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    # --- Public API ---
+
+    def complete(self, scheduler, params: dict, priority: int) -> dict:
+        """scheduler.complete(params, priority), shared with identical completions in flight."""
+        key = ("complete", self.make_key(params))
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            self._count(leader, stream=False)
+        if not leader:
+            return flight.result()
+        try:
+            flight.finish(item=scheduler.complete(params, priority))
+        except BaseException as e:
+            flight.finish(error=e)
+        finally:
+            self._forget(key, flight)
+        return flight.result()
+
+    def stream(self, scheduler, params: dict, priority: int):
+        """
+        Iterator over the raw chunks of scheduler.stream(params, priority), shared with identical
+        streams in flight. Admission errors for a new generation are raised here, as by the scheduler.
+        """
+        key = ("stream", self.make_key(params))
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            with flight.cond:
+                flight.readers += 1
+            self._count(leader, stream=True)
+        if leader:
+            try:
+                source = scheduler.stream(params, priority)
+            except BaseException as e:
+                flight.finish(error=e)
+                self._detach(key, flight)
+                raise
+            with flight.cond:
+                flight.source = source
+                flight.cond.notify_all()
+        return self._read(key, flight)
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self._counters["generations"] + self._counters["coalesced"]
+            return {
+                "in_flight": len(self._flights),
+                **self._counters,
+                "generations_saved": self._counters["coalesced"],
+                "coalesced_rate": self._counters["coalesced"] / requests if requests else 0.0,
+            }
+
+    # --- Internals ---
+
+    def _count(self, leader: bool, stream: bool):
+        """Callers hold self._lock."""
+        if leader:
+            self._counters["generations"] += 1
+            return
+        self._counters["coalesced"] += 1
+        if stream:
+            self._counters["coalesced_streams"] += 1
+        instrumentation.LLM_COALESCED_REQUESTS.labels(stream=str(stream).lower()).inc()
+
+    def _read(self, key, flight: _Flight):
+        """
+        Yield the flight's chunks from the first. Whichever reader reaches the end of what has been
+        produced pulls the next chunk from the scheduler, so no reader waits on a slow client.
+        """
+        index = 0
+        try:
+            while True:
+                pull = False
+                with flight.cond:
+                    while (index >= len(flight.items) and not flight.done
+                           and (flight.pulling or flight.source is None)):
+                        flight.cond.wait()
+                    if index < len(flight.items):
+                        item = flight.items[index]
+                        index += 1
+                    elif flight.done:
+                        if flight.error is not None:
+                            raise flight.error
+                        return
+                    else:
+                        flight.pulling = pull = True
+                if pull:
+                    self._pull(key, flight)
+                    continue
+                yield item
+        finally:
+            self._detach(key, flight)
+
+    def _pull(self, key, flight: _Flight):
+        try:
+            item = next(flight.source)
+        except StopIteration:
+            item, error, done = None, None, True
+        except BaseException as e:
+            item, error, done = None, e, True
+        else:
+            error, done = None, False
+        with flight.cond:
+            if item is not None:
+                flight.items.append(item)
+            if done:
+                flight.error = error
+                flight.done = True
+            flight.pulling = False
+            flight.cond.notify_all()
+        if done:
+            self._forget(key, flight)
+
+    def _detach(self, key, flight: _Flight):
+        # Under self._lock so a request cannot join the flight while its last reader leaves
+        with self._lock:
+            with flight.cond:
+                flight.readers -= 1
+                idle = flight.readers == 0
+                abandoned = idle and not flight.done
+            if idle and self._flights.get(key) is flight:
+                del self._flights[key]
+        if abandoned and flight.source is not None:
+            flight.source.close()  # cancels the scheduler job of a stream nobody reads any more
+
+    def _forget(self, key, flight: _Flight):
+        """Stop new requests joining a finished flight."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+
+_request_coalescer = None
+_request_coalescer_lock = threading.Lock()
+
+
+def get_request_coalescer():
+    """Return the process-wide request coalescer, or None when LLM_COALESCE_REQUESTS is off."""
+    global _request_coalescer
+    if not _config_value("LLM_COALESCE_REQUESTS", True):
+        return None
+    if _request_coalescer is None:
+        with _request_coalescer_lock:
+            if _request_coalescer is None:
+                _request_coalescer = RequestCoalescer()
+    return _request_coalescer
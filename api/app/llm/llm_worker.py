@@ -0,0 +1,95 @@
+"""
+LLM worker process.
+
+Started by app.llm.worker_pool as a standalone script (not via the `app` package)
+so each worker only loads llama.cpp, not Flask, torch or the embedding model.
+It serves chat completions over the socket whose file descriptor is passed in --fd.
+
+Messages are (op, request_id, payload) tuples:
+    parent -> worker: complete | stream | warm | ping | cancel | shutdown
+    worker -> parent: ready | result | chunk | done | error | pong
+"""
+from multiprocessing.connection import Connection
+import argparse
+import logging
+import os
+
+
+def _stream_cancelled(conn: Connection, request_id) -> bool:
+    """Check, without blocking, whether the parent asked to stop the current stream."""
+    while conn.poll():
+        op, target_id, _ = conn.recv()
+        if op == "cancel" and target_id == request_id:
+            return True
+    return False
+
+
+def serve(conn: Connection, model):
+    while True:
+        try:
+            op, request_id, payload = conn.recv()
+        except (EOFError, OSError):
+            return
+
+        if op == "shutdown":
+            return
+        if op == "cancel":
+            continue  # stream already finished
+        if op == "ping":
+            conn.send(("pong", request_id, {
+                "model_loaded": model is not None,
+                "n_ctx": model.n_ctx(),
+                "prefix_cache": model.prefix_cache_stats(),
+            }))
+            continue
+
+        try:
+            if op == "complete":
+                conn.send(("result", request_id, model.create_chat_completion(stream=False, **payload)))
+            elif op == "stream":
+                for chunk in model.create_chat_completion(stream=True, **payload):
+                    if _stream_cancelled(conn, request_id):
+                        break
+                    conn.send(("chunk", request_id, chunk))
+                conn.send(("done", request_id, None))
+            elif op == "warm":
+                conn.send(("result", request_id, model.warm_prefixes(payload)))
+            else:
+                conn.send(("error", request_id, f"Unknown operation '{op}'"))
+        except Exception as e:
+            logging.error(f"LLM worker {os.getpid()} failed request {request_id}: {e}", exc_info=True)
+            conn.send(("error", request_id, f"{type(e).__name__}: {e}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SureHealth LLM worker")
+    parser.add_argument("--fd", type=int, required=True)
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--n-ctx", type=int, default=4096)
+    parser.add_argument("--n-threads", type=int, default=None)
+    parser.add_argument("--n-gpu-layers", type=int, default=0)
+    parser.add_argument("--prefix-cache-size", type=int, default=16)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s [llm-worker {os.getpid()}] %(message)s")
+    conn = Connection(args.fd)
+
+    # Sibling module: the script directory is on sys.path, the `app` package is not imported
+    from prefix_cache import PrefixCachingLlama
+
+    # use_mmap keeps the GGUF weights in the shared page cache, so N workers do not need N copies
+    model = PrefixCachingLlama(
+        model_path=args.model_path,
+        n_ctx=args.n_ctx,
+        n_threads=args.n_threads,
+        n_gpu_layers=args.n_gpu_layers,
+        use_mmap=True,
+        verbose=False,
+        prefix_cache_size=args.prefix_cache_size,
+    )
+    conn.send(("ready", None, {"pid": os.getpid(), "n_ctx": model.n_ctx()}))
+    serve(conn, model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from llama_cpp import Llama, llama_chat_format
+import llama_cpp
+import threading
+import logging
+import ctypes
+
+logger = logging.getLogger(__name__)
+
+# Prefixes shorter than this are not worth a state snapshot
+MIN_PREFIX_TOKENS = 16
+
+# llama.cpp state functions and Llama internals the snapshots use instead of Llama.save_state(),
+# whose copy of the (n_ctx x n_vocab) scores matrix would make every snapshot hundreds of MB.
+# Checked when the model loads, so a llama-cpp-python upgrade that drops any of them turns the
+# cache off rather than corrupting the context (see test_prefix_cache.py for the pinned version).
+_STATE_FUNCTIONS = ("llama_get_state_size", "llama_copy_state_data", "llama_set_state_data")
+_STATE_ATTRIBUTES = ("ctx", "input_ids", "n_tokens", "_input_ids")
+
+_registered_prefixes = []
+_registry_lock = threading.Lock()
+
+
+def register_static_prefix(messages: list):
+    """
+    Register chat messages that start many prompts (an agent's system prompt, few-shot blocks).
+    Backends warm a KV snapshot for each registered prefix when the model loads.
+    """
+    with _registry_lock:
+        if messages not in _registered_prefixes:
+            _registered_prefixes.append(messages)
+
+
+def registered_prefixes() -> list:
+    with _registry_lock:
+        return list(_registered_prefixes)
+
+
+def missing_state_api(model) -> list:
+    """Names of the llama.cpp state functions and Llama attributes the snapshots need that are missing."""
+    return [f"llama_cpp.{name}" for name in _STATE_FUNCTIONS if not hasattr(llama_cpp, name)] + [
+        f"Llama.{name}" for name in _STATE_ATTRIBUTES if not hasattr(model, name)
+    ]
+
+
+def _common_prefix_len(a, b) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class PrefixCachingLlama(Llama):
+    """
+    Llama that keeps evaluated KV snapshots of static prompt prefixes.
+
+    Before each completion the longest snapshot that prefixes the prompt is restored,
+    so llama.cpp only evaluates the variable tail. Snapshots hold just the llama.cpp
+    state bytes for the prefix tokens, not Llama.save_state()'s full logits matrix.
+    """
+
+    def __init__(self, *args, prefix_cache_size: int = 16, **kwargs):
+        super().__init__(*args, **kwargs)
+        missing = missing_state_api(self)
+        if missing and prefix_cache_size > 0:
+            logger.warning(f"Prompt prefix cache disabled, this llama-cpp-python lacks: {', '.join(missing)}")
+            prefix_cache_size = 0
+        self.prefix_cache_size = prefix_cache_size
+        self._prefix_states = OrderedDict()  # tuple(prefix tokens) -> llama state bytes
+        self._prefix_stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "prompt_tokens": 0,
+            "prompt_tokens_skipped": 0,
+        }
+
+    def render_prompt(self, messages: list) -> str:
+        return llama_chat_format.get_chat_format(self.chat_format)(messages=messages).prompt
+
+    def _tokenize_prompt(self, prompt: str) -> list:
+        # Mirrors Llama._create_completion so keys line up with the tokens llama.cpp evaluates
+        return self.tokenize(prompt.encode("utf-8")) if prompt != "" else [self.token_bos()]
+
+    def static_prefix_tokens(self, prefix_messages: list) -> list:
+        """
+        Tokens shared by every prompt that starts with `prefix_messages`, found by rendering
+        two different user turns and keeping the common part. The last shared token is dropped
+        because it can merge with the first token of real user content.
+        """
+        first = self._tokenize_prompt(self.render_prompt(prefix_messages + [{"role": "user", "content": "A"}]))
+        second = self._tokenize_prompt(self.render_prompt(prefix_messages + [{"role": "user", "content": "Z"}]))
+        return first[:max(0, _common_prefix_len(first, second) - 1)]
+
+    def warm_prefix(self, prefix_messages: list) -> int:
+        """Evaluate a static prefix once and snapshot its state. Returns the prefix length in tokens."""
+        if self.prefix_cache_size <= 0:
+            return 0
+        tokens = self.static_prefix_tokens(prefix_messages)
+        if len(tokens) < MIN_PREFIX_TOKENS or tuple(tokens) in self._prefix_states:
+            return len(tokens)
+
+        self.reset()
+        self.eval(tokens)
+        state_size = llama_cpp.llama_get_state_size(self.ctx)
+        buffer = (ctypes.c_uint8 * int(state_size))()
+        n_bytes = llama_cpp.llama_copy_state_data(self.ctx, buffer)
+        self._prefix_states[tuple(tokens)] = ctypes.string_at(buffer, int(n_bytes))
+        while len(self._prefix_states) > self.prefix_cache_size:
+            self._prefix_states.popitem(last=False)
+        logger.info(f"Cached KV state for {len(tokens)}-token prompt prefix ({int(n_bytes) / 1e6:.1f} MB).")
+        return len(tokens)
+
+    def warm_prefixes(self, prefixes: list) -> dict:
+        for prefix_messages in prefixes:
+            try:
+                self.warm_prefix(prefix_messages)
+            except Exception as e:
+                logger.warning(f"Failed to warm prompt prefix: {e}")
+        return self.prefix_cache_stats()
+
+    def _restore_prefix(self, prompt: str):
+        tokens = self._tokenize_prompt(prompt)
+        stats = self._prefix_stats
+        stats["lookups"] += 1
+        stats["prompt_tokens"] += len(tokens)
+
+        # Tokens llama.cpp will reuse anyway from the previous request
+        reused = _common_prefix_len(self._input_ids.tolist(), tokens[:-1])
+
+        best = None
+        for key in self._prefix_states:
+            if len(key) < len(tokens) and (best is None or len(key) > len(best)) and tuple(tokens[:len(key)]) == key:
+                best = key
+
+        if best is None:
+            stats["misses"] += 1
+        else:
+            stats["hits"] += 1
+            self._prefix_states.move_to_end(best)
+            if len(best) > reused:
+                data = self._prefix_states[best]
+                state = (ctypes.c_uint8 * len(data)).from_buffer_copy(data)
+                if llama_cpp.llama_set_state_data(self.ctx, state) != len(data):
+                    raise RuntimeError("Failed to restore cached prefix state")
+                self.input_ids[:len(best)] = best
+                self.n_tokens = len(best)
+                reused = len(best)
+        stats["prompt_tokens_skipped"] += reused
+
+    def create_completion(self, prompt: str, *args, **kwargs):
+        if self._prefix_states:
+            try:
+                self._restore_prefix(prompt)
+            except Exception as e:
+                logger.warning(f"Prefix cache restore failed, evaluating full prompt: {e}")
+                self.reset()
+        return super().create_completion(prompt, *args, **kwargs)
+
+    def prefix_cache_stats(self) -> dict:
+        stats = dict(self._prefix_stats)
+        stats["prefixes"] = len(self._prefix_states)
+        stats["skip_ratio"] = (
+            stats["prompt_tokens_skipped"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        )
+        return stats
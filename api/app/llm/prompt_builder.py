@@ -1,5 +1,29 @@
 from datetime import datetime
 from textwrap import dedent
+from app.llm.prefix_cache import register_static_prefix
+
+SYSTEM_MESSAGE = dedent("""
+    You are a highly knowledgeable and compassionate healthcare assistant. Your role is to assist patients, clinicians, and admins by answering medical questions, interpreting symptoms, supporting appointment scheduling, explaining lab results, and providing clear, evidence-based health education. Always prioritize patient safety, accuracy, and empathy.
+""").strip()
+
+# Few-shot examples to guide the assistant's tone and style
+FEW_SHOT_EXAMPLES = dedent("""
+    Patient: I have a headache and fever.
+    Assistant: I'm sorry to hear that you're not feeling well. Could you tell me when your symptoms started and if you've taken any medication?
+
+    Patient: When can I schedule my next appointment?
+    Assistant: Let me check the next available slots. May I have your full name and reason for the visit?
+
+    Patient: Can you explain my lab results from last week?
+    Assistant: Sure, please provide the name of the test and any specific values or concerns you have.
+""").strip()
+
+# The system message and few-shot block never change, so their KV state is cached
+STATIC_PREFIX = [
+    {"role": "system", "content": SYSTEM_MESSAGE},
+    {"role": "user", "content": FEW_SHOT_EXAMPLES},
+]
+register_static_prefix(STATIC_PREFIX)
 
 def build_llm_prompt(
     user_query: str,
@@ -26,22 +50,6 @@ def build_llm_prompt(
 
     current_date = datetime.utcnow().strftime("%A, %B %d, %Y, %I:%M %p UTC")
 
-    system_message = dedent("""
-        You are a highly knowledgeable and compassionate healthcare assistant. Your role is to assist patients, clinicians, and admins by answering medical questions, interpreting symptoms, supporting appointment scheduling, explaining lab results, and providing clear, evidence-based health education. Always prioritize patient safety, accuracy, and empathy.
-    """).strip()
-
-    # Few-shot examples to guide the assistant's tone and style
-    few_shot_examples = dedent("""
-        Patient: I have a headache and fever.
-        Assistant: I'm sorry to hear that you're not feeling well. Could you tell me when your symptoms started and if you've taken any medication?
-
-        Patient: When can I schedule my next appointment?
-        Assistant: Let me check the next available slots. May I have your full name and reason for the visit?
-
-        Patient: Can you explain my lab results from last week?
-        Assistant: Sure, please provide the name of the test and any specific values or concerns you have.
-    """).strip()
-
     # Use retrieved context or fallback
     context_section = retrieved_context.strip() if retrieved_context else "No additional context available."
 
@@ -76,8 +84,6 @@ def build_llm_prompt(
     """).strip()
 
     # Return messages list in chat format with few-shot examples as a user message before the actual query
-    return [
-        {"role": "system", "content": system_message},
-        {"role": "user", "content": few_shot_examples},
+    return STATIC_PREFIX + [
         {"role": "user", "content": user_prompt},
     ]
@@ -0,0 +1,220 @@
+from collections import OrderedDict
+from typing import Iterable, Optional
+from app.extensions import _config_value
+import numpy as np
+import threading
+import hashlib
+import logging
+import json
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class _CachedResponse:
+    __slots__ = ("text", "tags", "stored_at", "scope", "vector")
+
+    def __init__(self, text: str, tags: tuple, scope: Optional[str], vector: Optional[np.ndarray]):
+        self.text = text
+        self.tags = tags
+        self.stored_at = time.monotonic()
+        self.scope = scope
+        self.vector = vector
+
+
+class ResponseCache:
+    """
+    Cache of final LLM reply texts.
+
+    The exact tier is keyed by a hash of the full messages plus sampling params. The optional
+    semantic tier reuses a reply when every message except the last user turn is identical
+    (same system prompt, history and params, the "scope") and the last user turn's embedding
+    is within `semantic_threshold` cosine similarity of a cached one. Entries expire after
+    `ttl_seconds` and can be dropped early by tag, e.g. "invoice:42" when that invoice changes.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 86400, semantic_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        self._entries = OrderedDict()  # key -> _CachedResponse
+        self._scopes = {}  # scope -> set of keys with a query vector
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+        self._counters = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    # --- Keys ---
+
+    @staticmethod
+    def make_key(params: dict) -> str:
+        """Hash of the messages and sampling params that determine the reply."""
+        return _digest({k: params.get(k) for k in ("messages", "max_tokens", "temperature", "top_p", "stop")})
+
+    @staticmethod
+    def semantic_scope(params: dict) -> Optional[str]:
+        """Hash of everything except the last user message; None if the prompt does not end with one."""
+        messages = params.get("messages") or []
+        if not messages or messages[-1].get("role") != "user":
+            return None
+        return _digest({
+            "messages": messages[:-1],
+            **{k: params.get(k) for k in ("max_tokens", "temperature", "top_p", "stop")},
+        })
+
+    # --- Lookup / store ---
+
+    def get(self, params: dict, semantic: bool = False) -> Optional[str]:
+        key = self.make_key(params)
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["exact_hits"] += 1
+                return entry.text
+            if not semantic:
+                self._counters["misses"] += 1
+                return None
+            scope = self.semantic_scope(params)
+            candidates = list(self._scopes.get(scope, ())) if scope else []
+
+        if candidates:
+            query = self._query_vector(params)
+            with self._lock:
+                live = [(k, e) for k, e in ((k, self._live_entry(k)) for k in candidates) if e is not None]
+                if query is not None and live:
+                    similarities = np.stack([e.vector for _, e in live]) @ query
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.semantic_threshold:
+                        best_key, entry = live[best]
+                        self._entries.move_to_end(best_key)
+                        self._counters["semantic_hits"] += 1
+                        return entry.text
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, params: dict, text: str, tags: Iterable[str] = (), semantic: bool = False):
+        key = self.make_key(params)
+        scope = self.semantic_scope(params) if semantic else None
+        vector = self._query_vector(params) if scope else None
+        if vector is None:
+            scope = None
+        entry = _CachedResponse(text, tuple(tags), scope, vector)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            if scope:
+                self._scopes.setdefault(scope, set()).add(key)
+            self._counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def invalidate(self, tag: str) -> int:
+        """Drop every entry stored with `tag`; returns how many were removed."""
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+            for key in keys:
+                self._remove(key)
+            self._counters["invalidations"] += len(keys)
+        if keys:
+            logger.info(f"Invalidated {len(keys)} cached LLM responses for {tag}")
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._tags.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._counters["exact_hits"] + self._counters["semantic_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                **self._counters,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+    # --- Internals (callers hold self._lock unless noted) ---
+
+    def _live_entry(self, key: str) -> Optional[_CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl_seconds and time.monotonic() - entry.stored_at > self.ttl_seconds:
+            self._remove(key)
+            self._counters["expirations"] += 1
+            return None
+        return entry
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        if entry.scope:
+            keys = self._scopes.get(entry.scope)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._scopes[entry.scope]
+
+    def _query_vector(self, params: dict) -> Optional[np.ndarray]:
+        """Unit-normalized embedding of the last user message (called without the lock held)."""
+        from app.rag.embedding_cache import embed_query
+        try:
+            vector = np.asarray(embed_query(params["messages"][-1]["content"]), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Semantic response cache disabled for this call, embedding failed: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide LLM response cache, configured from RESPONSE_CACHE_* settings."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(
+                    max_entries=_config_value("RESPONSE_CACHE_MAX_ENTRIES", 5000),
+                    ttl_seconds=_config_value("RESPONSE_CACHE_TTL", 86400),
+                    semantic_threshold=_config_value("RESPONSE_CACHE_SEMANTIC_THRESHOLD", 0.95),
+                )
+    return _response_cache
+
+
+def invalidate_cached_responses(tag: str) -> int:
+    """Invalidation hook for model events; a no-op until the cache has been used."""
+    if _response_cache is None:
+        return 0
+    return _response_cache.invalidate(tag)
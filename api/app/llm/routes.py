@@ -2,6 +2,12 @@ from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.llm.schemas import LLMQuerySchema
 from app.llm.services import process_llm_query
+from app.llm.clients import get_scheduler
+from app.llm.response_cache import get_response_cache
+from app.llm.coalescing import get_request_coalescer
+from app.common.decorators import jwt_required_with_roles
+from app.common.health_prober import get_health_prober
+from app.agents.intent_router import get_intent_router
 
 llm_bp = Blueprint('llm', __name__)
 
@@ -24,17 +30,16 @@ def chat_completion():
     user_id = get_jwt_identity()
 
     if stream:
-        def generate():
-            yield from process_llm_query(
-                messages,
-                user_id=user_id,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                top_p=top_p,
-                stop_tokens=stop_tokens,
-                stream=True,
-            )
-        return Response(stream_with_context(generate()), mimetype='text/plain')
+        generate = process_llm_query(
+            messages,
+            user_id=user_id,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            stop_tokens=stop_tokens,
+            stream=True,
+        )
+        return Response(stream_with_context(generate), mimetype='text/plain')
 
     else:
         response = process_llm_query(
@@ -48,57 +53,66 @@ def chat_completion():
         )
         return jsonify({"response": response})
 
+@llm_bp.route('/queue', methods=['GET'])
+@jwt_required_with_roles(roles=['admin'])
+def llm_queue_stats():
+    coalescer = get_request_coalescer()
+    return jsonify({**get_scheduler().stats(), "coalescing": coalescer.stats() if coalescer is not None else None})
+
+@llm_bp.route('/workers', methods=['GET'])
+@jwt_required_with_roles(roles=['admin'])
+def llm_worker_stats():
+    backend = get_scheduler().backend
+    workers = backend.stats() if hasattr(backend, 'stats') else []
+    return jsonify({
+        "backend": type(backend).__name__,
+        "ready": backend.is_ready(),
+        "workers": workers,
+        "prefix_cache": backend.prefix_cache_stats(),
+    })
+
+@llm_bp.route('/cache', methods=['GET'])
+@jwt_required_with_roles(roles=['admin'])
+def llm_cache_stats():
+    return jsonify(get_response_cache().stats())
+
+@llm_bp.route('/cache', methods=['DELETE'])
+@jwt_required_with_roles(roles=['admin'])
+def llm_cache_invalidate():
+    """Drop cached responses for ?tag=..., or everything when no tag is given."""
+    tag = request.args.get('tag')
+    if tag:
+        return jsonify({"invalidated": get_response_cache().invalidate(tag)})
+    get_response_cache().clear()
+    return jsonify({"cleared": True})
+
+@llm_bp.route('/router', methods=['GET'])
+@jwt_required_with_roles(roles=['admin'])
+def intent_router_stats():
+    return jsonify(get_intent_router().stats())
+
+@llm_bp.route('/router/classify', methods=['POST'])
+@jwt_required_with_roles(roles=['admin'])
+def intent_router_classify():
+    """Body: {"queries": [...]}; the agent each query would be routed to, classified as one batch."""
+    queries = (request.get_json(silent=True) or {}).get('queries')
+    if not queries or not isinstance(queries, list):
+        return jsonify({"error": "queries must be a non-empty list"}), 400
+    router = get_intent_router()
+    if not router.ready:
+        return jsonify({"error": "Intent router is not built (embedding model unavailable)"}), 503
+    return jsonify([
+        {"query": query, "intent": intent, "confidence": confidence}
+        for query, (intent, confidence) in zip(queries, router.route_batch([str(q) for q in queries]))
+    ])
+
 @llm_bp.route('/health', methods=['GET'])
 @jwt_required()
 def llm_health():
-    try:
-        from flask import current_app
-        import os
-        
-        # Check if model path exists
-        model_path = current_app.config.get("LLAMA_MODEL_PATH")
-        if not model_path:
-            return jsonify({
-                "status": "unhealthy",
-                "llm_available": False,
-                "error": "LLAMA_MODEL_PATH not configured"
-            }), 500
-        
-        if not os.path.exists(model_path):
-            return jsonify({
-                "status": "unhealthy",
-                "llm_available": False,
-                "error": f"Model file not found: {model_path}"
-            }), 500
-        
-        from app.llm.clients import generate_response
-        
-        # Test LLM with simple message
-        test_messages = [
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": "Say 'OK' if you are working."}
-        ]
-        
-        response_text = generate_response(test_messages)
-        
-        if response_text and response_text.strip():
-            return jsonify({
-                "status": "healthy",
-                "llm_available": True,
-                "test_response": response_text[:50] + "..." if len(response_text) > 50 else response_text
-            })
-        else:
-            return jsonify({
-                "status": "degraded",
-                "llm_available": False,
-                "message": "LLM not responding"
-            })
-            
-    except Exception as e:
-        return jsonify({
-            "status": "unhealthy",
-            "llm_available": False,
-            "error": str(e)
-        }), 500
-
-
+    """Model/worker state from the latest background probe; never runs inference."""
+    snapshot = get_health_prober().snapshot()
+    llm = snapshot["components"].get("llm")
+    if llm is None:
+        return jsonify({"status": "unknown", "llm_available": False, "message": snapshot.get("message")}), 503
+    payload = {**llm, "checked_at": snapshot["checked_at"], "stale": snapshot["stale"]}
+    return jsonify(payload), 500 if llm["status"] == "unhealthy" else 200
@@ -0,0 +1,367 @@
+from contextlib import contextmanager
+from app.extensions import init_llama_model
+from app.common import instrumentation
+import itertools
+import threading
+import logging
+import heapq
+import queue
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first. Background work is always queued behind interactive work.
+PRIORITY_CLINICIAN = 0
+PRIORITY_PATIENT = 10
+PRIORITY_BACKGROUND_OFFSET = 20
+
+CLINICIAN_ROLES = ('admin', 'clinician')
+
+
+def resolve_priority(roles=None, background: bool = False) -> int:
+    """Map JWT roles and request kind to a scheduler priority."""
+    if isinstance(roles, str):
+        roles = [roles]
+    priority = PRIORITY_CLINICIAN if any(r in CLINICIAN_ROLES for r in roles or []) else PRIORITY_PATIENT
+    if background:
+        priority += PRIORITY_BACKGROUND_OFFSET
+    return priority
+
+
+class SchedulerBusyError(Exception):
+    """
+    Raised when the inference queue cannot accept or serve a request in time.
+    Rendered by the error handlers as 429/503 with a Retry-After header.
+    """
+
+    def __init__(self, message: str, retry_after: int, status_code: int = 503):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class InferenceCancelledError(Exception):
+    """Raised for a request whose caller gave up on it (see cancel_on); nothing more is generated."""
+
+
+_cancel_scope = threading.local()
+
+
+@contextmanager
+def cancel_on(event: threading.Event):
+    """
+    Tie the LLM requests made by this thread to `event`, e.g. a background job's deadline. Once it
+    is set, queued requests are dropped, running ones stop generating at the next token, and new
+    ones are refused, all with InferenceCancelledError.
+    """
+    previous = getattr(_cancel_scope, "event", None)
+    _cancel_scope.event = event
+    try:
+        yield
+    finally:
+        _cancel_scope.event = previous
+
+
+def current_cancel_event():
+    """The event installed by cancel_on for this thread, or None."""
+    return getattr(_cancel_scope, "event", None)
+
+
+class LocalLlamaBackend:
+    """Runs completions on the in-process llama.cpp model; llama.cpp is not re-entrant, so concurrency is 1."""
+
+    concurrency = 1
+
+    def __init__(self, model_path: str, prefix_cache_size: int = 16):
+        self.model_path = model_path
+        self.prefix_cache_size = prefix_cache_size
+
+    def _model(self):
+        return init_llama_model(self.model_path, prefix_cache_size=self.prefix_cache_size)
+
+    def create_chat_completion(self, params: dict) -> dict:
+        return self._model().create_chat_completion(stream=False, **params)
+
+    def stream_chat_completion(self, params: dict):
+        return self._model().create_chat_completion(stream=True, **params)
+
+    def is_ready(self) -> bool:
+        from app import extensions
+        return extensions.llama_model is not None
+
+    def prefix_cache_stats(self) -> dict:
+        from app import extensions
+        return extensions.llama_model.prefix_cache_stats() if extensions.llama_model is not None else {}
+
+
+_DONE = object()
+
+
+class _InferenceJob:
+    def __init__(self, params: dict, priority: int, stream: bool, cancel_event: threading.Event = None):
+        self.params = params
+        self.priority = priority
+        self.stream = stream
+        self.cancel_event = cancel_event
+        self.enqueued_at = time.monotonic()
+        self.started = threading.Event()
+        self.cancelled = False
+        self.output = queue.Queue()  # response / stream chunks, then _DONE or an exception
+
+    def is_cancelled(self) -> bool:
+        return self.cancelled or (self.cancel_event is not None and self.cancel_event.is_set())
+
+
+class InferenceScheduler:
+    """
+    Bounded priority queue in front of an LLM backend.
+
+    Requests are served by `backend.concurrency` dispatcher threads in priority order.
+    A full queue sheds the lowest-priority request (or rejects the new one with 429),
+    and requests that wait longer than `max_wait_seconds` are dropped with 503.
+    Requests made inside cancel_on(event) can be abandoned by their caller at any point;
+    completions among them are generated as streams internally so they can stop mid-way.
+    """
+
+    def __init__(self, backend, max_queue_size: int = 32, max_wait_seconds: float = 30):
+        self.backend = backend
+        self.max_queue_size = max_queue_size
+        self.max_wait_seconds = max_wait_seconds
+        self._heap = []  # (priority, seq, job)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._in_flight = 0
+        self._avg_service_seconds = None
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "shed": 0,
+            "expired": 0,
+        }
+        self._wait_count = 0
+        self._wait_sum = 0.0
+        self._wait_max = 0.0
+
+    # --- Public API ---
+
+    def complete(self, params: dict, priority: int = PRIORITY_PATIENT) -> dict:
+        """Run a non-streaming chat completion and return the raw llama.cpp response."""
+        job = self._submit(params, priority, stream=False)
+        item = self._first_output(job)
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+    def stream(self, params: dict, priority: int = PRIORITY_PATIENT):
+        """
+        Queue a streaming chat completion and return an iterator of raw chunks.
+        Admission happens immediately so backpressure surfaces before any bytes are sent.
+        """
+        job = self._submit(params, priority, stream=True)
+
+        def iterator():
+            try:
+                item = self._first_output(job)
+                while item is not _DONE:
+                    if isinstance(item, BaseException):
+                        raise item
+                    yield item
+                    item = self._get_output(job)
+            finally:
+                with self._cond:
+                    self._discard(job)  # lets the dispatcher stop generating for a closed stream
+
+        return iterator()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queue_depth": len(self._heap),
+                "max_queue_size": self.max_queue_size,
+                "in_flight": self._in_flight,
+                "concurrency": self.backend.concurrency,
+                **self._counters,
+                "wait_seconds": {
+                    "count": self._wait_count,
+                    "avg": self._wait_sum / self._wait_count if self._wait_count else 0.0,
+                    "max": self._wait_max,
+                },
+                "avg_service_seconds": self._avg_service_seconds or 0.0,
+            }
+
+    # --- Internals ---
+
+    def _retry_after(self) -> int:
+        """Estimate seconds until a queue slot frees up; callers hold self._cond."""
+        service = self._avg_service_seconds or 5.0
+        return max(1, math.ceil(service * (len(self._heap) + 1) / max(1, self.backend.concurrency)))
+
+    def _submit(self, params: dict, priority: int, stream: bool) -> _InferenceJob:
+        job = _InferenceJob(params, priority, stream, current_cancel_event())
+        if job.is_cancelled():
+            raise InferenceCancelledError("LLM request cancelled by its caller.")
+        with self._cond:
+            self._ensure_threads()
+            if len(self._heap) >= self.max_queue_size:
+                # Shed the lowest-priority queued request if the newcomer outranks it
+                lowest = max(self._heap, key=lambda entry: (entry[0], entry[1]))
+                if lowest[0] <= priority:
+                    self._counters["rejected"] += 1
+                    raise SchedulerBusyError(
+                        "LLM request queue is full, please retry later.",
+                        retry_after=self._retry_after(),
+                        status_code=429,
+                    )
+                self._heap.remove(lowest)
+                heapq.heapify(self._heap)
+                self._counters["shed"] += 1
+                lowest[2].output.put(SchedulerBusyError(
+                    "Request was displaced by higher-priority work, please retry later.",
+                    retry_after=self._retry_after(),
+                    status_code=503,
+                ))
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            self._counters["submitted"] += 1
+            self._cond.notify()
+        return job
+
+    def _first_output(self, job: _InferenceJob):
+        """Wait for the first output, giving up with 503 if the job is still queued after max_wait_seconds."""
+        try:
+            return self._get_output(job, timeout=self.max_wait_seconds or None)
+        except queue.Empty:
+            pass
+        with self._cond:
+            if not job.started.is_set():
+                self._discard(job)
+                self._counters["expired"] += 1
+                raise SchedulerBusyError(
+                    "Timed out waiting for an LLM worker, please retry later.",
+                    retry_after=self._retry_after(),
+                    status_code=503,
+                )
+        return self._get_output(job)
+
+    def _get_output(self, job: _InferenceJob, timeout: float = None):
+        """job.output.get(), giving up with InferenceCancelledError once the caller cancels the job."""
+        if job.cancel_event is None:
+            return job.output.get(timeout=timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if wait <= 0:
+                raise queue.Empty
+            try:
+                return job.output.get(timeout=wait)
+            except queue.Empty:
+                if job.cancel_event.is_set():
+                    with self._cond:
+                        self._discard(job)  # the dispatcher stops generating if it already started
+                    raise InferenceCancelledError("LLM request cancelled by its caller.")
+
+    def _discard(self, job: _InferenceJob):
+        """
+        Cancel `job`, taking it out of the queue if no dispatcher has picked it up yet so it no
+        longer counts towards queue_depth or the full-queue check; callers hold self._cond.
+        """
+        job.cancelled = True
+        if not job.started.is_set():
+            self._heap = [entry for entry in self._heap if entry[2] is not job]
+            heapq.heapify(self._heap)
+
+    def _ensure_threads(self):
+        while len(self._threads) < self.backend.concurrency:
+            thread = threading.Thread(
+                target=self._dispatch_loop,
+                name=f"llm-dispatcher-{len(self._threads)}",
+                daemon=True,
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job(self) -> _InferenceJob:
+        with self._cond:
+            while True:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, job = heapq.heappop(self._heap)
+                if job.is_cancelled():
+                    continue
+                job.started.set()
+                wait = time.monotonic() - job.enqueued_at
+                self._wait_count += 1
+                self._wait_sum += wait
+                self._wait_max = max(self._wait_max, wait)
+                instrumentation.LLM_QUEUE_WAIT_SECONDS.observe(wait)
+                self._in_flight += 1
+                return job
+
+    def _dispatch_loop(self):
+        while True:
+            job = self._next_job()
+            started = time.monotonic()
+            failed = False
+            prompt_tokens = completion_tokens = None
+            try:
+                if job.stream:
+                    chunks = self.backend.stream_chat_completion(job.params)
+                    completion_tokens = 0
+                    try:
+                        for chunk in chunks:
+                            if job.is_cancelled():
+                                break
+                            completion_tokens += instrumentation.chunk_has_content(chunk)
+                            job.output.put(chunk)
+                    finally:
+                        if hasattr(chunks, "close"):
+                            chunks.close()  # lets the backend stop generating for an abandoned stream
+                    job.output.put(_DONE)
+                elif job.cancel_event is not None:
+                    response, completion_tokens = self._collect_stream(job)
+                    job.output.put(response)
+                else:
+                    response = self.backend.create_chat_completion(job.params)
+                    prompt_tokens, completion_tokens = instrumentation.completion_usage(response)
+                    job.output.put(response)
+            except Exception as e:
+                failed = True
+                logger.error(f"LLM backend error: {e}", exc_info=True)
+                job.output.put(e)
+            finally:
+                elapsed = time.monotonic() - started
+                if failed:
+                    instrumentation.LLM_FAILURES.inc()
+                else:
+                    instrumentation.record_llm_completion(elapsed, completion_tokens, prompt_tokens, job.stream)
+                with self._cond:
+                    self._in_flight -= 1
+                    self._counters["failed" if failed else "completed"] += 1
+                    self._avg_service_seconds = (
+                        elapsed if self._avg_service_seconds is None
+                        else 0.8 * self._avg_service_seconds + 0.2 * elapsed
+                    )
+
+    def _collect_stream(self, job: _InferenceJob):
+        """
+        Generate a cancellable completion as a stream, stopping as soon as its caller gives up.
+        Returns the assembled chat completion response and its completion token count.
+        """
+        chunks = self.backend.stream_chat_completion(job.params)
+        pieces, finish_reason, completion_tokens = [], None, 0
+        try:
+            for chunk in chunks:
+                if job.is_cancelled():
+                    break
+                completion_tokens += instrumentation.chunk_has_content(chunk)
+                choice = (chunk.get("choices") or [{}])[0]
+                pieces.append((choice.get("delta") or {}).get("content") or "")
+                finish_reason = choice.get("finish_reason") or finish_reason
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        message = {"role": "assistant", "content": "".join(pieces)}
+        return {"choices": [{"index": 0, "message": message, "finish_reason": finish_reason}]}, completion_tokens
@@ -12,15 +12,18 @@ def process_llm_query(messages, user_id=None, max_tokens=512, temperature=0.7, t
         # Stream generator wrapper that logs after streaming finished
         full_response = []
 
+        # Queue the request now so backpressure errors surface before the response starts
+        chunks = generate_response(
+            messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            stop_tokens=stop_tokens,
+            stream=True,
+        )
+
         def generator():
-            for chunk in generate_response(
-                messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                top_p=top_p,
-                stop_tokens=stop_tokens,
-                stream=True,
-            ):
+            for chunk in chunks:
                 full_response.append(chunk)
                 yield chunk
 
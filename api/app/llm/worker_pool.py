@@ -0,0 +1,329 @@
+from multiprocessing.connection import Connection
+import subprocess
+import threading
+import itertools
+import logging
+import socket
+import atexit
+import time
+import sys
+import os
+
+from app.llm.prefix_cache import registered_prefixes
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_worker.py")
+
+
+class WorkerUnavailableError(RuntimeError):
+    """No healthy LLM worker became available in time."""
+
+
+class WorkerCrashedError(RuntimeError):
+    """The LLM worker serving a request exited or closed its channel."""
+
+
+class _WorkerHandle:
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.state = "starting"  # starting | idle | busy | dead
+        self.served = 0
+        self.failures = 0
+        self.restarts = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.last_error = None
+        self.last_health_check = None
+        self.prefix_cache = {}
+
+    def stats(self) -> dict:
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "index": self.index,
+            "pid": self.process.pid if self.process else None,
+            "state": self.state,
+            "served": self.served,
+            "failures": self.failures,
+            "restarts": self.restarts,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "utilization": round(self.busy_seconds / uptime, 4) if uptime else 0.0,
+            "last_error": self.last_error,
+            "prefix_cache": self.prefix_cache,
+        }
+
+
+class LLMWorkerPool:
+    """
+    Pool of llama.cpp worker processes used as an InferenceScheduler backend.
+
+    Each worker is a separate OS process with its own mmap-shared copy of the GGUF model,
+    reached over a private socketpair. Requests go to the idle worker with the least busy
+    time; a monitor thread pings idle workers and restarts any that exit or stop answering,
+    so a llama.cpp crash costs one request instead of the API process.
+    """
+
+    def __init__(self, model_path: str, num_workers: int = 2, n_ctx: int = 4096, n_threads: int = None,
+                 n_gpu_layers: int = 0, start_timeout: float = 180, request_timeout: float = 600,
+                 health_interval: float = 15, prefix_cache_size: int = 16):
+        self.model_path = model_path
+        self.concurrency = num_workers
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads or max(1, (os.cpu_count() or 1) // num_workers)
+        self.n_gpu_layers = n_gpu_layers
+        self.start_timeout = start_timeout
+        self.request_timeout = request_timeout
+        self.health_interval = health_interval
+        self.prefix_cache_size = prefix_cache_size
+        self._workers = [_WorkerHandle(i) for i in range(num_workers)]
+        self._cond = threading.Condition()
+        self._request_ids = itertools.count(1)
+        self._closed = False
+
+        for worker in self._workers:
+            threading.Thread(target=self._spawn, args=(worker,), name=f"llm-worker-start-{worker.index}", daemon=True).start()
+        threading.Thread(target=self._monitor_loop, name="llm-worker-monitor", daemon=True).start()
+        atexit.register(self.close)
+
+    # --- Backend interface used by InferenceScheduler ---
+
+    def create_chat_completion(self, params: dict) -> dict:
+        worker = self._acquire()
+        started = time.monotonic()
+        try:
+            request_id = next(self._request_ids)
+            worker.conn.send(("complete", request_id, params))
+            op, _, payload = self._recv(worker, request_id)
+            if op == "error":
+                worker.failures += 1
+                raise RuntimeError(f"LLM worker {worker.index} error: {payload}")
+            worker.served += 1
+            return payload
+        finally:
+            self._release(worker, time.monotonic() - started)
+
+    def stream_chat_completion(self, params: dict):
+        worker = self._acquire()
+        started = time.monotonic()
+        request_id = next(self._request_ids)
+        finished = False
+        try:
+            worker.conn.send(("stream", request_id, params))
+            while True:
+                op, _, payload = self._recv(worker, request_id)
+                if op == "chunk":
+                    yield payload
+                    continue
+                finished = True
+                if op == "error":
+                    worker.failures += 1
+                    raise RuntimeError(f"LLM worker {worker.index} error: {payload}")
+                worker.served += 1
+                return
+        finally:
+            if not finished and worker.state == "busy":
+                self._cancel_stream(worker, request_id)
+            self._release(worker, time.monotonic() - started)
+
+    def is_ready(self) -> bool:
+        with self._cond:
+            return any(w.state in ("idle", "busy") for w in self._workers)
+
+    def stats(self) -> list:
+        with self._cond:
+            return [w.stats() for w in self._workers]
+
+    def prefix_cache_stats(self) -> dict:
+        """Prefix cache counters summed over workers, as of each worker's last warm-up or health check."""
+        totals = {"lookups": 0, "hits": 0, "misses": 0, "prompt_tokens": 0, "prompt_tokens_skipped": 0}
+        with self._cond:
+            for worker in self._workers:
+                for key in totals:
+                    totals[key] += worker.prefix_cache.get(key, 0)
+        totals["skip_ratio"] = totals["prompt_tokens_skipped"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+        return totals
+
+    def close(self):
+        self._closed = True
+        for worker in self._workers:
+            self._stop(worker)
+
+    # --- Worker lifecycle ---
+
+    def _spawn(self, worker: _WorkerHandle):
+        parent_sock, child_sock = socket.socketpair()
+        try:
+            process = subprocess.Popen(
+                [
+                    sys.executable, WORKER_SCRIPT,
+                    "--fd", str(child_sock.fileno()),
+                    "--model-path", self.model_path,
+                    "--n-ctx", str(self.n_ctx),
+                    "--n-threads", str(self.n_threads),
+                    "--n-gpu-layers", str(self.n_gpu_layers),
+                    "--prefix-cache-size", str(self.prefix_cache_size),
+                ],
+                pass_fds=(child_sock.fileno(),),
+            )
+        except OSError as e:
+            parent_sock.close()
+            child_sock.close()
+            self._mark_dead(worker, f"spawn failed: {e}")
+            return
+        child_sock.close()
+
+        conn = Connection(parent_sock.detach())
+        with self._cond:
+            worker.process = process
+            worker.conn = conn
+
+        if not conn.poll(self.start_timeout):
+            self._mark_dead(worker, f"not ready after {self.start_timeout}s")
+            return
+        try:
+            op, _, info = conn.recv()
+        except (EOFError, OSError):
+            self._mark_dead(worker, f"exited during startup (code {process.poll()})")
+            return
+        if op != "ready":
+            self._mark_dead(worker, f"unexpected startup message '{op}'")
+            return
+        if not self._warm(worker):
+            return
+
+        with self._cond:
+            worker.state = "idle"
+            worker.started_at = time.monotonic()
+            worker.busy_seconds = 0.0
+            self._cond.notify_all()
+        logger.info(f"LLM worker {worker.index} ready (pid {info.get('pid')}).")
+
+    def _warm(self, worker: _WorkerHandle) -> bool:
+        """Have a freshly started worker evaluate and snapshot the registered static prompt prefixes."""
+        prefixes = registered_prefixes()
+        if not prefixes or self.prefix_cache_size <= 0:
+            return True
+        try:
+            worker.conn.send(("warm", 0, prefixes))
+            if not worker.conn.poll(self.start_timeout):
+                raise WorkerCrashedError(f"prefix warm-up took longer than {self.start_timeout}s")
+            op, _, payload = worker.conn.recv()
+        except (EOFError, OSError, WorkerCrashedError) as e:
+            self._mark_dead(worker, f"failed during prefix warm-up: {e!r}")
+            return False
+        if op == "result":
+            worker.prefix_cache = payload
+        else:
+            logger.warning(f"LLM worker {worker.index} could not warm prompt prefixes: {payload}")
+        return True
+
+    def _stop(self, worker: _WorkerHandle):
+        if worker.conn is not None:
+            try:
+                worker.conn.send(("shutdown", None, None))
+            except (OSError, ValueError):
+                pass
+            worker.conn.close()
+            worker.conn = None
+        if worker.process is not None and worker.process.poll() is None:
+            worker.process.terminate()
+            try:
+                worker.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+
+    def _mark_dead(self, worker: _WorkerHandle, reason: str):
+        logger.error(f"LLM worker {worker.index} marked dead: {reason}")
+        with self._cond:
+            worker.state = "dead"
+            worker.last_error = reason
+        self._stop(worker)
+
+    def _restart(self, worker: _WorkerHandle):
+        with self._cond:
+            if worker.state != "dead" or self._closed:
+                return
+            worker.state = "starting"
+            worker.restarts += 1
+        logger.warning(f"Restarting LLM worker {worker.index} (restart #{worker.restarts}).")
+        self._spawn(worker)
+
+    def _monitor_loop(self):
+        while not self._closed:
+            time.sleep(self.health_interval)
+            for worker in self._workers:
+                with self._cond:
+                    state = worker.state
+                    if state == "idle":
+                        worker.state = "busy"  # reserve it for the health check
+                if state == "dead":
+                    self._restart(worker)
+                elif state == "idle":
+                    self._health_check(worker)
+
+    def _health_check(self, worker: _WorkerHandle):
+        request_id = next(self._request_ids)
+        try:
+            if worker.process.poll() is not None:
+                raise WorkerCrashedError(f"exited with code {worker.process.returncode}")
+            worker.conn.send(("ping", request_id, None))
+            if not worker.conn.poll(10):
+                raise WorkerCrashedError("ping timed out")
+            _, _, info = worker.conn.recv()
+            worker.prefix_cache = info.get("prefix_cache", worker.prefix_cache)
+            worker.last_health_check = time.time()
+        except (WorkerCrashedError, EOFError, OSError) as e:
+            self._mark_dead(worker, f"health check failed: {e}")
+            return
+        self._release(worker, 0.0)
+
+    # --- Request routing ---
+
+    def _acquire(self) -> _WorkerHandle:
+        deadline = time.monotonic() + self.start_timeout
+        with self._cond:
+            while True:
+                idle = [w for w in self._workers if w.state == "idle"]
+                if idle:
+                    worker = min(idle, key=lambda w: (w.busy_seconds, w.served))
+                    worker.state = "busy"
+                    return worker
+                if all(w.state == "dead" for w in self._workers):
+                    raise WorkerUnavailableError("All LLM workers are down; restarts are pending.")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise WorkerUnavailableError("No healthy LLM worker available.")
+                self._cond.wait(remaining)
+
+    def _release(self, worker: _WorkerHandle, busy_seconds: float):
+        with self._cond:
+            worker.busy_seconds += busy_seconds
+            if worker.state == "busy":
+                worker.state = "idle"
+            self._cond.notify()
+
+    def _recv(self, worker: _WorkerHandle, request_id):
+        """Receive the next message for `request_id`, treating a closed channel or hang as a crash."""
+        try:
+            if not worker.conn.poll(self.request_timeout):
+                raise WorkerCrashedError(f"no response within {self.request_timeout}s")
+            message = worker.conn.recv()
+        except (EOFError, OSError, WorkerCrashedError) as e:
+            worker.failures += 1
+            self._mark_dead(worker, f"request {request_id} failed: {e!r}")
+            threading.Thread(target=self._restart, args=(worker,), daemon=True).start()
+            raise WorkerCrashedError(f"LLM worker {worker.index} crashed while serving the request.") from e
+        return message
+
+    def _cancel_stream(self, worker: _WorkerHandle, request_id):
+        """Stop an abandoned stream and drain it so the worker is clean for the next request."""
+        try:
+            worker.conn.send(("cancel", request_id, None))
+            while True:
+                op, _, _ = self._recv(worker, request_id)
+                if op in ("done", "error"):
+                    return
+        except (WorkerCrashedError, OSError):
+            pass
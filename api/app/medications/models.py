@@ -19,6 +19,13 @@ class Prescription(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Back the list endpoint's keyset pages and filters
+    __table_args__ = (
+        db.Index('ix_prescriptions_patient_id_id', 'patient_id', 'id'),
+        db.Index('ix_prescriptions_status_id', 'status', 'id'),
+        db.Index('ix_prescriptions_medication_id', 'medication_name', 'id'),
+    )
+
 class TreatmentPlan(db.Model):
     __tablename__ = 'treatment_plans'
     id = db.Column(db.Integer, primary_key=True)
@@ -31,3 +38,8 @@ class TreatmentPlan(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_treatment_plans_patient_id_id', 'patient_id', 'id'),
+        db.Index('ix_treatment_plans_status_id', 'status', 'id'),
+    )
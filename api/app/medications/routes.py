@@ -3,7 +3,9 @@ from flask_jwt_extended import jwt_required
 from app.medications.models import Prescription, TreatmentPlan
 from app.medications.schemas import PrescriptionSchema, TreatmentPlanSchema
 from app.extensions import db
-from app.llm.clients import generate_response
+from app.common.pagination import list_page
+from app.medications.services import counsel_medication, normalize_medication_name
+from app.jobs.services import job_accepted, wants_async
 
 medications_bp = Blueprint('medications', __name__)
 
@@ -13,6 +15,20 @@ prescriptions_schema = PrescriptionSchema(many=True)
 treatment_plan_schema = TreatmentPlanSchema()
 treatment_plans_schema = TreatmentPlanSchema(many=True)
 
+# List endpoints: output name -> column, the default ?fields= set, and ?<name>= filters
+PRESCRIPTION_COLUMNS = {c.key: getattr(Prescription, c.key) for c in Prescription.__table__.columns}
+PRESCRIPTION_DEFAULT_FIELDS = ('id', 'patient_id', 'medication_name', 'dosage', 'status', 'start_date')
+PRESCRIPTION_FILTERS = {
+    'patient_id': Prescription.patient_id, 'status': Prescription.status,
+    'medication_name': Prescription.medication_name,
+}
+
+TREATMENT_PLAN_COLUMNS = {c.key: getattr(TreatmentPlan, c.key) for c in TreatmentPlan.__table__.columns}
+TREATMENT_PLAN_DEFAULT_FIELDS = (
+    'id', 'patient_id', 'plan_description', 'start_date', 'end_date', 'status', 'responsible_provider',
+)
+TREATMENT_PLAN_FILTERS = {'patient_id': TreatmentPlan.patient_id, 'status': TreatmentPlan.status}
+
 @medications_bp.route('/prescriptions', methods=['POST'])
 @jwt_required()
 def create_prescription():
@@ -32,23 +48,8 @@ def create_prescription():
 @medications_bp.route('/prescriptions', methods=['GET'])
 @jwt_required()
 def list_prescriptions():
-    try:
-        patient_id = request.args.get('patient_id', type=int)
-        query = Prescription.query
-        if patient_id:
-            query = query.filter_by(patient_id=patient_id)
-        rxs = query.all()
-        result = [{
-            'id': rx.id,
-            'patient_id': rx.patient_id,
-            'medication_name': rx.medication_name,
-            'dosage': rx.dosage,
-            'status': rx.status,
-            'start_date': rx.start_date.isoformat() if rx.start_date else None
-        } for rx in rxs]
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({"error": "Failed to fetch prescriptions", "details": str(e)}), 422
+    """Filter with ?patient_id=, ?status=, ?medication_name=, ?from=/?to= (start_date); ?fields=, ?limit=, ?cursor=."""
+    return list_page(PRESCRIPTION_COLUMNS, PRESCRIPTION_DEFAULT_FIELDS, PRESCRIPTION_FILTERS, Prescription.start_date)
 
 @medications_bp.route('/counseling', methods=['POST'])
 @jwt_required()
@@ -58,21 +59,9 @@ def medication_counseling():
     if not med_name:
         return jsonify({"error": "No medication specified"}), 400
 
-    try:
-        messages = [
-            {"role": "system", "content": "Give clear and safe medication counseling for a patient."},
-            {"role": "user", "content": f"Explain how to use {med_name}, including warnings."}
-        ]
-
-        reply_gen = generate_response(messages)
-        reply_text = ''.join(reply_gen) if reply_gen else ""
-        
-        if not reply_text.strip():
-            reply_text = f"Please consult your healthcare provider for specific guidance on {med_name}."
-            
-        return jsonify({"counseling": reply_text})
-    except Exception as e:
-        return jsonify({"counseling": f"Please consult your healthcare provider for guidance on {med_name}."}), 200
+    if wants_async():
+        return job_accepted('medication_counseling', {'medication': normalize_medication_name(med_name)})
+    return jsonify(counsel_medication(med_name))
 
 @medications_bp.route('/treatment-plans', methods=['POST'])
 @jwt_required()
@@ -93,24 +82,10 @@ def create_treatment_plan():
 @medications_bp.route('/treatment-plans', methods=['GET'])
 @jwt_required()
 def list_treatment_plans():
-    try:
-        patient_id = request.args.get('patient_id', type=int)
-        query = TreatmentPlan.query
-        if patient_id:
-            query = query.filter_by(patient_id=patient_id)
-        plans = query.all()
-        result = [{
-            'id': plan.id,
-            'patient_id': plan.patient_id,
-            'plan_description': plan.plan_description,
-            'start_date': plan.start_date.isoformat() if plan.start_date else None,
-            'end_date': plan.end_date.isoformat() if plan.end_date else None,
-            'status': plan.status,
-            'responsible_provider': plan.responsible_provider
-        } for plan in plans]
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({"error": "Failed to fetch treatment plans", "details": str(e)}), 422
+    """Filter with ?patient_id=, ?status=, ?from=/?to= (start_date); ?fields=, ?limit=, ?cursor=."""
+    return list_page(
+        TREATMENT_PLAN_COLUMNS, TREATMENT_PLAN_DEFAULT_FIELDS, TREATMENT_PLAN_FILTERS, TreatmentPlan.start_date
+    )
 
 @medications_bp.route('/treatment-plans/<int:plan_id>', methods=['GET'])
 @jwt_required()
@@ -0,0 +1,32 @@
+from app.llm.clients import generate_response
+from app.llm.scheduler import SchedulerBusyError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_medication_name(med_name) -> str:
+    # Normalized so "Ibuprofen " and "ibuprofen" share one cached answer
+    return " ".join(str(med_name).split()).lower()
+
+
+def counsel_medication(med_name: str) -> dict:
+    """
+    Usage and warnings for a medication. Falls back to a referral to the patient's provider when
+    the LLM fails; raises SchedulerBusyError when its queue is saturated.
+    """
+    med_name = normalize_medication_name(med_name)
+    messages = [
+        {"role": "system", "content": "Give clear and safe medication counseling for a patient."},
+        {"role": "user", "content": f"Explain how to use {med_name}, including warnings."}
+    ]
+    try:
+        reply_text = generate_response(messages, cache=True, cache_tags=(f"medication:{med_name}",))
+    except SchedulerBusyError:
+        raise
+    except Exception as e:
+        logger.error(f"Medication counseling failed for {med_name}: {e}")
+        return {"counseling": f"Please consult your healthcare provider for guidance on {med_name}."}
+    if not reply_text.strip():
+        reply_text = f"Please consult your healthcare provider for specific guidance on {med_name}."
+    return {"counseling": reply_text}
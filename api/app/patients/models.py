@@ -1,7 +1,8 @@
 import uuid
 from datetime import datetime
 from app.extensions import db
-from sqlalchemy import Index
+from app.clinical.models import Encounter, Observation, Appointment
+from sqlalchemy import Index, event, inspect
 
 class Patient(db.Model):
     __tablename__ = 'patients'
@@ -35,6 +36,7 @@ class Patient(db.Model):
     __table_args__ = (
         Index('idx_patient_name', 'first_name', 'last_name'),
         Index('idx_patient_active', 'is_active', 'created_at'),
+        Index('idx_patient_gender_id', 'gender', 'id'),
     )
 
     def __repr__(self):
@@ -54,4 +56,41 @@ class Patient(db.Model):
             'phone': self.phone,
             'email': self.email,
             'is_active': self.is_active
-        }
\ No newline at end of file
+        }
+
+class PatientSummary(db.Model):
+    """Latest LLM handoff summary per patient and the fingerprint of the record text it was generated from."""
+    __tablename__ = 'patient_summaries'
+
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    summary = db.Column(db.Text, nullable=False)
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+def _drop_summaries(connection, patient_ids):
+    patient_ids = {pid for pid in patient_ids if pid is not None}
+    if patient_ids:
+        summaries = PatientSummary.__table__
+        connection.execute(summaries.delete().where(summaries.c.patient_id.in_(patient_ids)))
+
+
+@event.listens_for(Patient, 'after_update')
+@event.listens_for(Patient, 'after_delete')
+def _invalidate_patient_summary(mapper, connection, target):
+    _drop_summaries(connection, {target.id})
+
+
+@event.listens_for(Encounter, 'after_insert')
+@event.listens_for(Encounter, 'after_update')
+@event.listens_for(Encounter, 'after_delete')
+@event.listens_for(Observation, 'after_insert')
+@event.listens_for(Observation, 'after_update')
+@event.listens_for(Observation, 'after_delete')
+@event.listens_for(Appointment, 'after_insert')
+@event.listens_for(Appointment, 'after_update')
+@event.listens_for(Appointment, 'after_delete')
+def _invalidate_clinical_summary(mapper, connection, target):
+    # A row moved to another patient changes both charts
+    history = inspect(target).attrs.patient_id.history
+    _drop_summaries(connection, {target.patient_id, *history.deleted})
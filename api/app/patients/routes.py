@@ -4,9 +4,10 @@ from app.patients.models import Patient
 from app.patients.schemas import PatientSchema, PatientCreateSchema, PatientUpdateSchema
 from app.extensions import db
 from datetime import datetime
-from app.llm.clients import generate_response
-from app.clinical.models import Encounter, Observation, Appointment
+from app.patients.services import summarize_patient
+from app.jobs.services import job_accepted, wants_async
 from app.common.hipaa import hipaa_audit, require_patient_access, log_hipaa_access, mask_phi_data
+from app.common.pagination import list_page
 from marshmallow import ValidationError
 
 
@@ -15,6 +16,19 @@ patients_bp = Blueprint('patients', __name__)
 patient_schema = PatientSchema()
 patients_schema = PatientSchema(many=True)
 
+# Columns the list endpoint may project (address and insurance details stay on the detail view)
+PATIENT_COLUMNS = {
+    name: getattr(Patient, name) for name in (
+        'id', 'fhir_id', 'user_id', 'first_name', 'last_name', 'gender', 'date_of_birth', 'phone', 'email',
+        'medical_record_number', 'is_active', 'created_at', 'updated_at',
+    )
+}
+PATIENT_DEFAULT_FIELDS = ('id', 'first_name', 'last_name', 'gender', 'date_of_birth', 'phone', 'email')
+PATIENT_FILTERS = {
+    'is_active': Patient.is_active, 'gender': Patient.gender, 'last_name': Patient.last_name,
+    'medical_record_number': Patient.medical_record_number,
+}
+
 @patients_bp.route('/', methods=['POST'])
 @jwt_required()
 @hipaa_audit('CREATE', 'patient')
@@ -98,71 +112,19 @@ def delete_patient(id):
 @patients_bp.route('', methods=['GET'])
 @jwt_required()
 def list_patients():
-    try:
-        patients = Patient.query.all()
-        result = [{
-            'id': p.id,
-            'first_name': p.first_name,
-            'last_name': p.last_name,
-            'gender': p.gender,
-            'date_of_birth': p.date_of_birth.isoformat() if p.date_of_birth else None,
-            'phone': p.phone,
-            'email': p.email
-        } for p in patients]
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({"error": "Failed to fetch patients", "details": str(e)}), 422
+    """Filter with ?is_active=, ?gender=, ?last_name=, ?medical_record_number=, ?from=/?to= (created_at); ?fields=, ?limit=, ?cursor=."""
+    return list_page(PATIENT_COLUMNS, PATIENT_DEFAULT_FIELDS, PATIENT_FILTERS, Patient.created_at)
 
 @patients_bp.route('/<int:patient_id>/summary', methods=['GET'])
 @jwt_required()
 def patient_summary(patient_id):
-    # Fetch relevant patient info (adjust fields according to your models)
-    patient = Patient.query.get_or_404(patient_id)
-    encounters = Encounter.query.filter_by(patient_id=patient_id).all()
-    observations = Observation.query.filter_by(patient_id=patient_id).all()
-    appointments = Appointment.query.filter_by(patient_id=patient_id).all()
-
-    # Construct plain input text for LLM
-    record_text = f"Patient: {patient.first_name} {patient.last_name}, {patient.gender}, DOB: {patient.date_of_birth}.\n"
-    record_text += f"Contact: {patient.phone or 'N/A'}, {patient.email or 'N/A'}\n"
-    record_text += f"Insurance: {patient.insurance_provider or 'N/A'}\n\n"
-    
-    if encounters:
-        record_text += "Recent Encounters:\n"
-        for e in encounters:
-            record_text += f"- {e.status} {e.encounter_class} on {e.period_start.strftime('%Y-%m-%d')}: {e.reason or 'No reason specified'}\n"
-    else:
-        record_text += "No recent encounters on record.\n"
-    
-    if observations:
-        record_text += "\nRecent Observations:\n"
-        for o in observations[:5]:
-            record_text += f"- {o.code}: {o.value}{o.unit or ''} ({o.effective_datetime.strftime('%Y-%m-%d')})\n"
-    else:
-        record_text += "\nNo recent observations on record.\n"
-    
-    if appointments:
-        record_text += "\nUpcoming Appointments:\n"
-        for a in appointments[:5]:
-            record_text += f"- {a.status} {a.start_datetime.strftime('%Y-%m-%d %H:%M')}: {a.reason or 'Routine visit'}\n"
-    else:
-        record_text += "\nNo upcoming appointments scheduled.\n"
-
-    # Try LLM generation, fallback to basic summary if not available
-    try:
-        messages = [
-            {"role": "system", "content": "Summarize the patient record for a general clinical handoff in clear, concise language."},
-            {"role": "user", "content": record_text}
-        ]
-        summary_gen = generate_response(messages)
-        summary_text = ''.join(summary_gen) if summary_gen else ""
-        
-        # If LLM returns empty, provide basic summary
-        if not summary_text.strip():
-            summary_text = f"Patient {patient.first_name} {patient.last_name} is a {patient.gender} patient with {len(encounters)} encounters, {len(observations)} observations, and {len(appointments)} appointments on record."
-            
-    except Exception as e:
-        print(f"LLM generation failed: {e}")
-        summary_text = f"Patient {patient.first_name} {patient.last_name} is a {patient.gender} patient. Clinical data: {len(encounters)} encounters, {len(observations)} observations, {len(appointments)} appointments."
-    
-    return jsonify({"summary": summary_text, "patient_data": record_text})
\ No newline at end of file
+    """Stored summary while the chart is unchanged; ?refresh=true regenerates it, ?async=true queues it as a job."""
+    refresh = request.args.get('refresh', 'false').lower() == 'true'
+    if wants_async():
+        if db.session.get(Patient, patient_id) is None:
+            abort(404, description=f"Patient with id {patient_id} not found.")
+        return job_accepted('patient_summary', {'patient_id': patient_id, 'refresh': refresh})
+    result = summarize_patient(patient_id, refresh=refresh)
+    if result is None:
+        abort(404, description=f"Patient with id {patient_id} not found.")
+    return jsonify(result)
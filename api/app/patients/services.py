@@ -0,0 +1,267 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import db, _config_value
+from app.patients.models import Patient, PatientSummary
+from app.clinical.models import Encounter, Observation, Appointment
+from app.llm.clients import generate_response
+from app.llm.scheduler import SchedulerBusyError
+import threading
+import hashlib
+import logging
+import atexit
+
+logger = logging.getLogger(__name__)
+
+# Rows per resource type included in an assembled record
+DEFAULT_RECORD_WINDOW = 5
+
+SUMMARY_SYSTEM_PROMPT = "Summarize the patient record for a general clinical handoff in clear, concise language."
+
+
+def _count(model, patient_id):
+    return select(func.count(model.id)).where(model.patient_id == patient_id).scalar_subquery()
+
+
+def load_patient_record(patient_id: int, window: int = None):
+    """
+    Demographics, per-resource totals and the `window` most relevant rows of each resource type
+    for one patient, or None if the patient does not exist.
+
+    Each resource is one ORDER BY ... LIMIT query on its (patient_id, date) index that selects only
+    the columns the record text uses, so the cost does not grow with the patient's history.
+    """
+    window = window or _config_value("PATIENT_RECORD_WINDOW", DEFAULT_RECORD_WINDOW)
+    patient = db.session.execute(
+        select(
+            Patient.id, Patient.first_name, Patient.last_name, Patient.gender, Patient.date_of_birth,
+            Patient.phone, Patient.email, Patient.insurance_provider,
+            _count(Encounter, patient_id).label("encounter_count"),
+            _count(Observation, patient_id).label("observation_count"),
+            _count(Appointment, patient_id).label("appointment_count"),
+        ).where(Patient.id == patient_id)
+    ).first()
+    if patient is None:
+        return None
+
+    encounters = db.session.execute(
+        select(Encounter.status, Encounter.encounter_class, Encounter.period_start, Encounter.reason)
+        .where(Encounter.patient_id == patient_id)
+        .order_by(Encounter.period_start.desc())
+        .limit(window)
+    ).all()
+    observations = db.session.execute(
+        select(Observation.code, Observation.value, Observation.unit, Observation.effective_datetime)
+        .where(Observation.patient_id == patient_id)
+        .order_by(Observation.effective_datetime.desc())
+        .limit(window)
+    ).all()
+    appointments = db.session.execute(
+        select(Appointment.status, Appointment.appointment_datetime, Appointment.reason)
+        .where(Appointment.patient_id == patient_id, Appointment.appointment_datetime >= datetime.utcnow())
+        .order_by(Appointment.appointment_datetime)
+        .limit(window)
+    ).all()
+    return {
+        "patient": patient,
+        "encounters": encounters,
+        "observations": observations,
+        "appointments": appointments,
+    }
+
+
+def _day(value, fmt="%Y-%m-%d"):
+    return value.strftime(fmt) if value else "unknown date"
+
+
+def iter_record_text(record: dict):
+    """Yield the plain-text record for LLM prompts piece by piece."""
+    patient = record["patient"]
+    yield f"Patient: {patient.first_name} {patient.last_name}, {patient.gender}, DOB: {patient.date_of_birth}.\n"
+    yield f"Contact: {patient.phone or 'N/A'}, {patient.email or 'N/A'}\n"
+    yield f"Insurance: {patient.insurance_provider or 'N/A'}\n\n"
+
+    if record["encounters"]:
+        yield "Recent Encounters:\n"
+        for e in record["encounters"]:
+            yield f"- {e.status} {e.encounter_class} on {_day(e.period_start)}: {e.reason or 'No reason specified'}\n"
+    else:
+        yield "No recent encounters on record.\n"
+
+    if record["observations"]:
+        yield "\nRecent Observations:\n"
+        for o in record["observations"]:
+            yield f"- {o.code}: {o.value}{o.unit or ''} ({_day(o.effective_datetime)})\n"
+    else:
+        yield "\nNo recent observations on record.\n"
+
+    if record["appointments"]:
+        yield "\nUpcoming Appointments:\n"
+        for a in record["appointments"]:
+            yield f"- {a.status} {_day(a.appointment_datetime, '%Y-%m-%d %H:%M')}: {a.reason or 'Routine visit'}\n"
+    else:
+        yield "\nNo upcoming appointments scheduled.\n"
+
+
+def record_text(record: dict) -> str:
+    return "".join(iter_record_text(record))
+
+
+# --- Stored summaries ---
+
+
+def record_fingerprint(text: str) -> str:
+    """Content hash of everything the summary is generated from (prompt and record text)."""
+    return hashlib.sha256(f"{SUMMARY_SYSTEM_PROMPT}\n{text}".encode("utf-8")).hexdigest()
+
+
+def _fallback_summary(patient) -> str:
+    return (
+        f"Patient {patient.first_name} {patient.last_name} is a {patient.gender} patient. Clinical data: "
+        f"{patient.encounter_count} encounters, {patient.observation_count} observations, "
+        f"{patient.appointment_count} appointments."
+    )
+
+
+def _store_summary(patient_id: int, fingerprint: str, summary: str, generated_at: datetime):
+    try:
+        db.session.merge(PatientSummary(
+            patient_id=patient_id, fingerprint=fingerprint, summary=summary, generated_at=generated_at
+        ))
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()  # e.g. stored concurrently by another worker; the next read regenerates
+        logger.warning(f"Could not store summary for patient {patient_id}: {e}")
+
+
+def summarize_patient(patient_id: int, refresh: bool = False):
+    """
+    Handoff summary for a patient, or None if the patient does not exist.
+
+    The record text is assembled first (a few bounded queries) and fingerprinted; a stored summary
+    with the same fingerprint is returned without calling the LLM. Otherwise a new summary is
+    generated and stored. Fallback summaries used when the LLM is unavailable are not stored.
+    Raises SchedulerBusyError when the LLM queue is saturated.
+    """
+    record = load_patient_record(patient_id)
+    if record is None:
+        return None
+    patient = record["patient"]
+    text = record_text(record)
+    fingerprint = record_fingerprint(text)
+
+    if not refresh:
+        stored = db.session.get(PatientSummary, patient_id)
+        if stored is not None and stored.fingerprint == fingerprint:
+            return {"summary": stored.summary, "patient_data": text, "cached": True,
+                    "generated_at": stored.generated_at.isoformat()}
+
+    generated_at = datetime.utcnow()
+    try:
+        summary = generate_response([
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": text},
+        ])
+    except SchedulerBusyError:
+        raise
+    except Exception as e:
+        logger.error(f"LLM generation failed for patient {patient_id}: {e}")
+        summary = ""
+    if summary.strip():
+        _store_summary(patient_id, fingerprint, summary, generated_at)
+    else:
+        summary = _fallback_summary(patient)
+    return {"summary": summary, "patient_data": text, "cached": False, "generated_at": generated_at.isoformat()}
+
+
+class SummaryPregenerator:
+    """
+    Every `interval` seconds, makes sure each patient with an appointment in the next
+    `lookahead_hours` has a current stored summary, so opening the chart is a cache hit.
+    Runs at background LLM priority and stops the pass early if the LLM queue is saturated.
+    """
+
+    def __init__(self, interval: float = 0, lookahead_hours: float = 24, max_patients: int = 200):
+        self.interval = interval
+        self.lookahead_hours = lookahead_hours
+        self.max_patients = max_patients
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self, app):
+        self._app = app
+        if self.interval and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="summary-pregenerator", daemon=True)
+            self._thread.start()
+            atexit.register(self._stop.set)
+
+    def stop(self, timeout: float = 5):
+        """Stop the background thread, e.g. before its app's database goes away; start() runs it again."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+            atexit.unregister(self._stop.set)
+
+    def pregenerate(self) -> dict:
+        """One pass; returns how many summaries were already current, generated or failed."""
+        now = datetime.utcnow()
+        patient_ids = db.session.execute(
+            select(Appointment.patient_id)
+            .where(Appointment.appointment_datetime.between(now, now + timedelta(hours=self.lookahead_hours)))
+            .group_by(Appointment.patient_id)
+            .order_by(func.min(Appointment.appointment_datetime))
+            .limit(self.max_patients)
+        ).scalars().all()
+        counts = {"current": 0, "generated": 0, "failed": 0}
+        for patient_id in patient_ids:
+            if self._stop.is_set():
+                break
+            try:
+                result = summarize_patient(patient_id)
+            except SchedulerBusyError:
+                logger.info("LLM queue saturated; deferring the rest of summary pre-generation")
+                break
+            except Exception as e:
+                db.session.rollback()
+                counts["failed"] += 1
+                logger.error(f"Summary pre-generation failed for patient {patient_id}: {e}")
+                continue
+            counts["current" if result and result["cached"] else "generated"] += 1
+        return counts
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._app.app_context():
+                try:
+                    self.pregenerate()
+                except Exception as e:
+                    logger.error(f"Summary pre-generation pass failed: {e}", exc_info=True)
+                finally:
+                    db.session.remove()
+
+
+_summary_pregenerator = None
+_summary_pregenerator_lock = threading.Lock()
+
+
+def init_summary_pregenerator(app) -> SummaryPregenerator:
+    """Create and start the process-wide summary pre-generator from PATIENT_SUMMARY_* settings (interval 0 disables it)."""
+    global _summary_pregenerator
+    with _summary_pregenerator_lock:
+        if _summary_pregenerator is None:
+            _summary_pregenerator = SummaryPregenerator(
+                interval=app.config.get("PATIENT_SUMMARY_PREGENERATE_INTERVAL", 0),
+                lookahead_hours=app.config.get("PATIENT_SUMMARY_LOOKAHEAD_HOURS", 24),
+                max_patients=app.config.get("PATIENT_SUMMARY_PREGENERATE_MAX", 200),
+            )
+        _summary_pregenerator.start(app)
+    return _summary_pregenerator
+
+
+def get_summary_pregenerator() -> SummaryPregenerator:
+    if _summary_pregenerator is None:
+        raise RuntimeError("Summary pre-generator not initialized; call init_summary_pregenerator(app) in create_app.")
+    return _summary_pregenerator
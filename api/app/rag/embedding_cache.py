@@ -0,0 +1,202 @@
+from collections import OrderedDict
+from typing import Callable, Optional
+from app.extensions import init_embed_model, _config_value
+from app.common.instrumentation import EMBEDDING_SECONDS
+import numpy as np
+import threading
+import sqlite3
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _DiskTier:
+    """
+    Optional second cache tier persisted in a small SQLite file so embeddings
+    survive restarts and are shared by every worker on the host. Each write deletes
+    expired rows and, past `max_entries`, the oldest ones, so the file stays bounded.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: float = 86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                " key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_query_embeddings_created_at ON query_embeddings (created_at)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str, ttl_seconds: float) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        vector, created_at = row
+        if ttl_seconds and time.time() - created_at > ttl_seconds:
+            return None
+        return np.frombuffer(vector, dtype=np.float32)
+
+    def put(self, key: str, vector: np.ndarray):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                (key, vector.astype(np.float32).tobytes(), now),
+            )
+            self._prune(now)
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+
+    def _prune(self, now: float):
+        """Delete expired rows, then all but the newest `max_entries`; callers hold self._lock."""
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM query_embeddings WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries:
+            self._conn.execute(
+                "DELETE FROM query_embeddings WHERE key IN ("
+                " SELECT key FROM query_embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM query_embeddings")
+            self._conn.commit()
+
+
+class EmbeddingCache:
+    """
+    Bounded, thread-safe LRU cache of query embeddings keyed by normalized text.
+    Entries expire after `ttl_seconds`; an optional on-disk tier backs the in-memory LRU.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 86400, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (vector, stored_at)
+        self._lock = threading.Lock()
+        self._disk = _DiskTier(disk_path, max_entries, ttl_seconds) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Case-fold and collapse whitespace so trivially different queries share an entry."""
+        return " ".join(text.lower().split())
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self.normalize(text)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, stored_at = entry
+                if not self.ttl_seconds or now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self._entries[key]
+
+        if self._disk is not None:
+            vector = self._disk.get(key, self.ttl_seconds)
+            if vector is not None:
+                self._store(key, vector)
+                with self._lock:
+                    self.disk_hits += 1
+                return vector
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text: str, vector) -> np.ndarray:
+        key = self.normalize(text)
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)  # cached vectors are shared between callers
+        self._store(key, vector)
+        if self._disk is not None:
+            try:
+                self._disk.put(key, vector)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to persist query embedding to disk cache: {e}")
+        return vector
+
+    def get_or_compute(self, text: str, compute: Callable[[str], np.ndarray]) -> np.ndarray:
+        vector = self.get(text)
+        if vector is None:
+            vector = self.put(text, compute(text))
+        return vector
+
+    def _store(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide query embedding cache, configured from EMBED_CACHE_* settings."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(
+                    max_entries=_config_value("EMBED_CACHE_MAX_ENTRIES", 10000),
+                    ttl_seconds=_config_value("EMBED_CACHE_TTL", 86400),
+                    disk_path=_config_value("EMBED_CACHE_PATH") or None,
+                )
+    return _embedding_cache
+
+
+def embed_query(text: str) -> np.ndarray:
+    """
+    Return the embedding for a user query, skipping the model forward pass on a cache hit.
+    The returned array is read-only; call .tolist() before handing it to Milvus.
+    """
+    embed_model = init_embed_model()
+
+    def compute(query):
+        with EMBEDDING_SECONDS.labels(kind="query").time():
+            return embed_model.encode(query)
+
+    return get_embedding_cache().get_or_compute(text, compute)
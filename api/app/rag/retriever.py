@@ -11,7 +11,8 @@
 #         return ""
 #     return "\n---\n".join([r.description or "" for r in records])
 
-from app.extensions import init_embed_model, search_vectors  # Your embedding model init
+from app.extensions import search_vectors
+from app.rag.embedding_cache import embed_query
 from typing import Optional
 
 def fetch_context(query: str, patient_id: Optional[int] = None, top_k: int = 3) -> str:
@@ -19,8 +20,7 @@ def fetch_context(query: str, patient_id: Optional[int] = None, top_k: int = 3)
     Retrieve relevant EHR documents as LLM context using vector-based similarity search.
     If patient_id is provided, restrict search to that patient's docs.
     """
-    embed_model = init_embed_model()
-    embedding = embed_model.encode(query).tolist()
+    embedding = embed_query(query).tolist()
 
     # Vector search returns list of documents or textual chunks
     results = search_vectors(embedding, top_k=top_k, patient_id=patient_id)  # Implement patient filtering in your search_vectors
@@ -11,11 +11,118 @@ class Config:
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=7)     # 7 days
     JWT_TOKEN_LOCATION = ['headers']
 
+    # Browser origins allowed to call the API and open Socket.IO connections (comma-separated)
+    CORS_ORIGINS = [o.strip() for o in os.environ.get("CORS_ORIGINS", "http://localhost:3000").split(",") if o.strip()]
+
+    # Cached user role / patient ownership lookups for authorization decorators
+    AUTHZ_CACHE_TTL = int(os.environ.get("AUTHZ_CACHE_TTL", "60"))
+    AUTHZ_CACHE_MAX_ENTRIES = int(os.environ.get("AUTHZ_CACHE_MAX_ENTRIES", "10000"))
+
+    # JWT revocation store shared by all workers: memory:// | sqlite:///path | redis://...
+    # (empty = SQLite file in the instance folder). A per-process Bloom filter, synced every
+    # REVOCATION_SYNC_INTERVAL seconds, keeps non-revoked tokens off the store.
+    REVOCATION_STORE_URL = os.environ.get("REVOCATION_STORE_URL", "")
+    REVOCATION_USE_BLOOM = os.environ.get("REVOCATION_USE_BLOOM", "true").lower() == "true"
+    REVOCATION_BLOOM_CAPACITY = int(os.environ.get("REVOCATION_BLOOM_CAPACITY", "100000"))
+    REVOCATION_BLOOM_ERROR_RATE = float(os.environ.get("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+    REVOCATION_SYNC_INTERVAL = float(os.environ.get("REVOCATION_SYNC_INTERVAL", "2.0"))
+
+    # HIPAA audit writer (spill file defaults to <instance>/audit_spill.jsonl)
+    AUDIT_SPILL_PATH = os.environ.get("AUDIT_SPILL_PATH", "")
+    AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "200"))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", "1.0"))
+    AUDIT_FSYNC = os.environ.get("AUDIT_FSYNC", "false").lower() == "true"
+
+    # Dashboard metric rollups (compactor runs every ROLLUP_INTERVAL seconds; 0 disables the thread)
+    ROLLUP_INTERVAL = float(os.environ.get("ROLLUP_INTERVAL", "60"))
+    ROLLUP_BATCH_SIZE = int(os.environ.get("ROLLUP_BATCH_SIZE", "5000"))
+    # Seconds a raw id the compactor passed over is waited for before it counts as rolled back
+    ROLLUP_GAP_TIMEOUT = float(os.environ.get("ROLLUP_GAP_TIMEOUT", "300"))
+    ROLLUP_MINUTE_RETENTION_HOURS = int(os.environ.get("ROLLUP_MINUTE_RETENTION_HOURS", "48"))
+    ROLLUP_HOUR_RETENTION_DAYS = int(os.environ.get("ROLLUP_HOUR_RETENTION_DAYS", "90"))
+
+    # Rows per resource type (encounters, observations, appointments) in LLM patient records
+    PATIENT_RECORD_WINDOW = int(os.environ.get("PATIENT_RECORD_WINDOW", "5"))
+
+    # Pre-generate summaries for patients with appointments in the next LOOKAHEAD hours (interval 0 disables)
+    PATIENT_SUMMARY_PREGENERATE_INTERVAL = float(os.environ.get("PATIENT_SUMMARY_PREGENERATE_INTERVAL", "0"))
+    PATIENT_SUMMARY_LOOKAHEAD_HOURS = float(os.environ.get("PATIENT_SUMMARY_LOOKAHEAD_HOURS", "24"))
+    PATIENT_SUMMARY_PREGENERATE_MAX = int(os.environ.get("PATIENT_SUMMARY_PREGENERATE_MAX", "200"))
+
+    # Background threads of an API process (metric rollups and recorder, health prober, summary
+    # pre-generation, job completion events); run_jobs.py turns them off in the job worker
+    BACKGROUND_SERVICES = os.environ.get("BACKGROUND_SERVICES", "true").lower() == "true"
+
+    # Background LLM jobs (?async=true): worker threads in the API process (0 = run_jobs.py only),
+    # queue poll interval, base retry backoff, how long a timed-out attempt gets to stop once
+    # cancelled, and completion-event poll interval, in seconds
+    JOBS_IN_PROCESS_THREADS = int(os.environ.get("JOBS_IN_PROCESS_THREADS", "0"))
+    JOBS_WORKER_THREADS = int(os.environ.get("JOBS_WORKER_THREADS", "4"))
+    JOBS_POLL_INTERVAL = float(os.environ.get("JOBS_POLL_INTERVAL", "0.5"))
+    JOBS_RETRY_BACKOFF = float(os.environ.get("JOBS_RETRY_BACKOFF", "5"))
+    JOBS_CANCEL_GRACE = float(os.environ.get("JOBS_CANCEL_GRACE", "30"))
+    JOBS_NOTIFY_INTERVAL = float(os.environ.get("JOBS_NOTIFY_INTERVAL", "1"))
+
+    # Bulk payment import: rows per INSERT/transaction
+    PAYMENT_IMPORT_BATCH_SIZE = int(os.environ.get("PAYMENT_IMPORT_BATCH_SIZE", "1000"))
+
+    # Per-request SQL profiler / N+1 detector (always on when app.debug; sampled otherwise)
+    SQL_PROFILER_SAMPLE_RATE = float(os.environ.get("SQL_PROFILER_SAMPLE_RATE", "0.01"))
+    SQL_PROFILER_N_PLUS_ONE_THRESHOLD = int(os.environ.get("SQL_PROFILER_N_PLUS_ONE_THRESHOLD", "5"))
+
+    # Background component health probes served by /health/detailed and /api/llm/health
+    HEALTH_PROBE_INTERVAL = float(os.environ.get("HEALTH_PROBE_INTERVAL", "15"))
+    HEALTH_PROBE_STALE_AFTER = float(os.environ.get("HEALTH_PROBE_STALE_AFTER", "0"))  # 0 = 3 x interval
+
+    # Buffered metrics recorder (app_metrics / user_activity writes are batched every interval)
+    METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "10"))
+    METRICS_MAX_PENDING_ROWS = int(os.environ.get("METRICS_MAX_PENDING_ROWS", "100000"))
+    # Counts each request as an api_call for the dashboard (latency lives in the Prometheus metrics)
+    METRICS_INSTRUMENT_REQUESTS = os.environ.get("METRICS_INSTRUMENT_REQUESTS", "true").lower() == "true"
+
+    # Cursor-paginated list endpoints (?limit=, capped at MAX_PAGE_SIZE)
+    DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", "50"))
+    MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "200"))
+
     MILVUS_DB_PATH = os.environ.get("MILVUS_DB_PATH", "./milvus_rag.db")
     MILVUS_COLLECTION = os.environ.get("MILVUS_COLLECTION", "sure_health_collection")
     MILVUS_DIMENSION = int(os.environ.get("MILVUS_DIMENSION", "384"))
     EMBED_MODEL_NAME = os.environ.get("EMBED_MODEL_NAME", "all-MiniLM-L6-v2")
+    EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "64"))
+    MILVUS_INSERT_BATCH_SIZE = int(os.environ.get("MILVUS_INSERT_BATCH_SIZE", "512"))
+
+    # Query embedding cache (EMBED_CACHE_PATH enables the on-disk tier)
+    EMBED_CACHE_MAX_ENTRIES = int(os.environ.get("EMBED_CACHE_MAX_ENTRIES", "10000"))
+    EMBED_CACHE_TTL = int(os.environ.get("EMBED_CACHE_TTL", "86400"))
+    EMBED_CACHE_PATH = os.environ.get("EMBED_CACHE_PATH", "")
     LLAMA_MODEL_PATH = os.environ.get("LLAMA_MODEL_PATH", "/Users/johnmoses/.cache/lm-studio/models/MaziyarPanahi/Meta-Llama-3-8B-Instruct-GGUF/Meta-Llama-3-8B-Instruct.Q4_K_M.gguf")
 
+    # LLM inference scheduler (bounded priority queue in front of the model)
+    LLM_QUEUE_MAX_SIZE = int(os.environ.get("LLM_QUEUE_MAX_SIZE", "32"))
+    LLM_QUEUE_MAX_WAIT = float(os.environ.get("LLM_QUEUE_MAX_WAIT", "30"))
+
+    # LLM worker processes (0 runs the model inside the API process). The pool is per process:
+    # every gunicorn worker and every run_jobs.py process that serves an LLM request starts its
+    # own LLM_WORKERS model processes, so size it with that multiplier in mind.
+    LLM_WORKERS = int(os.environ.get("LLM_WORKERS", "1"))
+    LLM_WORKER_THREADS = int(os.environ.get("LLM_WORKER_THREADS", "0"))  # 0 = cpu_count / LLM_WORKERS
+    LLAMA_N_CTX = int(os.environ.get("LLAMA_N_CTX", "4096"))
+    LLAMA_N_GPU_LAYERS = int(os.environ.get("LLAMA_N_GPU_LAYERS", "0"))
+    LLM_WORKER_START_TIMEOUT = float(os.environ.get("LLM_WORKER_START_TIMEOUT", "180"))
+    LLM_WORKER_REQUEST_TIMEOUT = float(os.environ.get("LLM_WORKER_REQUEST_TIMEOUT", "600"))
+    LLM_WORKER_HEALTH_INTERVAL = float(os.environ.get("LLM_WORKER_HEALTH_INTERVAL", "15"))
+    # Max static prompt prefixes (agent system prompts) whose KV state is kept per model; 0 disables
+    LLM_PREFIX_CACHE_SIZE = int(os.environ.get("LLM_PREFIX_CACHE_SIZE", "16"))
+
+    # LLM response cache (opt-in per call via generate_response(cache=..., semantic_cache=...))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+    RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", "86400"))
+    RESPONSE_CACHE_SEMANTIC_THRESHOLD = float(os.environ.get("RESPONSE_CACHE_SEMANTIC_THRESHOLD", "0.95"))
+    # Identical concurrent LLM requests share one generation (streams fan out to every caller)
+    LLM_COALESCE_REQUESTS = os.environ.get("LLM_COALESCE_REQUESTS", "true").lower() == "true"
+
+    # Chat agent routing: queries whose best exemplar similarity is below this go to the fallback agent
+    INTENT_ROUTER_THRESHOLD = float(os.environ.get("INTENT_ROUTER_THRESHOLD", "0.4"))
+
     # Rate Limiting
     RATELIMIT_STORAGE_URL = os.environ.get("REDIS_URL", "memory://")
@@ -0,0 +1,32 @@
+from app import create_app
+from app.jobs import tasks  # noqa: F401  (registers the built-in task types)
+from app.jobs.services import JobWorker
+import logging
+import signal
+
+
+# Configure root logger
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+# The API process runs the dashboard, health and summary threads; the worker only runs jobs
+app = create_app({'BACKGROUND_SERVICES': False})
+
+if __name__ == '__main__':
+    # Standalone worker process for background LLM jobs; any number can share the jobs table
+    threads = app.config.get('JOBS_WORKER_THREADS', 4)
+    worker = JobWorker(
+        threads=threads,
+        poll_interval=app.config.get('JOBS_POLL_INTERVAL', 0.5),
+        retry_backoff=app.config.get('JOBS_RETRY_BACKOFF', 5.0),
+        cancel_grace=app.config.get('JOBS_CANCEL_GRACE', 30.0),
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    # Jobs call the LLM through this process's own worker pool, in addition to the API's
+    app.logger.info(f"Starting job worker {worker.worker_id} with {threads} thread(s); "
+                    f"LLM jobs load {app.config.get('LLM_WORKERS', 1)} model process(es) on first use")
+    worker.start(app)
+    worker.wait()
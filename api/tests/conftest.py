@@ -1,8 +1,13 @@
 import pytest
-from app import create_app
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import create_app, stop_background_services
 from app.extensions import db
 from app.auth.models import User
 from app.patients.models import Patient
+# Patient's relationships are resolved by class name; make sure those models are registered
+from app.clinical import models as clinical_models  # noqa: F401
+from app.medications import models as medication_models  # noqa: F401
 from datetime import date
 
 @pytest.fixture
@@ -17,8 +22,23 @@ def app():
     with app.app_context():
         db.create_all()
         yield app
+        stop_background_services()
         db.drop_all()
 
+@pytest.fixture
+def sql_statements(app):
+    """`with sql_statements() as statements:` collects the SQL run on the app's engine in the block."""
+    @contextmanager
+    def record():
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    return record
+
 @pytest.fixture
 def client(app):
     """Create test client"""
@@ -0,0 +1,110 @@
+from datetime import datetime
+import json
+import os
+import time
+from app.common.audit_writer import AuditWriter
+from app.common.hipaa import HIPAAAuditLog
+
+
+def _event(user_id=1, action='READ'):
+    return {
+        'user_id': user_id, 'patient_id': 5, 'action': action, 'resource': 'patient',
+        'resource_id': '5', 'ip_address': '127.0.0.1', 'user_agent': 'pytest',
+        'timestamp': datetime.utcnow(), 'success': True, 'reason': None,
+    }
+
+
+def _spill_files(tmp_path):
+    return sorted(p.name for p in tmp_path.iterdir())
+
+
+def test_enqueue_defers_writes_until_flush(app, tmp_path):
+    writer = AuditWriter(str(tmp_path / 'audit.jsonl'), batch_size=100, flush_interval=60)
+    writer._app = app
+    for _ in range(3):
+        writer.enqueue(_event())
+
+    assert HIPAAAuditLog.query.count() == 0
+    assert writer.stats()['queue_depth'] == 3
+
+    assert writer.flush()
+    assert HIPAAAuditLog.query.count() == 3
+    stats = writer.stats()
+    assert stats['queue_depth'] == 0
+    assert stats['written'] == 3
+    # Only the (empty) live spill file remains once everything is committed
+    assert _spill_files(tmp_path) == [os.path.basename(writer._process_path)]
+    assert os.path.getsize(writer._process_path) == 0
+
+
+def test_replays_spill_left_by_dead_process(app, tmp_path):
+    dead_pid = 2 ** 22 + 1  # above the default pid_max, so never a live process
+    with open(tmp_path / f'audit.jsonl.{dead_pid}.3', 'w') as segment:
+        segment.write(json.dumps({**_event(action='DELETE'), 'timestamp': datetime.utcnow().isoformat()}) + '\n')
+
+    writer = AuditWriter(str(tmp_path / 'audit.jsonl'), flush_interval=60)
+    writer._app = app
+    writer._recover()
+    assert writer.flush()
+
+    assert HIPAAAuditLog.query.filter_by(action='DELETE').count() == 1
+    assert writer.stats()['replayed'] == 1
+    assert not (tmp_path / f'audit.jsonl.{dead_pid}.3').exists()
+
+
+def test_rejected_rows_do_not_block_the_batch(app, tmp_path):
+    writer = AuditWriter(str(tmp_path / 'audit.jsonl'), flush_interval=60)
+    writer._app = app
+    writer.enqueue(_event())
+    writer.enqueue(_event(user_id=None))  # violates NOT NULL
+    writer.enqueue(_event())
+
+    assert writer.flush()
+    assert HIPAAAuditLog.query.count() == 2
+    assert writer.stats()['rejected'] == 1
+    with open(tmp_path / 'audit.jsonl.rejected') as dead_letter:
+        assert len(dead_letter.readlines()) == 1
+
+
+def test_replays_files_left_by_an_earlier_run_with_the_same_pid(app, tmp_path):
+    # After a container restart the new process often gets the PID of the old one
+    pid = os.getpid()
+    for name, action in ((f'audit.jsonl.{pid}', 'CREATE'), (f'audit.jsonl.{pid}.1', 'UPDATE'),
+                         (f'audit.jsonl.{pid}-0badf00d.1', 'DELETE')):
+        with open(tmp_path / name, 'w') as leftover:
+            leftover.write(json.dumps({**_event(action=action), 'timestamp': datetime.utcnow().isoformat()}) + '\n')
+
+    writer = AuditWriter(str(tmp_path / 'audit.jsonl'), flush_interval=60)
+    writer._app = app
+    writer.enqueue(_event(action='READ'))
+    writer._recover()  # start() recovers again; nothing is queued twice
+    assert writer.flush()
+
+    assert sorted(row.action for row in HIPAAAuditLog.query) == ['CREATE', 'DELETE', 'READ', 'UPDATE']
+    assert writer.stats()['replayed'] == 3
+    assert _spill_files(tmp_path) == [os.path.basename(writer._process_path)]
+
+
+def test_flusher_survives_file_errors(app, tmp_path, monkeypatch):
+    writer = AuditWriter(str(tmp_path / 'audit.jsonl'), batch_size=1, flush_interval=0.01)
+    real_replace = os.replace
+    failures = []
+
+    def flaky_replace(src, dst):
+        if not failures:
+            failures.append(dst)
+            raise OSError('disk hiccup')
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', flaky_replace)
+    writer.start(app)
+    try:
+        writer.enqueue(_event())
+        deadline = time.monotonic() + 5
+        while writer.stats()['written'] < 1:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        writer.close()
+    assert failures and writer.stats()['flush_failures'] == 1
+    assert HIPAAAuditLog.query.count() == 1
@@ -1,5 +1,5 @@
 import pytest
-from app import create_app, extensions
+from app import create_app, extensions, stop_background_services
 
 @pytest.fixture
 def app():
@@ -12,6 +12,7 @@ def app():
     with app.app_context():
         extensions.db.create_all()
         yield app
+        stop_background_services()
         extensions.db.drop_all()
 
 @pytest.fixture
@@ -0,0 +1,86 @@
+from datetime import date
+import pytest
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.auth.models import User
+from app.patients.models import Patient
+from app.common.authz_cache import AuthorizationCache, get_authz_cache
+from app.common.decorators import jwt_required_with_roles
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    # The process-wide cache outlives each test's database
+    get_authz_cache().clear()
+
+
+def _user(username, role):
+    user = User(username=username, email=f'{username}@example.com', role=role)
+    user.set_password('pw')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _patient(user, mrn):
+    patient = Patient(user_id=user.id, first_name='Ada', last_name='Lovelace', date_of_birth=date(1990, 1, 1),
+                      gender='female', medical_record_number=mrn)
+    db.session.add(patient)
+    db.session.commit()
+    return patient
+
+
+def test_role_lookup_is_cached(app, sql_statements):
+    cache = AuthorizationCache(ttl_seconds=60)
+    user_id = _user('clin', 'clinician').id
+
+    with sql_statements() as first:
+        cache.user_role(user_id)
+    with sql_statements() as second:
+        cache.user_role(str(user_id))
+    assert len(first) == 1
+    assert len(second) == 0
+    assert cache.user_role(999) is None
+
+
+def test_model_changes_invalidate_entries(app):
+    cache = get_authz_cache()
+    user = _user('pat', 'patient')
+    other = _user('other', 'patient')
+    patient = _patient(user, 'MRN-1')
+    assert cache.owned_patient_ids(user.id) == {patient.id}
+
+    user.role = 'clinician'
+    patient.user_id = other.id
+    db.session.commit()
+
+    assert cache.user_role(user.id) == 'clinician'
+    assert cache.owned_patient_ids(user.id) == frozenset()
+    assert cache.owned_patient_ids(other.id) == {patient.id}
+
+
+def test_roles_decorator_uses_stored_role_when_token_has_none(app, client):
+    admin = _user('admin', 'admin')
+
+    @jwt_required_with_roles(roles=['admin'])
+    def admin_only():
+        return {'ok': True}
+
+    app.add_url_rule('/test/admin-only', 'admin_only', admin_only)
+    # Refreshed access tokens carry an empty roles claim
+    token = create_access_token(identity=str(admin.id), additional_claims={'roles': []})
+    response = client.get('/test/admin-only', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+
+
+def test_malformed_identity_is_denied(app, client):
+    @jwt_required_with_roles(roles=['admin'])
+    def admin_area():
+        return {'ok': True}
+
+    app.add_url_rule('/test/admin-area', 'admin_area', admin_area)
+    token = create_access_token(identity='not-a-user-id', additional_claims={'roles': ['admin']})
+    response = client.get('/test/admin-area', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 403
+    assert get_authz_cache().user_role('not-a-user-id') is None
+    assert get_authz_cache().owned_patient_ids('not-a-user-id') == frozenset()
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.chat.models import ChatRoom, ChatMessage
+
+START = datetime(2025, 1, 1)
+
+
+def _headers():
+    return {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+
+
+def _room_with_messages(count):
+    room = ChatRoom(name='history')
+    db.session.add(room)
+    db.session.flush()
+    for i in range(count):
+        db.session.add(ChatMessage(room_id=room.id, sender_id=1, content=f'm{i}', timestamp=START + timedelta(minutes=i)))
+    db.session.commit()
+    return room.id
+
+
+def _contents(response):
+    return [m['content'] for m in response.json]
+
+
+def test_default_page_is_latest_messages_in_order(app, client):
+    room_id = _room_with_messages(5)
+    response = client.get(f'/api/chat/rooms/{room_id}/messages?limit=2', headers=_headers())
+    assert _contents(response) == ['m3', 'm4']
+    assert 'X-Prev-Cursor' in response.headers
+
+
+def test_before_scrolls_back_until_exhausted(app, client):
+    room_id = _room_with_messages(5)
+    first = client.get(f'/api/chat/rooms/{room_id}/messages?limit=2', headers=_headers())
+    second = client.get(
+        f"/api/chat/rooms/{room_id}/messages?limit=2&before={first.headers['X-Prev-Cursor']}", headers=_headers()
+    )
+    third = client.get(
+        f"/api/chat/rooms/{room_id}/messages?limit=2&before={second.headers['X-Prev-Cursor']}", headers=_headers()
+    )
+    assert _contents(second) == ['m1', 'm2']
+    assert _contents(third) == ['m0']
+    assert 'X-Prev-Cursor' not in third.headers
+
+
+def test_after_and_since_return_only_newer_messages(app, client):
+    room_id = _room_with_messages(5)
+    anchor = ChatMessage.query.filter_by(content='m2').one()
+
+    after = client.get(f'/api/chat/rooms/{room_id}/messages?after={anchor.id}&limit=1', headers=_headers())
+    assert _contents(after) == ['m3']
+    assert after.headers['X-Next-Cursor'] == str(ChatMessage.query.filter_by(content='m3').one().id)
+
+    since = (START + timedelta(minutes=2, seconds=30)).isoformat()
+    assert _contents(client.get(f'/api/chat/rooms/{room_id}/messages?since={since}', headers=_headers())) == ['m3', 'm4']
+
+
+def test_cursor_from_another_room_is_rejected(app, client):
+    room_id = _room_with_messages(1)
+    response = client.get(f'/api/chat/rooms/{room_id + 1}/messages?before=1', headers=_headers())
+    assert response.status_code == 400
+
+
+def test_post_message_returns_only_new_messages(app, client, monkeypatch):
+    room_id = _room_with_messages(3)
+    monkeypatch.setattr('app.chat.routes.embed_query', lambda text: [])
+    monkeypatch.setattr('app.chat.routes.search_vectors', lambda vector, top_k=5: [])
+    monkeypatch.setattr('app.chat.routes.supervisor_agent', lambda query, context, stream=False: 'Rest and fluids.')
+
+    response = client.post(
+        f'/api/chat/rooms/{room_id}/post_message',
+        json={'content': 'I have a fever', 'role': 'patient'},
+        headers=_headers(),
+    )
+
+    assert response.status_code == 200
+    assert [m['content'] for m in response.json['messages']] == ['I have a fever', 'Rest and fluids.']
+    assert 'conversation' not in response.json
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.chat.models import ChatRoom, ChatMessage
+
+
+def _headers():
+    return {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+
+
+def _make_rooms(count, prefix='room'):
+    start = datetime(2025, 1, 1)
+    for i in range(count):
+        room = ChatRoom(name=f'{prefix}-{i}')
+        db.session.add(room)
+        db.session.flush()
+        db.session.add(ChatMessage(room_id=room.id, sender_id=1, content=f'hello {i}', timestamp=start + timedelta(minutes=i)))
+    db.session.commit()
+
+
+def test_insert_updates_room_activity(app):
+    _make_rooms(1)
+    room = ChatRoom.query.one()
+    message = ChatMessage.query.one()
+    assert room.last_message_id == message.id
+    assert room.last_activity_at == message.timestamp
+
+
+def test_list_rooms_pages_by_activity_with_last_message(app, client):
+    _make_rooms(5)
+
+    first = client.get('/api/chat/rooms?limit=2', headers=_headers())
+    assert [r['name'] for r in first.json] == ['room-4', 'room-3']
+    assert first.json[0]['last_message']['content'] == 'hello 4'
+
+    cursor = first.headers['X-Next-Cursor']
+    second = client.get(f'/api/chat/rooms?limit=2&cursor={cursor}', headers=_headers())
+    third = client.get(f"/api/chat/rooms?limit=2&cursor={second.headers['X-Next-Cursor']}", headers=_headers())
+    assert [r['name'] for r in second.json] == ['room-2', 'room-1']
+    assert [r['name'] for r in third.json] == ['room-0']
+    assert 'X-Next-Cursor' not in third.headers
+
+
+def test_list_rooms_query_count_independent_of_room_count(app, client, sql_statements):
+    _make_rooms(3)
+    with sql_statements() as few:
+        client.get('/api/chat/rooms', headers=_headers())
+    _make_rooms(20, prefix='more')
+    with sql_statements() as many:
+        client.get('/api/chat/rooms', headers=_headers())
+    assert len(few) == len(many)
+
+
+def test_list_rooms_rejects_bad_cursor(app, client):
+    response = client.get('/api/chat/rooms?cursor=not-a-cursor', headers=_headers())
+    assert response.status_code == 400
@@ -0,0 +1,103 @@
+from flask_jwt_extended import create_access_token
+from flask_socketio import SocketIOTestClient
+from app.extensions import db, socketio
+from app.auth.models import User
+from app.chat.models import ChatMessage, ChatParticipant, ChatRoom
+from app.chat.routes import stream_bot_reply
+
+
+def _user(name):
+    user = User(username=name, email=f'{name}@example.com', role='patient')
+    user.set_password('pw')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _room(room_id, *members):
+    db.session.add(ChatRoom(id=room_id, name=f'room-{room_id}'))
+    db.session.add_all(ChatParticipant(room_id=room_id, user_id=member.id) for member in members)
+    db.session.commit()
+
+
+def _socket(app, user=None):
+    auth = {'token': create_access_token(identity=str(user.id))} if user is not None else None
+    return SocketIOTestClient(app, socketio, auth=auth)
+
+
+def _joined_client(app, room_id):
+    user = _user(f'patient{room_id}')
+    _room(room_id, user)
+    client = _socket(app, user)
+    client.emit('join', {'room': room_id})
+    client.get_received()
+    return client
+
+
+def _events(client, name):
+    return [event['args'][0] for event in client.get_received() if event['name'] == name]
+
+
+def test_stream_bot_reply_emits_tokens_then_persists_once(app):
+    client = _joined_client(app, 7)
+
+    stream_bot_reply(app, 7, 'stream-1', iter(['Hel', 'lo', ' there']))
+
+    received = client.get_received()
+    tokens = [e['args'][0]['token'] for e in received if e['name'] == 'bot_token']
+    complete = [e['args'][0] for e in received if e['name'] == 'bot_complete']
+    assert tokens == ['Hel', 'lo', ' there']
+    assert len(complete) == 1
+    assert complete[0]['stream_id'] == 'stream-1'
+    assert complete[0]['message']['content'] == 'Hello there'
+    assert ChatMessage.query.filter_by(room_id=7, role='bot').count() == 1
+    client.disconnect()
+
+
+def test_stream_bot_reply_saves_partial_reply_on_error(app):
+    client = _joined_client(app, 8)
+
+    def failing():
+        yield 'Partial'
+        raise RuntimeError('worker crashed')
+
+    stream_bot_reply(app, 8, 'stream-2', failing())
+
+    received = client.get_received()
+    assert any(e['name'] == 'bot_error' for e in received)
+    saved = ChatMessage.query.filter_by(room_id=8, role='bot').all()
+    assert [m.content for m in saved] == ['Partial']
+    client.disconnect()
+
+
+def test_connection_without_a_valid_token_is_refused(app):
+    assert not _socket(app).is_connected()
+    bad = SocketIOTestClient(app, socketio, auth={'token': 'not-a-jwt'})
+    assert not bad.is_connected()
+
+
+def test_non_participant_cannot_join_or_post(app):
+    member, outsider = _user('member'), _user('outsider')
+    _room(9, member)
+    client = _socket(app, outsider)
+    assert client.is_connected()
+
+    client.emit('join', {'room': 9})
+    client.emit('send_message', {'room': 9, 'content': 'hi', 'sender_id': member.id})
+    assert [e['args'][0]['message'] for e in client.get_received() if e['name'] == 'error'] == \
+        ['Not a participant of this room.'] * 2
+    assert ChatMessage.query.filter_by(room_id=9).count() == 0
+
+    stream_bot_reply(app, 9, 'stream-3', iter(['secret']))
+    assert _events(client, 'bot_token') == []
+    client.disconnect()
+
+
+def test_messages_are_sent_as_the_connected_user(app):
+    member, other = _user('sender'), _user('spoofed')
+    _room(10, member, other)
+    client = _socket(app, member)
+    client.emit('join', {'room': 10})
+    client.emit('send_message', {'room': 10, 'content': 'hello', 'sender_id': other.id})
+    assert [m.sender_id for m in ChatMessage.query.filter_by(room_id=10)] == [member.id]
+    client.disconnect()
@@ -0,0 +1,70 @@
+import itertools
+import numpy as np
+from app.rag import embedding_cache
+from app.rag.embedding_cache import EmbeddingCache
+
+
+def test_cache_hits_on_normalized_text():
+    cache = EmbeddingCache(max_entries=10, ttl_seconds=60)
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        return np.array([0.1, 0.2, 0.3])
+
+    first = cache.get_or_compute("When is my appointment?", compute)
+    second = cache.get_or_compute("  when IS my   appointment? ", compute)
+
+    assert len(calls) == 1
+    assert np.array_equal(first, second)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    EmbeddingCache(disk_path=path).put("refill my prescription", [0.5, 0.25])
+
+    cache = EmbeddingCache(disk_path=path)
+    vector = cache.get("Refill my prescription")
+
+    assert vector is not None
+    assert np.allclose(vector, [0.5, 0.25])
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_keeps_only_the_newest_max_entries(tmp_path, monkeypatch):
+    clock = itertools.count(1000.0, 10.0)
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: next(clock))
+    cache = EmbeddingCache(max_entries=3, ttl_seconds=0, disk_path=str(tmp_path / "embeddings.db"))
+
+    for text in ("a", "b", "c", "d", "e"):
+        cache.put(text, [1.0])
+
+    assert cache._disk.count() == 3
+    assert [cache._disk.get(key, 0) is not None for key in "abcde"] == [False, False, True, True, True]
+
+
+def test_disk_tier_deletes_expired_rows(tmp_path, monkeypatch):
+    clock = itertools.count(1000.0, 10.0)
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: next(clock))
+    cache = EmbeddingCache(max_entries=100, ttl_seconds=15, disk_path=str(tmp_path / "embeddings.db"))
+
+    for text in ("a", "b", "c"):
+        cache.put(text, [1.0])
+
+    # Written at 1000, 1010 and 1020: "a" is past the TTL and was deleted, not just skipped on read
+    assert cache._disk.count() == 2
+    assert cache._disk.get("a", 0) is None
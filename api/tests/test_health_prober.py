@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from app.common import health_prober
+from app.common.health_prober import HealthProber, get_health_prober
+from app.llm import clients
+
+
+def _prober(app, **kwargs):
+    prober = HealthProber(interval=0, **kwargs)
+    prober.start(app)
+    return prober
+
+
+def test_probe_reports_every_component(app):
+    snapshot = _prober(app).probe_now()
+    assert set(snapshot["components"]) == {"database", "milvus", "embedding", "llm", "audit_writer", "system"}
+    assert snapshot["components"]["database"]["status"] == "healthy"
+    assert all("latency_ms" in component for component in snapshot["components"].values())
+
+
+def test_database_failure_marks_service_unhealthy(app, monkeypatch):
+    def broken():
+        raise RuntimeError("connection refused")
+    monkeypatch.setattr(health_prober, "_probe_database", broken)
+    snapshot = _prober(app).probe_now()
+    assert snapshot["status"] == "unhealthy"
+    assert snapshot["components"]["database"] == {
+        "status": "unhealthy", "error": "connection refused",
+        "latency_ms": snapshot["components"]["database"]["latency_ms"],
+    }
+
+
+def test_stale_snapshot_is_degraded(app, monkeypatch):
+    for name in ("_probe_milvus", "_probe_embedding", "_probe_llm"):
+        monkeypatch.setattr(health_prober, name, lambda *args: {"status": "healthy"})
+    prober = _prober(app, stale_after=30)
+    assert prober.probe_now()["status"] == "healthy"
+    prober._snapshot_at = datetime.utcnow() - timedelta(minutes=5)
+    snapshot = prober.snapshot()
+    assert snapshot["stale"] and snapshot["status"] == "degraded"
+
+
+def test_detailed_health_serves_the_snapshot_without_probing(app, client, sql_statements):
+    get_health_prober().probe_now()
+    with sql_statements() as statements:
+        response = client.get('/health/detailed')
+    assert response.status_code == 200
+    assert "database" in response.get_json()["components"]
+    assert statements == []
+
+
+def test_llm_health_never_runs_inference(app, client, monkeypatch, tmp_path):
+    model = tmp_path / "model.gguf"
+    model.write_bytes(b"gguf")
+    app.config["LLAMA_MODEL_PATH"] = str(model)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("health check must not run inference")
+    monkeypatch.setattr(clients, "generate_response", fail)
+    monkeypatch.setattr(clients, "_scheduler", None)
+    get_health_prober().probe_now()
+
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+    response = client.get('/api/llm/health', headers=headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["llm_available"] is True
+    assert body["model_loaded"] is False
+
+
+def test_milvus_probe_searches_the_collection_retrieval_uses(app, monkeypatch):
+    from app import extensions
+    searched = []
+
+    class Client:
+        def search(self, collection_name, **kwargs):
+            searched.append(collection_name)
+            return [[]]
+
+    monkeypatch.setattr(extensions, "_milvus_client", Client())
+    monkeypatch.setattr(extensions, "_milvus_collection", "clinical_notes_v2")
+    assert health_prober._probe_milvus() == {"status": "healthy"}
+    extensions.search_vectors([0.0] * extensions.embedding_dim)
+    assert searched == ["clinical_notes_v2", "clinical_notes_v2"]
@@ -0,0 +1,36 @@
+import numpy as np
+from app import extensions
+
+
+class FakeEmbedModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False):
+        self.calls.append(list(texts))
+        return np.ones((len(texts), 4), dtype=np.float64)
+
+
+class FakeMilvusClient:
+    def __init__(self):
+        self.inserts = []
+
+    def insert(self, collection_name, data):
+        self.inserts.append((collection_name, data))
+        return {"insert_count": len(data), "ids": list(range(len(data)))}
+
+
+def test_insert_documents_batches_generator(monkeypatch):
+    model = FakeEmbedModel()
+    client = FakeMilvusClient()
+    monkeypatch.setattr(extensions, "embed_model", model)
+    monkeypatch.setattr(extensions, "_milvus_client", client)
+
+    docs = ({"text": f"doc {i}", "subject": "test"} for i in range(10))
+    result = extensions.insert_documents(docs, collection_name="test_collection", batch_size=4)
+
+    assert result["insert_count"] == 10
+    assert [len(batch) for batch in model.calls] == [4, 4, 2]
+    assert [len(data) for _, data in client.inserts] == [4, 4, 2]
+    assert client.inserts[0][1][0]["vector"] == [1.0, 1.0, 1.0, 1.0]
+    assert result["docs_per_sec"] >= 0
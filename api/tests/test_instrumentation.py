@@ -0,0 +1,63 @@
+import time
+from prometheus_client import REGISTRY
+from app.llm.scheduler import InferenceScheduler, PRIORITY_PATIENT
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class UsageBackend:
+    concurrency = 1
+
+    def create_chat_completion(self, params):
+        return {"choices": [{"message": {"content": "ok"}}], "usage": {"prompt_tokens": 12, "completion_tokens": 5}}
+
+    def stream_chat_completion(self, params):
+        for piece in ("a", "b", ""):
+            yield {"choices": [{"delta": {"content": piece}}]}
+
+
+def _wait_completed(scheduler, count):
+    deadline = time.monotonic() + 5
+    while scheduler.stats()["completed"] < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_request_latency_and_db_metrics_are_exported(app, client):
+    labels = {"method": "GET", "route": "/health", "status": "200"}
+    before = _sample("http_request_duration_seconds_count", **labels)
+    client.get('/health')
+    assert _sample("http_request_duration_seconds_count", **labels) == before + 1
+    assert _sample("http_requests_in_progress", method="GET", route="/health") == 0
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    body = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/health",status="200"}' in body
+    assert "http_request_db_queries_bucket" in body
+    assert "db_query_duration_seconds_count" in body
+
+
+def test_queries_are_counted_per_request(app, client):
+    before = _sample("http_request_db_queries_sum", route="/api/chat/rooms")
+    from flask_jwt_extended import create_access_token
+    headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+    client.get('/api/chat/rooms', headers=headers)
+    assert _sample("http_request_db_queries_sum", route="/api/chat/rooms") > before
+
+
+def test_llm_tokens_and_queue_wait_are_recorded():
+    scheduler = InferenceScheduler(UsageBackend(), max_queue_size=4, max_wait_seconds=5)
+    prompt, completion = _sample("llm_prompt_tokens_total"), _sample("llm_completion_tokens_total")
+    waits = _sample("llm_queue_wait_seconds_count")
+
+    scheduler.complete({}, PRIORITY_PATIENT)
+    list(scheduler.stream({}, PRIORITY_PATIENT))
+    _wait_completed(scheduler, 2)
+
+    assert _sample("llm_prompt_tokens_total") == prompt + 12
+    assert _sample("llm_completion_tokens_total") == completion + 5 + 2
+    assert _sample("llm_queue_wait_seconds_count") == waits + 2
+    assert _sample("llm_generation_duration_seconds_count", stream="true") >= 1
@@ -0,0 +1,79 @@
+import time
+import zlib
+import numpy as np
+from app.agents import intent_router
+from app.agents.intent_router import FALLBACK_INTENT, IntentRouter, classify_keywords
+from app.agents.orchestrator import classify_intent
+
+DIM = 384
+
+
+def _bag_of_words(texts):
+    """Deterministic stand-in for the sentence embedding model: hashed word counts."""
+    vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().replace("?", "").split():
+            vectors[row, zlib.crc32(word.encode()) % DIM] += 1.0
+    return vectors
+
+
+def _router(**kwargs):
+    router = IntentRouter(embed=_bag_of_words, **kwargs)
+    router.build()
+    return router
+
+
+def test_routes_to_the_intent_of_the_closest_exemplar():
+    router = _router(threshold=0.3)
+    # Substring scanning sent this to the symptom agent because of "i have"
+    assert router.route_batch(["I have a question about my last bill"])[0][0] == "billing"
+    assert router.route_batch(["I need a refill of my inhaler prescription"])[0][0] == "prescription"
+    assert router.route_batch(["What are the side effects of metformin?"])[0][0] == "medication"
+
+    intent, confidence = router.route_batch(["zebra quantum violin"])[0]
+    assert intent == FALLBACK_INTENT and confidence < 0.3
+    stats = router.stats()
+    assert (stats["routed"], stats["low_confidence"]) == (4, 1)
+
+
+def test_batch_classification_matches_single_queries():
+    router = _router()
+    queries = ["My stomach hurts", "How do I pay my balance?", "Hello", "Can I take ibuprofen with food?"]
+    vectors = _bag_of_words(queries)
+    batch = router.classify_batch(vectors)
+    single = [router.classify(v) for v in vectors]
+    assert [intent for intent, _ in batch] == [intent for intent, _ in single]
+    assert np.allclose([c for _, c in batch], [c for _, c in single], atol=1e-6)
+    scores = router.scores(vectors[1])
+    assert max(scores, key=scores.get) == "billing"
+
+
+def test_classify_intent_uses_router_and_falls_back_to_keywords(app, monkeypatch):
+    monkeypatch.setattr(intent_router, "embed_query", lambda text: _bag_of_words([text])[0])
+    monkeypatch.setattr(intent_router, "_intent_router", _router())
+    assert classify_intent("I have a question about my invoice") == "billing"
+
+    # Embedding model unavailable: the router stays unbuilt and keywords are used
+    monkeypatch.setattr(intent_router, "_intent_router", IntentRouter(embed=_bag_of_words))
+    assert classify_intent("I have a billing question") == "billing"
+    assert classify_keywords("I have a fever") == "symptom"
+
+
+def test_routing_is_sub_millisecond():
+    rng = np.random.default_rng(0)
+    exemplars = {f"intent{i}": [f"example {i} {j}" for j in range(100)] for i in range(5)}
+    router = IntentRouter(exemplars=exemplars, embed=lambda texts: rng.standard_normal((len(texts), DIM)))
+    router.build()
+    queries = rng.standard_normal((1000, DIM)).astype(np.float32)
+
+    started = time.perf_counter()
+    for vector in queries:
+        router.classify(vector)
+    per_query = (time.perf_counter() - started) / len(queries)
+
+    started = time.perf_counter()
+    assert len(router.classify_batch(queries)) == 1000
+    batch_per_query = (time.perf_counter() - started) / len(queries)
+
+    assert per_query < 1e-3
+    assert batch_per_query < per_query
@@ -0,0 +1,105 @@
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.auth.models import User
+from app.billing.models import Invoice, Payment
+from app.billing.services import recompute_paid_totals
+
+
+def _user(role='patient', name='payer'):
+    user = User(username=name, email=f'{name}@example.com', role=role)
+    user.set_password('pw')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_payments_maintain_paid_total_and_status(app):
+    user = _user()
+    invoice = Invoice(patient_id=user.id, amount=100)
+    db.session.add(invoice)
+    db.session.commit()
+
+    first = Payment(invoice_id=invoice.id, amount=40)
+    db.session.add(first)
+    db.session.commit()
+    assert invoice.paid_total == 40
+    assert invoice.balance == 60
+    assert invoice.status == 'pending'
+
+    second = Payment(invoice_id=invoice.id, amount=60)
+    db.session.add(second)
+    db.session.commit()
+    assert invoice.paid_total == 100
+    assert invoice.status == 'paid'
+
+    second.amount = 50
+    db.session.commit()
+    assert invoice.paid_total == 90
+    assert invoice.status == 'pending'
+
+    db.session.delete(first)
+    db.session.commit()
+    assert invoice.paid_total == 50
+    assert invoice.balance == 50
+
+
+def test_moving_a_payment_updates_both_invoices(app):
+    user = _user()
+    source, target = Invoice(patient_id=user.id, amount=30), Invoice(patient_id=user.id, amount=30)
+    db.session.add_all([source, target])
+    db.session.commit()
+    payment = Payment(invoice_id=source.id, amount=30)
+    db.session.add(payment)
+    db.session.commit()
+    assert source.status == 'paid'
+
+    payment.invoice_id = target.id
+    db.session.commit()
+    assert (source.paid_total, source.status) == (0, 'pending')
+    assert (target.paid_total, target.status) == (30, 'paid')
+
+
+def test_recompute_repairs_drifted_totals(app):
+    user = _user()
+    invoice = Invoice(patient_id=user.id, amount=20)
+    db.session.add(invoice)
+    db.session.commit()
+    db.session.add(Payment(invoice_id=invoice.id, amount=20))
+    db.session.commit()
+    db.session.execute(Invoice.__table__.update().values(paid_total=0, status='pending'))
+    db.session.commit()
+
+    assert recompute_paid_totals() == 1
+    db.session.expire_all()
+    assert (invoice.paid_total, invoice.status) == (20, 'paid')
+
+
+def test_bulk_balances_use_one_query_per_page(app, client, sql_statements):
+    user = _user()
+    for i in range(5):
+        invoice = Invoice(patient_id=user.id, amount=100)
+        invoice.payments.extend(Payment(amount=10) for _ in range(i * 3))
+        db.session.add(invoice)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+    with sql_statements() as statements:
+        response = client.get('/api/billing/invoices/balances?open=true&limit=3', headers=headers)
+
+    assert response.status_code == 200
+    assert [b['balance'] for b in response.json] == [100, 70, 40]
+    assert response.headers['X-Next-Cursor']
+    assert [s for s in statements if 'FROM invoice' in s and 'payment' not in s.lower()]
+    assert not [s for s in statements if 'FROM payment' in s]
+
+    rest = client.get(
+        f"/api/billing/invoices/balances?open=true&limit=3&cursor={response.headers['X-Next-Cursor']}",
+        headers=headers,
+    )
+    # The last invoice is paid in full and filtered out
+    assert [b['balance'] for b in rest.json] == [10]
+    assert 'X-Next-Cursor' not in rest.headers
+
+    selected = client.get('/api/billing/invoices/balances?ids=1,5', headers=headers)
+    assert [(b['invoice_id'], b['status']) for b in selected.json] == [(1, 'pending'), (5, 'paid')]
+    assert client.get('/api/billing/invoices/balances?ids=x', headers=headers).status_code == 400
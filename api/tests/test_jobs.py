@@ -0,0 +1,247 @@
+from datetime import datetime, timedelta
+import time
+import pytest
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.auth.models import User
+from app.common.authz_cache import get_authz_cache
+from app.jobs.models import Job, JobStatus, JobTypeLock
+from app.jobs import services as job_services
+from app.jobs.services import InvalidJobParamsError, JobError, JobNotifier, JobWorker, submit_job, task
+from app.llm.scheduler import current_cancel_event
+from app.medications import services as medication_services
+
+_calls = []
+
+
+@task("test_echo", concurrency=1, timeout=5)
+def _echo(value):
+    _calls.append(value)
+    return {"echo": value}
+
+
+@task("test_flaky", timeout=5, max_attempts=2)
+def _flaky():
+    raise RuntimeError("backend unavailable")
+
+
+@task("test_missing", timeout=5)
+def _missing():
+    raise JobError("record not found")
+
+
+@task("test_slow", timeout=0.1, max_attempts=2)
+def _slow():
+    # Stands in for an LLM request, which gives up as soon as the attempt is cancelled
+    current_cancel_event().wait(5)
+
+
+@task("test_stuck", concurrency=1, timeout=0.1)
+def _stuck(n=0):
+    time.sleep(1)  # ignores cancellation
+
+
+@pytest.fixture
+def worker(app):
+    _calls.clear()
+    worker = JobWorker(threads=0, retry_backoff=0)
+    worker.start(app)
+    return worker
+
+
+def _user(name, role='user'):
+    user = User(username=name, email=f'{name}@example.com', role=role)
+    user.set_password('pw')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_identical_in_flight_jobs_are_shared(worker):
+    first, created = submit_job("test_echo", {"value": 1}, user_id=1)
+    again, created_again = submit_job("test_echo", {"value": 1}, user_id=1)
+    other_user, _ = submit_job("test_echo", {"value": 1}, user_id=2)
+    assert created and not created_again
+    assert again.id == first.id and other_user.id != first.id
+
+    worker.run_once()
+    worker.run_once()
+    # Once finished, the same request queues a fresh job
+    fresh, created = submit_job("test_echo", {"value": 1}, user_id=1)
+    assert created and fresh.id != first.id
+
+    with pytest.raises(InvalidJobParamsError):
+        submit_job("test_echo", {"wrong": 1})
+
+
+def test_successful_job_stores_its_result(worker):
+    job, _ = submit_job("test_echo", {"value": "hi"})
+    assert worker.run_once() is True
+    assert worker.run_once() is False
+
+    job = db.session.get(Job, job.id, populate_existing=True)
+    assert (job.status, job.attempts) == (JobStatus.SUCCEEDED, 1)
+    assert job.to_dict()['result'] == {"echo": "hi"}
+    assert _calls == ["hi"]
+
+
+def test_failed_attempts_are_retried_until_max_attempts(worker):
+    job, _ = submit_job("test_flaky")
+    worker.run_once()
+    job = db.session.get(Job, job.id, populate_existing=True)
+    assert (job.status, job.attempts) == (JobStatus.QUEUED, 1)
+    assert 'backend unavailable' in job.error
+
+    worker.run_once()
+    job = db.session.get(Job, job.id, populate_existing=True)
+    assert (job.status, job.attempts) == (JobStatus.FAILED, 2)
+    assert job.finished_at is not None
+
+
+def test_job_error_fails_without_retrying(worker):
+    job, _ = submit_job("test_missing")
+    worker.run_once()
+    job = db.session.get(Job, job.id, populate_existing=True)
+    assert (job.status, job.attempts) == (JobStatus.FAILED, 1)
+    assert job.error == 'JobError: record not found'
+
+
+def test_attempt_is_cancelled_after_its_timeout(worker):
+    job, _ = submit_job("test_slow")
+    started = time.perf_counter()
+    worker.run_once()
+    assert time.perf_counter() - started < 0.9
+    job = db.session.get(Job, job.id, populate_existing=True)
+    assert (job.status, job.attempts) == (JobStatus.QUEUED, 1)
+    assert job.error.startswith('Timed out')
+
+
+def test_attempt_that_ignores_cancellation_keeps_its_slot(app):
+    worker = JobWorker(threads=0, retry_backoff=0, cancel_grace=0.1)
+    worker.start(app)
+    stuck, _ = submit_job("test_stuck", {"n": 1})
+    worker.run_once()
+    stuck = db.session.get(Job, stuck.id, populate_existing=True)
+    # Not retried, so attempts never pile up on a thread that is still running
+    assert (stuck.status, stuck.attempts) == (JobStatus.FAILED, 1)
+    assert 'did not stop' in stuck.error
+
+    queued, _ = submit_job("test_stuck", {"n": 2})
+    assert worker.claim() is None
+    time.sleep(1)
+    assert worker.claim().id == queued.id
+
+
+def test_concurrency_limit_is_enforced_across_workers(worker):
+    # A job of the same type already running in another worker holds the only slot
+    running, _ = submit_job("test_echo", {"value": "elsewhere"})
+    running.status = JobStatus.RUNNING
+    running.attempts = 1
+    db.session.commit()
+    queued, _ = submit_job("test_echo", {"value": "next"})
+
+    assert worker.claim() is None
+    worker._finish(running.id, 1, JobStatus.SUCCEEDED, result=None)
+    claimed = worker.claim()
+    assert claimed.id == queued.id and claimed.status == JobStatus.RUNNING
+    # Claims of the type are serialized on its lock row
+    assert db.session.get(JobTypeLock, "test_echo") is not None
+
+
+def test_expired_lease_is_requeued(worker):
+    job, _ = submit_job("test_echo", {"value": 1})
+    worker.claim()
+    db.session.query(Job).filter_by(id=job.id).update({"lease_expires_at": datetime.utcnow() - timedelta(minutes=1)})
+    db.session.commit()
+    assert worker.reap_expired() == 1
+    job = db.session.get(Job, job.id, populate_existing=True)
+    assert job.status == JobStatus.QUEUED
+
+
+def test_async_endpoint_queues_a_job_the_submitter_can_collect(app, client, worker, monkeypatch):
+    get_authz_cache().clear()
+    try:
+        monkeypatch.setattr(medication_services, 'generate_response', lambda messages, **kwargs: 'Take with food.')
+        owner, stranger = _user('jobowner'), _user('stranger')
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(owner.id))}'}
+        other = {'Authorization': f'Bearer {create_access_token(identity=str(stranger.id))}'}
+
+        response = client.post('/api/medications/counseling?async=true', json={'medication': ' Ibuprofen '},
+                               headers=headers)
+        assert response.status_code == 202
+        job_id = response.json['job_id']
+        assert response.headers['Location'].endswith(f'/api/jobs/{job_id}')
+        assert client.get(f'/api/jobs/{job_id}/result', headers=headers).status_code == 202
+        assert client.get(f'/api/jobs/{job_id}', headers=other).status_code == 404
+
+        worker.run_once()
+        result = client.get(f'/api/jobs/{job_id}/result', headers=headers)
+        assert result.status_code == 200
+        assert result.json['result'] == {'counseling': 'Take with food.'}
+        assert client.get(f'/api/jobs/{job_id}', headers=headers).json['status'] == JobStatus.SUCCEEDED
+
+        unknown = client.post('/api/jobs', json={'type': 'nope'}, headers=headers)
+        assert unknown.status_code == 400 and 'medication_counseling' in unknown.json['types']
+    finally:
+        get_authz_cache().clear()
+
+
+def test_notifier_emits_once_for_watched_jobs(worker, monkeypatch):
+    emitted = []
+    monkeypatch.setattr(job_services.socketio, 'emit', lambda event, data, to=None: emitted.append((event, data, to)))
+    notifier = JobNotifier(interval=0)
+    job, _ = submit_job("test_echo", {"value": 1})
+    unwatched, _ = submit_job("test_echo", {"value": 2})
+    notifier.watch(job.id)
+    notifier.watch("no-such-job")
+
+    assert notifier.poll() == 0  # still queued
+    worker.run_once()
+    worker.run_once()
+    assert notifier.poll() == 1
+    assert notifier.poll() == 0
+    assert emitted == [("job_finished", {"job_id": job.id, "type": "test_echo", "status": JobStatus.SUCCEEDED},
+                        f"job:{job.id}")]
+    assert notifier._watched == set()
+
+
+def test_only_the_submitter_or_an_admin_can_watch_a_job(app, worker):
+    from flask_socketio import SocketIOTestClient
+    from app.extensions import socketio
+
+    owner, other, admin = _user('owner'), _user('other'), _user('admin', role='admin')
+    job, _ = submit_job("test_echo", {"value": 1}, user_id=owner.id)
+
+    def watch(user):
+        client = SocketIOTestClient(app, socketio, auth={'token': create_access_token(identity=str(user.id))})
+        client.emit('watch_job', {'job_id': job.id})
+        received = client.get_received()
+        client.disconnect()
+        return received
+
+    try:
+        assert watch(other) == [{'name': 'error', 'args': [{'message': f'Job {job.id} not found.'}], 'namespace': '/'}]
+        assert job.id not in job_services.get_job_notifier()._watched
+        assert watch(owner) == []
+        assert watch(admin) == []
+        assert job.id in job_services.get_job_notifier()._watched
+    finally:
+        get_authz_cache().clear()
+
+
+def test_worker_app_starts_no_background_services(monkeypatch):
+    import app as app_package
+    from app.patients import services as patient_services
+    started = []
+    for module, name in ((app_package, 'init_rollup_compactor'), (app_package, 'init_metrics_recorder'),
+                         (app_package, 'init_health_prober'), (patient_services, 'init_summary_pregenerator'),
+                         (job_services, 'init_jobs')):
+        monkeypatch.setattr(module, name, lambda app, name=name: started.append(name))
+
+    # As run_jobs.py creates its app
+    app_package.create_app({'BACKGROUND_SERVICES': False, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    assert started == []
+    app_package.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    assert sorted(started) == ['init_health_prober', 'init_jobs', 'init_metrics_recorder',
+                               'init_rollup_compactor', 'init_summary_pregenerator']
+    app_package.stop_background_services()
@@ -0,0 +1,108 @@
+from datetime import date, datetime
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.auth.models import User
+from app.patients.models import Patient
+from app.clinical.models import Observation, Appointment
+from app.medications.models import Prescription
+from app.billing.models import Invoice
+
+
+def _patients(count=2):
+    patients = []
+    for i in range(count):
+        user = User(username=f'lister{i}', email=f'lister{i}@example.com', role='patient')
+        user.set_password('pw')
+        db.session.add(user)
+        db.session.flush()
+        patient = Patient(user_id=user.id, first_name=f'P{i}', last_name='Lister', date_of_birth=date(1990, 1, 1),
+                          gender='female' if i % 2 else 'male')
+        db.session.add(patient)
+        patients.append(patient)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(patients[0].user_id))}'}
+    return patients, headers
+
+
+def test_observations_page_through_with_keyset_cursor(app, client):
+    (first, second), headers = _patients()
+    for i in range(7):
+        db.session.add(Observation(patient_id=first.id, code='hr', value=str(60 + i),
+                                   effective_datetime=datetime(2024, 1, 1 + i)))
+    db.session.add(Observation(patient_id=second.id, code='hr', value='90'))
+    db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        url = f'/api/clinical/observations?patient_id={first.id}&limit=3' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        seen.extend(o['value'] for o in response.json)
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert seen == [str(60 + i) for i in range(7)]
+
+    ranged = client.get(
+        f'/api/clinical/observations?patient_id={first.id}&from=2024-01-03&to=2024-01-04T00:00:00', headers=headers
+    )
+    assert [o['value'] for o in ranged.json] == ['62', '63']
+
+
+def test_fields_projection_selects_only_requested_columns(app, client, sql_statements):
+    (patient, _), headers = _patients()
+    db.session.add(Appointment(patient_id=patient.id, appointment_datetime=datetime(2024, 5, 1, 9),
+                               status='booked', practitioner='Dr. A', notes='long notes'))
+    db.session.commit()
+
+    with sql_statements() as statements:
+        response = client.get('/api/clinical/appointments?fields=status,appointment_datetime', headers=headers)
+
+    assert response.json == [{'id': 1, 'status': 'booked', 'appointment_datetime': '2024-05-01T09:00:00'}]
+    [select] = [s for s in statements if 'FROM appointments' in s]
+    assert 'notes' not in select and 'practitioner' not in select
+
+
+def test_filters_and_invalid_queries(app, client):
+    (patient, other), headers = _patients()
+    db.session.add_all([
+        Prescription(patient_id=patient.id, medication_name='a', status='active', start_date=date(2024, 1, 1)),
+        Prescription(patient_id=patient.id, medication_name='b', status='stopped', start_date=date(2024, 2, 1)),
+        Invoice(patient_id=patient.user_id, amount=50, paid_total=20),
+    ])
+    db.session.commit()
+
+    active = client.get('/api/medications/prescriptions?status=active', headers=headers)
+    assert [rx['medication_name'] for rx in active.json] == ['a']
+    assert client.get('/api/patients?gender=female', headers=headers).json[0]['id'] == other.id
+    invoices = client.get('/api/billing/invoices?fields=balance', headers=headers)
+    assert invoices.json == [{'id': 1, 'balance': 30.0}]
+
+    assert client.get('/api/clinical/encounters?fields=secret', headers=headers).status_code == 400
+    assert client.get('/api/clinical/encounters?patient_id=abc', headers=headers).status_code == 400
+    assert client.get('/api/clinical/encounters?from=yesterday', headers=headers).status_code == 400
+
+
+def test_page_size_is_capped(app, client):
+    (patient, _), headers = _patients()
+    app.config['MAX_PAGE_SIZE'] = 5
+    db.session.add_all(Observation(patient_id=patient.id, code='t') for _ in range(8))
+    db.session.commit()
+    response = client.get('/api/clinical/observations?limit=1000', headers=headers)
+    assert len(response.json) == 5
+    assert response.headers['X-Next-Cursor']
+
+
+def test_count_reports_every_matching_row(app, client):
+    (patient, _), headers = _patients()
+    db.session.add_all(
+        Prescription(patient_id=patient.id, medication_name=f'm{i}', status='active' if i < 6 else 'stopped')
+        for i in range(8)
+    )
+    db.session.commit()
+
+    response = client.get('/api/medications/prescriptions?status=active&count=true&limit=1&fields=id',
+                          headers=headers)
+    assert len(response.json) == 1
+    assert response.headers['X-Total-Count'] == '6'
+    assert 'X-Total-Count' not in client.get('/api/medications/prescriptions', headers=headers).headers
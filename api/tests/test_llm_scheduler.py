@@ -0,0 +1,164 @@
+import threading
+import time
+import pytest
+from app.llm.scheduler import (
+    InferenceCancelledError, InferenceScheduler, SchedulerBusyError, cancel_on, resolve_priority,
+    PRIORITY_CLINICIAN, PRIORITY_PATIENT,
+)
+
+
+class FakeBackend:
+    concurrency = 1
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.served = []
+
+    def create_chat_completion(self, params):
+        self.release.wait(5)
+        self.served.append(params["tag"])
+        return {"choices": [{"message": {"content": params["tag"]}}]}
+
+    def stream_chat_completion(self, params):
+        for piece in ("a", "b", "c"):
+            yield {"choices": [{"delta": {"content": piece}}]}
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_resolve_priority_orders_clinicians_first():
+    assert resolve_priority(["clinician"]) < resolve_priority(["patient"])
+    assert resolve_priority(["patient"]) < resolve_priority(["clinician"], background=True)
+
+
+def test_higher_priority_served_first():
+    backend = FakeBackend()
+    scheduler = InferenceScheduler(backend, max_queue_size=8, max_wait_seconds=5)
+
+    threads = [threading.Thread(target=scheduler.complete, args=({"tag": "blocker"}, PRIORITY_PATIENT))]
+    threads[0].start()
+    _wait_until(lambda: scheduler.stats()["in_flight"] > 0)
+    for tag, priority in (("patient", PRIORITY_PATIENT), ("clinician", PRIORITY_CLINICIAN)):
+        t = threading.Thread(target=scheduler.complete, args=({"tag": tag}, priority))
+        t.start()
+        threads.append(t)
+    _wait_until(lambda: scheduler.stats()["queue_depth"] == 2)
+
+    backend.release.set()
+    for t in threads:
+        t.join(5)
+
+    assert backend.served == ["blocker", "clinician", "patient"]
+
+
+def test_full_queue_rejects_with_retry_after():
+    backend = FakeBackend()
+    scheduler = InferenceScheduler(backend, max_queue_size=1, max_wait_seconds=5)
+
+    blocker = threading.Thread(target=scheduler.complete, args=({"tag": "blocker"}, PRIORITY_PATIENT))
+    blocker.start()
+    _wait_until(lambda: scheduler.stats()["in_flight"] > 0)
+    queued = threading.Thread(target=scheduler.complete, args=({"tag": "queued"}, PRIORITY_PATIENT))
+    queued.start()
+    _wait_until(lambda: scheduler.stats()["queue_depth"] > 0)
+
+    with pytest.raises(SchedulerBusyError) as exc:
+        scheduler.complete({"tag": "overflow"}, PRIORITY_PATIENT)
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after >= 1
+
+    backend.release.set()
+    blocker.join(5)
+    queued.join(5)
+
+
+def test_stream_yields_chunks():
+    scheduler = InferenceScheduler(FakeBackend(), max_queue_size=4, max_wait_seconds=5)
+    chunks = list(scheduler.stream({"tag": "s"}, PRIORITY_PATIENT))
+    assert [c["choices"][0]["delta"]["content"] for c in chunks] == ["a", "b", "c"]
+
+
+class SlowStreamBackend(FakeBackend):
+    def __init__(self):
+        super().__init__()
+        self.closed = threading.Event()
+
+    def stream_chat_completion(self, params):
+        try:
+            for i in range(500):
+                time.sleep(0.01)
+                yield {"choices": [{"delta": {"content": str(i)}}]}
+        finally:
+            self.closed.set()
+
+
+def test_completion_in_cancel_scope_is_assembled_from_the_stream():
+    scheduler = InferenceScheduler(FakeBackend(), max_queue_size=4, max_wait_seconds=5)
+    with cancel_on(threading.Event()):
+        response = scheduler.complete({"tag": "s"}, PRIORITY_PATIENT)
+    assert response["choices"][0]["message"]["content"] == "abc"
+
+
+def test_cancelled_completion_stops_generating():
+    backend = SlowStreamBackend()
+    scheduler = InferenceScheduler(backend, max_queue_size=4, max_wait_seconds=5)
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+
+    started = time.monotonic()
+    with cancel_on(cancel), pytest.raises(InferenceCancelledError):
+        scheduler.complete({"tag": "c"}, PRIORITY_PATIENT)
+    # Well before the 500 tokens (~5s) would have been generated
+    assert time.monotonic() - started < 1
+    assert backend.closed.wait(1)
+
+    with cancel_on(cancel), pytest.raises(InferenceCancelledError):
+        scheduler.complete({"tag": "refused"}, PRIORITY_PATIENT)
+
+
+def test_cancelled_request_is_dropped_from_the_queue():
+    backend = FakeBackend()
+    scheduler = InferenceScheduler(backend, max_queue_size=4, max_wait_seconds=5)
+    blocker = threading.Thread(target=scheduler.complete, args=({"tag": "blocker"}, PRIORITY_PATIENT))
+    blocker.start()
+    _wait_until(lambda: scheduler.stats()["in_flight"] > 0)
+
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    with cancel_on(cancel), pytest.raises(InferenceCancelledError):
+        scheduler.complete({"tag": "queued"}, PRIORITY_PATIENT)
+
+    # Taken out of the queue straight away, not when a dispatcher reaches it
+    assert scheduler.stats()["queue_depth"] == 0
+
+    backend.release.set()
+    blocker.join(5)
+    _wait_until(lambda: scheduler.stats()["completed"] == 1)
+    assert scheduler.stats()["completed"] == 1
+
+
+def test_expired_request_frees_its_queue_slot():
+    backend = FakeBackend()
+    scheduler = InferenceScheduler(backend, max_queue_size=1, max_wait_seconds=0.2)
+    blocker = threading.Thread(target=scheduler.complete, args=({"tag": "blocker"}, PRIORITY_PATIENT))
+    blocker.start()
+    _wait_until(lambda: scheduler.stats()["in_flight"] > 0)
+
+    with pytest.raises(SchedulerBusyError) as exc:
+        scheduler.complete({"tag": "expired"}, PRIORITY_PATIENT)
+    assert exc.value.status_code == 503
+    assert scheduler.stats()["queue_depth"] == 0
+
+    # The slot is free again, so the next request is queued instead of rejected with 429
+    queued = threading.Thread(target=scheduler.complete, args=({"tag": "queued"}, PRIORITY_PATIENT))
+    queued.start()
+    _wait_until(lambda: scheduler.stats()["queue_depth"] == 1)
+    backend.release.set()
+    blocker.join(5)
+    queued.join(5)
+    assert backend.served == ["blocker", "queued"]
@@ -0,0 +1,133 @@
+import threading
+import textwrap
+import os
+import time
+import pytest
+from app.llm import worker_pool
+from app.llm.worker_pool import LLMWorkerPool, WorkerCrashedError, WorkerUnavailableError
+
+# Serves the real llm_worker protocol with a model whose behaviour is picked by the prompt:
+# "crash" exits the process mid-request, "sleep <s>" holds the worker, "stream" yields chunks
+# slowly until cancelled.
+FAKE_WORKER = textwrap.dedent("""
+    from multiprocessing.connection import Connection
+    import argparse
+    import time
+    import sys
+    import os
+
+    sys.path.insert(0, {llm_dir!r})
+    from llm_worker import serve
+
+
+    class FakeModel:
+        def n_ctx(self):
+            return 512
+
+        def prefix_cache_stats(self):
+            return {{}}
+
+        def warm_prefixes(self, prefixes):
+            return {{}}
+
+        def create_chat_completion(self, stream=False, messages=(), **params):
+            prompt = messages[-1]["content"]
+            if prompt == "crash":
+                os._exit(3)
+            if prompt.startswith("sleep"):
+                time.sleep(float(prompt.split()[1]))
+            if stream:
+                return self._stream()
+            return {{"choices": [{{"message": {{"content": f"{{os.getpid()}}:{{prompt}}"}}}}]}}
+
+        def _stream(self):
+            for i in range(200):
+                time.sleep(0.01)
+                yield {{"choices": [{{"delta": {{"content": str(i)}}}}]}}
+
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fd", type=int)
+    args, _ = parser.parse_known_args()
+    conn = Connection(args.fd)
+    conn.send(("ready", None, {{"pid": os.getpid(), "n_ctx": 512}}))
+    serve(conn, FakeModel())
+""")
+
+
+@pytest.fixture
+def make_pool(tmp_path, monkeypatch):
+    script = tmp_path / "fake_worker.py"
+    script.write_text(FAKE_WORKER.format(llm_dir=os.path.dirname(worker_pool.WORKER_SCRIPT)))
+    monkeypatch.setattr(worker_pool, "WORKER_SCRIPT", str(script))
+    pools = []
+
+    def make(**kwargs):
+        kwargs.setdefault("health_interval", 60)
+        pool = LLMWorkerPool("/models/fake.gguf", prefix_cache_size=0, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def _params(content):
+    return {"messages": [{"role": "user", "content": content}], "max_tokens": 8}
+
+
+def _content(response):
+    return response["choices"][0]["message"]["content"]
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+
+def test_crashed_worker_fails_its_request_and_is_restarted(make_pool):
+    pool = make_pool(num_workers=1)
+    pid = _content(pool.create_chat_completion(_params("hello"))).split(":")[0]
+
+    with pytest.raises(WorkerCrashedError):
+        pool.create_chat_completion(_params("crash"))
+
+    _wait_for(lambda: pool.stats()[0]["state"] == "idle")
+    stats = pool.stats()[0]
+    assert (stats["restarts"], stats["failures"]) == (1, 1)
+    new_pid, reply = _content(pool.create_chat_completion(_params("again"))).split(":")
+    assert reply == "again" and new_pid != pid
+
+
+def test_closed_stream_is_drained_and_the_worker_reused(make_pool):
+    pool = make_pool(num_workers=1)
+    stream = pool.stream_chat_completion(_params("stream"))
+    assert next(stream)["choices"][0]["delta"]["content"] == "0"
+    started = time.monotonic()
+    stream.close()
+    # Cancelled long before the 200 chunks (~2s) would have finished
+    assert time.monotonic() - started < 1
+
+    stats = pool.stats()[0]
+    assert (stats["state"], stats["restarts"], stats["failures"]) == ("idle", 0, 0)
+    pid = str(stats["pid"])
+    # No leftover chunk of the cancelled stream is read as this request's reply
+    assert _content(pool.create_chat_completion(_params("next"))) == f"{pid}:next"
+
+
+def test_acquire_times_out_when_every_worker_is_busy(make_pool):
+    pool = make_pool(num_workers=1, start_timeout=1)
+    _wait_for(pool.is_ready)
+    holder = threading.Thread(target=pool.create_chat_completion, args=(_params("sleep 3"),))
+    holder.start()
+    _wait_for(lambda: pool.stats()[0]["state"] == "busy")
+
+    started = time.monotonic()
+    with pytest.raises(WorkerUnavailableError):
+        pool.create_chat_completion(_params("waiting"))
+    assert 0.9 < time.monotonic() - started < 2.5
+    holder.join(5)
+    assert pool.stats()[0]["served"] == 1
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+import json
+import threading
+import time
+from app.extensions import db
+from app.dashboard.models import AppMetric, UserActivity
+from app.dashboard.recorder import MetricsRecorder, get_metrics_recorder
+from app.dashboard.rollups import RollupCompactor
+from app.dashboard.services import get_api_call_counts_per_endpoint, record_metric, record_user_activity
+
+
+def _recorder(app, **kwargs):
+    recorder = MetricsRecorder(flush_interval=0, **kwargs)
+    recorder.start(app)
+    return recorder
+
+
+def test_recording_does_not_touch_the_database(app, sql_statements):
+    recorder = _recorder(app)
+    with sql_statements() as statements:
+        for _ in range(100):
+            recorder.increment('api_call', 1, 'endpoint', '/api/patients')
+            recorder.observe('request_latency_ms', 12.5, 'endpoint', '/api/patients')
+    assert statements == []
+    assert AppMetric.query.count() == 0
+
+
+def test_flush_writes_one_summarized_row_per_metric(app):
+    recorder = _recorder(app)
+
+    def work():
+        for value in (1, 2, 3):
+            recorder.increment('api_call', 1, 'endpoint', '/api/patients')
+            recorder.observe('request_latency_ms', value * 10, 'endpoint', '/api/patients')
+        recorder.gauge('queue_depth', 4)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert recorder.flush()
+
+    calls = AppMetric.query.filter_by(metric_name='api_call').one()
+    assert (calls.value, calls.sample_count) == (12, 12)
+    latency = AppMetric.query.filter_by(metric_name='request_latency_ms').one()
+    assert (latency.sample_count, latency.value, latency.min_value, latency.max_value) == (12, 240, 10, 30)
+    assert json.loads(latency.buckets)['25'] == 4
+    gauge = AppMetric.query.filter_by(metric_name='queue_depth').one()
+    assert (gauge.value, gauge.sample_count) == (4, 1)
+
+    # Drained buffers produce nothing on the next flush
+    assert recorder.flush()
+    assert AppMetric.query.count() == 3
+
+
+def test_failed_flush_keeps_rows_for_the_next_attempt(app):
+    recorder = _recorder(app)
+    recorder.increment('api_call', 1, 'endpoint', '/api/chat/rooms')
+    db.drop_all()
+    assert not recorder.flush()
+    assert recorder.stats()['pending_rows'] == 1
+    db.create_all()
+    assert recorder.flush()
+    assert AppMetric.query.one().sample_count == 1
+
+
+def test_services_and_requests_feed_the_rollups(app, client):
+    # The process-wide recorder may still hold samples from requests made by other tests
+    get_metrics_recorder().flush()
+    AppMetric.query.delete()
+    UserActivity.query.delete()
+    db.session.commit()
+
+    record_metric('api_call', 1, 'endpoint', '/manual')
+    record_user_activity(None, 'login')
+    client.get('/health')
+    get_metrics_recorder().flush()
+    assert UserActivity.query.count() == 1
+
+    for metric in AppMetric.query.all():
+        metric.timestamp = datetime.utcnow() - timedelta(minutes=1)
+    db.session.commit()
+    RollupCompactor().compact()
+    counts = {entry['endpoint']: entry['count'] for entry in get_api_call_counts_per_endpoint(24)}
+    assert counts['/manual'] == 1
+    assert counts['/health'] == 1
+
+
+def test_requests_are_counted_without_duplicating_prometheus_timings(app, client):
+    recorder = get_metrics_recorder()
+    recorder.flush()
+    AppMetric.query.delete()
+    db.session.commit()
+
+    client.get('/health')
+    recorder.flush()
+    assert {m.metric_name for m in AppMetric.query} == {'api_call'}
+
+
+def test_flusher_survives_unexpected_errors(app, monkeypatch):
+    recorder = MetricsRecorder(flush_interval=0.01)
+    failures = []
+
+    def collect():
+        failures.append(1)
+        raise TypeError('bad sample')
+
+    monkeypatch.setattr(recorder, '_collect', collect)
+    recorder.start(app)
+    # A second attempt means the thread outlived the first error
+    deadline = time.monotonic() + 5
+    while len(failures) < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    recorder._stop.set()
+    assert recorder.stats()['flush_failures'] >= 1
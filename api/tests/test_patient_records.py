@@ -0,0 +1,69 @@
+from datetime import date, datetime, timedelta
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.auth.models import User
+from app.patients.models import Patient
+from app.patients import services as patient_services
+from app.patients.services import load_patient_record, record_text
+from app.clinical.models import Encounter, Observation, Appointment
+
+
+def _patient_with_history():
+    user = User(username='longhistory', email='longhistory@example.com', role='patient')
+    user.set_password('pw')
+    db.session.add(user)
+    db.session.flush()
+    patient = Patient(user_id=user.id, first_name='Ada', last_name='Long', date_of_birth=date(1970, 1, 1),
+                      gender='female')
+    db.session.add(patient)
+    db.session.flush()
+    start = datetime(2020, 1, 1)
+    for i in range(30):
+        db.session.add(Encounter(patient_id=patient.id, status='finished', encounter_class='AMB',
+                                 period_start=start + timedelta(days=i), reason=f'visit {i}'))
+        db.session.add(Observation(patient_id=patient.id, code='hr', value=str(i), unit='bpm',
+                                   effective_datetime=start + timedelta(days=i)))
+    now = datetime.utcnow()
+    db.session.add(Appointment(patient_id=patient.id, appointment_datetime=now - timedelta(days=3), status='done'))
+    for i in range(8):
+        db.session.add(Appointment(patient_id=patient.id, appointment_datetime=now + timedelta(days=i + 1),
+                                   status='booked', reason=f'follow-up {i}'))
+    db.session.commit()
+    return user, patient
+
+
+def test_record_holds_only_the_most_recent_rows(app):
+    _, patient = _patient_with_history()
+    record = load_patient_record(patient.id, window=5)
+
+    assert (record['patient'].encounter_count, record['patient'].observation_count,
+            record['patient'].appointment_count) == (30, 30, 9)
+    assert [e.reason for e in record['encounters']] == [f'visit {i}' for i in range(29, 24, -1)]
+    assert [o.value for o in record['observations']] == ['29', '28', '27', '26', '25']
+    # Upcoming only, soonest first
+    assert [a.reason for a in record['appointments']] == [f'follow-up {i}' for i in range(5)]
+
+    text = record_text(record)
+    assert text.startswith('Patient: Ada Long, female, DOB: 1970-01-01.')
+    assert '- hr: 29bpm (2020-01-30)' in text
+    assert 'visit 24' not in text
+    assert load_patient_record(9999) is None
+
+
+def test_summary_endpoint_uses_bounded_queries(app, client, monkeypatch, sql_statements):
+    user, patient = _patient_with_history()
+    prompts = []
+    monkeypatch.setattr(patient_services, 'generate_response', lambda messages: prompts.append(messages) or 'ok')
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+    with sql_statements() as statements:
+        response = client.get(f'/api/patients/{patient.id}/summary', headers=headers)
+
+    assert response.status_code == 200
+    assert response.json['summary'] == 'ok'
+    assert 'Upcoming Appointments:' in response.json['patient_data']
+    assert prompts[0][1]['content'] == response.json['patient_data']
+    record_queries = [s for s in statements if 'FROM encounters' in s or 'FROM observations' in s
+                      or 'FROM appointments' in s]
+    assert all('LIMIT' in s or 'count(' in s for s in record_queries)
+    assert client.get('/api/patients/9999/summary', headers=headers).status_code == 404
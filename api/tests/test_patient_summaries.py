@@ -0,0 +1,100 @@
+from datetime import date, datetime, timedelta
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.auth.models import User
+from app.patients.models import Patient, PatientSummary
+from app.patients import services as patient_services
+from app.patients.services import SummaryPregenerator, summarize_patient
+from app.clinical.models import Observation, Appointment
+
+
+def _patient(name='chart'):
+    user = User(username=name, email=f'{name}@example.com', role='patient')
+    user.set_password('pw')
+    db.session.add(user)
+    db.session.flush()
+    patient = Patient(user_id=user.id, first_name='Cara', last_name=name, date_of_birth=date(1980, 2, 2),
+                      gender='female')
+    db.session.add(patient)
+    db.session.commit()
+    return user, patient
+
+
+def _fake_llm(monkeypatch):
+    calls = []
+    monkeypatch.setattr(patient_services, 'generate_response',
+                        lambda messages: calls.append(messages) or f'summary #{len(calls)}')
+    return calls
+
+
+def test_unchanged_chart_is_served_from_the_store(app, client, monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    user, patient = _patient()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+    first = client.get(f'/api/patients/{patient.id}/summary', headers=headers).json
+    second = client.get(f'/api/patients/{patient.id}/summary', headers=headers).json
+    assert (first['summary'], first['cached']) == ('summary #1', False)
+    assert (second['summary'], second['cached']) == ('summary #1', True)
+    assert len(calls) == 1
+
+    refreshed = client.get(f'/api/patients/{patient.id}/summary?refresh=true', headers=headers).json
+    assert (refreshed['summary'], refreshed['cached']) == ('summary #2', False)
+
+
+def test_clinical_changes_invalidate_the_stored_summary(app, monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    _, patient = _patient()
+    summarize_patient(patient.id)
+    assert db.session.get(PatientSummary, patient.id) is not None
+
+    observation = Observation(patient_id=patient.id, code='bp', value='120/80')
+    db.session.add(observation)
+    db.session.commit()
+    assert db.session.get(PatientSummary, patient.id) is None
+    assert summarize_patient(patient.id)['summary'] == 'summary #2'
+
+    # Editing a row outside the record window still drops the summary
+    observation.notes = 'rechecked'
+    db.session.commit()
+    assert db.session.get(PatientSummary, patient.id) is None
+    assert len(calls) == 2
+
+
+def test_fingerprint_mismatch_regenerates(app, monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    _, patient = _patient()
+    summarize_patient(patient.id)
+    db.session.execute(PatientSummary.__table__.update().values(fingerprint='stale'))
+    db.session.commit()
+    assert summarize_patient(patient.id)['cached'] is False
+    assert len(calls) == 2
+
+
+def test_llm_failures_are_not_stored(app, monkeypatch):
+    def failing(messages):
+        raise RuntimeError('model offline')
+    monkeypatch.setattr(patient_services, 'generate_response', failing)
+    _, patient = _patient()
+    result = summarize_patient(patient.id)
+    assert result['summary'].startswith('Patient Cara chart is a female patient.')
+    assert db.session.get(PatientSummary, patient.id) is None
+
+
+def test_pregenerates_summaries_for_upcoming_appointments(app, monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    _, tomorrow = _patient('tomorrow')
+    _, next_month = _patient('nextmonth')
+    now = datetime.utcnow()
+    db.session.add_all([
+        Appointment(patient_id=tomorrow.id, appointment_datetime=now + timedelta(hours=20), status='booked'),
+        Appointment(patient_id=next_month.id, appointment_datetime=now + timedelta(days=30), status='booked'),
+    ])
+    db.session.commit()
+
+    pregenerator = SummaryPregenerator(lookahead_hours=24)
+    assert pregenerator.pregenerate() == {'current': 0, 'generated': 1, 'failed': 0}
+    assert pregenerator.pregenerate() == {'current': 1, 'generated': 0, 'failed': 0}
+    assert db.session.get(PatientSummary, tomorrow.id) is not None
+    assert db.session.get(PatientSummary, next_month.id) is None
+    assert len(calls) == 1
@@ -0,0 +1,102 @@
+import io
+import json
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.auth.models import User
+from app.billing.models import Invoice, Payment
+from app.common.authz_cache import get_authz_cache
+
+
+def _setup(amounts):
+    admin = User(username='billing_admin', email='billing_admin@example.com', role='admin')
+    admin.set_password('pw')
+    db.session.add(admin)
+    db.session.commit()
+    invoices = [Invoice(patient_id=admin.id, amount=amount) for amount in amounts]
+    db.session.add_all(invoices)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(admin.id))}'}
+    return invoices, headers
+
+
+def test_csv_import_reports_every_row_and_settles_invoices(app, client):
+    (first, second), headers = _setup([100, 50])
+    body = (
+        "invoice_id,amount,method,claim_number\n"
+        f"{first.id},60,eft,C1\n"
+        f"{first.id},40,eft,C2\n"
+        f"{second.id},20,,C3\n"
+        "999,10,eft,C4\n"
+        f"{second.id},abc,eft,C5\n"
+        f"{second.id},-5,eft,C6\n"
+    )
+    response = client.post('/api/billing/payments/import', data=body, headers=headers, content_type='text/csv')
+
+    assert response.status_code == 200
+    report = response.json
+    assert (report['rows'], report['created'], report['failed'], report['invoices_updated']) == (6, 3, 3, 2)
+    assert [r['status'] for r in report['results']] == ['created'] * 3 + ['error'] * 3
+    assert 'invoice_id' in report['results'][3]['errors']
+    assert 'amount' in report['results'][4]['errors']
+    assert 'amount' in report['results'][5]['errors']
+
+    db.session.expire_all()
+    assert (first.paid_total, first.status) == (100, 'paid')
+    assert (second.paid_total, second.status) == (20, 'pending')
+    assert Payment.query.filter_by(invoice_id=first.id).count() == 2
+
+
+def test_ndjson_upload_is_inserted_in_batches(app, client, sql_statements):
+    app.config['PAYMENT_IMPORT_BATCH_SIZE'] = 500
+    invoices, headers = _setup([1000] * 10)
+    lines = [json.dumps({"invoice_id": invoices[i % 10].id, "amount": 1, "method": "card"}) for i in range(2000)]
+    lines.insert(3, "not json")
+    upload = io.BytesIO("\n".join(lines).encode())
+
+    with sql_statements() as statements:
+        response = client.post(
+            '/api/billing/payments/import', headers=headers,
+            data={'file': (upload, 'remittance.ndjson')}, content_type='multipart/form-data',
+        )
+
+    report = response.json
+    assert (report['rows'], report['created'], report['failed']) == (2001, 2000, 1)
+    assert report['results'][3]['status'] == 'error'
+    payment_inserts = [s for s in statements if s.startswith('INSERT INTO payment')]
+    # 2001 rows in batches of 500: one executemany INSERT per batch, never one per row
+    assert len(payment_inserts) == 5
+    db.session.expire_all()
+    assert {invoice.paid_total for invoice in invoices} == {200}
+
+
+def test_import_requires_admin(app, client):
+    # Each test gets a fresh database; drop roles cached for earlier tests' user ids
+    get_authz_cache().clear()
+    user = User(username='patient_x', email='patient_x@example.com', role='patient')
+    user.set_password('pw')
+    db.session.add(user)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    try:
+        response = client.post('/api/billing/payments/import', data="invoice_id,amount\n", headers=headers,
+                               content_type='text/csv')
+        assert response.status_code == 403
+    finally:
+        get_authz_cache().clear()
+
+
+def test_unreadable_file_keeps_committed_batches_and_reports_them(app, client):
+    app.config['PAYMENT_IMPORT_BATCH_SIZE'] = 500
+    (invoice,), headers = _setup([100000])
+    body = "invoice_id,amount\n" + "".join(f"{invoice.id},1\n" for _ in range(5000))
+    upload = body.encode() + b"\xff" + f"{invoice.id},1\n".encode()
+
+    response = client.post('/api/billing/payments/import', data=upload, headers=headers, content_type='text/csv')
+
+    assert response.status_code == 200
+    report = response.json
+    assert 'could not be read' in report['file_error']
+    created = Payment.query.filter_by(invoice_id=invoice.id).count()
+    # The report matches what was saved, row by row, so the rest can be re-sent without paying twice
+    assert 0 < report['created'] == created < 5000
+    assert [r['row'] for r in report['results']] == list(range(1, created + 1))
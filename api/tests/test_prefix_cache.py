@@ -0,0 +1,162 @@
+import importlib.util
+import pathlib
+import os
+import types
+import sys
+import numpy as np
+import pytest
+
+PREFIX_CACHE_PATH = pathlib.Path(__file__).resolve().parents[1] / "app" / "llm" / "prefix_cache.py"
+
+
+class FakeLlama:
+    """Character-level stand-in for llama_cpp.Llama that records how many tokens each eval() processes."""
+
+    def __init__(self, *args, **kwargs):
+        self.chat_format = "fake"
+        self.ctx = object()
+        self.input_ids = np.zeros(1024, dtype=np.intc)
+        self.n_tokens = 0
+        self.evaluated = []
+
+    @property
+    def _input_ids(self):
+        return self.input_ids[: self.n_tokens]
+
+    def tokenize(self, text: bytes):
+        return [1] + list(text)
+
+    def token_bos(self):
+        return 1
+
+    def reset(self):
+        self.n_tokens = 0
+
+    def eval(self, tokens):
+        self.evaluated.append(len(tokens))
+        self.input_ids[self.n_tokens:self.n_tokens + len(tokens)] = tokens
+        self.n_tokens += len(tokens)
+
+    def create_completion(self, prompt, **kwargs):
+        # Same prefix reuse as Llama.generate(): keep matching tokens, evaluate the rest
+        tokens = self.tokenize(prompt.encode("utf-8"))
+        reused = 0
+        for a, b in zip(self._input_ids.tolist(), tokens[:-1]):
+            if a != b:
+                break
+            reused += 1
+        self.n_tokens = reused
+        self.eval(tokens[reused:])
+        return {"choices": [{"text": "ok"}]}
+
+
+def _render(messages):
+    prompt = "".join(f"<|{m['role']}|>{m['content']}<|end|>" for m in messages) + "<|assistant|>"
+    return types.SimpleNamespace(prompt=prompt)
+
+
+def _load_prefix_cache():
+    spec = importlib.util.spec_from_file_location("prefix_cache_under_test", PREFIX_CACHE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _fake_llama_cpp():
+    fake = types.ModuleType("llama_cpp")
+    fake.Llama = FakeLlama
+    fake.llama_chat_format = types.SimpleNamespace(get_chat_format=lambda name: _render)
+    fake.llama_get_state_size = lambda ctx: 32
+    fake.llama_copy_state_data = lambda ctx, buffer: 16
+    fake.llama_set_state_data = lambda ctx, buffer: len(buffer)
+    return fake
+
+
+@pytest.fixture
+def prefix_cache(monkeypatch):
+    monkeypatch.setitem(sys.modules, "llama_cpp", _fake_llama_cpp())
+    return _load_prefix_cache()
+
+
+SYSTEM = [{"role": "system", "content": "You are a helpful and careful medical assistant."}]
+OTHER = [{"role": "system", "content": "You explain invoices and payment plans to patients."}]
+
+
+def _prompt(model, system, question):
+    return model.render_prompt(system + [{"role": "user", "content": question}])
+
+
+def test_restores_warm_prefix_after_other_requests(prefix_cache):
+    model = prefix_cache.PrefixCachingLlama(prefix_cache_size=4)
+    prefix_len = model.warm_prefix(SYSTEM)
+    model.warm_prefix(OTHER)
+
+    prompt = _prompt(model, SYSTEM, "I have a fever")
+    model.create_completion(prompt)
+
+    # Only the tail after the cached system prefix was evaluated
+    assert model.evaluated[-1] == len(model.tokenize(prompt.encode("utf-8"))) - prefix_len
+    stats = model.prefix_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["prompt_tokens_skipped"] == prefix_len
+
+
+def test_unrelated_prompt_is_a_miss(prefix_cache):
+    model = prefix_cache.PrefixCachingLlama(prefix_cache_size=4)
+    model.warm_prefix(SYSTEM)
+
+    model.create_completion(_prompt(model, OTHER, "How much do I owe?"))
+
+    stats = model.prefix_cache_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 0
+
+
+def test_evicts_least_recently_used_prefix(prefix_cache):
+    model = prefix_cache.PrefixCachingLlama(prefix_cache_size=1)
+    model.warm_prefix(SYSTEM)
+    model.warm_prefix(OTHER)
+
+    assert model.prefix_cache_stats()["prefixes"] == 1
+    model.create_completion(_prompt(model, SYSTEM, "I have a fever"))
+    assert model.prefix_cache_stats()["misses"] == 1
+
+
+def test_register_static_prefix_deduplicates(prefix_cache):
+    prefix_cache.register_static_prefix(SYSTEM)
+    prefix_cache.register_static_prefix(list(SYSTEM))
+    assert prefix_cache.registered_prefixes() == [SYSTEM]
+
+
+def test_cache_is_disabled_without_the_llama_cpp_state_functions(monkeypatch):
+    fake = _fake_llama_cpp()
+    del fake.llama_set_state_data
+    monkeypatch.setitem(sys.modules, "llama_cpp", fake)
+    prefix_cache = _load_prefix_cache()
+
+    model = prefix_cache.PrefixCachingLlama(prefix_cache_size=4)
+    assert prefix_cache.missing_state_api(model) == ["llama_cpp.llama_set_state_data"]
+    assert model.warm_prefix(SYSTEM) == 0
+    assert model.prefix_cache_stats()["prefixes"] == 0
+
+
+def test_pinned_llama_cpp_restores_a_cached_prefix():
+    """Against the real llama-cpp-python from requirements.txt; needs a GGUF model at LLAMA_MODEL_PATH."""
+    pytest.importorskip("llama_cpp")
+    model_path = os.environ.get("LLAMA_MODEL_PATH", "")
+    if not os.path.isfile(model_path):
+        pytest.skip("LLAMA_MODEL_PATH does not point at a model file")
+    prefix_cache = _load_prefix_cache()
+    model = prefix_cache.PrefixCachingLlama(model_path=model_path, n_ctx=512, verbose=False, prefix_cache_size=4)
+    assert prefix_cache.missing_state_api(model) == []
+
+    prompt = _prompt(model, SYSTEM, "Name one symptom of a fever.")
+    expected = model.create_completion(prompt, max_tokens=8, temperature=0)["choices"][0]["text"]
+    prefix_len = model.warm_prefix(SYSTEM)
+    model.warm_prefix(OTHER)  # leaves the other prefix evaluated in the context
+
+    # Restoring the snapshot gives the same greedy completion as evaluating the whole prompt
+    assert model.create_completion(prompt, max_tokens=8, temperature=0)["choices"][0]["text"] == expected
+    stats = model.prefix_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["prompt_tokens_skipped"] == prefix_len
@@ -0,0 +1,194 @@
+import threading
+import time
+import pytest
+from app.llm.coalescing import RequestCoalescer
+from app.llm.scheduler import InferenceScheduler, PRIORITY_PATIENT
+
+
+class GatedBackend:
+    concurrency = 1
+
+    def __init__(self, pieces=("a", "b", "c")):
+        self.pieces = pieces
+        self.release = threading.Event()
+        self.calls = 0
+        self.closed = 0
+        self.error = None
+
+    def create_chat_completion(self, params):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return {"choices": [{"message": {"content": f"reply #{self.calls}"}}]}
+
+    def stream_chat_completion(self, params):
+        self.calls += 1
+        try:
+            for piece in self.pieces:
+                self.release.wait(5)
+                yield {"choices": [{"delta": {"content": piece}}]}
+        finally:
+            self.closed += 1
+
+
+def _params(content="When is the clinic open?", temperature=0.7):
+    return {"messages": [{"role": "user", "content": content}], "max_tokens": 64,
+            "temperature": temperature, "top_p": 0.9, "stop": []}
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def _text(chunks):
+    return "".join(c["choices"][0]["delta"]["content"] for c in chunks)
+
+
+def test_identical_concurrent_completions_share_one_generation():
+    backend = GatedBackend()
+    scheduler = InferenceScheduler(backend, max_queue_size=8, max_wait_seconds=5)
+    coalescer = RequestCoalescer()
+    results = []
+
+    def ask(content):
+        results.append(coalescer.complete(scheduler, _params(content), PRIORITY_PATIENT))
+
+    threads = [threading.Thread(target=ask, args=("When is the clinic open?",))]
+    threads[0].start()
+    _wait_for(lambda: backend.calls == 1)
+    # Surrounding whitespace does not make a request different
+    threads += [threading.Thread(target=ask, args=(" When is the clinic open?\n",)) for _ in range(4)]
+    for t in threads[1:]:
+        t.start()
+    _wait_for(lambda: coalescer.stats()["coalesced"] == 4)
+    backend.release.set()
+    for t in threads:
+        t.join(5)
+
+    assert backend.calls == 1
+    assert [r["choices"][0]["message"]["content"] for r in results] == ["reply #1"] * 5
+    stats = coalescer.stats()
+    assert (stats["generations"], stats["generations_saved"], stats["in_flight"]) == (1, 4, 0)
+
+    # Once finished, the same request generates again; other sampling params never coalesce
+    coalescer.complete(scheduler, _params(), PRIORITY_PATIENT)
+    coalescer.complete(scheduler, _params(temperature=0.2), PRIORITY_PATIENT)
+    assert backend.calls == 3
+
+
+def test_generation_errors_reach_every_waiter():
+    backend = GatedBackend()
+    backend.error = RuntimeError("model crashed")
+    scheduler = InferenceScheduler(backend, max_queue_size=8, max_wait_seconds=5)
+    coalescer = RequestCoalescer()
+    errors = []
+
+    def ask():
+        try:
+            coalescer.complete(scheduler, _params(), PRIORITY_PATIENT)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=ask) for _ in range(3)]
+    threads[0].start()
+    _wait_for(lambda: backend.calls == 1)
+    for t in threads[1:]:
+        t.start()
+    _wait_for(lambda: coalescer.stats()["coalesced"] == 2)
+    backend.release.set()
+    for t in threads:
+        t.join(5)
+    assert errors == ["model crashed"] * 3 and backend.calls == 1
+
+
+def test_stream_fans_out_to_late_joiners():
+    backend = GatedBackend()
+    scheduler = InferenceScheduler(backend, max_queue_size=8, max_wait_seconds=5)
+    coalescer = RequestCoalescer()
+
+    backend.release.set()
+    first = coalescer.stream(scheduler, _params(), PRIORITY_PATIENT)
+    head = next(first)
+    backend.release.clear()
+
+    # Joins after the first chunk was produced and still receives the whole reply
+    second = coalescer.stream(scheduler, _params(), PRIORITY_PATIENT)
+    collected = []
+    reader = threading.Thread(target=lambda: collected.append(_text(second)))
+    reader.start()
+    backend.release.set()
+    rest = list(first)
+    reader.join(5)
+
+    assert _text([head] + rest) == "abc" and collected == ["abc"]
+    assert backend.calls == 1
+    assert coalescer.stats()["coalesced_streams"] == 1
+
+
+def test_stream_is_cancelled_only_when_every_reader_has_left():
+    backend = GatedBackend(pieces=("a", "b", "c", "d"))
+    backend.release.set()
+    scheduler = InferenceScheduler(backend, max_queue_size=8, max_wait_seconds=5)
+    coalescer = RequestCoalescer()
+
+    first = coalescer.stream(scheduler, _params(), PRIORITY_PATIENT)
+    second = coalescer.stream(scheduler, _params(), PRIORITY_PATIENT)
+    next(first)
+    first.close()
+    assert _text(second) == "abcd"
+    assert backend.calls == 1
+
+    third = coalescer.stream(scheduler, _params(), PRIORITY_PATIENT)
+    next(third)
+    third.close()
+    _wait_for(lambda: backend.closed == 2)
+    assert backend.calls == 2
+    assert coalescer.stats()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_generate_response_coalesces_unless_disabled(app, monkeypatch, enabled):
+    from app.llm import clients
+    backend = GatedBackend()
+    backend.release.set()
+    scheduler = InferenceScheduler(backend, max_queue_size=8, max_wait_seconds=5)
+    monkeypatch.setattr(clients, "get_scheduler", lambda: scheduler)
+    app.config["LLM_COALESCE_REQUESTS"] = enabled
+    coalescer = clients.get_request_coalescer()
+    before = coalescer.stats()["generations"] if coalescer else 0
+
+    assert clients.generate_response([{"role": "user", "content": "hi"}], priority=PRIORITY_PATIENT) == "reply #1"
+    assert (coalescer is not None) is enabled
+    if coalescer:
+        assert coalescer.stats()["generations"] == before + 1
+
+
+def test_identical_chat_agent_questions_share_one_generation(app, monkeypatch):
+    from app.agents.orchestrator import supervisor_agent
+    from app.llm import clients
+    backend = GatedBackend()
+    scheduler = InferenceScheduler(backend, max_queue_size=8, max_wait_seconds=5)
+    monkeypatch.setattr(clients, "get_scheduler", lambda: scheduler)
+    app.config["LLM_COALESCE_REQUESTS"] = True
+    coalescer = clients.get_request_coalescer()
+    coalesced = coalescer.stats()["coalesced"]
+    replies = []
+
+    def ask():
+        with app.app_context():
+            replies.append(supervisor_agent("When is the clinic open on Sunday?", "Clinic hours: 9-5"))
+
+    threads = [threading.Thread(target=ask) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: coalescer.stats()["coalesced"] == coalesced + 1)
+    backend.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert replies == ["reply #1", "reply #1"]
+    assert scheduler.stats()["submitted"] == 1
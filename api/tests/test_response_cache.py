@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from app.llm.response_cache import ResponseCache
+from app.llm.clients import completion_params
+
+VECTORS = {
+    "Explain how to use ibuprofen.": [1.0, 0.0, 0.0],
+    "How do I use ibuprofen?": [0.99, 0.1, 0.0],
+    "Explain how to use warfarin.": [0.0, 1.0, 0.0],
+}
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings(monkeypatch):
+    monkeypatch.setattr("app.rag.embedding_cache.embed_query", lambda text: np.array(VECTORS[text], dtype=np.float32))
+
+
+def _params(question, system="Give clear and safe medication counseling."):
+    return completion_params([
+        {"role": "system", "content": system},
+        {"role": "user", "content": question},
+    ])
+
+
+def test_exact_hit_requires_identical_params():
+    cache = ResponseCache()
+    cache.put(_params("Explain how to use ibuprofen."), "Take with food.")
+
+    assert cache.get(_params("Explain how to use ibuprofen.")) == "Take with food."
+    hotter = dict(_params("Explain how to use ibuprofen."), temperature=1.2)
+    assert cache.get(hotter) is None
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_semantic_hit_within_scope_and_threshold():
+    cache = ResponseCache(semantic_threshold=0.95)
+    cache.put(_params("Explain how to use ibuprofen."), "Take with food.", semantic=True)
+
+    assert cache.get(_params("How do I use ibuprofen?"), semantic=True) == "Take with food."
+    assert cache.get(_params("Explain how to use warfarin."), semantic=True) is None
+    # Same question under a different system prompt is a different scope
+    assert cache.get(_params("How do I use ibuprofen?", system="Be brief."), semantic=True) is None
+    stats = cache.stats()
+    assert stats["semantic_hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_invalidate_by_tag():
+    cache = ResponseCache()
+    cache.put(_params("Explain how to use ibuprofen."), "Invoice text", tags=("invoice:1",))
+    cache.put(_params("Explain how to use warfarin."), "Other", tags=("invoice:2",))
+
+    assert cache.invalidate("invoice:1") == 1
+    assert cache.get(_params("Explain how to use ibuprofen.")) is None
+    assert cache.get(_params("Explain how to use warfarin.")) == "Other"
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache = ResponseCache(ttl_seconds=10)
+    now = [1000.0]
+    monkeypatch.setattr("app.llm.response_cache.time.monotonic", lambda: now[0])
+    cache.put(_params("Explain how to use ibuprofen."), "Take with food.")
+
+    now[0] += 11
+    assert cache.get(_params("Explain how to use ibuprofen.")) is None
+    assert cache.stats()["expirations"] == 1
@@ -0,0 +1,88 @@
+import time
+from flask_jwt_extended import create_access_token
+from app.auth.revocation import (
+    BloomFilter,
+    MemoryRevocationBackend,
+    RevocationStore,
+    SQLiteRevocationBackend,
+    get_revocation_store,
+)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"jti-{i}")
+    assert all(f"jti-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_unrevoked_tokens_are_answered_without_the_backend():
+    backend = MemoryRevocationBackend()
+    store = RevocationStore(backend, bloom_capacity=1000)
+    store.revoke("revoked", time.time() + 60)
+
+    assert store.is_revoked("revoked")
+    for i in range(100):
+        assert not store.is_revoked(f"fresh-{i}")
+    stats = store.stats()
+    assert stats["backend_checks"] == 1
+    assert stats["bloom_negatives"] == 100
+
+
+def test_expired_revocations_are_dropped():
+    backend = MemoryRevocationBackend()
+    store = RevocationStore(backend, purge_interval=0)
+    store.revoke("old", time.time() - 1)
+    store.revoke("live", time.time() + 60)
+
+    assert not store.is_revoked("old")
+    assert store.is_revoked("live")
+    assert [jti for jti, _ in backend.active()] == ["live"]
+
+
+
+def test_memory_feed_is_trimmed_without_losing_the_cursor():
+    backend = MemoryRevocationBackend()
+    backend.add("old", time.time() - 1)
+    backend.add("live", time.time() + 60)
+    changes, cursor = backend.changes_since(0)
+    assert [jti for jti, _ in changes] == ["old", "live"]
+
+    assert backend.purge_expired() == 1
+    assert [jti for _, jti, _ in backend._feed] == ["live"]
+    backend.add("new", time.time() + 60)
+    # Only the revocation added after the cursor, even though the feed is now shorter
+    changes, cursor = backend.changes_since(cursor)
+    assert [jti for jti, _ in changes] == ["new"]
+    assert backend.changes_since(cursor) == ([], cursor)
+
+def test_revocations_propagate_between_workers_through_sqlite(tmp_path):
+    path = str(tmp_path / "revoked.db")
+    worker_a = RevocationStore(SQLiteRevocationBackend(path), sync_interval=0)
+    worker_b = RevocationStore(SQLiteRevocationBackend(path), sync_interval=0)
+
+    assert not worker_b.is_revoked("shared")
+    worker_a.revoke("shared", time.time() + 60)
+    assert worker_b.is_revoked("shared")
+
+
+def test_sync_interval_bounds_backend_reads(tmp_path):
+    path = str(tmp_path / "revoked.db")
+    worker_a = RevocationStore(SQLiteRevocationBackend(path))
+    worker_b = RevocationStore(SQLiteRevocationBackend(path), sync_interval=3600)
+
+    worker_a.revoke("shared", time.time() + 60)
+    # Not yet synced: worker_b has not read the change feed within its interval
+    assert not worker_b.is_revoked("shared")
+
+
+def test_logout_revokes_the_token(app, client):
+    with app.app_context():
+        token = create_access_token(identity="1")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.post("/api/auth/logout", headers=headers).status_code == 200
+    assert client.post("/api/auth/logout", headers=headers).status_code == 401
+    assert get_revocation_store().stats()["revoked_hits"] >= 1
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.dashboard.models import AppMetric, UserActivity, MetricRollup, RollupGap, RollupWatermark
+from app.dashboard.rollups import RollupCompactor
+from app.dashboard.services import (
+    get_api_call_counts_per_endpoint, get_daily_active_users, get_llm_queries_by_model, get_llm_query_counts,
+)
+from app.llm.models import LLMQueryLog
+
+
+def _api_calls(endpoint, n, at):
+    db.session.add_all([
+        AppMetric(metric_name='api_call', value=1, dimension_key='endpoint', dimension_value=endpoint, timestamp=at)
+        for _ in range(n)
+    ])
+    db.session.commit()
+
+
+def test_dashboard_reads_come_from_rollups(app, sql_statements):
+    now = datetime.utcnow() - timedelta(minutes=5)
+    _api_calls('/api/patients', 3, now)
+    _api_calls('/api/chat/rooms', 1, now)
+    _api_calls('/api/patients', 2, now - timedelta(days=3))  # outside a 24h window
+    db.session.add_all([LLMQueryLog(prompt='p', model_name='llama', created_at=now) for _ in range(4)])
+    db.session.commit()
+
+    # Nothing is visible until the compactor has folded the raw rows in
+    assert get_api_call_counts_per_endpoint(24) == []
+    RollupCompactor().compact()
+
+    assert get_api_call_counts_per_endpoint(24) == [
+        {"endpoint": "/api/patients", "count": 3},
+        {"endpoint": "/api/chat/rooms", "count": 1},
+    ]
+    assert get_api_call_counts_per_endpoint(24 * 7)[0] == {"endpoint": "/api/patients", "count": 5}
+    assert get_llm_queries_by_model(24) == [{"model": "llama", "count": 4}]
+    assert get_llm_query_counts(24) == 4
+
+    with sql_statements() as statements:
+        get_api_call_counts_per_endpoint(24)
+    assert len(statements) == 1
+    assert 'app_metrics' not in statements[0]
+
+
+def test_compaction_is_incremental_and_idempotent(app):
+    at = datetime.utcnow() - timedelta(minutes=5)
+    _api_calls('/api/patients', 2, at)
+    compactor = RollupCompactor(batch_size=1)
+    assert compactor.compact()["app_metrics"] == 2
+    assert compactor.compact()["app_metrics"] == 0
+
+    _api_calls('/api/patients', 1, at)
+    assert compactor.compact()["app_metrics"] == 1
+    hourly = MetricRollup.query.filter_by(metric='api_call', granularity='hour').one()
+    assert (hourly.count, hourly.total) == (3, 3.0)
+    assert compactor.watermarks()["app_metrics"] == AppMetric.query.order_by(AppMetric.id.desc()).first().id
+
+
+def test_rows_committed_after_the_watermark_passed_them_are_folded(app):
+    at = datetime.utcnow() - timedelta(minutes=5)
+    _api_calls('/api/patients', 1, at)
+    compactor = RollupCompactor()
+    compactor.compact()
+
+    # Ids 2 and 3 are taken by transactions that have not committed when id 4 is folded
+    db.session.add(AppMetric(id=4, metric_name='api_call', value=1, dimension_value='/api/patients', timestamp=at))
+    db.session.commit()
+    assert compactor.compact()["app_metrics"] == 1
+    assert compactor.watermarks()["app_metrics"] == 4
+    assert sorted(gap.raw_id for gap in RollupGap.query) == [2, 3]
+
+    db.session.add(AppMetric(id=2, metric_name='api_call', value=1, dimension_value='/api/patients', timestamp=at))
+    db.session.commit()
+    assert compactor.compact()["app_metrics"] == 1
+    assert get_api_call_counts_per_endpoint(24) == [{"endpoint": "/api/patients", "count": 3}]
+
+    # Id 3 never shows up (rolled back); its gap is dropped after the timeout
+    RollupCompactor(gap_timeout=-1).prune()
+    assert RollupGap.query.count() == 0
+
+
+def test_rows_without_or_with_future_timestamps_do_not_stall_compaction(app):
+    now = datetime.utcnow()
+    _api_calls('/api/patients', 1, now - timedelta(minutes=5))
+    db.session.add(AppMetric(metric_name='api_call', value=1, dimension_value='/api/patients', timestamp=None))
+    db.session.add(LLMQueryLog(prompt='p', model_name='llama', created_at=now + timedelta(hours=1)))
+    db.session.commit()
+    _api_calls('/api/chat/rooms', 1, now - timedelta(minutes=5))
+
+    folded = RollupCompactor().compact()
+    assert (folded["app_metrics"], folded["llm_query_logs"]) == (3, 1)
+    assert sorted(c["endpoint"] for c in get_api_call_counts_per_endpoint(24)) == ["/api/chat/rooms", "/api/patients"]
+    assert get_llm_query_counts(24) == 1
+
+
+def test_stale_watermark_does_not_double_count(app):
+    _api_calls('/api/patients', 2, datetime.utcnow() - timedelta(minutes=5))
+    first, second = RollupCompactor(), RollupCompactor()
+    first.compact()
+
+    # A second worker that read the old watermark loses the compare-and-set
+    watermark = db.session.get(RollupWatermark, 'app_metrics')
+    watermark_id = watermark.last_id
+    second._watermark = lambda source: 0
+    assert second.compact_source('app_metrics') == 0
+    assert db.session.get(RollupWatermark, 'app_metrics').last_id == watermark_id
+    assert get_api_call_counts_per_endpoint(24) == [{"endpoint": "/api/patients", "count": 2}]
+
+
+def test_daily_active_users_count_each_user_once_per_day(app):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    for user_id, at in [(1, yesterday), (1, yesterday), (2, yesterday), (1, today), (None, today)]:
+        db.session.add(UserActivity(user_id=user_id, activity_type='login', timestamp=at))
+    db.session.commit()
+    compactor = RollupCompactor(batch_size=2)
+    compactor.compact()
+
+    # Activity in a later batch for an already-counted user does not inflate the count
+    db.session.add(UserActivity(user_id=2, activity_type='login', timestamp=yesterday))
+    db.session.commit()
+    compactor.compact()
+
+    assert get_daily_active_users(7) == [
+        {"date": str(yesterday.date()), "count": 2},
+        {"date": str(today.date()), "count": 1},
+    ]
@@ -0,0 +1,88 @@
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+import pytest
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.auth.models import User
+from app.billing.models import Invoice, Payment
+from app.common.sql_profiler import SQLProfiler, get_sql_profiler, statement_shape
+
+
+def test_statement_shape_folds_literals_and_parameter_lists():
+    assert statement_shape("SELECT * FROM payment WHERE invoice_id = ?") == \
+        statement_shape("SELECT *   FROM payment\nWHERE invoice_id = ?")
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?)") == "SELECT * FROM t WHERE id IN (?, ...)"
+    assert statement_shape("SELECT * FROM t WHERE name = 'x' AND n = 42") == "SELECT * FROM t WHERE name = ? AND n = ?"
+    assert statement_shape("SELECT * FROM t WHERE id = %(id_1)s") == "SELECT * FROM t WHERE id = ?"
+
+
+def test_lazy_loads_are_flagged_as_n_plus_one(app):
+    user = User(username='payer', email='payer@example.com', role='patient')
+    user.set_password('pw')
+    db.session.add(user)
+    db.session.commit()
+    for i in range(6):
+        invoice = Invoice(patient_id=user.id, amount=100 + i)
+        invoice.payments.append(Payment(amount=10))
+        db.session.add(invoice)
+    db.session.commit()
+    db.session.expire_all()
+
+    profiler = SQLProfiler(sample_rate=1.0, n_plus_one_threshold=5)
+    with app.test_request_context('/api/billing/invoices'):
+        profiler.before_request()
+        total = sum(payment.amount for invoice in Invoice.query.all() for payment in invoice.payments)
+        response = profiler.after_request(app.response_class())
+
+    assert total == 60
+    assert response.headers["X-SQL-Queries"] == "7"
+    [endpoint] = profiler.report()
+    assert endpoint["n_plus_one_requests"] == 1
+    lazy_load = next(s for s in endpoint["top_shapes"] if s["executions"] == 6)
+    assert "FROM payment" in lazy_load["shape"]
+    assert lazy_load["n_plus_one_requests"] == 1
+
+
+def test_unsampled_requests_are_not_recorded(app):
+    profiler = SQLProfiler(sample_rate=0.0)
+    with app.test_request_context('/api/chat/rooms'):
+        profiler.before_request()
+        assert g.get("sql_profile") is None
+        response = profiler.after_request(app.response_class())
+    assert "X-SQL-Queries" not in response.headers
+    assert profiler.report() == []
+
+
+def test_admin_report_lists_sampled_endpoints(app, client, monkeypatch):
+    monkeypatch.setattr(get_sql_profiler(), "sample_rate", 1.0)
+    get_sql_profiler().reset()
+    admin = User(username='admin1', email='admin1@example.com', role='admin')
+    admin.set_password('pw')
+    db.session.add(admin)
+    db.session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(admin.id))}"}
+
+    response = client.get('/api/chat/rooms', headers=headers)
+    assert int(response.headers["X-SQL-Queries"]) >= 1
+
+    report = client.get('/api/dashboard/metrics/sql-profile', headers=headers).get_json()
+    endpoints = {e["endpoint"]: e for e in report["endpoints"]}
+    assert endpoints["GET /api/chat/rooms"]["sampled_requests"] == 1
+
+
+def test_failed_statements_leave_the_profile_consistent(app):
+    profiler = SQLProfiler(sample_rate=1.0)
+    with app.test_request_context('/api/billing/invoices'):
+        profiler.before_request()
+        with pytest.raises(OperationalError):
+            db.session.execute(text("SELECT * FROM no_such_table"))
+        db.session.rollback()
+        assert Invoice.query.count() == 0
+        statements = list(g.sql_profile)
+        response = profiler.after_request(app.response_class())
+
+    # Only the statement that completed is timed, and it is timed from its own start
+    assert [statement for statement, _ in statements if "no_such_table" in statement] == []
+    assert response.headers["X-SQL-Queries"] == "1"
+    assert all(seconds < 1 for _, seconds in statements)
@@ -33,7 +33,7 @@ const ChatScreen = ({ route }: any) => {
     setIsTyping(true);
     try {
       const response = await chatAPI.sendMessage(room.id, newMessage, 'user');
-      setMessages(response.conversation);
+      setMessages((prev) => [...prev, ...response.messages]);
       setNewMessage('');
     } catch (error) {
       Alert.alert('Error', 'Failed to send message');
@@ -18,10 +18,11 @@ const DashboardScreen = () => {
         setUser(profile);
         const patientId = profile.id;
 
+        // Only upcoming appointments and due invoices are needed, so let the server filter them
         const [appointments, rooms, invoices] = await Promise.all([
-          clinicalAPI.getAppointments(),
+          clinicalAPI.getAppointments({ from: new Date().toISOString() }),
           chatAPI.getRooms(),
-          billingAPI.getInvoices(patientId),
+          billingAPI.getInvoices(patientId, { status: 'due' }),
         ]);
 
         setAppointments(appointments);
@@ -17,6 +17,21 @@ const api = axios.create({
 const logError = (error: any) => {
   console.error('API Error:', error.response?.status, error.message);
 };
+
+// List endpoints return one page at a time; follow X-Next-Cursor until the last page
+const MAX_PAGE_SIZE = 200;
+const getAllPages = async (url: string, params: Record<string, any> = {}) => {
+  const items: any[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await api.get(url, {
+      params: { ...params, limit: MAX_PAGE_SIZE, ...(cursor ? { cursor } : {}) },
+    });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'] || undefined;
+  } while (cursor);
+  return items;
+};
 // Request interceptor to add auth token
 api.interceptors.request.use(async config => {
   const token = await AsyncStorage.getItem('access_token');
@@ -162,8 +177,7 @@ export const authAPI = {
 export const chatAPI = {
   getRooms: async () => {
     try {
-      const response = await api.get('/chat/rooms');
-      return response.data;
+      return await getAllPages('/chat/rooms');
     } catch (error) {
       logError(error);
       throw error;
@@ -209,10 +223,9 @@ export const chatAPI = {
 
 // Clinical API functions
 export const clinicalAPI = {
-  getObservations: async () => {
+  getObservations: async (params?: Record<string, any>) => {
     try {
-      const response = await api.get('/clinical/observations');
-      return response.data;
+      return await getAllPages('/clinical/observations', params);
     } catch (error) {
       logError(error);
       throw error;
@@ -272,10 +285,9 @@ export const clinicalAPI = {
       throw error;
     }
   },
-  getEncounters: async () => {
+  getEncounters: async (params?: Record<string, any>) => {
     try {
-      const response = await api.get('/clinical/encounters');
-      return response.data;
+      return await getAllPages('/clinical/encounters', params);
     } catch (error) {
       logError(error);
       throw error;
@@ -308,10 +320,9 @@ export const clinicalAPI = {
       throw error;
     }
   },
-  getPrescriptions: async () => {
+  getPrescriptions: async (params?: Record<string, any>) => {
     try {
-      const response = await api.get('/medications/prescriptions');
-      return response.data;
+      return await getAllPages('/medications/prescriptions', params);
     } catch (error) {
       logError(error);
       throw error;
@@ -353,10 +364,9 @@ export const clinicalAPI = {
       throw error;
     }
   },
-  getAppointments: async () => {
+  getAppointments: async (params?: Record<string, any>) => {
     try {
-      const response = await api.get('/clinical/appointments');
-      return response.data;
+      return await getAllPages('/clinical/appointments', params);
     } catch (error) {
       logError(error);
       throw error;
@@ -366,11 +376,9 @@ export const clinicalAPI = {
 
 // Billing API functions
 export const billingAPI = {
-  getInvoices: async (patientId?: number) => {
+  getInvoices: async (patientId?: number, params?: Record<string, any>) => {
     try {
-      const params = patientId ? { patient_id: patientId } : {};
-      const response = await api.get('/billing/invoices', { params });
-      return response.data;
+      return await getAllPages('/billing/invoices', { ...params, ...(patientId ? { patient_id: patientId } : {}) });
     } catch (error) {
       logError(error);
       throw error;
@@ -1,7 +1,9 @@
 'use client';
 import { useEffect, useState } from 'react';
 import { useAuth } from '../../xlib/auth';
-import api from '../../xlib/api';
+import { billingService } from '../../xlib/services';
+import { usePagedList } from '../../xlib/use-paged-list';
+import LoadMoreButton from '../../components/LoadMoreButton';
 import { CreditCard, Plus, Search, DollarSign, Clock, CheckCircle, AlertCircle } from 'lucide-react';
 
 interface Invoice {
@@ -15,31 +17,30 @@ interface Invoice {
 
 export default function Billing() {
   const { user } = useAuth();
-  const [invoices, setInvoices] = useState<Invoice[]>([]);
-  const [loading, setLoading] = useState(true);
+  const {
+    items: invoices, loading, loadingMore, hasMore, loadMore,
+  } = usePagedList<Invoice>(billingService.listInvoices, {}, Boolean(user));
+  const [statusCounts, setStatusCounts] = useState({ paid: 0, pending: 0, overdue: 0 });
   const [searchTerm, setSearchTerm] = useState('');
 
   useEffect(() => {
-    const fetchInvoices = async () => {
-      try {
-        const response = await api.get('/billing/invoices');
-        setInvoices(response.data);
-      } catch (error) {
-        console.error('Failed to fetch invoices:', error);
-      } finally {
-        setLoading(false);
-      }
+    // Counted by the API, so the cards cover every invoice, not just the pages loaded so far
+    const fetchStatusCounts = async () => {
+      const [paid, pending, overdue] = await Promise.allSettled(
+        ['paid', 'pending', 'overdue'].map((status) => billingService.countInvoices({ status }))
+      ).then((results) => results.map((result) => (result.status === 'fulfilled' ? result.value : 0)));
+      setStatusCounts({ paid, pending, overdue });
     };
 
     if (user) {
-      fetchInvoices();
+      fetchStatusCounts();
     }
   }, [user]);
 
-  const totalRevenue = invoices.reduce((sum, invoice) => sum + invoice.amount, 0);
-  const paidInvoices = invoices.filter(inv => inv.status === 'paid').length;
-  const pendingInvoices = invoices.filter(inv => inv.status === 'pending').length;
-  const overdueInvoices = invoices.filter(inv => inv.status === 'overdue').length;
+  const listedRevenue = invoices.reduce((sum, invoice) => sum + invoice.amount, 0);
+  const paidInvoices = statusCounts.paid;
+  const pendingInvoices = statusCounts.pending;
+  const overdueInvoices = statusCounts.overdue;
 
   if (loading) {
     return (
@@ -77,8 +78,8 @@ export default function Billing() {
           <div className="bg-gradient-to-r from-green-500 to-emerald-600 p-6 rounded-xl shadow-lg text-white hover:shadow-xl transition-all duration-300 hover:-translate-y-1">
             <div className="flex items-center justify-between">
               <div>
-                <p className="text-green-100 text-sm font-medium mb-1">Total Revenue</p>
-                <p className="text-3xl font-bold">${totalRevenue.toLocaleString()}</p>
+                <p className="text-green-100 text-sm font-medium mb-1">Revenue (listed invoices)</p>
+                <p className="text-3xl font-bold">${listedRevenue.toLocaleString()}</p>
               </div>
               <div className="bg-white/20 p-3 rounded-lg">
                 <DollarSign className="h-8 w-8" />
@@ -216,6 +217,7 @@ export default function Billing() {
             </table>
           </div>
         </div>
+        <LoadMoreButton hasMore={hasMore} loading={loadingMore} onClick={loadMore} />
 
         {invoices.length === 0 && !loading && (
           <div className="text-center py-12">
@@ -5,12 +5,16 @@ import { Calendar, Plus, Clock, X, User } from 'lucide-react';
 import { useAuth } from '../../../xlib/auth'; // Assuming this is the correct auth hook
 import { Appointment, Patient } from '../../../types';
 import { clinicalService, patientService } from '../../../xlib/services';
+import { usePagedList } from '../../../xlib/use-paged-list';
+import LoadMoreButton from '../../../components/LoadMoreButton';
 
 type ModalType = 'view' | 'create' | null; // Removed 'edit'
 
 export default function AppointmentsPage() {
   const { user } = useAuth(); // Use the common auth hook
-  const [appointments, setAppointments] = useState<Appointment[]>([]);
+  const {
+    items: appointments, setItems: setAppointments, loading: listLoading, loadingMore, hasMore, loadMore,
+  } = usePagedList<Appointment>(clinicalService.listAppointments, {}, Boolean(user));
   const [patients, setPatients] = useState<Patient[]>([]);
   const [loading, setLoading] = useState(true);
   const [modal, setModal] = useState<ModalType>(null);
@@ -23,11 +27,7 @@ export default function AppointmentsPage() {
     const fetchData = async () => {
       if (!user) return; // Ensure user is loaded
       try {
-        const [appointmentsRes, patientsRes] = await Promise.all([
-          clinicalService.listAppointments(),
-          patientService.listPatients()
-        ]);
-        setAppointments(appointmentsRes.data || []);
+        const patientsRes = await patientService.listPatientOptions();
         setPatients(patientsRes.data || []);
       } catch (error) {
         console.error('Failed to fetch data:', error);
@@ -82,7 +82,7 @@ export default function AppointmentsPage() {
     return patient ? `${patient.first_name} ${patient.last_name}` : 'Unknown Patient';
   };
 
-  if (loading) {
+  if (loading || listLoading) {
     return <div className="p-6">Loading appointments...</div>;
   }
 
@@ -153,6 +153,7 @@ export default function AppointmentsPage() {
           </tbody>
         </table>
       </div>
+      <LoadMoreButton hasMore={hasMore} loading={loadingMore} onClick={loadMore} />
 
       {modal && (
         <div className="fixed inset-0 bg-gray-600 bg-opacity-50 overflow-y-auto h-full w-full z-50">
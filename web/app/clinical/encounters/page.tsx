@@ -5,12 +5,16 @@ import { FileText, Plus, X, User } from 'lucide-react';
 import { useAuth } from '../../../xlib/auth'; // Use the common auth hook
 import { Encounter, Patient } from '../../../types';
 import { clinicalService, patientService } from '../../../xlib/services';
+import { usePagedList } from '../../../xlib/use-paged-list';
+import LoadMoreButton from '../../../components/LoadMoreButton';
 
 type ModalType = 'view' | 'create' | null; // Removed 'edit'
 
 export default function EncountersPage() {
   const { user } = useAuth(); // Use the common auth hook
-  const [encounters, setEncounters] = useState<Encounter[]>([]);
+  const {
+    items: encounters, setItems: setEncounters, loading: listLoading, loadingMore, hasMore, loadMore,
+  } = usePagedList<Encounter>(clinicalService.listEncounters, {}, Boolean(user));
   const [patients, setPatients] = useState<Patient[]>([]);
   const [loading, setLoading] = useState(true);
   const [modal, setModal] = useState<ModalType>(null);
@@ -23,11 +27,7 @@ export default function EncountersPage() {
     const fetchData = async () => {
       if (!user) return; // Ensure user is loaded
       try {
-        const [encountersRes, patientsRes] = await Promise.all([
-          clinicalService.listEncounters(),
-          patientService.listPatients()
-        ]);
-        setEncounters(encountersRes.data || []);
+        const patientsRes = await patientService.listPatientOptions();
         setPatients(patientsRes.data || []);
       } catch (error) {
         console.error('Failed to fetch data:', error);
@@ -85,7 +85,7 @@ export default function EncountersPage() {
     return patient ? `${patient.first_name} ${patient.last_name}` : 'Unknown Patient';
   };
 
-  if (loading) {
+  if (loading || listLoading) {
     return <div className="p-6">Loading encounters...</div>;
   }
 
@@ -161,6 +161,7 @@ export default function EncountersPage() {
           </tbody>
         </table>
       </div>
+      <LoadMoreButton hasMore={hasMore} loading={loadingMore} onClick={loadMore} />
 
       {modal && (
         <div className="fixed inset-0 bg-gray-600 bg-opacity-50 overflow-y-auto h-full w-full z-50">
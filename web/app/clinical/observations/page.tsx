@@ -5,12 +5,16 @@ import { Activity, Plus, X, User } from 'lucide-react';
 import { useAuth } from '../../../xlib/auth'; // Use the common auth hook
 import { Observation, Patient } from '../../../types';
 import { clinicalService, patientService } from '../../../xlib/services';
+import { usePagedList } from '../../../xlib/use-paged-list';
+import LoadMoreButton from '../../../components/LoadMoreButton';
 
 type ModalType = 'view' | 'create' | 'edit' | null;
 
 export default function ObservationsPage() {
   const { user } = useAuth(); // Use the common auth hook
-  const [observations, setObservations] = useState<Observation[]>([]);
+  const {
+    items: observations, setItems: setObservations, loading: listLoading, loadingMore, hasMore, loadMore,
+  } = usePagedList<Observation>(clinicalService.listObservations, {}, Boolean(user));
   const [patients, setPatients] = useState<Patient[]>([]);
   const [loading, setLoading] = useState(true);
   const [modal, setModal] = useState<ModalType>(null);
@@ -23,11 +27,7 @@ export default function ObservationsPage() {
     const fetchData = async () => {
       if (!user) return; // Ensure user is loaded
       try {
-        const [observationsRes, patientsRes] = await Promise.all([
-          clinicalService.listObservations(),
-          patientService.listPatients()
-        ]);
-        setObservations(observationsRes.data || []);
+        const patientsRes = await patientService.listPatientOptions();
         setPatients(patientsRes.data || []);
       } catch (error) {
         console.error('Failed to fetch data:', error);
@@ -84,7 +84,7 @@ export default function ObservationsPage() {
     return patient ? `${patient.first_name} ${patient.last_name}` : 'Unknown Patient';
   };
 
-  if (loading) {
+  if (loading || listLoading) {
     return (
       <div className="p-6">
         <div className="animate-pulse">
@@ -179,6 +179,7 @@ export default function ObservationsPage() {
           </tbody>
         </table>
       </div>
+      <LoadMoreButton hasMore={hasMore} loading={loadingMore} onClick={loadMore} />
 
       {modal && (
         <div className="fixed inset-0 bg-gray-600 bg-opacity-50 overflow-y-auto h-full w-full z-50">
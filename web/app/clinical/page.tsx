@@ -15,6 +15,7 @@ export default function Clinical() {
   const [observations, setObservations] = useState<Observation[]>([]);
   const [appointments, setAppointments] = useState<Appointment[]>([]);
   const [patients, setPatients] = useState<Patient[]>([]);
+  const [totals, setTotals] = useState({ encounter: 0, observation: 0, appointment: 0 });
   const [loading, setLoading] = useState(true);
   const [modal, setModal] = useState<ModalType>(null);
   const [selectedItem, setSelectedItem] = useState<ClinicalItemType>(null);
@@ -24,21 +25,27 @@ export default function Clinical() {
   useEffect(() => {
     const fetchClinicalData = async () => {
       try {
+        // The overview shows five of each and the totals (X-Total-Count), so one short page is enough
+        const recent = { limit: 5, count: true };
         const [encountersRes, observationsRes, appointmentsRes, patientsRes] = await Promise.allSettled([
-          clinicalService.listEncounters(),
-          clinicalService.listObservations(),
-          clinicalService.listAppointments(),
-          patientService.listPatients() 
+          clinicalService.listEncounters(recent),
+          clinicalService.listObservations(recent),
+          clinicalService.listAppointments(recent),
+          patientService.listPatientOptions()
         ]);
+        const total = (response: { headers: any }) => Number(response.headers['x-total-count'] ?? 0);
 
         if (encountersRes.status === 'fulfilled') {
           setEncounters(encountersRes.value.data);
+          setTotals(prev => ({ ...prev, encounter: total(encountersRes.value) }));
         }
         if (observationsRes.status === 'fulfilled') {
           setObservations(observationsRes.value.data);
+          setTotals(prev => ({ ...prev, observation: total(observationsRes.value) }));
         }
         if (appointmentsRes.status === 'fulfilled') {
           setAppointments(appointmentsRes.value.data);
+          setTotals(prev => ({ ...prev, appointment: total(appointmentsRes.value) }));
         }
         if (patientsRes.status === 'fulfilled') {
           setPatients(patientsRes.value.data);
@@ -85,6 +92,7 @@ export default function Clinical() {
         if (modal === 'create') {
           response = await clinicalService.createEncounter(formData as Encounter);
           setEncounters(prev => [...prev, response.data]);
+          setTotals(prev => ({ ...prev, encounter: prev.encounter + 1 }));
         } else if (modal === 'edit' && selectedItem) {
           response = await clinicalService.updateEncounter(selectedItem.id!, formData as Encounter);
           setEncounters(prev => prev.map(item => item.id === selectedItem.id ? response.data : item));
@@ -93,6 +101,7 @@ export default function Clinical() {
         if (modal === 'create') {
           response = await clinicalService.createObservation(formData as Observation);
           setObservations(prev => [...prev, response.data]);
+          setTotals(prev => ({ ...prev, observation: prev.observation + 1 }));
         } else if (modal === 'edit' && selectedItem) {
           response = await clinicalService.updateObservation(selectedItem.id!, formData as Observation);
           setObservations(prev => prev.map(item => item.id === selectedItem.id ? response.data : item));
@@ -101,6 +110,7 @@ export default function Clinical() {
         if (modal === 'create') {
           response = await clinicalService.createAppointment(formData as Appointment);
           setAppointments(prev => [...prev, response.data]);
+          setTotals(prev => ({ ...prev, appointment: prev.appointment + 1 }));
         } else if (modal === 'edit' && selectedItem) {
           response = await clinicalService.updateAppointment(selectedItem.id!, formData as Appointment);
           setAppointments(prev => prev.map(item => item.id === selectedItem.id ? response.data : item));
@@ -118,12 +128,15 @@ export default function Clinical() {
       if (itemType === 'encounter') {
         await clinicalService.deleteEncounter(id);
         setEncounters(prev => prev.filter(item => item.id !== id));
+        setTotals(prev => ({ ...prev, encounter: prev.encounter - 1 }));
       } else if (itemType === 'observation') {
         await clinicalService.deleteObservation(id);
         setObservations(prev => prev.filter(item => item.id !== id));
+        setTotals(prev => ({ ...prev, observation: prev.observation - 1 }));
       } else if (itemType === 'appointment') {
         await clinicalService.deleteAppointment(id);
         setAppointments(prev => prev.filter(item => item.id !== id));
+        setTotals(prev => ({ ...prev, appointment: prev.appointment - 1 }));
       }
     } catch (error) {
       console.error('Failed to delete clinical data:', error);
@@ -171,7 +184,7 @@ export default function Clinical() {
             <div className="flex items-center justify-between">
               <div>
                 <p className="text-blue-100 text-sm font-medium mb-1">Patient Encounters</p>
-                <p className="text-3xl font-bold">{encounters.length}</p>
+                <p className="text-3xl font-bold">{totals.encounter}</p>
               </div>
               <Calendar className="h-8 w-8 opacity-80" />
             </div>
@@ -181,7 +194,7 @@ export default function Clinical() {
             <div className="flex items-center justify-between">
               <div>
                 <p className="text-green-100 text-sm font-medium mb-1">Observations</p>
-                <p className="text-3xl font-bold">{observations.length}</p>
+                <p className="text-3xl font-bold">{totals.observation}</p>
               </div>
               <Activity className="h-8 w-8 opacity-80" />
             </div>
@@ -191,7 +204,7 @@ export default function Clinical() {
             <div className="flex items-center justify-between">
               <div>
                 <p className="text-purple-100 text-sm font-medium mb-1">Appointments</p>
-                <p className="text-3xl font-bold">{appointments.length}</p>
+                <p className="text-3xl font-bold">{totals.appointment}</p>
               </div>
               <Clock className="h-8 w-8 opacity-80" />
             </div>
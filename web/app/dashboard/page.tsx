@@ -29,33 +29,23 @@ function Dashboard() {
   useEffect(() => {
     const fetchDashboardData = async () => {
       try {
+        // Counted by the API; the list endpoints only return one page of rows
+        const startOfDay = new Date();
+        startOfDay.setHours(0, 0, 0, 0);
+        const endOfDay = new Date(startOfDay.getTime() + 24 * 60 * 60 * 1000 - 1);
         const results = await Promise.allSettled([
-          patientService.listPatients(),
-          clinicalService.listAppointments(),
-          medicationsService.listPrescriptions(),
-          billingService.listInvoices()
+          patientService.countPatients(),
+          clinicalService.countAppointments({ from: startOfDay.toISOString(), to: endOfDay.toISOString() }),
+          medicationsService.countPrescriptions({ status: 'active' }),
+          billingService.countInvoices({ status: 'pending' })
         ]);
 
-        const patients = results[0].status === 'fulfilled' ? results[0].value.data : [];
-        const appointments = results[1].status === 'fulfilled' ? results[1].value.data : [];
-        const prescriptions = results[2].status === 'fulfilled' ? results[2].value.data : [];
-        const invoices = results[3].status === 'fulfilled' ? results[3].value.data : [];
-
-        const today = new Date().toDateString();
-        const todayAppointments = appointments.filter((apt: any) => 
-          new Date(apt.appointment_datetime).toDateString() === today
-        ).length;
-
-        const activePrescriptions = prescriptions.filter((rx: any) => 
-          rx.status === 'active'
-        ).length;
-
-        const pendingBills = invoices.filter((inv: any) => 
-          inv.status === 'pending'
-        ).length;
+        const [totalPatients, todayAppointments, activePrescriptions, pendingBills] = results.map(
+          (result) => (result.status === 'fulfilled' ? result.value : 0)
+        );
 
         setData({
-          totalPatients: patients.length,
+          totalPatients,
           todayAppointments,
           activePrescriptions,
           pendingBills
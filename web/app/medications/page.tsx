@@ -2,30 +2,38 @@
 import { useEffect, useState } from 'react';
 import { useAuth } from '../../xlib/auth';
 import { medicationsService } from '../../xlib/services';
+import { usePagedList } from '../../xlib/use-paged-list';
+import LoadMoreButton from '../../components/LoadMoreButton';
 import { Prescription } from '../../types';
 import { Pill, Plus, Search, Clock, User, FileText } from 'lucide-react';
 import Link from 'next/link';
 
 export default function Medications() {
   const { user } = useAuth();
-  const [prescriptions, setPrescriptions] = useState<Prescription[]>([]);
-  const [loading, setLoading] = useState(true);
+  const {
+    items: prescriptions, loading, loadingMore, hasMore, loadMore,
+  } = usePagedList<Prescription>(medicationsService.listPrescriptions, {}, Boolean(user));
+  const [activePrescriptions, setActivePrescriptions] = useState(0);
+  const [totalPrescriptions, setTotalPrescriptions] = useState(0);
   const [searchTerm, setSearchTerm] = useState('');
 
   useEffect(() => {
-    const fetchPrescriptions = async () => {
+    // Counted by the API, so the totals cover every prescription, not just the pages loaded so far
+    const fetchCounts = async () => {
       if (!user) return; // Ensure user is loaded
       try {
-        const response = await medicationsService.listPrescriptions();
-        setPrescriptions(response.data || []);
+        const [active, total] = await Promise.all([
+          medicationsService.countPrescriptions({ status: 'active' }),
+          medicationsService.countPrescriptions(),
+        ]);
+        setActivePrescriptions(active);
+        setTotalPrescriptions(total);
       } catch (error) {
-        console.error('Failed to fetch prescriptions:', error);
-      } finally {
-        setLoading(false);
+        console.error('Failed to count prescriptions:', error);
       }
     };
 
-    fetchPrescriptions();
+    fetchCounts();
   }, [user]);
 
   const filteredPrescriptions = prescriptions.filter(prescription =>
@@ -33,9 +41,6 @@ export default function Medications() {
     prescription.prescribed_by.toLowerCase().includes(searchTerm.toLowerCase())
   );
 
-  const activePrescriptions = prescriptions.filter(p => p.status === 'active').length;
-  const totalPrescriptions = prescriptions.length;
-
   const handleNewPrescription = () => {
     console.log('New Prescription button clicked. Implement modal or form here.');
     // Example: open a modal for adding a new prescription
@@ -173,6 +178,7 @@ export default function Medications() {
             </div>
           ))}
         </div>
+        <LoadMoreButton hasMore={hasMore} loading={loadingMore} onClick={loadMore} />
 
         {filteredPrescriptions.length === 0 && !loading && (
           <div className="text-center py-12">
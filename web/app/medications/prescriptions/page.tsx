@@ -5,11 +5,15 @@ import { Pill, Plus, X, User } from 'lucide-react';
 import { useAuthStore } from '../../../xlib/auth-store';
 import { Patient, Prescription } from '../../../types';
 import { medicationsService, patientService } from '../../../xlib/services';
+import { usePagedList } from '../../../xlib/use-paged-list';
+import LoadMoreButton from '../../../components/LoadMoreButton';
 
 type ModalType = 'view' | 'create' | 'edit' | null;
 
 export default function PrescriptionsPage() {
-  const [prescriptions, setPrescriptions] = useState<Prescription[]>([]);
+  const {
+    items: prescriptions, setItems: setPrescriptions, loading: listLoading, loadingMore, hasMore, loadMore,
+  } = usePagedList<Prescription>(medicationsService.listPrescriptions);
   const [patients, setPatients] = useState<Patient[]>([]);
   const [loading, setLoading] = useState(true);
   const [modal, setModal] = useState<ModalType>(null);
@@ -26,11 +30,7 @@ export default function PrescriptionsPage() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [prescriptionsRes, patientsRes] = await Promise.all([
-          medicationsService.listPrescriptions(),
-          patientService.listPatients()
-        ]);
-        setPrescriptions(prescriptionsRes.data || []);
+        const patientsRes = await patientService.listPatientOptions();
         setPatients(patientsRes.data || []);
       } catch (error) {
         console.error('Failed to fetch data:', error);
@@ -72,7 +72,7 @@ export default function PrescriptionsPage() {
   //   return patient ? `${patient.firstName} ${patient.lastName}` : 'Unknown Patient';
   // };
 
-  if (!hydrated || loading) {
+  if (!hydrated || loading || listLoading) {
     return <div className="p-6">Loading prescriptions...</div>;
   }
 
@@ -153,6 +153,7 @@ export default function PrescriptionsPage() {
           </tbody>
         </table>
       </div>
+      <LoadMoreButton hasMore={hasMore} loading={loadingMore} onClick={loadMore} />
 
       {modal && (
         <div className="fixed inset-0 bg-gray-600 bg-opacity-50 overflow-y-auto h-full w-full z-50">
@@ -5,13 +5,17 @@ import { FileText, Plus, X, User } from 'lucide-react';
 import { useAuthStore } from '../../../xlib/auth-store';
 import { Patient, TreatmentPlan } from '../../../types';
 import { medicationsService, patientService } from '../../../xlib/services';
+import { usePagedList } from '../../../xlib/use-paged-list';
+import LoadMoreButton from '../../../components/LoadMoreButton';
 
 
 
 type ModalType = 'view' | 'create' | 'edit' | null;
 
 export default function TreatmentPlansPage() {
-  const [treatmentPlans, setTreatmentPlans] = useState<TreatmentPlan[]>([]);
+  const {
+    items: treatmentPlans, setItems: setTreatmentPlans, loading: listLoading, loadingMore, hasMore, loadMore,
+  } = usePagedList<TreatmentPlan>(medicationsService.listTreatmentPlans);
   const [patients, setPatients] = useState<Patient[]>([]);
   const [loading, setLoading] = useState(true);
   const [modal, setModal] = useState<ModalType>(null);
@@ -28,11 +32,7 @@ export default function TreatmentPlansPage() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [plansRes, patientsRes] = await Promise.all([
-          medicationsService.listTreatmentPlans(),
-          patientService.listPatients()
-        ]);
-        setTreatmentPlans(plansRes.data || []);
+        const patientsRes = await patientService.listPatientOptions();
         setPatients(patientsRes.data || []);
       } catch (error) {
         console.error('Failed to fetch data:', error);
@@ -77,7 +77,7 @@ export default function TreatmentPlansPage() {
     return patient ? `${patient.first_name} ${patient.last_name}` : 'Unknown Patient';
   };
 
-  if (!hydrated || loading) {
+  if (!hydrated || loading || listLoading) {
     return <div className="p-6">Loading treatment plans...</div>;
   }
 
@@ -159,6 +159,7 @@ export default function TreatmentPlansPage() {
           </tbody>
         </table>
       </div>
+      <LoadMoreButton hasMore={hasMore} loading={loadingMore} onClick={loadMore} />
 
       {modal && (
         <div className="fixed inset-0 bg-gray-600 bg-opacity-50 overflow-y-auto h-full w-full z-50">
@@ -2,39 +2,25 @@
 import { useEffect, useState, useCallback } from 'react';
 import { useAuth } from '../../xlib/auth';
 import { patientService } from '../../xlib/services';
+import { usePagedList } from '../../xlib/use-paged-list';
+import LoadMoreButton from '../../components/LoadMoreButton';
 import { Patient } from '../../types';
 import { Users, Plus, Search, Phone, Mail, Calendar } from 'lucide-react';
 
 export default function Patients() {
   const { user } = useAuth();
-  const [patients, setPatients] = useState<Patient[]>([]);
-  const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
 
   // Debounce search term
   const debouncedSearchTerm = useDebounce(searchTerm, 500);
 
-  useEffect(() => {
-    const fetchPatients = async () => {
-      if (!user) return;
-      setLoading(true);
-      try {
-        let response;
-        if (debouncedSearchTerm) {
-          response = await patientService.searchPatients(debouncedSearchTerm);
-        } else {
-          response = await patientService.listPatients();
-        }
-        setPatients(response.data);
-      } catch (error) {
-        console.error('Failed to fetch patients:', error);
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchPatients();
-  }, [user, debouncedSearchTerm]);
+  const {
+    items: patients, loading, loadingMore, hasMore, loadMore,
+  } = usePagedList<Patient>(
+    ({ query, ...params }) => (query ? patientService.searchPatients(query) : patientService.listPatients(params)),
+    { query: debouncedSearchTerm },
+    Boolean(user),
+  );
 
   const handleAddPatient = () => {
     console.log('Add Patient button clicked. Implement modal or form here.');
@@ -141,6 +127,7 @@ export default function Patients() {
             </div>
           ))}
         </div>
+        <LoadMoreButton hasMore={hasMore} loading={loadingMore} onClick={loadMore} />
 
         {patients.length === 0 && !loading && (
           <div className="text-center py-12">
@@ -0,0 +1,22 @@
+'use client';
+
+interface LoadMoreButtonProps {
+  hasMore: boolean;
+  loading: boolean;
+  onClick: () => void;
+}
+
+export default function LoadMoreButton({ hasMore, loading, onClick }: LoadMoreButtonProps) {
+  if (!hasMore) return null;
+  return (
+    <div className="flex justify-center mt-4">
+      <button
+        onClick={onClick}
+        disabled={loading}
+        className="px-4 py-2 border border-gray-300 rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50"
+      >
+        {loading ? 'Loading...' : 'Load more'}
+      </button>
+    </div>
+  );
+}
@@ -1,5 +1,29 @@
+import type { AxiosResponse } from 'axios';
 import api from './api';
 
+// List endpoints return one page at a time (the API's default page is 50 rows) and point at the
+// next one with X-Next-Cursor; list pages fetch a page and load more on demand (usePagedList).
+const listPage = (url: string, params?: any) => api.get(url, { params });
+
+// Every row, following X-Next-Cursor to the last page: only for small lookups such as pickers
+const listAll = async (url: string, params?: any) => {
+  const items: any[] = [];
+  let cursor: string | undefined;
+  let response: AxiosResponse;
+  do {
+    response = await api.get(url, { params: { limit: 200, ...params, cursor } });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'] as string | undefined;
+  } while (cursor);
+  return { ...response, data: items };
+};
+
+// Number of rows matching `params`, counted by the API (X-Total-Count) without fetching them
+const countAll = async (url: string, params?: any) => {
+  const response = await api.get(url, { params: { ...params, count: true, limit: 1, fields: 'id' } });
+  return Number(response.headers['x-total-count'] ?? 0);
+};
+
 // Auth Services
 export const authService = {
   login: (data: any) => api.post('/auth/login', data),
@@ -16,18 +40,20 @@ export const authService = {
 export const billingService = {
   createInvoice: (data: any) => api.post('/billing/invoices', data),
   getInvoice: (invoiceId: number) => api.get(`/billing/invoices/${invoiceId}`),
-  listInvoices: (params?: any) => api.get('/billing/invoices', { params }),
+  listInvoices: (params?: any) => listPage('/billing/invoices', params),
+  countInvoices: (params?: any) => countAll('/billing/invoices', params),
   updateInvoice: (invoiceId: number, data: any) => api.put(`/billing/invoices/${invoiceId}`, data),
   deleteInvoice: (invoiceId: number) => api.delete(`/billing/invoices/${invoiceId}`),
   createPayment: (data: any) => api.post('/billing/payments', data),
-  getPaymentsForInvoice: (invoiceId: number) => api.get(`/billing/invoices/${invoiceId}/payments`),
+  getPaymentsForInvoice: (invoiceId: number) => listAll(`/billing/invoices/${invoiceId}/payments`),
   explainInvoice: (invoiceId: number) => api.get(`/billing/invoices/${invoiceId}/explain`),
 };
 
 // Chat Services
 export const chatService = {
   createRoom: (data: any) => api.post('/chat/rooms', data),
-  listRooms: () => api.get('/chat/rooms'),
+  // Most recently active first; follows X-Next-Cursor so the room list is complete
+  listRooms: () => listAll('/chat/rooms'),
   joinRoom: (roomId: number) => api.post(`/chat/rooms/${roomId}/participants`),
   getMessages: (roomId: number) => api.get(`/chat/rooms/${roomId}/messages`),
   sendMessage: (roomId: number, data: any) => api.post(`/chat/rooms/${roomId}/messages`, data),
@@ -39,18 +65,21 @@ export const chatService = {
 // Clinical Services
 export const clinicalService = {
   createObservation: (data: any) => api.post('/clinical/observations', data),
-  listObservations: (params?: any) => api.get('/clinical/observations', { params }),
+  listObservations: (params?: any) => listPage('/clinical/observations', params),
+  countObservations: (params?: any) => countAll('/clinical/observations', params),
   getObservationById: (id: number) => api.get(`/clinical/observations/${id}`),
   getObservationByFhirId: (fhirId: string) => api.get(`/clinical/observations/${fhirId}`),
   updateObservation: (id: number, data: any) => api.put(`/clinical/observations/${id}`, data),
   updateObservationByFhirId: (fhirId: string, data: any) => api.put(`/clinical/observations/${fhirId}`, data),
   deleteObservation: (id: number) => api.delete(`/clinical/observations/${id}`),
   deleteObservationByFhirId: (fhirId: string) => api.delete(`/clinical/observations/${fhirId}`),
-  listEncounters: (params?: any) => api.get('/clinical/encounters', { params }),
+  listEncounters: (params?: any) => listPage('/clinical/encounters', params),
+  countEncounters: (params?: any) => countAll('/clinical/encounters', params),
   createEncounter: (data: any) => api.post('/clinical/encounters', data),
   updateEncounter: (id: number, data: any) => api.put(`/clinical/encounters/${id}`, data),
   deleteEncounter: (id: number) => api.delete(`/clinical/encounters/${id}`),
-  listAppointments: (params?: any) => api.get('/clinical/appointments', { params }),
+  listAppointments: (params?: any) => listPage('/clinical/appointments', params),
+  countAppointments: (params?: any) => countAll('/clinical/appointments', params),
   createAppointment: (data: any) => api.post('/clinical/appointments', data),
   updateAppointment: (id: number, data: any) => api.put(`/clinical/appointments/${id}`, data),
   deleteAppointment: (id: number) => api.delete(`/clinical/appointments/${id}`),
@@ -76,10 +105,11 @@ export const llmService = {
 // Medications Services
 export const medicationsService = {
   createPrescription: (data: any) => api.post('/medications/prescriptions', data),
-  listPrescriptions: (params?: any) => api.get('/medications/prescriptions', { params }),
+  listPrescriptions: (params?: any) => listPage('/medications/prescriptions', params),
+  countPrescriptions: (params?: any) => countAll('/medications/prescriptions', params),
   getMedicationCounseling: (data: { medication: string }) => api.post('/medications/counseling', data),
   createTreatmentPlan: (data: any) => api.post('/medications/treatment-plans', data),
-  listTreatmentPlans: (params?: any) => api.get('/medications/treatment-plans', { params }),
+  listTreatmentPlans: (params?: any) => listPage('/medications/treatment-plans', params),
   getTreatmentPlan: (planId: number) => api.get(`/medications/treatment-plans/${planId}`),
   updateTreatmentPlan: (planId: number, data: any) => api.put(`/medications/treatment-plans/${planId}`, data),
   deleteTreatmentPlan: (planId: number) => api.delete(`/medications/treatment-plans/${planId}`),
@@ -91,7 +121,10 @@ export const patientService = {
   getPatient: (id: number) => api.get(`/patients/${id}`),
   updatePatient: (id: number, data: any) => api.put(`/patients/${id}`, data),
   deletePatient: (id: number) => api.delete(`/patients/${id}`),
-  listPatients: () => api.get('/patients'),
+  listPatients: (params?: any) => listPage('/patients', params),
+  // Names of every patient, for the patient pickers
+  listPatientOptions: () => listAll('/patients', { fields: 'first_name,last_name' }),
+  countPatients: (params?: any) => countAll('/patients', params),
   getPatientSummary: (patientId: number) => api.get(`/patients/${patientId}/summary`),
   searchPatients: (query: string) => api.get('/patients/search', { params: { query } }),
   maskPatientPhi: (patientId: number) => api.get(`/patients/${patientId}/mask_phi`),
@@ -0,0 +1,51 @@
+'use client';
+import { useEffect, useState } from 'react';
+import type { AxiosResponse } from 'axios';
+
+type FetchPage<T> = (params: any) => Promise<AxiosResponse<T[]>>;
+
+// One page of a list endpoint at a time: the first page is fetched with `params` (filters,
+// fields, limit) whenever they change, and loadMore() appends the page X-Next-Cursor points at.
+export function usePagedList<T>(fetchPage: FetchPage<T>, params: Record<string, any> = {}, enabled = true) {
+  const [items, setItems] = useState<T[]>([]);
+  const [cursor, setCursor] = useState<string | undefined>();
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const paramsKey = JSON.stringify(params);
+
+  useEffect(() => {
+    if (!enabled) return;
+    let cancelled = false;
+    setLoading(true);
+    fetchPage(params)
+      .then((response) => {
+        if (cancelled) return;
+        setItems(response.data || []);
+        setCursor(response.headers['x-next-cursor']);
+      })
+      .catch((error) => console.error('Failed to fetch list:', error))
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+    return () => {
+      cancelled = true;
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [enabled, paramsKey]);
+
+  const loadMore = async () => {
+    if (!cursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await fetchPage({ ...params, cursor });
+      setItems((prev) => [...prev, ...(response.data || [])]);
+      setCursor(response.headers['x-next-cursor']);
+    } catch (error) {
+      console.error('Failed to fetch the next page:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  return { items, setItems, loading, loadingMore, hasMore: Boolean(cursor), loadMore };
+}